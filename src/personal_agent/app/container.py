@@ -9,6 +9,7 @@ from personal_agent.config import ConfigContainer
 from personal_agent.chat import Container as ChatContainer
 from personal_agent.cli import Container as CliContainer
 from personal_agent.mcp import Container as MCPContainer
+from personal_agent.server import Container as ServerContainer
 
 
 class AppContainer(containers.DeclarativeContainer):
@@ -17,14 +18,35 @@ class AppContainer(containers.DeclarativeContainer):
     config_container = providers.Container(ConfigContainer)
     configer = config_container.provided.configer
 
+    mcp_container = providers.Container(MCPContainer, configer=configer)
+    server_registry = mcp_container.provided.server_registry
+    async_server_registry = mcp_container.provided.async_server_registry
+
     # 注入 configer 的 provider到 chat 容器中，生成 chat 的容器，并获取它的 chat_service 的 provider
-    chat_container = providers.Container(ChatContainer, configer=configer)
+    # chat 通过 MCP 的工具服务发现和调用工具
+    chat_container = providers.Container(
+        ChatContainer,
+        configer=configer,
+        tool_service=mcp_container.provided.tool_service.call(),
+    )
     chat_service = chat_container.provided.chat_service
-
-    mcp_container = providers.Container(MCPContainer)
-    server_registry = mcp_container.provided.server_registry
+    session_chat_service = chat_container.provided.session_chat_service
 
     cli_container = providers.Container(
-        CliContainer, server_registry=server_registry, chat_service=chat_service
+        CliContainer,
+        configer=configer,
+        server_registry=async_server_registry,
+        chat_service=chat_service,
+        health_checker=mcp_container.provided.health_checker,
+        session_chat_service=session_chat_service.call(),
     )
     cli = cli_container.provided.cli()
+
+    # HTTP 服务与 CLI 共用同一套聊天服务与服务器注册表
+    server_container = providers.Container(
+        ServerContainer,
+        configer=configer,
+        session_chat_service=session_chat_service.call(),
+        server_registry=async_server_registry.call(),
+        health_checker=mcp_container.provided.health_checker.call(),
+    )
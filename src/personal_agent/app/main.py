@@ -1,12 +1,63 @@
+import argparse
 import asyncio
+import sys
+from typing import List, Optional
 from personal_agent.app import Container
 from personal_agent.cli import CommandLineInterface
+from personal_agent.cli.batch import default_output_path
+from personal_agent.util import contracts, tracing
 
 
-def main():
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="personal-agent")
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser("batch", help="并发执行 JSONL 文件中的对话")
+    batch.add_argument("input", help="输入文件，每行一个 JSON 对象")
+    batch.add_argument("-o", "--output", help="结果文件，默认为 <输入>.results.jsonl")
+    batch.add_argument(
+        "-j", "--concurrency", type=int, help="同时进行的对话数，默认取配置"
+    )
+    serve = commands.add_parser("serve", help="启动 HTTP / WebSocket 服务")
+    serve.add_argument("--host", help="监听地址，默认取配置")
+    serve.add_argument("--port", type=int, help="监听端口，默认取配置")
+    serve.add_argument("--workers", type=int, help="预派生的工作进程数，默认取配置")
+    args = parser.parse_args(argv)
+    if args.command == "batch" and args.concurrency is not None:
+        if args.concurrency <= 0:
+            parser.error("--concurrency 必须为正整数")
+    if args.command == "serve" and args.workers is not None and args.workers <= 0:
+        parser.error("--workers 必须为正整数")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.command == "serve":
+        # uvicorn 与 starlette 只在启动服务时导入
+        # pylint: disable=import-outside-toplevel
+        from personal_agent.server.runner import serve
+
+        serve(args.host, args.port, args.workers)
+        return
     container = Container()
-    cli: CommandLineInterface = container.cli_container().cli()
-    asyncio.run(cli.start())
+    app_config = container.config_container().configer().get_app_config()
+    contracts.configure(app_config.contracts, app_config.contract_sample_rate)
+    tracing.configure_from(app_config.tracing)
+    try:
+        if args.command == "batch":
+            output = args.output or default_output_path(args.input)
+            runner = container.cli_container().batch_runner()
+            summary = asyncio.run(runner.run(args.input, output, args.concurrency))
+            print(
+                f"完成 {summary['completed']}，失败 {summary['failed']}，"
+                f"跳过 {summary['skipped']}；结果写入 {output}",
+                file=sys.stderr,
+            )
+            return
+        cli: CommandLineInterface = container.cli_container().cli()
+        asyncio.run(cli.start())
+    finally:
+        tracing.shutdown()
 
 
 if __name__ == "__main__":
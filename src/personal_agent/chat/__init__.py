@@ -3,6 +3,7 @@ chat 子系统职责：负责与LLM模型交互，处理用户输入，并返回
 """
 
 from .api.chat_service import ChatService
+from .api.session_chat_service import SessionChatService
 from .container import Container
 
-__all__ = ["ChatService", "Container"]
+__all__ = ["ChatService", "SessionChatService", "Container"]
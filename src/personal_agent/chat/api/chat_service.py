@@ -1,9 +1,11 @@
-from abc import ABC, abstractmethod
-from typing import List, Dict
-from icontract import require, ensure
+from abc import abstractmethod
+from collections.abc import Mapping
+from typing import AsyncIterator, List, Dict
+from icontract import DBC
+from personal_agent.util.contracts import require, ensure
 
 
-class ChatService(ABC):
+class ChatService(DBC):
     """
     聊天服务接口
 
@@ -37,11 +39,35 @@ class ChatService(ABC):
             该方法应保证线程安全（如适用），并在异常情况下提供明确的错误信息。
         """
 
+    @abstractmethod
+    @require(
+        lambda message: isinstance(message, str) and message.strip() != "",
+        "消息内容必须为非空字符串",
+    )
+    async def stream_response(self, message: str) -> AsyncIterator[str]:
+        """
+        发送一条用户消息，并以异步生成器的方式逐段获取聊天服务的回复。
+
+        参数:
+            message (str): 用户输入的消息内容，不能为空字符串。
+
+        返回:
+            AsyncIterator[str]: 按到达顺序产出的回复片段，拼接后即为完整回复。
+
+        异常:
+            ConnectionError: 无法连接到聊天服务时抛出。
+
+        说明:
+            完整回复在流结束后才写入上下文；若调用方提前停止迭代，本轮对话不计入上下文。
+        """
+        # 声明为异步生成器，与各实现一致
+        yield ""
+
     @abstractmethod
     @ensure(lambda result: isinstance(result, list), "返回值必须为列表")
     @ensure(
         lambda result: all(
-            isinstance(item, dict) and "role" in item and "content" in item
+            isinstance(item, Mapping) and "role" in item and "content" in item
             for item in result
         ),
         "每个历史项必须包含 role 和 content 字段",
@@ -51,7 +77,7 @@ class ChatService(ABC):
         获取当前会话的完整上下文历史。
 
         返回:
-            List[Dict[str, str]]: 对话历史列表。每个元素为字典，包含：
+            List[Dict[str, str]]: 对话历史列表。每个元素为只读映射（如 ChatMessage），包含：
                 - role (str): 消息发送方角色（如 'user', 'assistant'）。
                 - content (str): 消息内容。
 
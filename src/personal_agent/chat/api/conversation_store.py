@@ -0,0 +1,79 @@
+from abc import abstractmethod
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+from icontract import DBC
+from personal_agent.util.contracts import ensure, require
+
+
+class ConversationStore(DBC):
+    """
+    会话历史存储接口
+
+    以追加方式持久化每轮对话，并支持从最新消息开始分批倒序读取，
+    使恢复会话时只需加载上下文预算内的尾部历史。
+    """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @require(
+        lambda messages: all(
+            isinstance(m, Mapping) and "role" in m and "content" in m for m in messages
+        ),
+        "每条消息必须包含 role 和 content 字段",
+    )
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """
+        将一轮对话的消息作为一次追加写入会话历史，不改写已有记录。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @require(lambda batch_size: batch_size > 0, "批大小必须为正数")
+    def iter_reverse(
+        self, session_id: str, batch_size: int = 64
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        从最新消息开始倒序分批读取会话历史。
+
+        每批内部按时间正序排列，批与批之间由新到旧；调用方停止迭代后不再读取更早的记录。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    def count(self, session_id: str) -> int:
+        """
+        返回会话中已保存的消息条数。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    def clear(self, session_id: str) -> None:
+        """
+        删除会话的全部历史。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @ensure(lambda result: isinstance(result, int) and result >= 0, "修订号为非负整数")
+    def revision(self, session_id: str) -> int:
+        """
+        返回会话历史的修订号：从未写入的会话为 0，每次 append 或 clear 恰好加 1。
+
+        多个进程共用同一存储时，聊天服务在每轮开始前比对修订号，
+        发现其他进程写入过该会话后重新加载历史。
+        """
@@ -0,0 +1,77 @@
+from abc import abstractmethod
+from typing import AsyncIterator, Dict, List
+from icontract import DBC
+from personal_agent.util.contracts import require, ensure
+
+
+class SessionChatService(DBC):
+    """
+    多会话聊天服务接口
+
+    以 session_id 区分彼此独立的对话，使一个进程可以同时服务多个用户。
+    同一会话内的请求按到达顺序依次处理，不同会话之间互不阻塞。
+    """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @require(
+        lambda message: isinstance(message, str) and message.strip() != "",
+        "消息内容必须为非空字符串",
+    )
+    @ensure(
+        lambda result: isinstance(result, str) and result.strip() != "",
+        "回复内容必须为非空字符串",
+    )
+    async def get_response(self, session_id: str, message: str) -> str:
+        """
+        在指定会话中发送一条用户消息，并异步获取回复。
+
+        异常:
+            ConnectionError: 无法连接到聊天服务时抛出。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @require(
+        lambda message: isinstance(message, str) and message.strip() != "",
+        "消息内容必须为非空字符串",
+    )
+    async def stream_response(
+        self, session_id: str, message: str
+    ) -> AsyncIterator[str]:
+        """
+        在指定会话中发送一条用户消息，并以异步生成器的方式逐段获取回复。
+
+        异常:
+            ConnectionError: 无法连接到聊天服务时抛出。
+        """
+        # 声明为异步生成器，与各实现一致
+        yield ""
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @ensure(lambda result: isinstance(result, list), "返回值必须为列表")
+    def get_context(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        获取指定会话当前加载在内存中的上下文历史。
+        """
+
+    @abstractmethod
+    @require(
+        lambda session_id: isinstance(session_id, str) and session_id != "",
+        "会话 ID 必须为非空字符串",
+    )
+    @ensure(lambda result: result is None, "无返回值")
+    def clear_context(self, session_id: str) -> None:
+        """
+        清空指定会话的上下文历史（包括已持久化的记录）。
+        """
@@ -1,14 +1,80 @@
-from typing import List, Dict
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Tuple
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.tracing import span
 from .api.chat_service import ChatService
-from .llm_adapter import LLMAdapter
+from .api.conversation_store import ConversationStore
+from .context_window import ContextWindow
+from .exceptions import LLMError
+from .llm_adapter import LLMAdapter, LLMReply
+from .message import ChatMessage
+from .request_scope import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_TOOL_FOLLOW_UP,
+    scheduled_stream,
+    scheduling,
+)
+from .tool_executor import ToolExecutor
 
 
-class ChatServiceImpl(ChatService):
-    """使用 langchain 实现的 LLM 聊天服务，支持 OpenAI 兼容 API（如 deepseek、qwen）"""
+class ChatServiceImpl(ChatService):  # pylint: disable=too-many-instance-attributes
+    """使用 langchain 实现的 LLM 聊天服务，支持 OpenAI 兼容 API（如 deepseek、qwen）
 
-    def __init__(self, llm_adapter: LLMAdapter):
+    会话存储的读写在单线程执行器中进行，不阻塞事件循环；
+    历史在首轮对话前（或首次 get_context 时）才从存储加载。
+    """
+
+    def __init__(
+        self,
+        llm_adapter: LLMAdapter,
+        *,
+        context_window: Optional[ContextWindow] = None,
+        store: Optional[ConversationStore] = None,
+        session_id: str = "default",
+        tool_executor: Optional[ToolExecutor] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
         self.llm_adapter = llm_adapter
-        self._context: List[Dict[str, str]] = []
+        self.context_window = context_window or ContextWindow()
+        self.store = store
+        self.session_id = session_id
+        self.tool_executor = tool_executor
+        self.metrics = metrics or default_registry
+        self._context: List[ChatMessage] = []
+        # 已加载的历史对应的存储修订号，None 表示尚未从存储加载
+        self._revision: Optional[int] = None
+        # 同一会话的多个请求依次执行，避免并发写入交错
+        self._lock = asyncio.Lock()
+        self._executor = executor
+        if store is not None and executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="conversation-store"
+            )
+
+    def _read(self) -> Tuple[int, List[ChatMessage]]:
+        """恢复会话：读取修订号及上下文预算内的尾部历史"""
+        revision = self.store.revision(self.session_id)
+        tail = self.context_window.load_tail(self.store.iter_reverse(self.session_id))
+        return revision, tail
+
+    async def _sync(self) -> None:
+        """首轮对话前加载历史；其他进程（如共用同一数据库的多个工作进程）写入过本会话时重新加载"""
+        if self.store is None:
+            return
+        if self._revision is not None:
+            revision = await self._on_store(self.store.revision, self.session_id)
+            if revision == self._revision:
+                return
+            self.metrics.counter("chat.session_reloads").inc()
+        self._revision, self._context = await self._on_store(self._read)
+
+    async def _on_store(self, method: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
 
     async def get_response(self, message: str) -> str:
         """发送消息到 LLM 服务
@@ -20,26 +86,181 @@ class ChatServiceImpl(ChatService):
         Raises:
             ConnectionError: 连接失败时抛出
         """
-        try:
-            # 构建消息列表，包含历史上下文
-            messages = self._context.copy()
-            messages.append({"role": "user", "content": message})
+        with span("chat.turn", session=self.session_id) as turn:
+            async with self._lock:
+                try:
+                    await self._sync()
+                    with scheduling(PRIORITY_INTERACTIVE, self.session_id):
+                        # 构建消息列表，包含预算内的历史上下文
+                        messages = await self._build_prompt(message)
+                        messages, reply = await self._run_tools(messages)
+
+                        # 调用 LLM Adapter
+                        if reply is None:
+                            with scheduling(priority=_follow_up_priority(messages)):
+                                reply = await self.llm_adapter.chat(messages)
+
+                    await self._commit_turn(message, reply)
+                    turn.set("reply_chars", len(reply))
+
+                    return reply
+                except LLMError:
+                    # 已归类的 LLM 异常（超时、限流、熔断等）原样抛出，便于调用方区分
+                    raise
+                except Exception as e:
+                    raise ConnectionError(f"Failed to send message: {e}") from e
 
-            # 调用 LLM Adapter
-            reply = await self.llm_adapter.chat(messages)
+    async def stream_response(self, message: str) -> AsyncIterator[str]:
+        """流式发送消息到 LLM 服务，逐段产出回复
+
+        首个片段到达的耗时记录为 chat.time_to_first_token_seconds 指标，
+        流结束后将完整回复写入上下文。
+
+        Args:
+            message: 用户消息
+        Yields:
+            str: LLM 回复片段
+        Raises:
+            ConnectionError: 连接失败时抛出
+        """
+        chunks: List[str] = []
+        start = time.perf_counter()
+        with span("chat.turn", session=self.session_id, stream=True) as turn:
+            async with self._lock:
+                try:
+                    await self._sync()
+                    with scheduling(PRIORITY_INTERACTIVE, self.session_id):
+                        messages = await self._build_prompt(message)
+                    async for chunk in self._stream_reply(messages):
+                        if not chunks:
+                            first = time.perf_counter() - start
+                            self.metrics.histogram(
+                                "chat.time_to_first_token_seconds"
+                            ).observe(first)
+                            turn.set("first_chunk_seconds", first)
+                        chunks.append(chunk)
+                        # span 不跨越 yield，避免成为消费方的当前 span
+                        turn.detach()
+                        yield chunk
+                        turn.attach()
+                except LLMError:
+                    # 已归类的 LLM 异常（超时、限流、熔断等）原样抛出，便于调用方区分
+                    raise
+                except Exception as e:
+                    raise ConnectionError(f"Failed to send message: {e}") from e
+                self.metrics.histogram("chat.stream_duration_seconds").observe(
+                    time.perf_counter() - start
+                )
 
-            # 更新上下文
-            self._context.append({"role": "user", "content": message})
-            self._context.append({"role": "assistant", "content": reply})
+                # 流结束后更新上下文
+                reply = "".join(chunks)
+                await self._commit_turn(message, reply)
+                turn.set("chunks", len(chunks))
+                turn.set("reply_chars", len(reply))
 
-            return reply
-        except Exception as e:
-            raise ConnectionError(f"Failed to send message: {e}") from e
+    async def _build_prompt(self, message: str) -> List[Dict[str, Any]]:
+        with span("chat.build_prompt", history=len(self._context)) as build:
+            messages = await self.context_window.build(self._context, message)
+            if build.recording:
+                counter = self.context_window.counter
+                build.set("messages", len(messages))
+                build.set("prompt_tokens", sum(counter.count(m) for m in messages))
+            return messages
 
-    def get_context(self) -> List[Dict[str, str]]:
-        """获取当前对话上下文"""
+    async def _select_tools(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[ToolDescription]:
+        """以本轮用户消息检索相关工具；未接入工具或无相关工具时返回空列表"""
+        if self.tool_executor is None:
+            return []
+        return await self.tool_executor.select_tools(messages[-1]["content"])
+
+    def _tool_rounds(self, tools: List[ToolDescription]) -> range:
+        return range(self.tool_executor.max_rounds if tools else 0)
+
+    async def _run_tools(
+        self, messages: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """有可用工具时由模型决定是否调用工具，最多连续 max_rounds 轮
+
+        Returns:
+            (最终请求要发送的消息, 已得到的回复)。模型直接作答时返回其回复；
+            否则各轮的工具结果都已附在消息后，由调用方发出不附带工具的最后一次请求。
+        """
+        tools = await self._select_tools(messages)
+        for _ in self._tool_rounds(tools):
+            with scheduling(priority=_follow_up_priority(messages)):
+                reply = await self.llm_adapter.chat_with_tools(messages, tools)
+            if not reply.tool_calls:
+                return messages, reply.content
+            messages = await self._with_tool_results(messages, reply)
+        return messages, None
+
+    async def _stream_reply(self, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """流式产出回复；附带工具时照常逐段输出文本，收到工具调用后执行并继续下一轮"""
+        tools = await self._select_tools(messages)
+        for _ in self._tool_rounds(tools):
+            reply = None
+            async for item in scheduled_stream(
+                self.llm_adapter.stream_with_tools(messages, tools),
+                _follow_up_priority(messages),
+                self.session_id,
+            ):
+                if isinstance(item, LLMReply):
+                    reply = item
+                else:
+                    yield item
+            if reply is None:
+                return
+            messages = await self._with_tool_results(messages, reply)
+        async for chunk in scheduled_stream(
+            self.llm_adapter.stream(messages),
+            _follow_up_priority(messages),
+            self.session_id,
+        ):
+            yield chunk
+
+    async def _with_tool_results(
+        self, messages: List[Dict[str, Any]], reply: LLMReply
+    ) -> List[Dict[str, Any]]:
+        """并发执行模型请求的工具，把请求与结果附在消息后"""
+        tool_messages = await self.tool_executor.execute(reply.tool_calls)
+        assistant = {
+            "role": "assistant",
+            "content": reply.content,
+            "tool_calls": reply.tool_calls,
+        }
+        return messages + [assistant] + tool_messages
+
+    async def _commit_turn(self, message: str, reply: str) -> None:
+        """将一轮对话写入上下文，并作为一次追加写入会话存储"""
+        turn = [ChatMessage("user", message), ChatMessage("assistant", reply)]
+        self._context.extend(turn)
+        if self.store is not None:
+            await self._on_store(self.store.append, self.session_id, turn)
+            # 若其他进程在本轮期间也写入过，修订号对不上，下一轮开始时重新加载
+            self._revision += 1
+
+    def get_context(self) -> List[ChatMessage]:
+        """获取当前对话上下文（直接返回内部列表，不复制）
+
+        尚未进行过对话时在此同步加载历史，供恢复会话后直接查看。
+        """
+        if self.store is not None and self._revision is None:
+            self._revision, self._context = self._read()
         return self._context
 
     def clear_context(self) -> None:
         """清除当前对话上下文"""
         self._context = []
+        if self.store is not None:
+            self.store.clear(self.session_id)
+            if self._revision is not None:
+                self._revision += 1
+
+
+def _follow_up_priority(messages: List[Dict[str, Any]]) -> int:
+    """携带工具结果的后续请求优先级低于新的交互式请求"""
+    if messages and messages[-1]["role"] == "tool":
+        return PRIORITY_TOOL_FOLLOW_UP
+    return PRIORITY_INTERACTIVE
@@ -0,0 +1,43 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.singleflight import SingleFlight
+from .llm_adapter import LLMAdapter, LLMReply
+from .response_cache import request_key
+
+
+class CoalescingLLMAdapter(LLMAdapter):
+    """
+    合并同时在途的相同 LLM 请求：规范化后消息列表（及工具列表）相同的并发请求只向上游发送一次。
+
+    流式请求的各个消费者节奏不同，不做合并。需要独立请求时在 no_coalesce() 上下文中调用。
+    """
+
+    def __init__(self, inner: LLMAdapter, metrics: Optional[MetricsRegistry] = None):
+        self.inner = inner
+        self.metrics = metrics or default_registry
+        self._flight = SingleFlight("llm.singleflight", self.metrics)
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._flight.do(
+            ("chat", request_key(messages)), lambda: self.inner.chat(messages)
+        )
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self.inner.stream(messages):
+            yield chunk
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        async for item in self.inner.stream_with_tools(messages, tools):
+            yield item
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        key = request_key(messages, tools=[tool.qualified_name for tool in tools])
+        return await self._flight.do(
+            ("chat_with_tools", key),
+            lambda: self.inner.chat_with_tools(messages, tools),
+        )
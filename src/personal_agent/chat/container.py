@@ -1,15 +1,151 @@
+from typing import Optional
 from dependency_injector import containers, providers
+from .api.conversation_store import ConversationStore
 from .chat_service_impl import ChatServiceImpl
-from .llm_adapter import OpenAICompatibleLLMAdapter
+from .coalescing import CoalescingLLMAdapter
+from .context_window import ContextWindow
+from .conversation_store_memory import MemoryConversationStore
+from .conversation_store_sqlite import SqliteConversationStore
+from .llm_adapter import LLMAdapter, OpenAICompatibleLLMAdapter
+from .llm_router import Backend, RoutingLLMAdapter
+from .resilience import ResilientLLMAdapter
+from .response_cache import CachingLLMAdapter
+from .scheduler import RequestScheduler, SchedulingLLMAdapter
+from .session_chat_service_impl import SessionChatServiceImpl
+from .tool_executor import ToolExecutor
+
+
+def create_conversation_store(chat_config) -> ConversationStore:
+    """配置了 history_path 时持久化到 SQLite，否则只保存在内存"""
+    if chat_config.history_path:
+        return SqliteConversationStore(chat_config.history_path)
+    return MemoryConversationStore()
+
+
+def _endpoint_adapter(llm_config) -> LLMAdapter:
+    """单个端点：模型调用外包一层超时、重试与熔断策略"""
+    return ResilientLLMAdapter.from_config(
+        OpenAICompatibleLLMAdapter(llm_config), llm_config
+    )
+
+
+def create_llm_adapter(
+    llm_config, scheduler: Optional[RequestScheduler] = None
+) -> LLMAdapter:
+    """
+    按配置组装 LLMAdapter：单端点或多后端路由，外加调度，可选再加请求合并与回复缓存。
+
+    传入 scheduler 时与其他 adapter 共用排队与 RPM/TPM 限额，否则按配置新建一个。
+    调度在弹性策略与路由之外，每个请求只排一次队；重试、切换后端与对冲各自另取令牌。
+    """
+    if llm_config.backends:
+        adapter: LLMAdapter = RoutingLLMAdapter(
+            [
+                Backend(
+                    backend.name,
+                    _endpoint_adapter(
+                        llm_config.model_copy(
+                            update={
+                                "provider": backend.name,
+                                "model": backend.model,
+                                "api_key": backend.api_key,
+                                "api_base": backend.api_base,
+                                # 失败后直接切换到其他后端，不在同一后端上重试
+                                "retry_attempts": 0,
+                            }
+                        )
+                    ),
+                    weight=backend.weight,
+                )
+                for backend in llm_config.backends
+            ],
+            strategy=llm_config.routing_strategy,
+        )
+    else:
+        adapter = _endpoint_adapter(llm_config)
+    adapter = SchedulingLLMAdapter.from_config(adapter, llm_config, scheduler)
+    if llm_config.coalesce:
+        adapter = CoalescingLLMAdapter(adapter)
+    if llm_config.cache.enabled:
+        adapter = CachingLLMAdapter.from_config(adapter, llm_config)
+    return adapter
+
+
+def create_summary_llm_adapter(
+    llm_config, llm_adapter, scheduler: RequestScheduler
+) -> LLMAdapter:
+    """
+    后台摘要所用的 LLMAdapter：配置了 summary_model 时改用该（更便宜的）模型。
+
+    摘要请求与对话请求发往同一服务商，因此共用同一个调度器，一起计入 RPM/TPM 限额。
+    """
+    summary_model = llm_config.context.summary_model
+    if not summary_model or summary_model == llm_config.model:
+        return llm_adapter
+    return create_llm_adapter(
+        llm_config.model_copy(update={"model": summary_model, "backends": []}),
+        scheduler,
+    )
 
 
 class Container(containers.DeclarativeContainer):
     configer = providers.Dependency()
+    # MCP 工具服务，未提供时聊天不附带工具
+    tool_service = providers.Dependency(default=providers.Object(None))
 
     llm_config = providers.Callable(
         lambda configer: configer().get_llm_config(), configer
     )
+    chat_config = providers.Callable(
+        lambda configer: configer().get_chat_config(), configer
+    )
 
-    llm_adapter = providers.Singleton(OpenAICompatibleLLMAdapter, llm_config=llm_config)
+    # 对话与摘要的模型请求共用一个调度器：同一队列、并发名额与 RPM/TPM 令牌桶
+    llm_scheduler = providers.Singleton(
+        RequestScheduler.from_config, llm_config=llm_config
+    )
 
-    chat_service = providers.Singleton(ChatServiceImpl, llm_adapter=llm_adapter)
+    llm_adapter = providers.Singleton(
+        create_llm_adapter, llm_config=llm_config, scheduler=llm_scheduler
+    )
+
+    summary_llm_adapter = providers.Singleton(
+        create_summary_llm_adapter,
+        llm_config=llm_config,
+        llm_adapter=llm_adapter,
+        scheduler=llm_scheduler,
+    )
+
+    tool_executor = providers.Singleton(
+        ToolExecutor.from_config, chat_config=chat_config, tool_service=tool_service
+    )
+
+    conversation_store = providers.Singleton(
+        create_conversation_store, chat_config=chat_config
+    )
+
+    # 上下文窗口持有摘要等会话级状态，每个聊天服务各自一份
+    context_window = providers.Factory(
+        ContextWindow.from_config,
+        llm_config=llm_config,
+        llm_adapter=summary_llm_adapter,
+    )
+
+    chat_service = providers.Singleton(
+        ChatServiceImpl,
+        llm_adapter=llm_adapter,
+        context_window=context_window,
+        store=conversation_store,
+        session_id=chat_config.provided.session_id,
+        tool_executor=tool_executor,
+    )
+
+    # 多会话服务与单会话服务共享同一个 llm_adapter 及其连接池
+    session_chat_service = providers.Singleton(
+        SessionChatServiceImpl,
+        llm_adapter=llm_adapter,
+        store=conversation_store,
+        context_window_factory=context_window.provider,
+        max_active_sessions=chat_config.provided.max_active_sessions,
+        tool_executor=tool_executor,
+    )
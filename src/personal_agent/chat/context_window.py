@@ -0,0 +1,430 @@
+"""
+对话上下文窗口：按 token 预算从历史中挑选每轮请求要携带的消息。
+
+每轮只从历史尾部向前扫描到预算用尽为止，token 数按消息内容缓存，
+因此单轮开销只与窗口大小有关，不随会话长度增长。
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.tracing import span
+from .message import ChatMessage
+from .request_scope import PRIORITY_BACKGROUND, scheduling
+
+logger = logging.getLogger(__name__)
+
+Message = Mapping[str, Any]
+Summarizer = Callable[[Optional[str], List[Message]], Awaitable[str]]
+
+
+@functools.lru_cache(maxsize=None)
+def _load_encoder(model: str) -> Optional[Callable[[str], list]]:
+    """加载模型对应的分词器，进程内每个模型只加载一次"""
+    try:
+        import tiktoken  # pylint: disable=import-outside-toplevel
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return encoding.encode
+    except Exception:  # pylint: disable=broad-except
+        # 未安装 tiktoken 或无法加载词表时退化为近似估算
+        return None
+
+
+class TokenCounter:
+    """估算消息的 token 数，结果按消息内容缓存，同一条消息只分词一次"""
+
+    # 每条消息在 chat 格式中额外占用的 token（角色标记、分隔符）
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, model: Optional[str] = None, max_cache_size: int = 100_000):
+        self.model = model
+        self.max_cache_size = max_cache_size
+        self._cache: Dict[str, int] = {}
+
+    def count(self, message: Message) -> int:
+        """返回单条消息的 token 数"""
+        content = message["content"]
+        # str 会缓存自身的 hash，命中时查找代价与内容长度无关
+        tokens = self._cache.get(content)
+        if tokens is None:
+            tokens = self.count_text(content)
+            if len(self._cache) >= self.max_cache_size:
+                # 按插入顺序淘汰最早的条目
+                del self._cache[next(iter(self._cache))]
+            self._cache[content] = tokens
+        return tokens + self.MESSAGE_OVERHEAD
+
+    def count_text(self, text: str) -> int:
+        """对文本分词计数，不经过缓存"""
+        encode = _load_encoder(self.model or "")
+        if encode is not None:
+            return len(encode(text))
+        # 无分词器时的近似：ASCII 约 4 字符一个 token，其余字符（如中文）各算一个
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _split_system(history: Sequence[Message]) -> tuple:
+    """拆出位于开头的系统提示，返回 (系统消息列表, 起始下标)"""
+    if history and history[0]["role"] == "system":
+        return [history[0]], 1
+    return [], 0
+
+
+def _fit_tail(
+    history: Sequence[Message],
+    counter: TokenCounter,
+    budget: int,
+    start: int = 0,
+    max_messages: Optional[int] = None,
+) -> int:
+    """从尾部向前累加，返回预算内能保留的最早下标（不早于 start）"""
+    used = 0
+    index = len(history)
+    lowest = start if max_messages is None else max(start, index - max_messages)
+    while index > lowest:
+        tokens = counter.count(history[index - 1])
+        if used + tokens > budget:
+            break
+        used += tokens
+        index -= 1
+    # 窗口不以孤立的助手回复开头
+    while index < len(history) and history[index]["role"] == "assistant":
+        index += 1
+    return index
+
+
+class TrimPolicy(ABC):
+    """上下文裁剪策略：决定历史中哪些消息随本轮请求发送"""
+
+    @abstractmethod
+    async def select(
+        self, history: Sequence[Message], counter: TokenCounter, budget: int
+    ) -> List[Message]:
+        """从历史中选出不超过 budget 个 token 的消息，按时间顺序返回"""
+
+
+class SlidingWindowPolicy(TrimPolicy):
+    """保留系统提示和预算内尽可能多的最近消息"""
+
+    async def select(
+        self, history: Sequence[Message], counter: TokenCounter, budget: int
+    ) -> List[Message]:
+        pinned, start = _split_system(history)
+        budget -= sum(counter.count(m) for m in pinned)
+        index = _fit_tail(history, counter, budget, start)
+        return pinned + list(history[index:])
+
+
+class LastTurnsPolicy(TrimPolicy):
+    """保留系统提示和最近 keep_turns 轮对话，同时不超过预算"""
+
+    def __init__(self, keep_turns: int):
+        self.keep_turns = keep_turns
+
+    async def select(
+        self, history: Sequence[Message], counter: TokenCounter, budget: int
+    ) -> List[Message]:
+        pinned, start = _split_system(history)
+        budget -= sum(counter.count(m) for m in pinned)
+        index = _fit_tail(history, counter, budget, start, self.keep_turns * 2)
+        return pinned + list(history[index:])
+
+
+class SummarizePolicy(TrimPolicy):
+    """超出预算的较早消息被压缩为一条摘要，摘要之后保留预算内的最近消息
+
+    摘要按增量维护：只有新滑出窗口的消息才会与已有摘要一起重新压缩。
+    摘要请求在本轮对话中等待完成，沿用调用方的调度优先级。
+    """
+
+    # 摘要最多占用预算的比例
+    SUMMARY_SHARE = 0.25
+
+    def __init__(self, summarizer: Summarizer):
+        self.summarizer = summarizer
+        self._summary: Optional[str] = None
+        # 摘要不变时复用同一条消息，其转换结果也随之复用
+        self._summary_message: Optional[ChatMessage] = None
+        self._summarized_upto = 0
+        # 摘要所属的历史列表；清空或重新加载会话会换成新的列表
+        self._history: Optional[Sequence[Message]] = None
+
+    async def select(
+        self, history: Sequence[Message], counter: TokenCounter, budget: int
+    ) -> List[Message]:
+        pinned, start = _split_system(history)
+        budget -= sum(counter.count(m) for m in pinned)
+        if history is not self._history or self._summarized_upto > len(history):
+            # 历史被清空或替换，摘要与下标都已失效
+            self._summary, self._summarized_upto = None, 0
+            self._summary_message = None
+            self._history = history
+
+        index = _fit_tail(history, counter, budget, start)
+        if index > start:
+            # 预算不足以容纳全部历史，为摘要预留空间后重新计算窗口
+            reserved = int(budget * self.SUMMARY_SHARE)
+            index = _fit_tail(history, counter, budget - reserved, start)
+            dropped_from = max(start, self._summarized_upto)
+            if index > dropped_from:
+                self._summary = await self.summarizer(
+                    self._summary, list(history[dropped_from:index])
+                )
+                self._summary_message = ChatMessage(
+                    "system", f"之前对话的摘要：{self._summary}"
+                )
+                self._summarized_upto = index
+            index = max(index, self._summarized_upto)
+
+        summary = []
+        if self._summary_message and self._summarized_upto > start:
+            summary = [self._summary_message]
+        return pinned + summary + list(history[index:])
+
+
+class BackgroundSummarizePolicy(TrimPolicy):
+    """与 SummarizePolicy 相同的滚动摘要，但摘要在后台生成，用户的一轮对话从不等待摘要请求
+
+    未摘要的历史超过可用预算的 threshold 比例时，把其中较早的部分（保留最近约一半原文）
+    连同已有摘要交给 summarizer 在后台任务中压缩；摘要完成后，在下一轮组装提示时整体换入。
+    摘要追上之前，超出预算的最早消息直接被裁掉，每次记入 chat.summary.window_overflows。
+    摘要的次数、耗时、失败与 token 开销记入 chat.summary.* 指标。
+    """
+
+    # 摘要最多占用预算的比例
+    SUMMARY_SHARE = 0.25
+    # 开始摘要时保留原文的最近消息占可用预算的比例
+    KEEP_SHARE = 0.5
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        threshold: float = 0.8,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.summarizer = summarizer
+        self.threshold = threshold
+        self.metrics = metrics or default_registry
+        # (摘要文本, 摘要消息, 已摘要到的下标)，只整体替换
+        self._state: Tuple[Optional[str], Optional[ChatMessage], int] = (None, None, 0)
+        # 后台任务完成、等待下一轮换入的状态
+        self._ready: Optional[Tuple[str, ChatMessage, int]] = None
+        # 状态所属的历史列表；清空会话会换成新的列表
+        self._history: Optional[Sequence[Message]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def select(
+        self, history: Sequence[Message], counter: TokenCounter, budget: int
+    ) -> List[Message]:
+        pinned, start = _split_system(history)
+        budget -= sum(counter.count(m) for m in pinned)
+        self._swap_in(history)
+        _, summary_message, summarized_upto = self._state
+        summary = [summary_message] if summary_message else []
+        begin = max(start, summarized_upto)
+
+        available = budget - sum(counter.count(m) for m in summary)
+        index = _fit_tail(history, counter, available, begin)
+        if index > begin:
+            self.metrics.counter("chat.summary.window_overflows").inc()
+
+        room = budget - int(budget * self.SUMMARY_SHARE)
+        if (
+            self._task is None
+            and _fit_tail(history, counter, int(room * self.threshold), begin) > begin
+        ):
+            cut = _fit_tail(history, counter, int(room * self.KEEP_SHARE), begin)
+            self._start(history, counter, begin, cut)
+        return pinned + summary + list(history[index:])
+
+    async def wait_idle(self) -> None:
+        """等待进行中的摘要任务结束"""
+        if self._task is not None:
+            await asyncio.wait({self._task})
+
+    def _swap_in(self, history: Sequence[Message]) -> None:
+        if history is not self._history or self._state[2] > len(history):
+            # 历史被清空或替换，旧摘要与进行中的摘要都已无效
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+            self._state, self._ready, self._history = (None, None, 0), None, history
+            return
+        if self._ready is not None:
+            self._state, self._ready = self._ready, None
+            self.metrics.counter("chat.summary.swaps").inc()
+
+    def _start(
+        self,
+        history: Sequence[Message],
+        counter: TokenCounter,
+        begin: int,
+        cut: int,
+    ) -> None:
+        messages = list(history[begin:cut])
+        # 在空的上下文中运行：不继承本轮的调度优先级与追踪 span
+        self._task = asyncio.get_running_loop().create_task(
+            self._summarize(history, counter, messages, cut),
+            context=contextvars.Context(),
+        )
+
+    async def _summarize(
+        self,
+        history: Sequence[Message],
+        counter: TokenCounter,
+        messages: List[Message],
+        cut: int,
+    ) -> None:
+        previous = self._state[0]
+        start = time.perf_counter()
+        try:
+            with span("chat.summarize", messages=len(messages)):
+                text = await self.summarizer(previous, messages)
+        except Exception:  # pylint: disable=broad-except
+            self.metrics.counter("chat.summary.failures").inc()
+            logger.warning("后台摘要失败，下一轮重试", exc_info=True)
+            return
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+        input_tokens = sum(counter.count(m) for m in messages)
+        if previous:
+            input_tokens += counter.count_text(previous)
+        output_tokens = counter.count_text(text)
+        self.metrics.counter("chat.summary.runs").inc()
+        self.metrics.histogram("chat.summary_seconds").observe(
+            time.perf_counter() - start
+        )
+        self.metrics.counter("chat.summary.input_tokens").inc(input_tokens)
+        self.metrics.counter("chat.summary.output_tokens").inc(output_tokens)
+        if history is self._history:
+            message = ChatMessage("system", f"之前对话的摘要：{text}")
+            self._ready = (text, message, cut)
+
+
+class ContextWindow:
+    """按 token 预算组装每轮请求的消息列表"""
+
+    def __init__(
+        self,
+        budget_tokens: int = 6000,
+        policy: Optional[TrimPolicy] = None,
+        counter: Optional[TokenCounter] = None,
+    ):
+        self.budget_tokens = budget_tokens
+        self.policy = policy or SlidingWindowPolicy()
+        self.counter = counter or TokenCounter()
+        # 此下标之前（已滑出窗口）的消息的转换缓存都已释放
+        self._released_upto = 0
+
+    @classmethod
+    def from_config(cls, llm_config, llm_adapter=None) -> "ContextWindow":
+        """根据 LLMConfig.context 创建上下文窗口"""
+        config = llm_config.context
+        if config.policy == "last_turns":
+            policy: TrimPolicy = LastTurnsPolicy(config.keep_turns)
+        elif config.policy == "summarize":
+            policy = SummarizePolicy(_llm_summarizer(llm_adapter))
+        elif config.policy == "background_summarize":
+            policy = BackgroundSummarizePolicy(
+                _llm_summarizer(llm_adapter, PRIORITY_BACKGROUND),
+                config.summarize_threshold,
+            )
+        else:
+            policy = SlidingWindowPolicy()
+        return cls(config.budget_tokens, policy, TokenCounter(llm_config.model))
+
+    def load_tail(self, batches: Iterable[List[Message]]) -> List[Message]:
+        """从由新到旧的历史批次中取出预算内的尾部，按时间顺序返回
+
+        用于恢复会话：预算填满后即停止读取，不会加载更早的历史。
+        """
+        tail: List[Message] = []
+        used = 0
+        for batch in batches:
+            for message in reversed(batch):
+                used += self.counter.count(message)
+                if used > self.budget_tokens:
+                    break
+                tail.append(ChatMessage.of(message))
+            else:
+                continue
+            break
+        tail.reverse()
+        # 与 build 保持一致：窗口不以孤立的助手回复开头
+        while tail and tail[0]["role"] == "assistant":
+            tail.pop(0)
+        return tail
+
+    async def build(self, history: Sequence[Message], message: str) -> List[Message]:
+        """返回本轮要发送的消息：裁剪后的历史加上新的用户消息"""
+        new_message = ChatMessage("user", message)
+        budget = self.budget_tokens - self.counter.count(new_message)
+        messages = await self.policy.select(history, self.counter, budget)
+        self._release_dropped(history, messages)
+        messages.append(new_message)
+        return messages
+
+    def _release_dropped(
+        self, history: Sequence[Message], window: Sequence[Message]
+    ) -> None:
+        """释放滑出窗口的消息上缓存的转换结果，长会话的内存只随窗口大小增长
+
+        窗口中来自历史的部分是历史的一段后缀（开头的系统提示与摘要除外），按对象身份比对；
+        每条消息只在滑出时被访问一次。
+        """
+        if self._released_upto > len(history):
+            # 历史被清空或替换
+            self._released_upto = 0
+        kept = 0
+        while (
+            kept < len(history)
+            and kept < len(window)
+            and window[-1 - kept] is history[-1 - kept]
+        ):
+            kept += 1
+        start = len(history) - kept
+        for index in range(self._released_upto, start):
+            message = history[index]
+            # 系统提示固定在窗口中，不释放
+            if isinstance(message, ChatMessage) and message.role != "system":
+                message.converted = None
+        self._released_upto = max(self._released_upto, start)
+
+
+def _llm_summarizer(llm_adapter, priority: Optional[int] = None) -> Summarizer:
+    """使用 LLM 将较早的对话压缩为摘要；未指定 priority 时沿用调用方的调度优先级"""
+
+    async def summarize(previous: Optional[str], messages: List[Message]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = (
+            "请将以下对话压缩为简洁的摘要，保留关键事实、用户偏好和未完成的事项。\n"
+        )
+        if previous:
+            prompt += f"已有摘要：{previous}\n"
+        prompt += f"新增对话：\n{transcript}"
+        with scheduling(priority=priority):
+            return await llm_adapter.chat([{"role": "user", "content": prompt}])
+
+    return summarize
@@ -0,0 +1,43 @@
+from typing import Dict, Iterator, List
+from .api.conversation_store import ConversationStore
+from .message import ChatMessage
+
+
+class MemoryConversationStore(ConversationStore):
+    """
+    基于内存的会话历史存储，进程退出后丢失，适用于测试和未配置持久化的场景。
+    与聊天服务共享同一批 ChatMessage 对象，追加时不复制消息。
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, List[ChatMessage]] = {}
+        self._revisions: Dict[str, int] = {}
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        self._sessions.setdefault(session_id, []).extend(
+            ChatMessage.of(m) for m in messages
+        )
+        self._bump(session_id)
+
+    def iter_reverse(
+        self, session_id: str, batch_size: int = 64
+    ) -> Iterator[List[Dict[str, str]]]:
+        history = self._sessions.get(session_id, [])
+        end = len(history)
+        while end > 0:
+            start = max(0, end - batch_size)
+            yield history[start:end]
+            end = start
+
+    def count(self, session_id: str) -> int:
+        return len(self._sessions.get(session_id, []))
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._bump(session_id)
+
+    def revision(self, session_id: str) -> int:
+        return self._revisions.get(session_id, 0)
+
+    def _bump(self, session_id: str) -> None:
+        self._revisions[session_id] = self._revisions.get(session_id, 0) + 1
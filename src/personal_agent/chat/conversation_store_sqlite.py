@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+from .api.conversation_store import ConversationStore
+from .message import ChatMessage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# 序号在写事务内按 MAX(seq)+1 逐条取得，走主键索引
+_INSERT = (
+    "INSERT INTO messages (session_id, seq, role, content) "
+    "SELECT ?1, COALESCE(MAX(seq), -1) + 1, ?2, ?3 "
+    "FROM messages WHERE session_id = ?1"
+)
+_BUMP = (
+    "INSERT INTO sessions (session_id, revision) VALUES (?, 1) "
+    "ON CONFLICT (session_id) DO UPDATE SET revision = revision + 1"
+)
+
+
+class SqliteConversationStore(ConversationStore):
+    """
+    基于 SQLite（WAL 模式）的追加式会话历史存储。
+
+    每条消息按 (session_id, seq) 聚簇存放，每轮对话只做一次 INSERT 事务；
+    倒序读取走主键索引，恢复会话的耗时只与读取的尾部长度有关。
+
+    序号与修订号都在 BEGIN IMMEDIATE 写事务内计算，不在进程内缓存，
+    多个工作进程共用同一数据库文件时追加不会冲突。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _write(self, session_id: str, statement: str, rows: list) -> None:
+        """在 BEGIN IMMEDIATE 事务中执行写入并把会话的修订号加 1"""
+        with self._lock:
+            # 先取得写锁再读取 MAX(seq)，其他进程的写入排在本事务之前或之后
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(statement, rows)
+                self._conn.execute(_BUMP, (session_id,))
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        self._write(
+            session_id,
+            _INSERT,
+            [(session_id, m["role"], m["content"]) for m in messages],
+        )
+
+    def iter_reverse(
+        self, session_id: str, batch_size: int = 64
+    ) -> Iterator[List[Dict[str, str]]]:
+        upper = None
+        while True:
+            with self._lock:
+                if upper is None:
+                    rows = self._conn.execute(
+                        "SELECT seq, role, content FROM messages WHERE session_id = ? "
+                        "ORDER BY seq DESC LIMIT ?",
+                        (session_id, batch_size),
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT seq, role, content FROM messages "
+                        "WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                        (session_id, upper, batch_size),
+                    ).fetchall()
+            if not rows:
+                return
+            upper = rows[-1][0]
+            yield [ChatMessage(role, content) for _, role, content in rows[::-1]]
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+
+    def clear(self, session_id: str) -> None:
+        self._write(
+            session_id, "DELETE FROM messages WHERE session_id = ?", [(session_id,)]
+        )
+
+    def revision(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return 0 if row is None else row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,36 @@
+"""
+chat 子系统的异常定义。
+
+所有 LLM 调用异常都是 ConnectionError 的子类，调用方可以继续按 ConnectionError 统一处理，
+也可以按具体类型区分超时、限流、熔断等情况。
+"""
+
+from typing import Optional
+
+
+class LLMError(ConnectionError):
+    """LLM 调用失败的基类"""
+
+
+class LLMTimeoutError(LLMError):
+    """单次请求或整个调用超出时限"""
+
+
+class LLMRateLimitError(LLMError):
+    """服务端限流（HTTP 429），retry_after 为服务端建议的等待秒数"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMServerError(LLMError):
+    """服务端错误（5xx）或网络连接失败，可重试"""
+
+
+class LLMRequestError(LLMError):
+    """请求本身有误（如鉴权失败、参数错误），重试无意义"""
+
+
+class CircuitOpenError(LLMError):
+    """端点熔断中，请求被直接拒绝"""
@@ -1,8 +1,52 @@
+import functools
+import re
 from abc import ABC, abstractmethod
-from typing import List, Dict
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    List,
+    Dict,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.tracing import span
+from .message import ChatMessage
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+
+@dataclass
+class ToolCall:
+    """模型请求的一次工具调用
+
+    name 为带服务器前缀的工具名；tool 为按函数名反查到的工具，模型调用了未提供的函数时为 None，
+    此时 name 是模型给出的原始函数名。
+    """
+
+    id: str
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    tool: Optional[ToolDescription] = None
+
+    @property
+    def function(self) -> str:
+        """发给模型的函数名，回放历史中的工具调用时使用"""
+        return function_name(self.tool) if self.tool is not None else self.name
+
+
+@dataclass
+class LLMReply:
+    """携带工具时的模型回复：文本内容，或需要执行的工具调用"""
+
+    content: str
+    tool_calls: List[ToolCall] = field(default_factory=list)
 
 
 class LLMAdapter(ABC):
@@ -10,28 +54,245 @@ class LLMAdapter(ABC):
     async def chat(self, messages: List[Dict[str, str]]) -> str:
         """发送消息列表，返回回复内容"""
 
+    @abstractmethod
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """发送消息列表，以异步生成器的方式逐段返回回复内容"""
+        # 声明为异步生成器，与各实现一致
+        yield ""
+
+    @abstractmethod
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        """发送消息列表并附带可用工具，返回回复内容或模型请求的工具调用"""
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        """流式发送消息列表并附带可用工具
+
+        文本片段到达即产出；模型请求了工具时，最后再产出一个 LLMReply，
+        其 content 为已产出文本的拼接、tool_calls 为请求的调用。
+        默认实现退化为一次 chat_with_tools，包装层与支持流式的实现应覆盖。
+        """
+        reply = await self.chat_with_tools(messages, tools)
+        if reply.content:
+            yield reply.content
+        if reply.tool_calls:
+            yield reply
+
+
+def function_name(tool: ToolDescription) -> str:
+    """OpenAI 函数名只允许字母、数字、下划线和连字符，服务器前缀以双下划线连接"""
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", f"{tool.server}__{tool.name}")[:64]
+
+
+def tool_functions(tools: Sequence[ToolDescription]) -> Dict[str, ToolDescription]:
+    """函数名到工具的映射：生成工具 schema 与还原模型的工具调用都以它为准"""
+    return {function_name(tool): tool for tool in tools}
+
+
+def _tool_schemas(by_function: Dict[str, ToolDescription]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": tool.description,
+                "parameters": tool.input_schema or {"type": "object", "properties": {}},
+            },
+        }
+        for name, tool in by_function.items()
+    ]
+
+
+def _tool_calls(
+    raw_calls: Sequence[Dict[str, Any]], by_function: Dict[str, ToolDescription]
+) -> List[ToolCall]:
+    """把模型返回的函数调用还原为工具调用，未知函数名原样保留"""
+    calls = []
+    for call in raw_calls:
+        tool = by_function.get(call["name"])
+        calls.append(
+            ToolCall(
+                id=call["id"],
+                name=tool.qualified_name if tool is not None else call["name"],
+                arguments=call.get("args") or {},
+                tool=tool,
+            )
+        )
+    return calls
+
 
 class OpenAICompatibleLLMAdapter(LLMAdapter):
+    """
+    OpenAI 兼容接口的 LLMAdapter。
+
+    langchain、OpenAI SDK 与 httpx 导入耗时较长，推迟到首次发送请求时才导入并创建客户端，
+    只使用 /server 等命令时 CLI 不必为此付出启动时间。
+    """
+
     def __init__(self, llm_config):
-        self.llm = self._init_llm(llm_config)
+        self.llm_config = llm_config
+        self._llm: Optional["BaseChatModel"] = None
 
-    def _init_llm(self, config) -> BaseChatModel:
+    @property
+    def llm(self) -> "BaseChatModel":
+        if self._llm is None:
+            self._llm = self._init_llm(self.llm_config)
+        return self._llm
+
+    def _init_llm(self, config) -> "BaseChatModel":
+        # pylint: disable=import-outside-toplevel
+        import httpx
+        from langchain_openai import ChatOpenAI
+
+        # 显式创建连接池，所有会话复用同一组 keep-alive 连接
+        http_async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+            )
+        )
         return ChatOpenAI(
             model=config.model,
             api_key=config.api_key,
             base_url=config.api_base,
             temperature=config.temperature,
             max_tokens=config.max_tokens,
+            timeout=config.timeout,
+            # 重试由 ResilientLLMAdapter 统一负责，避免两层重试叠加
+            max_retries=0,
+            http_async_client=http_async_client,
         )
 
-    async def chat(self, messages: List[Dict[str, str]]) -> str:
-        # 将通用消息格式转为 langchain 消息对象
+    def _to_lc_messages(self, messages: List[Dict[str, Any]]) -> list:
+        """转为 langchain 消息列表；历史中的 ChatMessage 只转换一次，之后复用缓存的对象"""
         lc_messages = []
         for msg in messages:
-            if msg["role"] == "user":
-                lc_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                lc_messages.append(AIMessage(content=msg["content"]))
-        # 调用 LLM
-        reply_msg = await self.llm.ainvoke(lc_messages)
-        return reply_msg.content if hasattr(reply_msg, "content") else str(reply_msg)
+            if isinstance(msg, ChatMessage):
+                if msg.converted is None:
+                    msg.converted = _to_lc_message(msg)
+                lc_message = msg.converted
+            else:
+                lc_message = _to_lc_message(msg)
+            if lc_message is not None:
+                lc_messages.append(lc_message)
+        return lc_messages
+
+    def _span(self, name: str, messages: List[Dict[str, Any]]):
+        return span(name, model=self.llm_config.model, messages=len(messages))
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        with self._span("llm.chat", messages) as request:
+            # 调用 LLM
+            reply_msg = await self.llm.ainvoke(self._to_lc_messages(messages))
+            _record_usage(request, reply_msg)
+            content = (
+                reply_msg.content if hasattr(reply_msg, "content") else str(reply_msg)
+            )
+            request.set("reply_chars", len(content))
+            return content
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        with self._span("llm.stream", messages) as request:
+            async for chunk in self.llm.astream(self._to_lc_messages(messages)):
+                _record_usage(request, chunk)
+                content = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if content:
+                    request.add("chunks")
+                    request.add("reply_chars", len(content))
+                    # span 不跨越 yield，避免成为消费方的当前 span
+                    request.detach()
+                    yield content
+                    request.attach()
+
+    def _bind_tools(
+        self, tools: Sequence[ToolDescription]
+    ) -> Tuple[Any, Dict[str, ToolDescription]]:
+        by_function = tool_functions(tools)
+        return self.llm.bind_tools(_tool_schemas(by_function)), by_function
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        llm, by_function = self._bind_tools(tools)
+        with self._span("llm.chat_with_tools", messages) as request:
+            request.set("tools", len(by_function))
+            reply_msg = await llm.ainvoke(self._to_lc_messages(messages))
+            _record_usage(request, reply_msg)
+        tool_calls = _tool_calls(
+            getattr(reply_msg, "tool_calls", None) or [], by_function
+        )
+        return LLMReply(content=reply_msg.content or "", tool_calls=tool_calls)
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        llm, by_function = self._bind_tools(tools)
+        with self._span("llm.stream_with_tools", messages) as request:
+            request.set("tools", len(by_function))
+            gathered = None
+            texts = []
+            async for chunk in llm.astream(self._to_lc_messages(messages)):
+                _record_usage(request, chunk)
+                # 工具调用以增量片段到达，累加后才能解析出完整的参数
+                gathered = chunk if gathered is None else gathered + chunk
+                if chunk.content:
+                    texts.append(chunk.content)
+                    request.add("chunks")
+                    request.detach()
+                    yield chunk.content
+                    request.attach()
+            raw_calls = getattr(gathered, "tool_calls", None) or []
+            request.set("tool_calls", len(raw_calls))
+        if raw_calls:
+            yield LLMReply(
+                content="".join(texts), tool_calls=_tool_calls(raw_calls, by_function)
+            )
+
+
+def _record_usage(request, message) -> None:
+    """把服务商返回的 token 用量记入 span；流式时用量只出现在最后一个片段上"""
+    usage = getattr(message, "usage_metadata", None) if request.recording else None
+    if usage:
+        request.add("input_tokens", usage.get("input_tokens", 0))
+        request.add("output_tokens", usage.get("output_tokens", 0))
+
+
+@functools.lru_cache(maxsize=None)
+def _lc_message_classes() -> Tuple[type, type, type, type]:
+    """首次转换消息时才导入 langchain，避免启动命令行时加载；之后复用已导入的类"""
+    # pylint: disable=import-outside-toplevel
+    from langchain_core.messages import (
+        HumanMessage,
+        AIMessage,
+        SystemMessage,
+        ToolMessage,
+    )
+
+    return HumanMessage, AIMessage, SystemMessage, ToolMessage
+
+
+def _to_lc_message(msg: Mapping[str, Any]) -> Optional[Any]:
+    """将通用消息格式转为 langchain 消息对象"""
+    HumanMessage, AIMessage, SystemMessage, ToolMessage = _lc_message_classes()
+    role = msg["role"]
+    if role == "user":
+        return HumanMessage(content=msg["content"])
+    if role == "assistant":
+        tool_calls = [
+            {
+                "id": call.id,
+                "name": call.function,
+                "args": call.arguments,
+            }
+            for call in msg.get("tool_calls", ())
+        ]
+        return AIMessage(content=msg["content"], tool_calls=tool_calls)
+    if role == "system":
+        return SystemMessage(content=msg["content"])
+    if role == "tool":
+        return ToolMessage(content=msg["content"], tool_call_id=msg["tool_call_id"])
+    # 未知角色的消息不发送
+    return None
@@ -0,0 +1,223 @@
+import random
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from .exceptions import LLMRequestError
+from .llm_adapter import LLMAdapter, LLMReply
+
+STRATEGY_LATENCY = "latency"
+STRATEGY_WEIGHTED = "weighted"
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+
+
+class Backend:  # pylint: disable=too-many-instance-attributes
+    """
+    路由中的一个后端及其运行统计。
+
+    延迟、首个片段延迟（TTFT）与错误率均为指数加权移动平均（EWMA），近期请求的权重更高。
+    完整调用的延迟随回复长度变化，与流式请求的首个片段延迟分开统计。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        adapter: LLMAdapter,
+        *,
+        weight: float = 1.0,
+        alpha: float = 0.3,
+        error_threshold: float = 0.5,
+        cooldown: float = 30.0,
+    ):
+        self.name = name
+        self.adapter = adapter
+        self.weight = weight
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.latency: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.error_rate = 0.0
+        self.outstanding = 0
+        self._failed_at = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """
+        错误率低于阈值、未熔断且不在半开探测中（探测期间只放行一个请求，其余请求会被直接拒绝）；
+        不健康的后端在冷却期过后重新参与路由（探测）
+        """
+        breaker = getattr(self.adapter, "breaker", None)
+        if breaker is not None and not breaker.available:
+            return False
+        if self.error_rate < self.error_threshold:
+            return True
+        return time.monotonic() - self._failed_at >= self.cooldown
+
+    def record(self, ok: bool, seconds: Optional[float] = None) -> None:
+        """记录一次请求的结果，seconds 为成功的完整调用耗时"""
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if not ok:
+            self._failed_at = time.monotonic()
+        elif seconds is not None:
+            self.latency = self._average(self.latency, seconds)
+
+    def record_ttft(self, seconds: float) -> None:
+        """记录流式请求收到首个片段的耗时"""
+        self.ttft = self._average(self.ttft, seconds)
+
+    def _average(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.alpha * (sample - current)
+
+
+class RoutingLLMAdapter(LLMAdapter):
+    """
+    多后端路由：每个请求按策略选择后端，失败时依次切换到下一个后端。
+
+    策略：
+    - latency：优先 EWMA 延迟最低的健康后端（尚无样本的后端优先，以便获得样本）；
+    - weighted：按权重随机选择首选后端；
+    - least_outstanding：优先进行中请求最少的后端。
+
+    不健康的后端排在最后，只在其他后端都失败时使用。
+    请求本身有误（LLMRequestError，如 4xx）时直接抛出，换后端也无济于事，也不计入后端的错误率。
+    流式请求按首个片段延迟排序，只在收到首个片段之前切换后端，之后的错误计入错误率后抛出。
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        strategy: str = STRATEGY_LATENCY,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        if not backends:
+            raise ValueError("至少需要一个后端")
+        if strategy not in (
+            STRATEGY_LATENCY,
+            STRATEGY_WEIGHTED,
+            STRATEGY_LEAST_OUTSTANDING,
+        ):
+            raise ValueError(f"未知的路由策略: {strategy}")
+        self.backends = list(backends)
+        self.strategy = strategy
+        self.metrics = metrics or default_registry
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._route(lambda adapter: adapter.chat(messages))
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        return await self._route(
+            lambda adapter: adapter.chat_with_tools(messages, tools)
+        )
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self._route_stream(lambda adapter: adapter.stream(messages)):
+            yield chunk
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        async for item in self._route_stream(
+            lambda adapter: adapter.stream_with_tools(messages, tools)
+        ):
+            yield item
+
+    async def _route_stream(
+        self, open_stream: Callable[[LLMAdapter], AsyncIterator[Any]]
+    ):
+        error: Optional[BaseException] = None
+        for index, backend in enumerate(self._candidates(streaming=True)):
+            if index:
+                self.metrics.counter("llm.router.failovers").inc()
+            stream = open_stream(backend.adapter).__aiter__()
+            backend.outstanding += 1
+            start = time.perf_counter()
+            try:
+                try:
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    backend.record(True)
+                    return
+                except LLMRequestError:
+                    raise
+                except Exception as e:  # pylint: disable=broad-except
+                    backend.record(False)
+                    error = e
+                    continue
+                backend.record_ttft(time.perf_counter() - start)
+                self._count(backend)
+                yield first
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                except LLMRequestError:
+                    raise
+                except Exception:
+                    backend.record(False)
+                    raise
+                backend.record(True)
+                return
+            finally:
+                backend.outstanding -= 1
+        raise error
+
+    async def _route(self, request: Callable[[LLMAdapter], Awaitable[Any]]) -> Any:
+        error: Optional[BaseException] = None
+        for index, backend in enumerate(self._candidates()):
+            if index:
+                self.metrics.counter("llm.router.failovers").inc()
+            backend.outstanding += 1
+            start = time.perf_counter()
+            try:
+                result = await request(backend.adapter)
+            except LLMRequestError:
+                raise
+            except Exception as e:  # pylint: disable=broad-except
+                backend.record(False)
+                error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+            backend.record(True, time.perf_counter() - start)
+            self._count(backend)
+            return result
+        raise error
+
+    def _candidates(self, streaming: bool = False) -> List[Backend]:
+        """按策略排好序的后端列表：健康后端在前，不健康的作为最后手段"""
+        healthy = [b for b in self.backends if b.healthy]
+        unhealthy = [b for b in self.backends if not b.healthy]
+        if self.strategy == STRATEGY_WEIGHTED and healthy:
+            first = random.choices(healthy, weights=[b.weight for b in healthy])[0]
+            rest = sorted(
+                (b for b in healthy if b is not first),
+                key=lambda b: -b.weight,
+            )
+            healthy = [first] + rest
+        elif self.strategy == STRATEGY_LEAST_OUTSTANDING:
+            healthy.sort(key=lambda b: (b.outstanding, _delay(b, streaming)))
+        else:
+            healthy.sort(key=lambda b: (_delay(b, streaming), b.outstanding))
+        unhealthy.sort(key=lambda b: b.error_rate)
+        return healthy + unhealthy
+
+    def _count(self, backend: Backend) -> None:
+        self.metrics.counter(f"llm.router.requests.{backend.name}").inc()
+
+
+def _delay(backend: Backend, streaming: bool) -> float:
+    """排序所用的延迟：流式请求看首个片段延迟，尚无样本时为 0（优先获得样本）"""
+    delay = backend.ttft if streaming else backend.latency
+    return delay or 0.0
@@ -0,0 +1,51 @@
+"""
+会话历史中的消息：用 __slots__ 存放角色与内容，角色字符串经 sys.intern 驻留，
+长会话中数以万计的消息共享同一个角色对象，每条消息也不再携带一个字典。
+
+ChatMessage 实现只读的 Mapping 接口，读取 message["role"] 的代码无需修改，
+与同内容的字典比较也相等；需要 JSON 序列化时用 dict(message) 转换。
+
+converted 由 LLMAdapter 缓存该消息转换后的服务商消息对象（如 langchain 的 HumanMessage），
+历史中的每条消息只转换一次；消息滑出上下文窗口后由 ContextWindow 释放。
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+_KEYS = ("role", "content")
+
+
+class ChatMessage(Mapping):
+    """一条用户、助手或系统消息"""
+
+    __slots__ = ("role", "content", "converted")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+        self.converted: Optional[Any] = None
+
+    @classmethod
+    def of(cls, message: Mapping) -> "ChatMessage":
+        """把字典形式的消息转为 ChatMessage，已是 ChatMessage 时原样返回"""
+        if isinstance(message, ChatMessage):
+            return message
+        return cls(message["role"], message["content"])
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_KEYS)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        # 与字典形式一致，日志与调试输出不因表示方式改变
+        return repr({"role": self.role, "content": self.content})
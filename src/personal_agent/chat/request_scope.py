@@ -0,0 +1,57 @@
+"""
+LLM 请求的调度上下文：请求优先级与所属会话。
+
+通过 contextvars 传递，调用方在发起请求前用 scheduling() 标注，
+调度器（SchedulingLLMAdapter）据此排队，LLMAdapter 的接口无需改变。
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_TOOL_FOLLOW_UP = 1
+PRIORITY_BACKGROUND = 2
+
+_scope: ContextVar[Tuple[int, str]] = ContextVar(
+    "llm_scheduling_scope", default=(PRIORITY_INTERACTIVE, "")
+)
+
+
+@contextmanager
+def scheduling(
+    priority: Optional[int] = None, session_id: Optional[str] = None
+) -> Iterator[None]:
+    """指定此上下文中 LLM 请求的优先级与所属会话，未指定的部分沿用外层设置"""
+    current_priority, current_session = _scope.get()
+    token = _scope.set(
+        (
+            current_priority if priority is None else priority,
+            current_session if session_id is None else session_id,
+        )
+    )
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+async def scheduled_stream(
+    stream: AsyncIterator[str],
+    priority: Optional[int] = None,
+    session_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """逐段迭代流时设置调度上下文；上下文不跨越 yield，不会泄漏给消费方"""
+    iterator = stream.__aiter__()
+    while True:
+        with scheduling(priority, session_id):
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+        yield chunk
+
+
+def current_scope() -> Tuple[int, str]:
+    """当前上下文的 (优先级, 会话)"""
+    return _scope.get()
@@ -0,0 +1,362 @@
+# pylint: disable=duplicate-code
+
+import asyncio
+import random
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import Histogram, MetricsRegistry, default_registry
+from .exceptions import (
+    CircuitOpenError,
+    LLMError,
+    LLMRateLimitError,
+    LLMRequestError,
+    LLMServerError,
+    LLMTimeoutError,
+)
+from .llm_adapter import LLMAdapter, LLMReply
+from .scheduler import before_send, try_hedge
+
+
+def classify_error(error: BaseException) -> LLMError:
+    """将底层异常归类为 LLMError 子类"""
+    # pylint: disable=import-outside-toplevel
+    import openai
+
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+        return LLMTimeoutError(f"LLM 请求超时: {error}")
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return _classify_status(error, status)
+    if isinstance(error, (openai.APIConnectionError, ConnectionError, OSError)):
+        return LLMServerError(f"无法连接 LLM 服务: {error}")
+    return LLMRequestError(f"LLM 调用失败: {error}")
+
+
+def _classify_status(error: BaseException, status: int) -> LLMError:
+    if status == 429:
+        return LLMRateLimitError(f"LLM 服务限流: {error}", _retry_after(error))
+    if status >= 500:
+        return LLMServerError(f"LLM 服务端错误 {status}: {error}")
+    return LLMRequestError(f"LLM 请求被拒绝 {status}: {error}")
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    单个端点的熔断器。
+
+    连续失败 failure_threshold 次后熔断，reset_timeout 秒内的请求直接拒绝；
+    之后放行一个探测请求（半开），成功则恢复，失败则重新熔断，
+    探测请求被取消时交还探测机会（release），由下一个请求重新探测。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于熔断期（只读判断，不会触发半开探测）"""
+        return (
+            self.state == self.OPEN
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+
+    @property
+    def available(self) -> bool:
+        """既不在熔断期也不在半开探测中，可以正常承接请求"""
+        return not self.is_open and self.state != self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """是否允许发出请求"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def release(self) -> None:
+        """放弃进行中的半开探测（请求被取消、没有结果），恢复为可以立即探测的熔断状态"""
+        if self.state == self.HALF_OPEN and self._probing:
+            self.state = self.OPEN
+            self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class ResilientLLMAdapter(LLMAdapter):  # pylint: disable=too-many-instance-attributes
+    """
+    LLM 调用的弹性策略层，包装单个端点的 LLMAdapter：
+
+    - 每次尝试有 attempt_timeout，整个调用（含重试与退避）有 total_timeout；
+    - 超时、限流、5xx 与网络错误按带抖动的指数退避重试，429 优先采用 Retry-After；
+    - 端点连续失败时熔断，直接拒绝请求而不是等待超时；
+    - 可选对冲请求：首个请求超过近期 p95 延迟仍未返回时再发一个，取先返回的结果。
+
+    流式请求只在收到首个片段之前重试，也不做对冲；总时限覆盖整个流，
+    已产出内容后的错误（含超出总时限）计入熔断后直接抛出。
+    首个片段延迟（TTFT）与完整调用延迟分开统计，对冲只参考后者。
+
+    位于 SchedulingLLMAdapter 之内时，每次重试先等待调度器的令牌；
+    对冲只在令牌足够时发出，都不计入本次尝试的时限。
+    """
+
+    def __init__(
+        self,
+        inner: LLMAdapter,
+        *,
+        attempt_timeout: float = 30.0,
+        total_timeout: float = 90.0,
+        max_attempts: int = 4,
+        base_backoff: float = 0.2,
+        max_backoff: float = 10.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.inner = inner
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.metrics = metrics or default_registry
+        # 本端点完整调用的成功延迟，用于计算对冲时机
+        self.latency = Histogram("llm.attempt_seconds", max_samples=256)
+        # 流式请求收到首个片段的延迟，与完整调用的延迟分布不同，不参与对冲
+        self.ttft = Histogram("llm.ttft_seconds", max_samples=256)
+
+    @classmethod
+    def from_config(cls, inner: LLMAdapter, llm_config) -> "ResilientLLMAdapter":
+        resilience = llm_config.resilience
+        return cls(
+            inner,
+            attempt_timeout=llm_config.timeout,
+            total_timeout=resilience.total_timeout,
+            max_attempts=llm_config.retry_attempts + 1,
+            base_backoff=resilience.base_backoff,
+            max_backoff=resilience.max_backoff,
+            breaker=CircuitBreaker(
+                resilience.breaker_failure_threshold, resilience.breaker_reset_timeout
+            ),
+            hedge=resilience.hedge,
+            hedge_min_samples=resilience.hedge_min_samples,
+        )
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._call(lambda: self.inner.chat(messages))
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        return await self._call(lambda: self.inner.chat_with_tools(messages, tools))
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self._stream(lambda: self.inner.stream(messages)):
+            yield chunk
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        async for item in self._stream(
+            lambda: self.inner.stream_with_tools(messages, tools)
+        ):
+            yield item
+
+    async def _stream(self, open_stream: Callable[[], AsyncIterator[Any]]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.total_timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            await before_send()
+            # 先算时限再取半开探测机会：时限用尽时直接失败，不占着探测机会
+            budget = self._attempt_budget(loop, deadline)
+            probe = self._check_breaker()
+            stream = open_stream().__aiter__()
+            start = loop.time()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), budget)
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except Exception as e:  # pylint: disable=broad-except
+                await _close(stream)
+                await self._handle_failure(e, attempt, loop, deadline)
+                continue
+            except BaseException:
+                await _close(stream)
+                self._release(probe)
+                raise
+            self.breaker.record_success()
+            self.ttft.observe(loop.time() - start)
+            break
+        try:
+            yield first
+            while True:
+                try:
+                    budget = self._attempt_budget(loop, deadline)
+                    chunk = await asyncio.wait_for(stream.__anext__(), budget)
+                except StopAsyncIteration:
+                    return
+                except Exception as e:  # pylint: disable=broad-except
+                    raise self._record_failure(e) from e
+                yield chunk
+        finally:
+            await _close(stream)
+
+    async def _call(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.total_timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            await before_send()
+            # 先算时限再取半开探测机会：时限用尽时直接失败，不占着探测机会
+            budget = self._attempt_budget(loop, deadline)
+            probe = self._check_breaker()
+            start = loop.time()
+            try:
+                result = await asyncio.wait_for(self._attempt(request), budget)
+            except Exception as e:  # pylint: disable=broad-except
+                await self._handle_failure(e, attempt, loop, deadline)
+                continue
+            except BaseException:
+                self._release(probe)
+                raise
+            self.breaker.record_success()
+            self.latency.observe(loop.time() - start)
+            return result
+
+    async def _attempt(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        """发出一次请求；启用对冲且样本充足时，超过 p95 延迟再补发一个"""
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await request()
+        tasks = [asyncio.ensure_future(request())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done or not try_hedge():
+                return await tasks[0]
+            self.metrics.counter("llm.hedged_requests").inc()
+            tasks.append(asyncio.ensure_future(request()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # 两个请求都失败时抛出首个请求的异常
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or self.latency.count < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(95)
+
+    def _attempt_budget(self, loop, deadline: float) -> float:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise LLMTimeoutError(f"LLM 调用超出总时限 {self.total_timeout:g} 秒")
+        return min(self.attempt_timeout, remaining)
+
+    def _check_breaker(self) -> bool:
+        """熔断时拒绝请求；返回本次请求是否为半开探测"""
+        if not self.breaker.allow():
+            self.metrics.counter("llm.circuit_rejections").inc()
+            raise CircuitOpenError("LLM 端点熔断中，请稍后再试")
+        return self.breaker.state == CircuitBreaker.HALF_OPEN
+
+    def _release(self, probe: bool) -> None:
+        # 请求被取消时没有结果，交还半开探测机会，否则端点会一直拒绝请求
+        if probe:
+            self.breaker.release()
+
+    def _record_failure(self, error: BaseException) -> LLMError:
+        """把失败计入熔断器，返回归类后的异常"""
+        llm_error = classify_error(error)
+        if isinstance(llm_error, LLMRequestError):
+            # 端点给出了明确答复，只是请求本身有误，不计入熔断
+            self.breaker.record_success()
+            return llm_error
+        self.breaker.record_failure()
+        self.metrics.counter("llm.failed_attempts").inc()
+        return llm_error
+
+    async def _handle_failure(
+        self, error: BaseException, attempt: int, loop, deadline: float
+    ) -> None:
+        """记录失败；可重试且时限允许时等待退避时间，否则抛出归类后的异常"""
+        llm_error = self._record_failure(error)
+        if isinstance(llm_error, LLMRequestError) or attempt >= self.max_attempts:
+            raise llm_error from error
+        delay = getattr(llm_error, "retry_after", None)
+        if delay is None:
+            delay = random.uniform(
+                0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+            )
+        if loop.time() + delay >= deadline:
+            raise llm_error from error
+        self.metrics.counter("llm.retries").inc()
+        await asyncio.sleep(delay)
+
+
+async def _close(stream: AsyncIterator[str]) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:  # pylint: disable=broad-except
+            pass
@@ -0,0 +1,243 @@
+# pylint: disable=duplicate-code
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.disk_store import SqliteDiskStore
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.tracing import current_span
+from .llm_adapter import LLMAdapter, LLMReply
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_by_accessed ON responses (accessed);
+"""
+
+
+def _normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留影响回复的字段，并去掉内容首尾的空白"""
+    normalized = {
+        "role": message["role"],
+        "content": (message.get("content") or "").strip(),
+    }
+    if message.get("tool_call_id"):
+        normalized["tool_call_id"] = message["tool_call_id"]
+    if message.get("tool_calls"):
+        normalized["tool_calls"] = [
+            asdict(call) if is_dataclass(call) else call
+            for call in message["tool_calls"]
+        ]
+    return normalized
+
+
+def request_key(messages: List[Dict[str, Any]], **extra: Any) -> str:
+    """规范化后的消息列表（及附加参数）的 SHA-256 哈希"""
+    payload = json.dumps(
+        {"messages": [_normalize_message(m) for m in messages], **extra},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    model: str,
+    temperature: float,
+    messages: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None,
+) -> str:
+    """模型、温度、输出长度上限与规范化后的消息列表的哈希"""
+    return request_key(
+        messages, model=model, temperature=temperature, max_tokens=max_tokens
+    )
+
+
+def served_model(llm_config) -> str:
+    """
+    实际生成回复的模型。配置了多个后端时回复可能来自其中任一后端（LLMConfig.model 不参与路由），
+    取全部后端的模型，后端增减或换模型后旧的缓存不再命中。
+    """
+    if not llm_config.backends:
+        return llm_config.model
+    return ",".join(
+        sorted(f"{backend.name}={backend.model}" for backend in llm_config.backends)
+    )
+
+
+class DiskResponseStore(SqliteDiskStore):
+    """
+    回复缓存的磁盘层（SQLite），总大小超过 max_bytes 时按最久未访问淘汰。
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(path, "responses", _SCHEMA, max_bytes)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._touch(key, time.time())
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        self._put(key, value)
+
+
+class CachingLLMAdapter(LLMAdapter):  # pylint: disable=too-many-instance-attributes
+    """
+    回复缓存：包装任意 LLMAdapter，相同的（模型、温度、输出长度上限、规范化消息列表）
+    直接返回缓存的回复。
+
+    内存层为 LRU，可选的磁盘层在进程重启后仍然有效；
+    磁盘读写在专用的单线程执行器中完成，不阻塞事件循环。temperature > 0 时回复本身带有随机性，
+    默认不走缓存，除非配置 cache_nonzero_temperature。携带工具的请求依赖外部状态，不缓存。
+    """
+
+    def __init__(
+        self,
+        inner: LLMAdapter,
+        model: str,
+        temperature: float,
+        *,
+        max_entries: int = 1024,
+        disk_store: Optional[DiskResponseStore] = None,
+        cache_nonzero_temperature: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        max_tokens: Optional[int] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self.inner = inner
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_entries = max_entries
+        self.disk_store = disk_store
+        self.enabled = temperature == 0 or cache_nonzero_temperature
+        self.metrics = metrics or default_registry
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._executor = executor
+        if disk_store is not None and executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="response-cache"
+            )
+
+    @classmethod
+    def from_config(cls, inner: LLMAdapter, llm_config) -> "CachingLLMAdapter":
+        cache_config = llm_config.cache
+        disk_store = (
+            DiskResponseStore(cache_config.path, cache_config.max_disk_bytes)
+            if cache_config.path
+            else None
+        )
+        return cls(
+            inner,
+            model=served_model(llm_config),
+            temperature=llm_config.temperature,
+            max_tokens=llm_config.max_tokens,
+            max_entries=cache_config.max_entries,
+            disk_store=disk_store,
+            cache_nonzero_temperature=cache_config.cache_nonzero_temperature,
+        )
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        if not self.enabled:
+            return await self.inner.chat(messages)
+        key = self._key(messages)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        reply = await self.inner.chat(messages)
+        await self._store(key, reply)
+        return reply
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        if not self.enabled:
+            async for chunk in self.inner.stream(messages):
+                yield chunk
+            return
+        key = self._key(messages)
+        cached = await self._lookup(key)
+        if cached is not None:
+            if cached:
+                yield cached
+            return
+        chunks = []
+        async for chunk in self.inner.stream(messages):
+            chunks.append(chunk)
+            yield chunk
+        # 只缓存完整结束的流
+        await self._store(key, "".join(chunks))
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        return await self.inner.chat_with_tools(messages, tools)
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        async for item in self.inner.stream_with_tools(messages, tools):
+            yield item
+
+    def _key(self, messages: List[Dict[str, Any]]) -> str:
+        return cache_key(self.model, self.temperature, messages, self.max_tokens)
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.metrics.counter("llm.cache.hits").inc()
+            current_span().set("llm_cache", "hit")
+            return value
+        if self.disk_store is not None:
+            value = await self._on_disk(self.disk_store.get, key)
+            if value is not None:
+                self._remember(key, value)
+                self.metrics.counter("llm.cache.hits").inc()
+                self.metrics.counter("llm.cache.disk_hits").inc()
+                current_span().set("llm_cache", "disk_hit")
+                return value
+        self.metrics.counter("llm.cache.misses").inc()
+        current_span().set("llm_cache", "miss")
+        return None
+
+    async def _store(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        if self.disk_store is not None:
+            await self._on_disk(self.disk_store.put, key, value)
+
+    async def _on_disk(self, method: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
+
+    def _remember(self, key: str, value: str) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,381 @@
+# pylint: disable=duplicate-code
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from .context_window import TokenCounter
+from .llm_adapter import LLMAdapter, LLMReply
+from .request_scope import current_scope
+
+
+class TokenBucket:
+    """
+    按分钟速率补充的令牌桶，容量等于每分钟额度。
+
+    允许余额为负：实际消耗在请求完成后才知道（如回复的 token 数），
+    超额部分会推迟后续请求，而不是拒绝已完成的请求。
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """取得 amount 个令牌还需等待的秒数；amount 超过容量时按容量计算"""
+        self._refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return 0.0 if needed <= 0 else needed / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.perf_counter()
+
+
+class _Admission:
+    """一次放行：首次发送计入放行时扣除的令牌，之后的重发（重试、切换后端、对冲）另取令牌"""
+
+    __slots__ = ("scheduler", "tokens", "sent")
+
+    def __init__(self, scheduler: "RequestScheduler", tokens: int):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.sent = False
+
+
+# 当前正在执行的已放行请求；对冲任务复制上下文，与首个请求共用同一个对象
+_admission: ContextVar[Optional[_Admission]] = ContextVar("llm_admission", default=None)
+
+
+async def before_send() -> None:
+    """
+    每次向服务商发出请求前调用。
+
+    放行时已为首次发送扣除令牌；同一请求的重试与切换后端会再次发送，
+    需另取一个 RPM 令牌与提示词的 TPM 令牌，沿用已占的并发名额。不在调度器下时直接返回。
+    """
+    admission = _admission.get()
+    if admission is None:
+        return
+    if not admission.sent:
+        admission.sent = True
+        return
+    await admission.scheduler.acquire(admission.tokens)
+
+
+def try_hedge() -> bool:
+    """对冲请求可有可无：令牌足够时扣除并返回 True，否则返回 False、不发对冲"""
+    admission = _admission.get()
+    return admission is None or admission.scheduler.try_acquire(admission.tokens)
+
+
+class RequestScheduler:
+    """
+    LLM 请求的准入控制：排队、并发名额与 RPM/TPM 令牌桶。
+
+    - 每分钟请求数（RPM）与每分钟 token 数（TPM）两个令牌桶，避免触发服务商限流；
+    - 按优先级排队：交互式对话优先于工具结果的后续请求，后者优先于后台摘要等任务；
+    - 同一优先级内按会话轮询，单个会话的突发请求不会饿死其他会话。
+
+    rpm、tpm 为 0 表示不限制。多个 SchedulingLLMAdapter 可共用一个调度器
+    （如对话模型与摘要模型），它们的请求一起排队并共同计入服务商的限额。
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 32,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.metrics = metrics or default_registry
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self._running = 0
+        # 优先级 -> 会话 -> 等待队列；会话的顺序即轮询顺序
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_config(cls, llm_config) -> "RequestScheduler":
+        return cls(
+            rpm=llm_config.rpm,
+            tpm=llm_config.tpm,
+            max_concurrency=llm_config.max_concurrent_requests,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中（尚未放行）的请求数"""
+        return sum(
+            len(queue)
+            for sessions in self._queues.values()
+            for queue in sessions.values()
+        )
+
+    async def admit(self, tokens: int) -> None:
+        """排队直到被放行，放行时已占用一个并发名额并扣除预估的 token"""
+        priority, session_id = current_scope()
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        sessions = self._queues.setdefault(priority, OrderedDict())
+        sessions.setdefault(session_id, deque()).append(waiter)
+        self.metrics.histogram("llm.scheduler.queue_depth").observe(self.queue_depth)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已放行但调用方取消，归还并发名额
+                self.release()
+            else:
+                self._discard(priority, session_id, waiter)
+            raise
+        self.metrics.histogram("llm.scheduler.wait_seconds").observe(
+            time.perf_counter() - waiter.enqueued_at
+        )
+
+    def release(self) -> None:
+        """请求完成，归还并发名额"""
+        self._running -= 1
+        self._dispatch()
+
+    async def acquire(self, tokens: int) -> None:
+        """为已放行请求的重发等待并扣除令牌，不再排队，也不另占并发名额"""
+        while not self.try_acquire(tokens):
+            self.metrics.counter("llm.scheduler.throttled").inc()
+            await asyncio.sleep(self._wait_time(tokens))
+
+    def try_acquire(self, tokens: int) -> bool:
+        """令牌足够时扣除并返回 True，否则不扣除、返回 False"""
+        if self._wait_time(tokens) > 0:
+            return False
+        self._consume(tokens)
+        self.metrics.counter("llm.scheduler.resends").inc()
+        return True
+
+    def charge(self, tokens: int) -> None:
+        """补扣请求完成后才知道的 token（如回复的长度）"""
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.consume(tokens)
+
+    def _dispatch(self) -> None:
+        """按优先级与会话轮询放行请求，直到并发数或令牌桶不允许"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._running < self.max_concurrency:
+            head = self._peek()
+            if head is None:
+                return
+            priority, session_id, waiter = head
+            if waiter.future.done():
+                # 调用方已取消，尚未来得及移出队列
+                self._pop(priority, session_id)
+                continue
+            wait = self._wait_time(waiter.tokens)
+            if wait > 0:
+                self.metrics.counter("llm.scheduler.throttled").inc()
+                self._timer = asyncio.get_running_loop().call_later(
+                    wait, self._dispatch
+                )
+                return
+            self._pop(priority, session_id)
+            self._consume(waiter.tokens)
+            self._running += 1
+            waiter.future.set_result(None)
+
+    def _wait_time(self, tokens: int) -> float:
+        """取得一个请求令牌与 tokens 个 TPM 令牌还需等待的秒数"""
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.wait_time(1))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.wait_time(tokens))
+        return wait
+
+    def _consume(self, tokens: int) -> None:
+        if self.request_bucket is not None:
+            self.request_bucket.consume(1)
+        if self.token_bucket is not None:
+            self.token_bucket.consume(tokens)
+
+    def _peek(self) -> Optional[Tuple[int, str, _Waiter]]:
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            if sessions:
+                session_id, queue = next(iter(sessions.items()))
+                return priority, session_id, queue[0]
+        return None
+
+    def _pop(self, priority: int, session_id: str) -> None:
+        sessions = self._queues[priority]
+        queue = sessions.pop(session_id)
+        queue.popleft()
+        if queue:
+            # 该会话还有请求时排到本优先级的末尾，实现会话间轮询
+            sessions[session_id] = queue
+        if not sessions:
+            del self._queues[priority]
+
+    def _discard(self, priority: int, session_id: str, waiter: _Waiter) -> None:
+        sessions = self._queues.get(priority)
+        queue = sessions.get(session_id) if sessions else None
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del sessions[session_id]
+            if not sessions:
+                del self._queues[priority]
+        self._dispatch()
+
+
+class SchedulingLLMAdapter(LLMAdapter):
+    """
+    带准入控制的 LLMAdapter 包装，在请求发往服务商之前由 RequestScheduler 排队。
+
+    请求的优先级与会话取自 request_scope.scheduling() 上下文，由调度器在并发数与令牌桶
+    允许时依次放行；请求完成后按实际回复长度补扣 TPM 令牌。内层的弹性策略重试或对冲时
+    经 before_send()/try_hedge() 为每次重发另取令牌，不会绕过限额。未传入 scheduler 时
+    按 rpm、tpm 与 max_concurrency 新建一个，rpm、tpm 为 0 表示不限制。
+    """
+
+    def __init__(
+        self,
+        inner: LLMAdapter,
+        *,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 32,
+        counter: Optional[TokenCounter] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        self.inner = inner
+        self.counter = counter or TokenCounter()
+        self.scheduler = scheduler or RequestScheduler(
+            rpm, tpm, max_concurrency, metrics
+        )
+
+    @classmethod
+    def from_config(
+        cls,
+        inner: LLMAdapter,
+        llm_config,
+        scheduler: Optional[RequestScheduler] = None,
+    ) -> "SchedulingLLMAdapter":
+        return cls(
+            inner,
+            counter=TokenCounter(llm_config.model),
+            scheduler=scheduler or RequestScheduler.from_config(llm_config),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中（尚未放行）的请求数，包括共用调度器的其他 adapter 的请求"""
+        return self.scheduler.queue_depth
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        reply = await self._run(messages, lambda: self.inner.chat(messages))
+        self._charge(reply)
+        return reply
+
+    async def chat_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> LLMReply:
+        reply = await self._run(
+            messages, lambda: self.inner.chat_with_tools(messages, tools)
+        )
+        self._charge(reply.content)
+        return reply
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self._stream(messages, lambda: self.inner.stream(messages)):
+            yield chunk
+
+    async def stream_with_tools(
+        self, messages: List[Dict[str, Any]], tools: Sequence[ToolDescription]
+    ) -> AsyncIterator[Union[str, LLMReply]]:
+        async for item in self._stream(
+            messages, lambda: self.inner.stream_with_tools(messages, tools)
+        ):
+            yield item
+
+    async def _stream(
+        self,
+        messages: List[Dict[str, Any]],
+        open_stream: Callable[[], AsyncIterator[Any]],
+    ):
+        admission = _Admission(self.scheduler, await self._admit(messages))
+        stream = open_stream().__aiter__()
+        produced = 0
+        try:
+            while True:
+                # 放行记录只在取下一个片段时可见，不跨越 yield 泄漏给消费方
+                token = _admission.set(admission)
+                try:
+                    item = await stream.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _admission.reset(token)
+                if isinstance(item, str):
+                    produced += self.counter.count_text(item)
+                yield item
+        finally:
+            self.scheduler.release()
+            self.scheduler.charge(produced)
+
+    async def _run(
+        self, messages: List[Dict[str, Any]], request: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        token = _admission.set(_Admission(self.scheduler, await self._admit(messages)))
+        try:
+            return await request()
+        finally:
+            _admission.reset(token)
+            self.scheduler.release()
+
+    async def _admit(self, messages: List[Dict[str, Any]]) -> int:
+        """排队直到放行，返回放行时按提示词预估扣除的 token 数"""
+        tokens = sum(self.counter.count(m) for m in messages)
+        await self.scheduler.admit(tokens)
+        return tokens
+
+    def _charge(self, reply: str) -> None:
+        """按回复的实际 token 数补扣 TPM 令牌"""
+        if reply:
+            self.scheduler.charge(self.counter.count_text(reply))
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from .api.conversation_store import ConversationStore
+from .api.session_chat_service import SessionChatService
+from .chat_service_impl import ChatServiceImpl
+from .context_window import ContextWindow
+from .llm_adapter import LLMAdapter
+from .tool_executor import ToolExecutor
+
+
+class _ActiveSession:
+    """内存中的活跃会话及正在使用它的请求数"""
+
+    __slots__ = ("service", "in_flight")
+
+    def __init__(self, service: ChatServiceImpl):
+        self.service = service
+        self.in_flight = 0
+
+
+class SessionChatServiceImpl(SessionChatService):
+    """
+    多会话聊天服务实现。
+
+    所有会话共享同一个 LLMAdapter（及其 HTTP 连接池）和会话存储；
+    内存中只保留最近使用的 max_active_sessions 个会话，其余按 LRU 淘汰。
+    每轮对话在完成时已追加写入存储，淘汰只需丢弃内存对象，再次访问时从存储恢复尾部历史。
+    各会话的存储读写共用一个单线程执行器，不随会话数增加线程。
+    """
+
+    def __init__(
+        self,
+        llm_adapter: LLMAdapter,
+        store: ConversationStore,
+        *,
+        context_window_factory: Callable[[], ContextWindow] = ContextWindow,
+        max_active_sessions: int = 256,
+        tool_executor: Optional[ToolExecutor] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.llm_adapter = llm_adapter
+        self.store = store
+        self.tool_executor = tool_executor
+        self.context_window_factory = context_window_factory
+        self.max_active_sessions = max_active_sessions
+        self.metrics = metrics or default_registry
+        self._sessions: "OrderedDict[str, _ActiveSession]" = OrderedDict()
+        self._store_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="conversation-store"
+        )
+
+    async def get_response(self, session_id: str, message: str) -> str:
+        with self._acquire(session_id) as service:
+            return await service.get_response(message)
+
+    async def stream_response(
+        self, session_id: str, message: str
+    ) -> AsyncIterator[str]:
+        with self._acquire(session_id) as service:
+            async for chunk in service.stream_response(message):
+                yield chunk
+
+    def get_context(self, session_id: str) -> List[Dict[str, str]]:
+        with self._acquire(session_id) as service:
+            return service.get_context()
+
+    def clear_context(self, session_id: str) -> None:
+        with self._acquire(session_id) as service:
+            service.clear_context()
+
+    @property
+    def active_sessions(self) -> int:
+        """当前保留在内存中的会话数"""
+        return len(self._sessions)
+
+    @contextmanager
+    def _acquire(self, session_id: str) -> Iterator[ChatServiceImpl]:
+        """取得会话并标记为使用中，使用中的会话不会被淘汰"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            self.metrics.counter("chat.session_loads").inc()
+            session = _ActiveSession(
+                ChatServiceImpl(
+                    self.llm_adapter,
+                    context_window=self.context_window_factory(),
+                    store=self.store,
+                    session_id=session_id,
+                    tool_executor=self.tool_executor,
+                    metrics=self.metrics,
+                    executor=self._store_executor,
+                )
+            )
+            self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        session.in_flight += 1
+        try:
+            self._evict()
+            yield session.service
+        finally:
+            session.in_flight -= 1
+
+    def _evict(self) -> None:
+        """从最久未使用的会话开始淘汰，跳过仍在处理请求的会话"""
+        if len(self._sessions) <= self.max_active_sessions:
+            return
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_active_sessions:
+                break
+            if self._sessions[session_id].in_flight == 0:
+                del self._sessions[session_id]
+                self.metrics.counter("chat.session_evictions").inc()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from personal_agent.mcp.api.tool_service import ToolService
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.bounded_text import truncate_text
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.tracing import span
+from .llm_adapter import ToolCall
+
+
+class ToolExecutor:  # pylint: disable=too-many-instance-attributes
+    """
+    工具执行引擎：位于 ChatServiceImpl 与 MCP 之间，并发执行模型在一轮中请求的工具调用。
+
+    相互独立的调用通过 asyncio.gather 同时发出，每个服务器的并发数有上限，
+    每次调用有单独的超时；失败或超时的调用以错误文本作为结果返回给模型，不影响其他调用。
+    整轮耗时约等于最慢的单个调用，而不是所有调用之和。
+
+    每轮只向模型提供与用户消息最相关的 top_k 个工具，避免提示中携带全部工具的 schema。
+    一轮中所有工具结果合计不超过 max_result_bytes 字节，按调用数平分，超出的结果截断后再放入提示。
+    一轮对话中模型最多连续 max_rounds 次请求工具，之后的请求不再附带工具，模型须直接作答。
+    """
+
+    def __init__(
+        self,
+        tool_service: ToolService,
+        *,
+        per_server_concurrency: int = 4,
+        call_timeout: float = 30.0,
+        top_k: int = 8,
+        max_result_bytes: int = 64 * 1024,
+        max_rounds: int = 3,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.tool_service = tool_service
+        self.per_server_concurrency = per_server_concurrency
+        self.call_timeout = call_timeout
+        self.top_k = top_k
+        self.max_result_bytes = max_result_bytes
+        self.max_rounds = max_rounds
+        self.metrics = metrics or default_registry
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_config(cls, chat_config, tool_service) -> Optional["ToolExecutor"]:
+        """未接入工具服务时返回 None，聊天服务随之关闭工具调用"""
+        if tool_service is None:
+            return None
+        return cls(
+            tool_service,
+            per_server_concurrency=chat_config.tool_concurrency_per_server,
+            call_timeout=chat_config.tool_call_timeout,
+            top_k=chat_config.tool_top_k,
+            max_result_bytes=chat_config.tool_results_max_bytes,
+            max_rounds=chat_config.max_tool_rounds,
+        )
+
+    async def select_tools(self, query: str) -> List[ToolDescription]:
+        """选出本轮提供给模型的工具；top_k 为 0 时提供全部工具"""
+        with span("tools.select", top_k=self.top_k) as select:
+            if self.top_k > 0:
+                tools = await self.tool_service.search_tools(query, self.top_k)
+            else:
+                tools = await self.tool_service.list_tools()
+            select.set("tools", len(tools))
+        self.metrics.histogram("chat.tools_offered").observe(len(tools))
+        return tools
+
+    async def execute(self, calls: List[ToolCall]) -> List[Dict[str, Any]]:
+        """并发执行工具调用，按调用顺序返回 role 为 tool 的消息"""
+        start = time.perf_counter()
+        with span("tools.execute", calls=len(calls)) as execute:
+            results = await asyncio.gather(*(self._run(call) for call in calls))
+            share = self.max_result_bytes // max(1, len(calls))
+            messages = [
+                {
+                    "role": "tool",
+                    "tool_call_id": call.id,
+                    "content": truncate_text(content, share),
+                }
+                for call, content in zip(calls, results)
+            ]
+            if execute.recording:
+                execute.set(
+                    "result_bytes",
+                    sum(len(m["content"].encode("utf-8")) for m in messages),
+                )
+        self.metrics.histogram("chat.tool_batch_seconds").observe(
+            time.perf_counter() - start
+        )
+        return messages
+
+    async def _run(self, call: ToolCall) -> str:
+        # 服务器取自模型适配器按函数名反查到的工具，不从名称中拆分（服务器名可能含 "."）
+        server = call.tool.server if call.tool is not None else ""
+        semaphore = self._semaphores.get(server)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_server_concurrency)
+            self._semaphores[server] = semaphore
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    self.tool_service.call_tool(call.name, call.arguments),
+                    timeout=self.call_timeout,
+                )
+            except asyncio.TimeoutError:
+                self.metrics.counter("chat.tool_timeouts").inc()
+                return f"工具 {call.name} 调用超时（{self.call_timeout:g} 秒）"
+            except Exception as e:  # pylint: disable=broad-except
+                self.metrics.counter("chat.tool_errors").inc()
+                return f"工具 {call.name} 调用失败: {e}"
+            finally:
+                self.metrics.histogram("chat.tool_call_seconds").observe(
+                    time.perf_counter() - start
+                )
@@ -0,0 +1,181 @@
+"""
+批量模式：从 JSONL 文件逐行读取对话，并发地交给多会话聊天服务处理，结果逐条写入 JSONL。
+
+输入每行一个 JSON 对象：
+    {"id": "q1", "prompt": "你好"}                  单轮对话
+    {"id": "q2", "messages": ["你好", "再说一遍"]}   同一会话中的多轮对话
+id 省略时使用行号。输出每行对应一条输入，成功时包含 response（多轮为 responses），失败时包含 error。
+
+输出文件同时作为检查点：重新运行同一命令时，已成功的 id 会被跳过，失败的 id 会重新执行，
+新结果追加在旧的 error 记录之后（同一 id 以最后一条为准）；
+进程崩溃时写了一半的最后一行会被截掉后再继续追加。
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple, Union
+from personal_agent.chat import SessionChatService
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+
+# 批量对话使用的会话 ID 前缀，避免与交互式会话混用
+SESSION_PREFIX = "batch:"
+
+
+def default_output_path(input_path: Union[str, Path]) -> Path:
+    """prompts.jsonl 的结果默认写入同目录下的 prompts.results.jsonl"""
+    path = Path(input_path)
+    return path.with_name(f"{path.stem}.results.jsonl")
+
+
+def load_checkpoint(output_path: Union[str, Path]) -> Set[str]:
+    """
+    读取已成功的 id；带 error 的记录不计入，使失败的对话在下次运行时重试。
+    最后一行不完整（写入中途崩溃）时将其截掉，使后续追加从完整的行开始。
+    """
+    path = Path(output_path)
+    if not path.exists():
+        return set()
+    done: Set[str] = set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                if "error" not in record:
+                    done.add(str(record["id"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+class BatchRunner:
+    """
+    并发执行批量对话：最多 concurrency 个对话同时进行，输入按需逐行读取，不整体载入内存。
+
+    每个对话使用独立的会话，开始前清空该会话中上次未完成运行留下的历史，
+    完成后再次清空，避免成千上万个评测会话堆积在会话存储中。
+    """
+
+    def __init__(
+        self,
+        session_chat_service: SessionChatService,
+        concurrency: int = 16,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.session_chat_service = session_chat_service
+        self.concurrency = concurrency
+        self.metrics = metrics or default_registry
+
+    @classmethod
+    def from_config(cls, chat_config, session_chat_service) -> "BatchRunner":
+        return cls(session_chat_service, concurrency=chat_config.batch_concurrency)
+
+    async def run(
+        self,
+        input_path: Union[str, Path],
+        output_path: Optional[Union[str, Path]] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        处理 input_path 中尚未完成的对话，返回本次运行的统计：
+        completed（成功）、failed（失败）、skipped（检查点中已有结果）。
+        """
+        output_path = output_path or default_output_path(input_path)
+        done = load_checkpoint(output_path)
+        summary = {"completed": 0, "failed": 0, "skipped": 0}
+        with open(input_path, "r", encoding="utf-8") as source, open(
+            output_path, "a", encoding="utf-8"
+        ) as sink:
+            pending = self._pending(source, done, summary)
+            workers = concurrency or self.concurrency
+            await asyncio.gather(
+                *(self._worker(pending, sink, summary) for _ in range(workers))
+            )
+        return summary
+
+    def _pending(
+        self, source: TextIO, done: Set[str], summary: Dict[str, int]
+    ) -> Iterator[Tuple[str, Any]]:
+        """逐行产出 (id, 解析后的对象或解析错误)，跳过空行与检查点中已完成的 id"""
+        for lineno, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                item: Any = json.loads(line)
+                if not isinstance(item, dict):
+                    raise ValueError("每行必须是 JSON 对象")
+            except ValueError as e:
+                item = e
+            item_id = str(lineno)
+            if isinstance(item, dict) and item.get("id") is not None:
+                item_id = str(item["id"])
+            if item_id in done:
+                summary["skipped"] += 1
+                continue
+            done.add(item_id)
+            yield item_id, item
+
+    async def _worker(
+        self,
+        pending: Iterator[Tuple[str, Any]],
+        sink: TextIO,
+        summary: Dict[str, int],
+    ) -> None:
+        # 各个 worker 共用同一个迭代器；取下一行时不会让出事件循环，因此不会重复取到同一行
+        for item_id, item in pending:
+            record = await self._process(item_id, item)
+            sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+            sink.flush()
+            if "error" in record:
+                summary["failed"] += 1
+                self.metrics.counter("batch.failed").inc()
+            else:
+                summary["completed"] += 1
+                self.metrics.counter("batch.completed").inc()
+
+    async def _process(self, item_id: str, item: Any) -> Dict[str, Any]:
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"id": item_id}
+        try:
+            if isinstance(item, Exception):
+                raise item
+            messages = self._messages_of(item)
+            session_id = SESSION_PREFIX + item_id
+            self.session_chat_service.clear_context(session_id)
+            try:
+                responses: List[str] = []
+                for message in messages:
+                    responses.append(
+                        await self.session_chat_service.get_response(
+                            session_id, message
+                        )
+                    )
+            finally:
+                self.session_chat_service.clear_context(session_id)
+            if isinstance(item.get("prompt"), str):
+                record["response"] = responses[0]
+            else:
+                record["responses"] = responses
+        except Exception as e:  # pylint: disable=broad-except
+            # 单个对话失败只记录在结果中，不影响其他对话
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["elapsed"] = round(time.perf_counter() - start, 3)
+        return record
+
+    @staticmethod
+    def _messages_of(item: Dict[str, Any]) -> List[str]:
+        if isinstance(item.get("prompt"), str) and item["prompt"].strip():
+            return [item["prompt"]]
+        messages = item.get("messages")
+        if (
+            isinstance(messages, list)
+            and messages
+            and all(isinstance(m, str) and m.strip() for m in messages)
+        ):
+            return messages
+        raise ValueError("缺少 prompt 字段（字符串）或 messages 字段（非空字符串列表）")
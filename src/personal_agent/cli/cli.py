@@ -1,20 +1,31 @@
 # pylint: disable=duplicate-code
 
+import functools
+import inspect
 import os
+import time
 from typing import Dict, Callable, Optional
 from prompt_toolkit import PromptSession
 from personal_agent.chat import ChatService
-from personal_agent.mcp.api.server_registry import ServerRegistry
+from personal_agent.mcp.api.async_server_registry import AsyncServerRegistry
+from personal_agent.mcp.health_checker import HealthChecker
+from personal_agent.util import tracing
+from personal_agent.util.metrics import MetricsRegistry, default_registry
 from .api.cli_service import CommandLineInterface as CLIServiceInterface
 
+# /server list 每页显示的服务器数
+SERVER_PAGE_SIZE = 20
+
 
 class CommandLineInterface(CLIServiceInterface):
     """Command Line Interface implementation for the personal agent."""
 
     def __init__(
         self,
-        server_registry: ServerRegistry,
+        server_registry: AsyncServerRegistry,
         chat_service: Optional[ChatService] = None,
+        health_checker: Optional[HealthChecker] = None,
+        metrics: Optional[MetricsRegistry] = None,
     ):
         self.running = True
         self.cli_commands: Dict[str, Callable] = {
@@ -22,40 +33,81 @@ class CommandLineInterface(CLIServiceInterface):
             "exit": self._exit,
             "clear": self._clear_screen,
             "server": self._server_command,
+            "stats": self._show_stats,
         }
+        self.metrics = metrics or default_registry
         self.server_registry = server_registry()
+        self.health_checker: Optional[HealthChecker] = (
+            health_checker() if health_checker else None
+        )
 
-        self.chat_service = chat_service() if chat_service else None
+        # 聊天服务在首次对话时才创建，只执行 /server 等命令时不必组装 LLM 相关组件
+        self._chat_service_provider = chat_service
         self.session = PromptSession()
 
+    @functools.cached_property
+    def chat_service(self) -> Optional[ChatService]:
+        if self._chat_service_provider is None:
+            return None
+        return self._chat_service_provider()
+
     async def start(self):
         """启动CLI界面"""
         self._show_welcome()
+        # 服务器健康检查在后台运行，/server list 与 /server info 只读取其结果
+        if self.health_checker is not None:
+            self.health_checker.start()
 
-        while self.running:
-            try:
-                user_input = (await self.session.prompt_async("> ")).strip()
-                if not user_input:
-                    continue
-                await self._process_input(user_input)
-            except KeyboardInterrupt:
-                print("\nGoodbye!")
-                self.running = False
-            except Exception as e:
-                print(f"Error: {str(e)}")
+        try:
+            while self.running:
+                try:
+                    user_input = (await self.session.prompt_async("> ")).strip()
+                    if not user_input:
+                        continue
+                    await self._process_input(user_input)
+                except KeyboardInterrupt:
+                    print("\nGoodbye!")
+                    self.running = False
+                except Exception as e:
+                    print(f"Error: {str(e)}")
+        finally:
+            if self.health_checker is not None:
+                await self.health_checker.stop()
 
     async def _process_input(self, user_input: str) -> None:
         """处理用户输入"""
         if self._is_cmd(user_input):
-            self._handle_cli_command(user_input[1:])
+            await self._handle_cli_command(user_input[1:])
         else:
-            try:
-                print("Thinking...", end="", flush=True)
-                response = await self.chat_service.get_response(user_input)
-                print("\b" * len("Thinking..."), end="", flush=True)  # 用退格键清除
-                print(f"Assistant: {response}")
-            except Exception as e:
-                print(f"Error: {e}")
+            with tracing.span("cli.turn", input_chars=len(user_input)) as turn:
+                await self._chat_turn(user_input, turn)
+
+    async def _chat_turn(self, user_input: str, turn) -> None:
+        """流式输出一轮回复；终端输出的耗时单独记为 render_seconds"""
+        thinking = True
+        try:
+            print("Thinking...", end="", flush=True)
+            async for chunk in self.chat_service.stream_response(user_input):
+                start = time.perf_counter()
+                if thinking:
+                    # 首个片段到达时用退格键清除提示，再逐段输出回复
+                    print("\b" * len("Thinking..."), end="", flush=True)
+                    print("Assistant: ", end="", flush=True)
+                    thinking = False
+                print(chunk, end="", flush=True)
+                turn.add("render_seconds", time.perf_counter() - start)
+                turn.add("output_chars", len(chunk))
+            if thinking:
+                print("\b" * len("Thinking..."), end="", flush=True)
+                print("Assistant: ", end="", flush=True)
+            print()
+        except Exception as e:
+            turn.record_error(e)
+            if thinking:
+                print("\b" * len("Thinking..."), end="", flush=True)
+            else:
+                print()
+            print(f"Error: {e}")
 
     def _is_cmd(self, user_input):
         return user_input.startswith("/")
@@ -65,8 +117,8 @@ class CommandLineInterface(CLIServiceInterface):
         print("Welcome to Personal Agent CLI!")
         print("Type /help for available commands")
 
-    def _handle_cli_command(self, command: str):
-        """处理CLI命令"""
+    async def _handle_cli_command(self, command: str):
+        """处理CLI命令；异步命令（如访问注册表的 /server）在事件循环上等待完成"""
         parts = command.strip().split()
         if not parts:
             print("No command entered.")
@@ -74,7 +126,9 @@ class CommandLineInterface(CLIServiceInterface):
         cmd = parts[0].lower()
         args = parts[1:]
         if cmd in self.cli_commands:
-            self.cli_commands[cmd](*args)
+            result = self.cli_commands[cmd](*args)
+            if inspect.isawaitable(result):
+                await result
             return  # 执行完命令后立即返回
         print(f"Unknown command: {command}")
         print("Available commands:")
@@ -86,11 +140,50 @@ class CommandLineInterface(CLIServiceInterface):
         for cmd in self.cli_commands:
             print(f"/{cmd}")
         print("\nServer management:")
-        print("  /server add <name> <url> [description]   添加服务器")
-        print("  /server list                           列出所有服务器")
+        print("  /server add <name> <url> [tag ...]       添加服务器")
+        print("  /server list [--host h] [--tag t] [--page n]  分页列出服务器")
         print("  /server remove <name>                  删除服务器")
         print("  /server info <name>                    查看服务器详情")
         print("  /server edit <name> <url> [desc]       编辑服务器")
+        print("\nPerformance:")
+        print(
+            "  /stats [prefix]                        各阶段耗时的 p50/p95/p99 与计数"
+        )
+
+    def _show_stats(self, prefix: str = ""):
+        """
+        /stats [prefix]
+        显示名称以 prefix 开头的耗时指标（毫秒）与计数器；开启追踪后包含每轮各阶段的 span。
+        """
+        snapshot = self.metrics.snapshot()
+        if not tracing.default_tracer.enabled:
+            print("追踪未开启（app.tracing.enabled），只显示内置指标")
+        timings = sorted(
+            (name, values)
+            for name, values in snapshot["histograms"].items()
+            if values["count"] and name.endswith("_seconds") and name.startswith(prefix)
+        )
+        counters = sorted(
+            (name, value)
+            for name, value in snapshot["counters"].items()
+            if name.startswith(prefix)
+        )
+        if not timings and not counters:
+            print("暂无指标")
+            return
+        if timings:
+            width = max(len(name) for name, _ in timings)
+            print(f"{'timing':<{width}} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+            for name, values in timings:
+                quantiles = " ".join(
+                    f"{values[q] * 1000:>9.1f}" for q in ("p50", "p95", "p99")
+                )
+                print(f"{name:<{width}} {values['count']:>7} {quantiles}")
+        if counters:
+            width = max(len(name) for name, _ in counters)
+            print()
+            for name, value in counters:
+                print(f"{name:<{width}} {value:>12g}")
 
     def _exit(self):
         """退出程序"""
@@ -102,7 +195,7 @@ class CommandLineInterface(CLIServiceInterface):
         os.system("cls" if os.name == "nt" else "clear")
         self._show_welcome()
 
-    def _server_command(self, *args):
+    async def _server_command(self, *args):
         """
         服务器配置管理命令分发接口。
         支持子命令：add、list、remove、info、edit。
@@ -113,48 +206,99 @@ class CommandLineInterface(CLIServiceInterface):
             return
         subcmd = args[0].lower()
         if subcmd == "add":
-            self._server_add(*args[1:])
+            await self._server_add(*args[1:])
         elif subcmd == "list":
-            self._server_list()
+            await self._server_list(*args[1:])
         elif subcmd == "remove":
-            self._server_remove(*args[1:])
+            await self._server_remove(*args[1:])
         elif subcmd == "info":
-            self._server_info(*args[1:])
+            await self._server_info(*args[1:])
         elif subcmd == "edit":
-            self._server_edit(*args[1:])
+            await self._server_edit(*args[1:])
         else:
             print(f"未知子命令: {subcmd}")
             print("用法: /server <add|list|remove|info|edit> ...")
 
-    def _server_add(self, *args):
+    async def _server_add(self, *args):
         """
-        /server add <name> <url>
+        /server add <name> <url> [tag ...]
         添加服务器。
         """
         if len(args) < 2:
-            print("Usage: /server add <name> <url>")
+            print("Usage: /server add <name> <url> [tag ...]")
             return
         name, url = args[0], args[1]
-        success = self.server_registry.add_server(name, url)
+        success = await self.server_registry.add_server(name, url, tags=args[2:])
         if success:
             print(f"服务器 {name} 添加成功")
         else:
             print("名称重复，添加失败")
 
-    def _server_list(self):
+    async def _server_list(self, *args):
         """
-        /server list
-        列出所有服务器。
+        /server list [--host <host>] [--tag <tag>] [--page <n>]
+        分页列出服务器，可按主机名与标签过滤。
         """
-        servers = self.server_registry.list_servers()
+        options = dict(zip(args[::2], args[1::2]))
+        unknown = set(options) - {"--host", "--tag", "--page"}
+        if len(args) % 2 or unknown or not options.get("--page", "1").isdigit():
+            print("Usage: /server list [--host <host>] [--tag <tag>] [--page <n>]")
+            return
+        host, tag = options.get("--host"), options.get("--tag")
+        page = max(1, int(options.get("--page", "1")))
+        total = await self.server_registry.count_servers(host=host, tag=tag)
+        servers = await self.server_registry.list_servers(
+            offset=(page - 1) * SERVER_PAGE_SIZE,
+            limit=SERVER_PAGE_SIZE,
+            host=host,
+            tag=tag,
+        )
         if not servers:
             print("没有服务器可用")
         else:
             print("服务器列表：")
             for s in servers:
-                print(f"- {s['name']}: {s['url']}")
+                tags = f" [{', '.join(s['tags'])}]" if s.get("tags") else ""
+                health = self._format_health(s["name"])
+                print(f"- {s['name']}: {s['url']}{tags}{health}")
+            if total > SERVER_PAGE_SIZE:
+                pages = -(-total // SERVER_PAGE_SIZE)
+                print(f"第 {page}/{pages} 页，共 {total} 个服务器")
+
+    def _health_of(self, name: str) -> Optional[Dict]:
+        if self.health_checker is None:
+            return None
+        return self.health_checker.get(name)
+
+    def _format_health(self, name: str) -> str:
+        """列表中一行的健康摘要，尚未探测时为空"""
+        health = self._health_of(name)
+        if health is None:
+            return ""
+        parts = [health["status"]]
+        if health["p95"] is not None:
+            parts.append(f"p95 {health['p95'] * 1000:.0f}ms")
+        parts.append(f"可用率 {health['availability']:.0%}")
+        return f" ({', '.join(parts)})"
+
+    def _print_health(self, name: str) -> None:
+        health = self._health_of(name)
+        if health is None:
+            print("健康状态: 尚未检查")
+            return
+        print(f"健康状态: {health['status']}")
+        print(f"可用率: {health['availability']:.0%}")
+        if health["p50"] is not None:
+            print(
+                f"探测延迟: p50 {health['p50'] * 1000:.0f}ms, "
+                f"p95 {health['p95'] * 1000:.0f}ms"
+            )
+        checked = time.strftime("%H:%M:%S", time.localtime(health["checked_at"]))
+        print(f"最近检查: {checked}")
+        if health["last_error"]:
+            print(f"最近错误: {health['last_error']}")
 
-    def _server_remove(self, *args):
+    async def _server_remove(self, *args):
         """
         /server remove <name>
         删除服务器。
@@ -163,13 +307,13 @@ class CommandLineInterface(CLIServiceInterface):
             print("Usage: /server remove <name>")
             return
         name = args[0]
-        success = self.server_registry.remove_server(name)
+        success = await self.server_registry.remove_server(name)
         if success:
             print(f"服务器 {name} 已删除")
         else:
             print("没有这样的服务器")
 
-    def _server_info(self, *args):
+    async def _server_info(self, *args):
         """
         /server info <name>
         查看服务器详情。
@@ -178,14 +322,17 @@ class CommandLineInterface(CLIServiceInterface):
             print("Usage: /server info <name>")
             return
         name = args[0]
-        info = self.server_registry.get_server(name)
+        info = await self.server_registry.get_server(name)
         if info:
             print(f"服务器名称: {info['name']}")
             print(f"服务器地址: {info['url']}")
+            if info.get("tags"):
+                print(f"标签: {', '.join(info['tags'])}")
+            self._print_health(name)
         else:
             print("没有这样的服务器")
 
-    def _server_edit(self, *args):
+    async def _server_edit(self, *args):
         """
         /server edit <name> <url>
         编辑服务器。
@@ -194,7 +341,7 @@ class CommandLineInterface(CLIServiceInterface):
             print("Usage: /server edit <name> <url>")
             return
         name, url = args[0], args[1]
-        success = self.server_registry.edit_server(name, url)
+        success = await self.server_registry.edit_server(name, url)
         if success:
             print(f"服务器 {name} 地址已更新")
         else:
@@ -1,10 +1,30 @@
 from dependency_injector import containers, providers
+from .batch import BatchRunner
 from .cli import CommandLineInterface
 
 
 class Container(containers.DeclarativeContainer):
+    configer = providers.Dependency()
     chat_service = providers.Dependency()
     server_registry = providers.Dependency()
+    # 可选：未提供时 /server list 与 /server info 不显示健康数据
+    health_checker = providers.Dependency(default=providers.Object(None))
+    # 批量模式使用的多会话聊天服务，只在执行 batch 命令时创建
+    session_chat_service = providers.Dependency()
+
+    chat_config = providers.Callable(
+        lambda configer: configer().get_chat_config(), configer
+    )
+
     cli = providers.Singleton(
-        CommandLineInterface, server_registry=server_registry, chat_service=chat_service
+        CommandLineInterface,
+        server_registry=server_registry,
+        chat_service=chat_service,
+        health_checker=health_checker,
+    )
+
+    batch_runner = providers.Singleton(
+        BatchRunner.from_config,
+        chat_config=chat_config,
+        session_chat_service=session_chat_service,
     )
@@ -9,3 +9,15 @@ class ConfigSupplier(ABC):
     @abstractmethod
     def get_app_config(self):
         pass
+
+    @abstractmethod
+    def get_chat_config(self):
+        pass
+
+    @abstractmethod
+    def get_mcp_config(self):
+        pass
+
+    @abstractmethod
+    def get_server_config(self):
+        pass
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 import yaml
 from pydantic import BaseModel, Field
 from .api.config_supplier import ConfigSupplier
@@ -18,6 +18,61 @@ class FileConfigSupplier(ConfigSupplier):
     def get_cli_config(self):
         return self._config.cli
 
+    def get_chat_config(self):
+        return self._config.chat
+
+    def get_mcp_config(self):
+        return self._config.mcp
+
+    def get_server_config(self):
+        return self._config.server
+
+
+class ContextWindowConfig(BaseModel):
+    """对话上下文窗口配置"""
+
+    budget_tokens: int = Field(default=6000, gt=0)  # 每次请求携带历史的 token 上限
+    policy: Literal[
+        "sliding_window", "last_turns", "summarize", "background_summarize"
+    ] = "sliding_window"
+    keep_turns: int = Field(default=10, gt=0)  # last_turns 策略保留的最近轮数
+    # background_summarize：未摘要的历史超过可用预算的该比例时在后台开始摘要
+    summarize_threshold: float = Field(default=0.8, gt=0, le=1)
+    # 生成摘要所用的（更便宜的）模型，为 None 时使用对话模型
+    summary_model: Optional[str] = None
+
+
+class ResponseCacheConfig(BaseModel):
+    """LLM 回复缓存配置"""
+
+    enabled: bool = False
+    max_entries: int = Field(default=1024, gt=0)  # 内存 LRU 保留的回复数
+    path: Optional[str] = None  # 磁盘缓存的 SQLite 文件路径，为 None 时只缓存在内存
+    max_disk_bytes: int = Field(default=64 * 1024 * 1024, gt=0)  # 磁盘缓存大小上限
+    cache_nonzero_temperature: bool = False  # temperature > 0 时是否仍然缓存
+
+
+class ResilienceConfig(BaseModel):
+    """LLM 调用的重试、熔断与对冲配置（单次超时与重试次数见 LLMConfig）"""
+
+    total_timeout: float = Field(default=90.0, gt=0)  # 含重试与退避的总时限（秒）
+    base_backoff: float = Field(default=0.2, ge=0)  # 指数退避的初始上限（秒）
+    max_backoff: float = Field(default=10.0, ge=0)
+    breaker_failure_threshold: int = Field(default=5, gt=0)  # 连续失败多少次后熔断
+    breaker_reset_timeout: float = Field(default=30.0, gt=0)  # 熔断持续秒数
+    hedge: bool = False  # 超过 p95 延迟时是否补发对冲请求
+    hedge_min_samples: int = Field(default=20, gt=0)  # 启用对冲前需要的延迟样本数
+
+
+class LLMBackendConfig(BaseModel):
+    """多后端路由中的一个 OpenAI 兼容后端，未填写的参数沿用 LLMConfig"""
+
+    name: str
+    model: str
+    api_key: str
+    api_base: Optional[str] = None
+    weight: float = Field(default=1.0, gt=0)  # weighted 策略下的权重
+
 
 class LLMConfig(BaseModel):
     """LLM 配置"""
@@ -28,8 +83,84 @@ class LLMConfig(BaseModel):
     api_base: Optional[str] = None  # API 基础 URL，如果为 None 则使用默认值
     temperature: float = Field(default=0.7, ge=0.0, le=1.0)
     max_tokens: int = Field(default=1000, gt=0)
-    timeout: int = Field(default=30, gt=0)
-    retry_attempts: int = Field(default=3, ge=0)
+    timeout: int = Field(default=30, gt=0)  # 单次请求超时（秒）
+    retry_attempts: int = Field(default=3, ge=0)  # 失败后的最多重试次数
+    max_connections: int = Field(default=100, gt=0)  # 所有会话共享的 HTTP 连接池上限
+    max_keepalive_connections: int = Field(default=20, ge=0)
+    rpm: int = Field(default=0, ge=0)  # 每分钟请求数上限，0 表示不限制
+    tpm: int = Field(default=0, ge=0)  # 每分钟 token 数上限，0 表示不限制
+    max_concurrent_requests: int = Field(default=32, gt=0)  # 同时发往服务商的请求数
+    context: ContextWindowConfig = ContextWindowConfig()
+    coalesce: bool = True  # 相同的并发请求是否合并为一次上游调用
+    cache: ResponseCacheConfig = ResponseCacheConfig()
+    resilience: ResilienceConfig = ResilienceConfig()
+    # 配置多个后端时按 routing_strategy 路由并自动故障切换，为空时只使用上面的单一后端
+    backends: List[LLMBackendConfig] = []
+    routing_strategy: Literal["latency", "weighted", "least_outstanding"] = "latency"
+
+
+class ChatConfig(BaseModel):
+    """聊天会话配置"""
+
+    # 会话历史 SQLite 文件路径，为 None 时只保存在内存
+    history_path: Optional[str] = None
+    session_id: str = "default"  # 启动时恢复的会话
+    max_active_sessions: int = Field(default=256, gt=0)  # 内存中保留的活跃会话数
+    tool_call_timeout: float = Field(default=30.0, gt=0)  # 单次工具调用超时（秒）
+    # 每个服务器的并发调用上限
+    tool_concurrency_per_server: int = Field(default=4, gt=0)
+    # 每轮附带的最相关工具数，0 表示附带全部工具
+    tool_top_k: int = Field(default=8, ge=0)
+    # 一轮中所有工具结果的字节数上限
+    tool_results_max_bytes: int = Field(default=64 * 1024, gt=0)
+    # 一轮对话中模型连续请求工具的最大次数，之后的请求不再附带工具
+    max_tool_rounds: int = Field(default=3, gt=0)
+    batch_concurrency: int = Field(default=16, gt=0)  # 批量模式中同时进行的对话数
+
+
+class ToolResultCacheConfig(BaseModel):
+    """MCP 工具结果缓存配置"""
+
+    enabled: bool = False
+    # 未单独配置的工具的有效期（秒），0 表示不缓存
+    default_ttl: float = Field(default=300.0, ge=0)
+    tool_ttls: Dict[str, float] = {}  # 按工具名（或 服务器.工具名）覆盖的有效期
+    non_cacheable: List[str] = []  # 结果随时间或副作用变化、不应缓存的工具
+    max_bytes: int = Field(default=16 * 1024 * 1024, gt=0)  # 内存中结果的总字节数上限
+    path: Optional[str] = None  # 磁盘缓存的 SQLite 文件路径，为 None 时只缓存在内存
+    max_disk_bytes: int = Field(default=64 * 1024 * 1024, gt=0)  # 磁盘缓存大小上限
+
+
+class MCPConfig(BaseModel):
+    """MCP 配置"""
+
+    tools_ttl: float = Field(default=300.0, gt=0)  # 工具能力缓存的默认有效期（秒）
+    server_tools_ttl: Dict[str, float] = {}  # 按服务器覆盖的有效期
+    tools_fetch_wait: float = Field(default=2.0, gt=0)  # 首次拉取工具时最多等待的秒数
+    coalesce_tool_calls: bool = True  # 相同工具、相同参数的并发调用是否合并
+    # 服务器注册表 SQLite 文件路径，为 None 时只保存在内存
+    registry_path: Optional[str] = None
+    health_check_interval: float = Field(default=30.0, gt=0)  # 后台健康检查的间隔（秒）
+    health_check_timeout: float = Field(default=5.0, gt=0)  # 单次探测超时（秒）
+    health_check_concurrency: int = Field(default=8, gt=0)  # 同时进行的探测数上限
+    # 探测 p95 延迟超过该值（秒）的服务器标记为 slow，不参与工具路由；None 表示不按延迟标记
+    health_slow_threshold: Optional[float] = Field(default=None, gt=0)
+    tool_cache: ToolResultCacheConfig = ToolResultCacheConfig()
+    # 单个工具结果保留的字节数上限
+    max_tool_result_bytes: int = Field(default=32 * 1024, gt=0)
+
+
+class ServerConfig(BaseModel):
+    """HTTP 服务配置"""
+
+    host: str = "127.0.0.1"
+    port: int = Field(default=8080, ge=0, le=65535)
+    # 预派生的工作进程数；大于 1 时各进程的内存状态互不共享，应配置 history_path 与 registry_path
+    workers: int = Field(default=1, gt=0)
+    max_in_flight: int = Field(default=64, gt=0)  # 同时处理的对话请求数
+    max_waiting: int = Field(default=256, ge=0)  # 排队等待的请求数上限，超出时返回 503
+    # 停止时等待进行中请求完成的秒数
+    shutdown_timeout: float = Field(default=30.0, gt=0)
 
 
 class CLIConfig(BaseModel):
@@ -39,12 +170,27 @@ class CLIConfig(BaseModel):
     welcome_message: str = "Welcome to Personal Agent CLI ..."
 
 
+class TracingConfig(BaseModel):
+    """每轮对话的追踪与指标导出配置"""
+
+    enabled: bool = False  # 关闭时追踪调用几乎没有开销，/stats 只显示内置指标
+    otel_path: Optional[str] = None  # 结束的 span 以 OTLP JSON 逐行追加到该文件
+    prometheus_path: Optional[str] = None  # 指标以 Prometheus 文本格式写入该文件
+    # 写入指标文件的最小间隔（秒）
+    prometheus_interval: float = Field(default=15.0, gt=0)
+
+
 class SystemConfig(BaseModel):
     """应用配置"""
 
     name: str
     version: str
     environment: str
+    # 接口契约检查模式：full 每次调用都检查，sampled 按比例抽样，off 关闭
+    contracts: Literal["full", "sampled", "off"] = "sampled"
+    # sampled 模式的抽样比例
+    contract_sample_rate: float = Field(default=0.01, gt=0, le=1)
+    tracing: TracingConfig = TracingConfig()
 
 
 class OverallConfig(BaseModel):
@@ -52,6 +198,9 @@ class OverallConfig(BaseModel):
 
     llm: LLMConfig
     app: SystemConfig
+    chat: ChatConfig = ChatConfig()
+    mcp: MCPConfig = MCPConfig()
+    server: ServerConfig = ServerConfig()
 
     @classmethod
     def load_config(cls, config_path: Optional[Path] = None) -> "OverallConfig":
@@ -0,0 +1,7 @@
+"""
+devtools 子系统职责：提供开发与测试用的本地替身服务，如 OpenAI 兼容的假 LLM 服务器。
+"""
+
+from .fake_llm import FakeLLMServer, FakeStep
+
+__all__ = ["FakeLLMServer", "FakeStep"]
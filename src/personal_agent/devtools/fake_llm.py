@@ -0,0 +1,394 @@
+"""
+OpenAI 兼容的本地假 LLM 服务器，基于 asyncio 直接实现 HTTP/1.1，不依赖任何 Web 框架。
+
+支持 /v1/chat/completions 的普通与流式（SSE）响应，可按请求顺序编排延迟与错误状态，
+用于测试超时、重试、限流与对冲等策略；也可设置生成速度、随机错误率、回复大小与工具调用，
+作为性能基准中可复现的后端。也可单独运行：
+
+    python -m personal_agent.devtools.fake_llm --port 8000 --latency 0.2 --token-rate 50
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .serving import fake_server_parser, serve_forever
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class FakeStep:
+    """编排中的一次响应：状态码、响应前的延迟及 429 时的 Retry-After"""
+
+    status: int = 200
+    delay: float = 0.0
+    retry_after: Optional[float] = None
+
+
+class FakeLLMServer:  # pylint: disable=too-many-instance-attributes
+    """
+    假 LLM 服务器。
+
+    plan 中的步骤按请求到达顺序依次使用，用完后按 latency 正常返回 reply，
+    其中 error_rate 比例的请求返回 error_status（随机数由 seed 决定，结果可复现）。
+
+    - 回复按 chunk_size 个字符切分为 token；设置 token_rate（token/秒）时按该速度生成，
+      流式响应逐个 token 发出，非流式响应在全部生成后一次返回；
+    - reply_size 设置时把 reply 重复截取到该长度，用于测量不同大小的回复；
+    - tool_call 设置时，若请求附带了名称包含该字符串的工具且最后一条消息不是工具结果，
+      返回对该工具的调用（参数为 tool_arguments，流式请求时以增量片段发出），否则返回文本回复。
+
+    requests 记录已收到的请求体，便于断言请求次数与内容；record_requests 为 False 时不记录。
+    """
+
+    def __init__(
+        self,
+        reply: str = "你好，我是假 LLM。",
+        *,
+        latency: float = 0.0,
+        plan: Optional[List[FakeStep]] = None,
+        chunk_size: int = 4,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token_rate: Optional[float] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        reply_size: Optional[int] = None,
+        tool_call: Optional[str] = None,
+        tool_arguments: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = 0,
+        record_requests: bool = True,
+    ):
+        if reply_size is not None:
+            reply = (reply * (reply_size // max(1, len(reply)) + 1))[:reply_size]
+        self.reply = reply
+        self.latency = latency
+        self.plan = list(plan or [])
+        self.chunk_size = chunk_size
+        self.host = host
+        self.port = port
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tool_call = tool_call
+        self.tool_arguments = dict(tool_arguments or {})
+        self.record_requests = record_requests
+        self.requests: List[Dict] = []
+        self._random = random.Random(seed)
+        self._calls = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        """OpenAI 客户端使用的 base_url"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> "FakeLLMServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        # 连接关闭后处理协程读到 EOF 自行退出，等待它们结束，避免事件循环关闭时被强行取消
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1.0)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self) -> "FakeLLMServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._writers.add(writer)
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                path, body = request
+                await self._respond(writer, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, path: str, body: bytes
+    ) -> None:
+        if not path.endswith("/chat/completions"):
+            await _write_json(writer, 404, {"error": {"message": "not found"}})
+            return
+        payload = json.loads(body or b"{}")
+        if self.record_requests:
+            self.requests.append(payload)
+        step = self.plan.pop(0) if self.plan else self._next_step()
+        if step.delay:
+            await asyncio.sleep(step.delay)
+        if step.status != 200:
+            headers = {}
+            if step.retry_after is not None:
+                headers["Retry-After"] = f"{step.retry_after:g}"
+            await _write_json(
+                writer,
+                step.status,
+                {"error": {"message": f"fake error {step.status}", "type": "fake"}},
+                headers,
+            )
+            return
+        model = payload.get("model", "fake-model")
+        tool = self._tool_to_call(payload)
+        if tool is not None and payload.get("stream"):
+            await self._write_tool_stream(writer, model, tool)
+        elif tool is not None:
+            await _write_json(writer, 200, self._tool_completion(model, tool))
+        elif payload.get("stream"):
+            await self._write_stream(writer, model)
+        else:
+            if self.token_rate:
+                await asyncio.sleep(len(self._pieces()) / self.token_rate)
+            await _write_json(writer, 200, self._completion(model))
+
+    def _next_step(self) -> FakeStep:
+        if self.error_rate and self._random.random() < self.error_rate:
+            return FakeStep(status=self.error_status, delay=self.latency)
+        return FakeStep(delay=self.latency)
+
+    def _pieces(self) -> List[str]:
+        return [
+            self.reply[i : i + self.chunk_size]
+            for i in range(0, len(self.reply), self.chunk_size)
+        ]
+
+    def _tool_to_call(self, payload: Dict) -> Optional[str]:
+        messages = payload.get("messages") or [{}]
+        if self.tool_call is None or messages[-1].get("role") == "tool":
+            return None
+        for tool in payload.get("tools") or []:
+            name = tool.get("function", {}).get("name", "")
+            if self.tool_call in name:
+                return name
+        return None
+
+    def _tool_completion(self, model: str, function: str) -> Dict:
+        self._calls += 1
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": None,
+                        "tool_calls": [
+                            {
+                                "id": f"call_fake_{self._calls}",
+                                "type": "function",
+                                "function": {
+                                    "name": function,
+                                    "arguments": json.dumps(
+                                        self.tool_arguments, ensure_ascii=False
+                                    ),
+                                },
+                            }
+                        ],
+                    },
+                    "finish_reason": "tool_calls",
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def _completion(self, model: str) -> Dict:
+        tokens = len(self._pieces())
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 1,
+                "completion_tokens": tokens,
+                "total_tokens": tokens + 1,
+            },
+        }
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, model: str) -> None:
+        _write_stream_head(writer)
+        pieces = self._pieces()
+        for index, piece in enumerate(pieces + [None]):
+            if self.token_rate and piece is not None:
+                await asyncio.sleep(1 / self.token_rate)
+            _write_event(
+                writer,
+                model,
+                {"content": piece} if piece is not None else {},
+                None if piece is not None else "stop",
+            )
+            if self.token_rate or index % 8 == 0:
+                await writer.drain()
+        await _write_stream_end(writer)
+
+    async def _write_tool_stream(
+        self, writer: asyncio.StreamWriter, model: str, function: str
+    ) -> None:
+        """流式返回工具调用：先发函数名，参数分两段增量发出"""
+        self._calls += 1
+        arguments = json.dumps(self.tool_arguments, ensure_ascii=False)
+        half = len(arguments) // 2
+        _write_stream_head(writer)
+        _write_event(
+            writer,
+            model,
+            {
+                "role": "assistant",
+                "tool_calls": [
+                    {
+                        "index": 0,
+                        "id": f"call_fake_{self._calls}",
+                        "type": "function",
+                        "function": {"name": function, "arguments": ""},
+                    }
+                ],
+            },
+        )
+        for piece in (arguments[:half], arguments[half:]):
+            _write_event(
+                writer,
+                model,
+                {"tool_calls": [{"index": 0, "function": {"arguments": piece}}]},
+            )
+        _write_event(writer, model, {}, "tool_calls")
+        await _write_stream_end(writer)
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, bytes]]:
+    """读取一个 HTTP 请求，连接关闭时返回 None"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    path = lines[0].split(" ")[1]
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    body = await reader.readexactly(length) if length else b""
+    return path, body
+
+
+async def _write_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Dict,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+def _write_stream_head(writer: asyncio.StreamWriter) -> None:
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/event-stream\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+    )
+
+
+def _write_event(
+    writer: asyncio.StreamWriter,
+    model: str,
+    delta: Dict,
+    finish_reason: Optional[str] = None,
+) -> None:
+    event = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    _write_chunk(writer, f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+
+async def _write_stream_end(writer: asyncio.StreamWriter) -> None:
+    _write_chunk(writer, b"data: [DONE]\n\n")
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = fake_server_parser(
+        "OpenAI 兼容的本地假 LLM 服务器", 8000, "每次响应的延迟（秒）"
+    )
+    parser.add_argument("--reply", default="你好，我是假 LLM。")
+    parser.add_argument("--reply-size", type=int, help="回复的字符数")
+    args = parser.parse_args(argv)
+    serve_forever(
+        lambda: FakeLLMServer(
+            args.reply,
+            latency=args.latency,
+            host=args.host,
+            port=args.port,
+            token_rate=args.token_rate,
+            error_rate=args.error_rate,
+            reply_size=args.reply_size,
+            seed=args.seed,
+            record_requests=False,
+        ).start(),
+        "fake LLM",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+本地假 MCP 服务器（SSE 传输），工具结果的延迟、生成速度、错误率与大小均可配置，
+作为性能基准中可复现的工具后端。也可单独运行：
+
+    python -m personal_agent.devtools.fake_mcp --port 8100 --latency 0.05 --payload-size 4096
+"""
+
+import asyncio
+import random
+from typing import List, Optional
+import uvicorn
+from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
+from .serving import fake_server_parser, serve_forever
+
+# 估算 token 数时每个 token 对应的字符数
+CHARS_PER_TOKEN = 4
+
+
+class FakeMCPServer:  # pylint: disable=too-many-instance-attributes
+    """
+    假 MCP 服务器，提供 search(query) 与 echo(text) 两个工具。
+
+    search 在 latency 秒后返回 payload_size 个字符的结果；设置 token_rate（token/秒）时
+    再按结果的 token 数（每 token 约 CHARS_PER_TOKEN 个字符）增加生成时间；
+    error_rate 比例的调用以工具错误结束（随机数由 seed 决定，结果可复现）。
+    calls 记录 search 的调用次数。
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        token_rate: Optional[float] = None,
+        error_rate: float = 0.0,
+        payload_size: int = 256,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = 0,
+    ):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.host = host
+        self.port = port
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._server: Optional[uvicorn.Server] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        """注册到服务器注册表的 SSE 地址"""
+        return f"http://{self.host}:{self.port}/sse"
+
+    def build(self) -> FastMCP:
+        mcp = FastMCP("fake")
+
+        @mcp.tool
+        async def search(query: str) -> str:
+            """按关键词搜索，返回固定大小的结果"""
+            self.calls += 1
+            delay = self.latency
+            if self.token_rate:
+                delay += self.payload_size / CHARS_PER_TOKEN / self.token_rate
+            if delay:
+                await asyncio.sleep(delay)
+            if self.error_rate and self._random.random() < self.error_rate:
+                raise ToolError(f"fake failure for {query}")
+            line = f"result for {query}; "
+            return (line * (self.payload_size // len(line) + 1))[: self.payload_size]
+
+        @mcp.tool
+        def echo(text: str) -> str:
+            """原样返回输入"""
+            return text
+
+        return mcp
+
+    async def start(self) -> "FakeMCPServer":
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                self.build().http_app(transport="sse"),
+                host=self.host,
+                port=self.port,
+                log_level="warning",
+            )
+        )
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._task.done():
+                # 启动失败（如端口被占用）时抛出原始异常
+                self._task.result()
+            await asyncio.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.should_exit = True
+        await self._task
+        self._server = None
+
+    async def __aenter__(self) -> "FakeMCPServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = fake_server_parser(
+        "本地假 MCP 服务器（SSE）", 8100, "每次调用的延迟（秒）"
+    )
+    parser.add_argument("--payload-size", type=int, default=256, help="结果的字符数")
+    args = parser.parse_args(argv)
+    serve_forever(
+        lambda: FakeMCPServer(
+            latency=args.latency,
+            token_rate=args.token_rate,
+            error_rate=args.error_rate,
+            payload_size=args.payload_size,
+            host=args.host,
+            port=args.port,
+            seed=args.seed,
+        ).start(),
+        "fake MCP",
+    )
+
+
+if __name__ == "__main__":
+    main()
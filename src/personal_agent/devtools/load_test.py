@@ -0,0 +1,184 @@
+"""
+HTTP 服务压测：默认在本进程内启动假 LLM 与 HTTP 服务（单工作进程），以固定并发发送对话请求，
+输出吞吐量与延迟分位数；指定 --url 时压测已经运行的服务。
+进程内模式下压测客户端、服务与假 LLM 共用一个 CPU 核，适合比较改动前后的相对变化；
+绝对吞吐量应以 --url 压测单独启动（可多进程）的服务为准。
+
+    python -m personal_agent.devtools.load_test --requests 2000 --concurrency 100 --latency 0.05
+    python -m personal_agent.devtools.load_test --stream --url http://127.0.0.1:8080
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+import uvicorn
+from dependency_injector import providers
+from personal_agent.app import Container
+from personal_agent.config import ConfigSupplier
+from personal_agent.config.config import (
+    LLMConfig,
+    OverallConfig,
+    ServerConfig,
+    SystemConfig,
+)
+from personal_agent.util import contracts
+from personal_agent.util.metrics import Histogram
+from .fake_llm import FakeLLMServer
+
+
+class _StaticConfigSupplier(ConfigSupplier):
+    def __init__(self, config: OverallConfig):
+        self._config = config
+
+    def get_llm_config(self):
+        return self._config.llm
+
+    def get_app_config(self):
+        return self._config.app
+
+    def get_chat_config(self):
+        return self._config.chat
+
+    def get_mcp_config(self):
+        return self._config.mcp
+
+    def get_server_config(self):
+        return self._config.server
+
+
+@asynccontextmanager
+async def local_server(
+    latency: float, max_in_flight: int, max_waiting: int
+) -> AsyncIterator[str]:
+    """启动假 LLM 与指向它的 HTTP 服务，产出服务地址"""
+    async with FakeLLMServer(latency=latency) as fake:
+        config = OverallConfig(
+            llm=LLMConfig(
+                provider="fake",
+                model="fake-model",
+                api_key="fake-key",
+                api_base=fake.url,
+                max_concurrent_requests=max_in_flight,
+            ),
+            app=SystemConfig(
+                name="personal-agent", version="load-test", environment="test"
+            ),
+            server=ServerConfig(
+                port=0, max_in_flight=max_in_flight, max_waiting=max_waiting
+            ),
+        )
+        contracts.configure(contracts.MODE_OFF)
+        container = Container()
+        container.config_container().configer.override(
+            providers.Object(_StaticConfigSupplier(config))
+        )
+        server = uvicorn.Server(
+            uvicorn.Config(
+                container.server_container().app(),
+                host="127.0.0.1",
+                port=0,
+                log_level="warning",
+            )
+        )
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            server.should_exit = True
+            await task
+
+
+async def run_load(
+    url: str, requests: int, concurrency: int, stream: bool = False
+) -> Dict[str, Any]:
+    """以 concurrency 个并发客户端共发送 requests 个对话请求，每个请求使用独立会话"""
+    latency = Histogram("latency", max_samples=requests)
+    first_byte = Histogram("first_byte", max_samples=requests)
+    statuses: Counter = Counter()
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+
+        async def one(index: int) -> None:
+            path = f"/v1/sessions/load-{index}/messages"
+            body = {"message": f"第 {index} 个请求"}
+            start = time.perf_counter()
+            try:
+                if stream:
+                    async with client.stream("POST", path + "/stream", json=body) as r:
+                        waiting = True
+                        async for _ in r.aiter_bytes():
+                            if waiting:
+                                first_byte.observe(time.perf_counter() - start)
+                                waiting = False
+                        statuses[r.status_code] += 1
+                else:
+                    response = await client.post(path, json=body)
+                    statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                return
+            latency.observe(time.perf_counter() - start)
+
+        async def worker() -> None:
+            for index in counter:
+                await one(index)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result: Dict[str, Any] = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 1),
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "latency": latency.snapshot(),
+    }
+    if stream:
+        result["first_byte"] = first_byte.snapshot()
+    return result
+
+
+async def _measure(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    # 预热：首批请求会触发 LLM 客户端的导入与连接建立，不计入结果
+    await run_load(url, args.concurrency, args.concurrency, args.stream)
+    return await run_load(url, args.requests, args.concurrency, args.stream)
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        return await _measure(args.url, args)
+    async with local_server(args.latency, args.max_in_flight, args.max_waiting) as url:
+        return await _measure(url, args)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="HTTP 服务压测")
+    parser.add_argument(
+        "--url", help="已运行服务的地址；省略时在本进程内启动假 LLM 与服务"
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stream", action="store_true", help="使用 SSE 流式接口")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="假 LLM 的响应延迟（秒）"
+    )
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--max-waiting", type=int, default=256)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(_main(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
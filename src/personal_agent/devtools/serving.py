@@ -0,0 +1,35 @@
+"""
+假服务器命令行入口的公共部分：通用参数与常驻运行。
+"""
+
+import argparse
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+def fake_server_parser(
+    description: str, port: int, latency_help: str
+) -> argparse.ArgumentParser:
+    """带有地址、端口、延迟、生成速度、错误率与随机种子参数的解析器"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--latency", type=float, default=0.0, help=latency_help)
+    parser.add_argument("--token-rate", type=float, help="生成速度（token/秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="失败的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def serve_forever(start: Callable[[], Awaitable[Any]], label: str) -> None:
+    """启动假服务器并一直运行，直到按下 Ctrl+C"""
+
+    async def serve() -> None:
+        server = await start()
+        print(f"{label} listening on {server.url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
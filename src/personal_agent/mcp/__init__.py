@@ -3,6 +3,8 @@ mcp 子系统职责：管理 MCP 服务器及其提供的工具的使用，负
 """
 
 from .container import Container
+from .api.async_server_registry import AsyncServerRegistry
 from .api.server_registry import ServerRegistry
+from .api.tool_service import ToolService
 
-__all__ = ["Container", "ServerRegistry"]
+__all__ = ["AsyncServerRegistry", "Container", "ServerRegistry", "ToolService"]
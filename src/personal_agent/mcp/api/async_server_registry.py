@@ -0,0 +1,124 @@
+from abc import abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from icontract import DBC
+from personal_agent.util.contracts import require, ensure
+from .server_registry import (
+    _is_listener,
+    _is_valid_entry,
+    _is_valid_tags,
+    is_valid_url,
+)
+
+
+class AsyncServerRegistry(DBC):
+    """
+    MCP服务器注册与管理的异步接口，语义与 ServerRegistry 相同。
+
+    供运行在事件循环上的调用方（CLI 命令、HTTP 接口）使用：
+    涉及磁盘等阻塞 I/O 的实现不会阻塞事件循环，并发进行的流式对话不受影响。
+    """
+
+    @abstractmethod
+    @require(
+        lambda offset: isinstance(offset, int) and offset >= 0,
+        "offset 必须为非负整数",
+    )
+    @require(
+        lambda limit: limit is None or (isinstance(limit, int) and limit > 0),
+        "limit 必须为正整数或 None",
+    )
+    @ensure(lambda result: isinstance(result, list))
+    async def list_servers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        host: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取已注册的服务器信息，可按主机名与标签过滤并分页。
+        """
+
+    @abstractmethod
+    @ensure(lambda result: isinstance(result, int) and result >= 0)
+    async def count_servers(
+        self, host: Optional[str] = None, tag: Optional[str] = None
+    ) -> int:
+        """
+        统计满足过滤条件的服务器数量。
+        """
+
+    @abstractmethod
+    @require(
+        lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
+    )
+    @require(is_valid_url, "服务器地址必须为合法的 URL")
+    @require(_is_valid_tags, "标签必须为非空字符串列表")
+    @ensure(lambda result: isinstance(result, bool))
+    async def add_server(self, name: str, url: str, tags: Sequence[str] = ()) -> bool:
+        """
+        添加新服务器。若名称重复则添加失败。
+        """
+
+    @abstractmethod
+    @require(
+        lambda servers: all(_is_valid_entry(server) for server in servers),
+        "每个服务器必须包含非空名称与合法的 URL",
+    )
+    @ensure(lambda result: isinstance(result, int) and result >= 0)
+    async def add_servers(self, servers: Sequence[Dict[str, Any]]) -> int:
+        """
+        批量添加服务器，返回实际添加的数量。
+        """
+
+    @abstractmethod
+    @require(
+        lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
+    )
+    @ensure(lambda result: isinstance(result, bool))
+    async def remove_server(self, name: str) -> bool:
+        """
+        删除指定名称的服务器。若服务器不存在则删除失败。
+        """
+
+    @abstractmethod
+    @require(
+        lambda names: all(isinstance(name, str) and name != "" for name in names),
+        "服务器名称必须为非空字符串",
+    )
+    @ensure(lambda result: isinstance(result, int) and result >= 0)
+    async def remove_servers(self, names: Sequence[str]) -> int:
+        """
+        批量删除服务器，返回实际删除的数量。
+        """
+
+    @abstractmethod
+    @require(
+        lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
+    )
+    @ensure(
+        lambda result: result is None
+        or (isinstance(result, dict) and "name" in result and "url" in result)
+    )
+    async def get_server(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定名称服务器的详细信息。若不存在则返回 None。
+        """
+
+    @abstractmethod
+    @require(
+        lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
+    )
+    @require(is_valid_url, "服务器地址必须为合法的 URL")
+    @ensure(lambda result: isinstance(result, bool))
+    async def edit_server(self, name: str, url: str) -> bool:
+        """
+        修改指定服务器的地址。若服务器不存在则修改失败。
+        """
+
+    @abstractmethod
+    @require(_is_listener, "listener 必须可调用")
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        """
+        订阅服务器变更事件，listener(event, name) 总是在事件循环线程上被调用。
+        """
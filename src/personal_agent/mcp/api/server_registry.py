@@ -1,7 +1,14 @@
 from urllib.parse import urlparse
-from abc import ABC, abstractmethod
-from typing import List, Optional, Dict
-from icontract import require, ensure
+from abc import abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from icontract import DBC
+from personal_agent.util.contracts import require, ensure
+
+
+# 服务器变更事件，作为 listener(event, name) 的 event 参数
+SERVER_ADDED = "added"
+SERVER_REMOVED = "removed"
+SERVER_EDITED = "edited"
 
 
 def is_valid_url(url: str) -> bool:
@@ -14,16 +21,70 @@ def is_valid_url(url: str) -> bool:
         return False
 
 
-class ServerRegistry(ABC):
+def url_host(url: str) -> str:
+    """服务器地址的主机名（小写），用于按主机索引与过滤"""
+    return (urlparse(url).hostname or "").lower()
+
+
+def _is_valid_tags(tags: Sequence[str]) -> bool:
+    return not isinstance(tags, str) and all(
+        isinstance(tag, str) and tag != "" for tag in tags
+    )
+
+
+def _is_listener(listener: Any) -> bool:
+    # icontract 按参数名传参，不能直接使用内置的 callable(obj)
+    return callable(listener)
+
+
+def _is_valid_entry(server: Dict[str, Any]) -> bool:
+    return (
+        isinstance(server, dict)
+        and isinstance(server.get("name"), str)
+        and server["name"] != ""
+        and is_valid_url(server.get("url"))
+        and _is_valid_tags(server.get("tags", ()))
+    )
+
+
+class ServerRegistry(DBC):
     """
     MCP服务器注册与管理接口，负责服务器的增删查改。
+
+    服务器信息为 {"name": ..., "url": ...}，带标签的服务器另有 "tags" 列表。
+    列表按添加顺序排列，支持按主机名、标签过滤与分页。
     """
 
     @abstractmethod
+    @require(
+        lambda offset: isinstance(offset, int) and offset >= 0,
+        "offset 必须为非负整数",
+    )
+    @require(
+        lambda limit: limit is None or (isinstance(limit, int) and limit > 0),
+        "limit 必须为正整数或 None",
+    )
     @ensure(lambda result: isinstance(result, list))
-    def list_servers(self) -> List[Dict[str, str]]:
+    @ensure(lambda limit, result: limit is None or len(result) <= limit)
+    def list_servers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        host: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        获取所有已注册的服务器信息。
+        获取已注册的服务器信息。
+        可按主机名（host）与标签（tag）过滤，并从第 offset 个起最多返回 limit 个。
+        """
+
+    @abstractmethod
+    @ensure(lambda result: isinstance(result, int) and result >= 0)
+    def count_servers(
+        self, host: Optional[str] = None, tag: Optional[str] = None
+    ) -> int:
+        """
+        统计满足过滤条件的服务器数量，用于分页。
         """
 
     @abstractmethod
@@ -31,12 +92,27 @@ class ServerRegistry(ABC):
         lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
     )
     @require(is_valid_url, "服务器地址必须为合法的 URL")
+    @require(_is_valid_tags, "标签必须为非空字符串列表")
     @ensure(lambda result: isinstance(result, bool))
-    def add_server(self, name: str, url: str) -> bool:
+    def add_server(self, name: str, url: str, tags: Sequence[str] = ()) -> bool:
         """
         添加新服务器。若名称重复则添加失败。
         """
 
+    @abstractmethod
+    @require(
+        lambda servers: all(_is_valid_entry(server) for server in servers),
+        "每个服务器必须包含非空名称与合法的 URL",
+    )
+    @ensure(
+        lambda servers, result: isinstance(result, int) and 0 <= result <= len(servers)
+    )
+    def add_servers(self, servers: Sequence[Dict[str, Any]]) -> int:
+        """
+        批量添加服务器，在同一事务中完成。
+        名称已存在（或在本批中重复）的条目被跳过，返回实际添加的数量。
+        """
+
     @abstractmethod
     @require(
         lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
@@ -48,6 +124,18 @@ class ServerRegistry(ABC):
         若服务器不存在则删除失败。
         """
 
+    @abstractmethod
+    @require(
+        lambda names: all(isinstance(name, str) and name != "" for name in names),
+        "服务器名称必须为非空字符串",
+    )
+    @ensure(lambda names, result: isinstance(result, int) and 0 <= result <= len(names))
+    def remove_servers(self, names: Sequence[str]) -> int:
+        """
+        批量删除服务器，在同一事务中完成。
+        不存在的名称被忽略，返回实际删除的数量。
+        """
+
     @abstractmethod
     @require(
         lambda name: isinstance(name, str) and name != "", "服务器名称必须为非空字符串"
@@ -56,7 +144,7 @@ class ServerRegistry(ABC):
         lambda result: result is None
         or (isinstance(result, dict) and "name" in result and "url" in result)
     )
-    def get_server(self, name: str) -> Optional[Dict[str, str]]:
+    def get_server(self, name: str) -> Optional[Dict[str, Any]]:
         """
         获取指定名称服务器的详细信息。
         若不存在则返回 None。
@@ -70,6 +158,14 @@ class ServerRegistry(ABC):
     @ensure(lambda result: isinstance(result, bool))
     def edit_server(self, name: str, url: str) -> bool:
         """
-        修改指定服务器的地址。
+        修改指定服务器的地址，标签保持不变。
         若服务器不存在则修改失败。
         """
+
+    @abstractmethod
+    @require(_is_listener, "listener 必须可调用")
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        """
+        订阅服务器变更事件。
+        每次成功的增删改后以 listener(event, name) 通知，批量操作对每个服务器各通知一次，event 为 added / removed / edited。
+        """
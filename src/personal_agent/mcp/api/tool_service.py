@@ -0,0 +1,55 @@
+from abc import abstractmethod
+from typing import Any, Dict, List, Optional
+from icontract import DBC
+from personal_agent.util.contracts import require, ensure
+from ..types import ToolDescription
+
+
+class ToolService(DBC):
+    """
+    MCP 工具服务接口，仅供 chat 模块调用。
+
+    聚合所有已注册服务器的工具能力，并将工具调用路由到对应的服务器。
+    工具名可带服务器前缀（如 amap.maps_weather），不带前缀时须在所有服务器中唯一。
+    """
+
+    @abstractmethod
+    @ensure(lambda result: isinstance(result, list))
+    async def list_tools(self) -> List[ToolDescription]:
+        """
+        获取所有聚合后的工具能力描述。
+        """
+
+    @abstractmethod
+    @require(lambda query: isinstance(query, str), "查询必须为字符串")
+    @require(lambda top_k: top_k > 0, "top_k 必须为正整数")
+    @ensure(lambda result, top_k: isinstance(result, list) and len(result) <= top_k)
+    async def search_tools(self, query: str, top_k: int) -> List[ToolDescription]:
+        """
+        按与查询（通常是用户本轮消息）的相关度返回至多 top_k 个工具，
+        没有相关工具时返回空列表。
+        """
+
+    @abstractmethod
+    @require(
+        lambda tool_name: isinstance(tool_name, str) and tool_name != "",
+        "工具名称必须为非空字符串",
+    )
+    @ensure(lambda result: isinstance(result, str))
+    async def call_tool(
+        self, tool_name: str, params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        调用指定工具，返回结果的文本内容。
+
+        异常:
+            ToolNotFound: 没有服务器提供该工具。
+            ToolCallError: 服务器返回错误。
+            MCPConnectionError: 无法连接到工具所在的服务器。
+        """
+
+    @abstractmethod
+    async def refresh_tools(self) -> None:
+        """
+        主动刷新能力缓存，重新拉取所有服务器的工具。
+        """
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Set
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from .api.async_server_registry import AsyncServerRegistry
+from .api.server_registry import SERVER_EDITED, SERVER_REMOVED, ServerRegistry
+from .connection_manager import MCPConnectionManager
+from .server_registry_async import ThreadedServerRegistry, list_server_names
+from .types import ToolDescription
+
+
+class _Entry:
+    """单个服务器的缓存条目"""
+
+    __slots__ = ("tools", "fetched_at")
+
+    def __init__(self, tools: List[ToolDescription], fetched_at: float):
+        self.tools = tools
+        self.fetched_at = fetched_at
+
+
+class CapabilityCache:  # pylint: disable=too-many-instance-attributes
+    """
+    能力缓存：按服务器聚合 list_tools 结果。
+
+    - 懒加载：首次查询时并行拉取所有尚未缓存的服务器；
+    - 每个服务器独立的有效期（TTL），过期后先返回旧数据，再在后台刷新（stale-while-revalidate）；
+    - 首次拉取最多等待 fetch_wait 秒，慢服务器在后台继续拉取，不阻塞当前这一轮对话；
+    - 注册表中服务器被删除或修改时自动失效；
+    - 缓存内容变化时通知订阅者（如工具检索索引），便于其增量更新；
+    - 服务器列表通过异步注册表按页读取，磁盘注册表的查询不阻塞事件循环。
+    """
+
+    def __init__(
+        self,
+        server_registry: ServerRegistry,
+        connection_manager: MCPConnectionManager,
+        *,
+        default_ttl: float = 300.0,
+        server_ttls: Optional[Dict[str, float]] = None,
+        fetch_wait: float = 2.0,
+        metrics: Optional[MetricsRegistry] = None,
+        async_server_registry: Optional[AsyncServerRegistry] = None,
+    ):
+        self.server_registry = server_registry
+        # 未提供时直接在事件循环上调用同步注册表（适用于内存注册表）
+        self.async_server_registry = async_server_registry or ThreadedServerRegistry(
+            server_registry, offload=False
+        )
+        self.connection_manager = connection_manager
+        self.default_ttl = default_ttl
+        self.server_ttls = dict(server_ttls or {})
+        self.fetch_wait = fetch_wait
+        self.metrics = metrics or default_registry
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 每次失效递增，防止失效前发起的拉取把旧数据写回缓存
+        self._generations: Dict[str, int] = {}
+        self._listeners: List[
+            Callable[[str, Optional[List[ToolDescription]]], None]
+        ] = []
+        server_registry.subscribe(self._on_registry_change)
+
+    @classmethod
+    def from_config(
+        cls,
+        mcp_config,
+        server_registry,
+        connection_manager,
+        async_server_registry=None,
+    ) -> "CapabilityCache":
+        return cls(
+            server_registry,
+            connection_manager,
+            default_ttl=mcp_config.tools_ttl,
+            server_ttls=mcp_config.server_tools_ttl,
+            fetch_wait=mcp_config.tools_fetch_wait,
+            async_server_registry=async_server_registry,
+        )
+
+    async def get_tools(self) -> List[ToolDescription]:
+        """返回所有已注册服务器的工具，按注册顺序聚合"""
+        names = await list_server_names(self.async_server_registry)
+        await self._ensure(names)
+        tools: List[ToolDescription] = []
+        for name in names:
+            entry = self._entries.get(name)
+            if entry is not None:
+                tools.extend(entry.tools)
+        return tools
+
+    async def get_server_tools(self, name: str) -> List[ToolDescription]:
+        """返回单个服务器的工具"""
+        await self._ensure([name])
+        entry = self._entries.get(name)
+        return list(entry.tools) if entry is not None else []
+
+    async def refresh(self, name: Optional[str] = None) -> None:
+        """主动刷新指定服务器（默认全部）的能力，等待刷新完成"""
+        if name is None:
+            names = await list_server_names(self.async_server_registry)
+        else:
+            names = [name]
+        tasks = [self._fetch(n) for n in names]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """使指定服务器（默认全部）的缓存失效"""
+        names = set(self._entries) | set(self._inflight) if name is None else [name]
+        for n in names:
+            self._entries.pop(n, None)
+            self._generations[n] = self._generations.get(n, 0) + 1
+            task = self._inflight.pop(n, None)
+            if task is not None:
+                task.cancel()
+            self._notify(n, None)
+
+    def subscribe(
+        self, listener: Callable[[str, Optional[List[ToolDescription]]], None]
+    ) -> None:
+        """订阅缓存变化：服务器工具更新时回调 (name, tools)，失效时回调 (name, None)。
+        订阅时会先以当前已缓存的内容回调一次。"""
+        self._listeners.append(listener)
+        for name, entry in self._entries.items():
+            listener(name, entry.tools)
+
+    def stats(self) -> Dict[str, float]:
+        """命中、未命中、后台刷新等计数"""
+        return {
+            key: self.metrics.counter(f"mcp.capability_cache.{key}").value
+            for key in ("hits", "misses", "refreshes", "errors")
+        }
+
+    async def _ensure(self, names: List[str]) -> None:
+        now = time.monotonic()
+        missing: Set[asyncio.Task] = set()
+        for name in names:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._count("misses")
+                missing.add(self._fetch(name))
+                continue
+            self._count("hits")
+            if now - entry.fetched_at >= self.server_ttls.get(name, self.default_ttl):
+                # 过期数据照常返回，同时在后台刷新
+                if name not in self._inflight:
+                    self._count("refreshes")
+                self._fetch(name)
+        if missing:
+            # 超时未完成的拉取继续在后台运行，结果写入缓存供下一轮使用
+            await asyncio.wait(missing, timeout=self.fetch_wait)
+
+    def _fetch(self, name: str) -> asyncio.Task:
+        """发起（或复用进行中的）拉取任务"""
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._load(name))
+            self._inflight[name] = task
+        return task
+
+    async def _load(self, name: str) -> None:
+        generation = self._generations.get(name, 0)
+        try:
+            tools = await self.connection_manager.list_tools(name)
+        except Exception:  # pylint: disable=broad-except
+            # 拉取失败不影响其他服务器；保留旧数据（如有），下次查询时重试
+            self._count("errors")
+            return
+        finally:
+            if self._generations.get(name, 0) == generation:
+                self._inflight.pop(name, None)
+        if self._generations.get(name, 0) != generation:
+            return
+        entry = _Entry(
+            [ToolDescription.from_mcp_tool(name, tool) for tool in tools],
+            time.monotonic(),
+        )
+        self._entries[name] = entry
+        self._notify(name, entry.tools)
+
+    def _notify(self, name: str, tools: Optional[List[ToolDescription]]) -> None:
+        for listener in self._listeners:
+            listener(name, tools)
+
+    def _count(self, key: str) -> None:
+        self.metrics.counter(f"mcp.capability_cache.{key}").inc()
+
+    def _on_registry_change(self, event: str, name: str) -> None:
+        if event in (SERVER_REMOVED, SERVER_EDITED):
+            self.invalidate(name)
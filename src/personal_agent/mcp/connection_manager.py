@@ -0,0 +1,263 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.tracing import span
+from .api.async_server_registry import AsyncServerRegistry
+from .api.server_registry import SERVER_EDITED, SERVER_REMOVED, ServerRegistry
+from .exceptions import MCPConnectionError, ServerNotFound
+from .server_registry_async import ThreadedServerRegistry
+
+
+def is_server_error(error: BaseException) -> bool:
+    """服务器返回的业务错误（工具报错、方法不存在等），说明连接本身仍然可用"""
+    # fastmcp 导入较慢，推迟到真正需要时（此时客户端早已加载）
+    # pylint: disable=import-outside-toplevel
+    from fastmcp.exceptions import FastMCPError, McpError
+
+    return isinstance(error, (FastMCPError, McpError))
+
+
+def _not_sent(error: BaseException) -> bool:
+    """请求还未写出就失败（会话的发送通道已关闭），服务器不可能执行过它"""
+    # pylint: disable=import-outside-toplevel
+    from anyio import BrokenResourceError, ClosedResourceError
+
+    return isinstance(error, (BrokenResourceError, ClosedResourceError))
+
+
+def _default_client_factory(url: str):
+    # pylint: disable=import-outside-toplevel
+    from fastmcp import Client
+
+    # 路径以 /sse 结尾时使用 SSE 传输，否则使用 Streamable HTTP
+    return Client(url)
+
+
+class _Connection:
+    """单个服务器的连接状态"""
+
+    __slots__ = ("url", "client", "lock", "failures", "retry_at")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = None
+        self.lock = asyncio.Lock()
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+
+class MCPConnectionManager:  # pylint: disable=too-many-instance-attributes
+    """
+    MCP 服务器连接管理：为每个已注册服务器维护一个长连接客户端。
+
+    客户端在首次使用时建立，之后的工具调用复用同一会话，不再重复握手；
+    连接失败按指数退避（带抖动）重试，连接中断时自动重连；
+    服务器被删除或修改地址时关闭对应客户端。
+    连接中断后只有 list_tools 这类幂等请求会重发；工具调用可能有副作用，
+    只在请求尚未发出时才重发，否则直接报错，避免同一工具被执行两次。
+    """
+
+    def __init__(
+        self,
+        server_registry: ServerRegistry,
+        *,
+        client_factory: Optional[Callable[[str], Any]] = None,
+        connect_attempts: int = 3,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        metrics: Optional[MetricsRegistry] = None,
+        async_server_registry: Optional[AsyncServerRegistry] = None,
+    ):
+        self.server_registry = server_registry
+        # 未提供时直接在事件循环上调用同步注册表（适用于内存注册表）
+        self.async_server_registry = async_server_registry or ThreadedServerRegistry(
+            server_registry, offload=False
+        )
+        self.connect_attempts = connect_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or default_registry
+        self._client_factory = client_factory or _default_client_factory
+        self._connections: Dict[str, _Connection] = {}
+        self._closing: Set[asyncio.Task] = set()
+        server_registry.subscribe(self._on_registry_change)
+
+    async def get_client(self, name: str):
+        """获取服务器的已连接客户端，必要时建立连接
+
+        Raises:
+            ServerNotFound: 服务器未注册
+            MCPConnectionError: 重试后仍无法连接，或仍处于退避期内
+        """
+        conn = self._connections.get(name)
+        if conn is None:
+            info = await self.async_server_registry.get_server(name)
+            if info is None:
+                raise ServerNotFound(f"服务器 {name} 未注册")
+            conn = self._connections.setdefault(name, _Connection(info["url"]))
+        if conn.connected:
+            self.metrics.counter("mcp.connection_reuses").inc()
+            return conn.client
+        async with conn.lock:
+            if not conn.connected:
+                with span("mcp.connect", server=name):
+                    await self._connect(name, conn)
+        return conn.client
+
+    async def call_tool(
+        self, name: str, tool: str, arguments: Optional[Dict[str, Any]] = None
+    ):
+        """在指定服务器上调用工具"""
+        with span("mcp.client.call_tool", server=name, tool=tool):
+            return await self._run(
+                name, lambda client: client.call_tool(tool, arguments), idempotent=False
+            )
+
+    async def list_tools(self, name: str):
+        """列出指定服务器提供的工具"""
+        with span("mcp.client.list_tools", server=name) as listing:
+            tools = await self._run(name, lambda client: client.list_tools())
+            if isinstance(tools, list):
+                listing.set("tools", len(tools))
+            return tools
+
+    async def check_health(self, name: str) -> bool:
+        """
+        探测服务器是否可用。
+
+        已有长连接时在该连接上 ping，失败时关闭它以便下次重连；
+        否则用临时客户端握手并 ping，探测完即关闭，不为只被探测的服务器保持会话。
+        """
+        conn = self._connections.get(name)
+        if conn is not None and conn.connected:
+            client = conn.client
+            if await self._ping(client):
+                return True
+            await self._teardown(name, client)
+            return False
+        info = await self.async_server_registry.get_server(name)
+        if info is None:
+            return False
+        client = self._client_factory(info["url"])
+        try:
+            await client.__aenter__()  # pylint: disable=unnecessary-dunder-call
+            return await self._ping(client)
+        except Exception:  # pylint: disable=broad-except
+            return False
+        finally:
+            await self._close_client(client)
+
+    def is_connected(self, name: str) -> bool:
+        conn = self._connections.get(name)
+        return conn is not None and conn.connected
+
+    async def close(self, name: str) -> None:
+        """关闭指定服务器的客户端"""
+        conn = self._connections.pop(name, None)
+        if conn is not None and conn.client is not None:
+            await self._close_client(conn.client)
+
+    async def close_all(self) -> None:
+        """关闭所有客户端，用于进程退出前清理"""
+        for name in list(self._connections):
+            await self.close(name)
+
+    async def _run(
+        self,
+        name: str,
+        operation: Callable[[Any], Awaitable[Any]],
+        idempotent: bool = True,
+    ):
+        """执行一次请求；连接已断开时重连，幂等或尚未发出的请求重试一次"""
+        for attempt in range(2):
+            client = await self.get_client(name)
+            try:
+                return await operation(client)
+            except Exception as e:  # pylint: disable=broad-except
+                if is_server_error(e):
+                    raise
+                await self._teardown(name, client)
+                if attempt or not (idempotent or _not_sent(e)):
+                    raise MCPConnectionError(f"服务器 {name} 连接中断: {e}") from e
+                self.metrics.counter("mcp.reconnects").inc()
+        raise AssertionError("unreachable")
+
+    async def _connect(self, name: str, conn: _Connection) -> None:
+        wait = conn.retry_at - time.monotonic()
+        if wait > 0:
+            raise MCPConnectionError(f"服务器 {name} 暂不可用，{wait:.1f} 秒后重试")
+        last_error: Optional[Exception] = None
+        for attempt in range(self.connect_attempts):
+            client = self._client_factory(conn.url)
+            start = time.perf_counter()
+            try:
+                # 长连接跨越多次调用，只进入客户端上下文建立会话，之后由 _close_client 关闭
+                await client.__aenter__()  # pylint: disable=unnecessary-dunder-call
+            except Exception as e:  # pylint: disable=broad-except
+                await self._close_client(client)
+                last_error = e
+                conn.failures += 1
+                self.metrics.counter("mcp.connect_failures").inc()
+                if attempt + 1 < self.connect_attempts:
+                    await asyncio.sleep(self._backoff(conn.failures))
+                continue
+            except BaseException:
+                # 握手中途被取消（如健康检查超时），关闭已建立一半的会话再向上传递
+                await self._close_client(client)
+                raise
+            self.metrics.histogram("mcp.connect_seconds").observe(
+                time.perf_counter() - start
+            )
+            self.metrics.counter("mcp.connects").inc()
+            conn.client, conn.failures, conn.retry_at = client, 0, 0.0
+            return
+        # 重试耗尽后进入退避期，期间的请求直接失败，不再逐个等待超时
+        conn.retry_at = time.monotonic() + self._backoff(conn.failures)
+        raise MCPConnectionError(f"无法连接服务器 {name}: {last_error}") from last_error
+
+    @staticmethod
+    async def _ping(client) -> bool:
+        try:
+            await client.ping()
+        except Exception as e:  # pylint: disable=broad-except
+            # 服务器有应答（例如不支持 ping）说明连接是通的
+            return is_server_error(e)
+        return True
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(0, failures - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _teardown(self, name: str, client) -> None:
+        conn = self._connections.get(name)
+        if conn is not None and conn.client is client:
+            conn.client = None
+        await self._close_client(client)
+
+    @staticmethod
+    async def _close_client(client) -> None:
+        try:
+            await client.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def _on_registry_change(self, event: str, name: str) -> None:
+        if event not in (SERVER_REMOVED, SERVER_EDITED):
+            return
+        conn = self._connections.pop(name, None)
+        if conn is None or conn.client is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # 注册表回调是同步的，关闭连接交给事件循环异步完成
+        task = loop.create_task(self._close_client(conn.client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
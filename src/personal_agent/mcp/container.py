@@ -1,6 +1,86 @@
+from typing import Optional
 from dependency_injector import containers, providers
+from .api.async_server_registry import AsyncServerRegistry
+from .api.server_registry import ServerRegistry
+from .capability_cache import CapabilityCache
+from .connection_manager import MCPConnectionManager
+from .health_checker import HealthChecker
+from .tool_result_cache import ToolResultCache
+from .tool_service_impl import ToolServiceImpl
+from .server_registry_async import ThreadedServerRegistry
 from .server_registry_memory import MemoryServerRegistry
+from .server_registry_sqlite import SqliteServerRegistry
+
+
+def create_server_registry(mcp_config) -> ServerRegistry:
+    """配置了 registry_path 时持久化到 SQLite，否则只保存在内存"""
+    if mcp_config.registry_path:
+        return SqliteServerRegistry(mcp_config.registry_path)
+    return MemoryServerRegistry()
+
+
+def create_async_server_registry(
+    server_registry: ServerRegistry,
+) -> AsyncServerRegistry:
+    """内存注册表的操作不会阻塞，直接在事件循环上执行；其他实现放到工作线程中执行"""
+    return ThreadedServerRegistry(
+        server_registry,
+        offload=not isinstance(server_registry, MemoryServerRegistry),
+    )
+
+
+def create_tool_result_cache(mcp_config) -> Optional[ToolResultCache]:
+    """启用时创建工具结果缓存，否则每次调用都访问服务器"""
+    if mcp_config.tool_cache.enabled:
+        return ToolResultCache.from_config(mcp_config.tool_cache)
+    return None
 
 
 class Container(containers.DeclarativeContainer):
-    server_registry = providers.Factory(MemoryServerRegistry)
+    configer = providers.Dependency()
+
+    mcp_config = providers.Callable(
+        lambda configer: configer().get_mcp_config(), configer
+    )
+
+    # 注册表与连接管理器需共享同一份服务器列表，因此为单例
+    server_registry = providers.Singleton(create_server_registry, mcp_config)
+
+    # 供事件循环上的调用方（CLI 命令）使用，与 server_registry 共享同一份数据
+    async_server_registry = providers.Singleton(
+        create_async_server_registry, server_registry
+    )
+
+    connection_manager = providers.Singleton(
+        MCPConnectionManager,
+        server_registry=server_registry,
+        async_server_registry=async_server_registry,
+    )
+
+    capability_cache = providers.Singleton(
+        CapabilityCache.from_config,
+        mcp_config=mcp_config,
+        server_registry=server_registry,
+        connection_manager=connection_manager,
+        async_server_registry=async_server_registry,
+    )
+
+    health_checker = providers.Singleton(
+        HealthChecker.from_config,
+        mcp_config=mcp_config,
+        server_registry=server_registry,
+        connection_manager=connection_manager,
+        async_server_registry=async_server_registry,
+    )
+
+    tool_result_cache = providers.Singleton(create_tool_result_cache, mcp_config)
+
+    tool_service = providers.Singleton(
+        ToolServiceImpl,
+        capability_cache=capability_cache,
+        connection_manager=connection_manager,
+        coalesce=mcp_config.provided.coalesce_tool_calls,
+        health_checker=health_checker,
+        result_cache=tool_result_cache,
+        max_result_bytes=mcp_config.provided.max_tool_result_bytes,
+    )
@@ -0,0 +1,23 @@
+"""
+MCP 子系统的异常定义。
+"""
+
+
+class MCPError(Exception):
+    """MCP 相关异常的基类"""
+
+
+class MCPConnectionError(MCPError, ConnectionError):
+    """无法连接到 MCP 服务器，或连接在调用过程中断开"""
+
+
+class ServerNotFound(MCPError, LookupError):
+    """服务器未在注册表中登记"""
+
+
+class ToolNotFound(MCPError, LookupError):
+    """没有服务器提供该工具"""
+
+
+class ToolCallError(MCPError):
+    """工具调用失败（服务器返回错误或调用超时）"""
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+from personal_agent.util.metrics import Histogram, MetricsRegistry, default_registry
+from .api.async_server_registry import AsyncServerRegistry
+from .api.server_registry import SERVER_EDITED, SERVER_REMOVED, ServerRegistry
+from .connection_manager import MCPConnectionManager
+from .server_registry_async import ThreadedServerRegistry, list_server_names
+
+STATUS_UNKNOWN = "unknown"
+STATUS_HEALTHY = "healthy"
+STATUS_SLOW = "slow"
+STATUS_DOWN = "down"
+
+
+class ServerHealth:
+    """
+    单个服务器最近 window 次探测的健康数据：成功探测的延迟分位数与可用率。
+    """
+
+    __slots__ = (
+        "latency",
+        "results",
+        "consecutive_failures",
+        "checked_at",
+        "last_error",
+        "status",
+    )
+
+    def __init__(self, window: int):
+        self.latency = Histogram("probe_seconds", max_samples=window)
+        self.results: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.status = STATUS_UNKNOWN
+
+    @property
+    def availability(self) -> Optional[float]:
+        """最近探测中成功的比例，尚未探测时为 None"""
+        if not self.results:
+            return None
+        return sum(self.results) / len(self.results)
+
+    def record(self, ok: bool, seconds: float, error: Optional[str]) -> None:
+        self.results.append(ok)
+        self.checked_at = time.time()
+        if ok:
+            self.latency.observe(seconds)
+            self.consecutive_failures = 0
+            self.last_error = None
+        else:
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "availability": self.availability,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "checked_at": self.checked_at,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class HealthChecker:  # pylint: disable=too-many-instance-attributes
+    """
+    MCP 服务器后台健康检查。
+
+    每隔 interval 秒（带 ±jitter 比例的随机抖动，避免多个进程同时探测）并发探测所有已注册服务器，
+    同时进行的探测不超过 concurrency 个，单次探测超过 timeout 秒记为失败。
+    连续 down_after 次失败的服务器标记为 down；设置了 slow_threshold 时，
+    成功探测的 p95 延迟超过该值的服务器标记为 slow。两者都不参与工具路由。
+    服务器列表通过异步注册表按页读取；探测不会为每个服务器保持长连接（见
+    MCPConnectionManager.check_health）。
+
+    查询健康数据只读取最近一次探测的结果，不会触发探测。
+    """
+
+    def __init__(
+        self,
+        server_registry: ServerRegistry,
+        connection_manager: MCPConnectionManager,
+        *,
+        interval: float = 30.0,
+        timeout: float = 5.0,
+        concurrency: int = 8,
+        jitter: float = 0.2,
+        slow_threshold: Optional[float] = None,
+        down_after: int = 2,
+        window: int = 20,
+        metrics: Optional[MetricsRegistry] = None,
+        async_server_registry: Optional[AsyncServerRegistry] = None,
+    ):
+        self.server_registry = server_registry
+        # 未提供时直接在事件循环上调用同步注册表（适用于内存注册表）
+        self.async_server_registry = async_server_registry or ThreadedServerRegistry(
+            server_registry, offload=False
+        )
+        self.connection_manager = connection_manager
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.slow_threshold = slow_threshold
+        self.down_after = down_after
+        self.window = window
+        self.metrics = metrics or default_registry
+        self._health: Dict[str, ServerHealth] = {}
+        # 每次删除或修改递增，防止变更前发起的探测把旧结果写回
+        self._generations: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        server_registry.subscribe(self._on_registry_change)
+
+    @classmethod
+    def from_config(
+        cls,
+        mcp_config,
+        server_registry,
+        connection_manager,
+        async_server_registry=None,
+    ) -> "HealthChecker":
+        return cls(
+            server_registry,
+            connection_manager,
+            interval=mcp_config.health_check_interval,
+            timeout=mcp_config.health_check_timeout,
+            concurrency=mcp_config.health_check_concurrency,
+            slow_threshold=mcp_config.health_slow_threshold,
+            async_server_registry=async_server_registry,
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台探测任务，已启动时不做任何事"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台探测任务并等待其退出"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def check_all(self) -> None:
+        """立即对所有已注册服务器探测一轮"""
+        names = await list_server_names(self.async_server_registry)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe(name: str) -> None:
+            async with semaphore:
+                await self.check(name)
+
+        await asyncio.gather(*(probe(name) for name in names))
+
+    async def check(self, name: str) -> Optional[Dict[str, Any]]:
+        """探测单个服务器，返回更新后的健康数据"""
+        generation = self._generations.get(name, 0)
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            ok = await asyncio.wait_for(
+                self.connection_manager.check_health(name), self.timeout
+            )
+            if not ok:
+                error = "连接失败"
+        except asyncio.TimeoutError:
+            ok, error = False, f"探测超时（{self.timeout:g} 秒）"
+        seconds = time.perf_counter() - start
+        self.metrics.counter("mcp.health.probes").inc()
+        if not ok:
+            self.metrics.counter("mcp.health.failures").inc()
+        if self._generations.get(name, 0) != generation:
+            return None
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = ServerHealth(self.window)
+        health.record(ok, seconds, error)
+        health.status = self._classify(health)
+        return health.to_dict()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """最近一次探测后的健康数据，尚未探测时返回 None"""
+        health = self._health.get(name)
+        return None if health is None else health.to_dict()
+
+    def is_available(self, name: str) -> bool:
+        """服务器是否参与工具路由；尚未探测的服务器视为可用"""
+        health = self._health.get(name)
+        return health is None or health.status in (STATUS_UNKNOWN, STATUS_HEALTHY)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """所有已探测服务器的健康数据"""
+        return {name: health.to_dict() for name, health in self._health.items()}
+
+    def unavailable_servers(self) -> Set[str]:
+        """被标记为 slow 或 down、不参与工具路由的服务器"""
+        return {
+            name
+            for name, health in self._health.items()
+            if health.status in (STATUS_SLOW, STATUS_DOWN)
+        }
+
+    def _classify(self, health: ServerHealth) -> str:
+        if health.consecutive_failures >= self.down_after:
+            return STATUS_DOWN
+        p95 = health.latency.percentile(95)
+        if p95 is None:
+            # 还没有成功的探测，失败次数也未达到阈值
+            return STATUS_UNKNOWN
+        if self.slow_threshold is not None and p95 > self.slow_threshold:
+            return STATUS_SLOW
+        return STATUS_HEALTHY
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_all()
+            except Exception:  # pylint: disable=broad-except
+                # 单轮探测出错（如注册表读取失败）不应终止后台任务
+                self.metrics.counter("mcp.health.round_errors").inc()
+            await asyncio.sleep(
+                self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            )
+
+    def _on_registry_change(self, event: str, name: str) -> None:
+        if event in (SERVER_REMOVED, SERVER_EDITED):
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._health.pop(name, None)
@@ -0,0 +1,45 @@
+"""
+服务器注册表变更事件的订阅与分发。
+
+订阅者（连接管理、能力缓存、健康检查等）都运行在事件循环线程上。
+注册表的写操作被放到线程池中执行时，通过 deliver_to(loop) 声明事件应交回哪个事件循环，
+事件随之经 call_soon_threadsafe 在该循环中依次执行，订阅者不必考虑线程安全。
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+Listener = Callable[[str, str], None]
+
+_local = threading.local()
+
+
+@contextmanager
+def deliver_to(loop: asyncio.AbstractEventLoop) -> Iterator[None]:
+    """在当前（工作）线程中触发的变更事件交给 loop 执行"""
+    previous = getattr(_local, "loop", None)
+    _local.loop = loop
+    try:
+        yield
+    finally:
+        _local.loop = previous
+
+
+class ChangeNotifier:
+    """按订阅顺序通知 listener(event, name)"""
+
+    def __init__(self):
+        self._listeners: List[Listener] = []
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def notify(self, event: str, name: str) -> None:
+        loop = getattr(_local, "loop", None)
+        for listener in self._listeners:
+            if loop is None:
+                listener(event, name)
+            else:
+                loop.call_soon_threadsafe(listener, event, name)
@@ -0,0 +1,102 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from .api.async_server_registry import AsyncServerRegistry
+from .api.server_registry import ServerRegistry
+from .registry_events import deliver_to
+
+# 按页读取服务器列表时每页的条数
+SERVER_PAGE_SIZE = 256
+
+
+async def list_server_names(
+    registry: AsyncServerRegistry, page_size: int = SERVER_PAGE_SIZE
+) -> List[str]:
+    """按注册顺序分页读取所有服务器名称，注册表很大时也不会一次取出全部记录"""
+    names: List[str] = []
+    while True:
+        page = await registry.list_servers(len(names), page_size)
+        names.extend(server["name"] for server in page)
+        if len(page) < page_size:
+            return names
+
+
+class ThreadedServerRegistry(AsyncServerRegistry):
+    """
+    把同步的 ServerRegistry 适配为异步接口。
+
+    offload 为 True 时（磁盘等阻塞存储），每次调用都在专用的单线程执行器中完成，
+    事件循环在等待期间继续处理其他任务；单线程保证写操作按提交顺序执行。
+    调用中触发的变更事件被交回发起调用的事件循环，订阅者仍只在循环线程上运行。
+    offload 为 False 时（纯内存存储）直接在循环线程上调用，省去线程切换的开销。
+    """
+
+    def __init__(
+        self,
+        inner: ServerRegistry,
+        executor: Optional[ThreadPoolExecutor] = None,
+        offload: bool = True,
+    ):
+        self.inner = inner
+        self.offload = offload
+        self._executor = executor
+        if offload and executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="server-registry"
+            )
+
+    async def list_servers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        host: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        return await self._call(self.inner.list_servers, offset, limit, host, tag)
+
+    async def count_servers(
+        self, host: Optional[str] = None, tag: Optional[str] = None
+    ) -> int:
+        return await self._call(self.inner.count_servers, host, tag)
+
+    async def add_server(self, name: str, url: str, tags: Sequence[str] = ()) -> bool:
+        return await self._call(self.inner.add_server, name, url, tags)
+
+    async def add_servers(self, servers: Sequence[Dict[str, Any]]) -> int:
+        return await self._call(self.inner.add_servers, servers)
+
+    async def remove_server(self, name: str) -> bool:
+        return await self._call(self.inner.remove_server, name)
+
+    async def remove_servers(self, names: Sequence[str]) -> int:
+        return await self._call(self.inner.remove_servers, names)
+
+    async def get_server(self, name: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.inner.get_server, name)
+
+    async def edit_server(self, name: str, url: str) -> bool:
+        return await self._call(self.inner.edit_server, name, url)
+
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        self.inner.subscribe(listener)
+
+    def close(self) -> None:
+        """等待已提交的调用完成并释放执行器（不关闭被包装的注册表）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        if not self.offload:
+            return method(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(_run_delivering, loop, method, *args)
+        )
+
+
+def _run_delivering(
+    loop: asyncio.AbstractEventLoop, method: Callable[..., Any], *args: Any
+) -> Any:
+    with deliver_to(loop):
+        return method(*args)
@@ -1,52 +1,173 @@
-from typing import List, Dict, Optional
-from .api.server_registry import ServerRegistry
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+from .api.server_registry import (
+    SERVER_ADDED,
+    SERVER_EDITED,
+    SERVER_REMOVED,
+    ServerRegistry,
+    url_host,
+)
+from .registry_events import ChangeNotifier
+
+
+class _Entry:
+    __slots__ = ("name", "url", "tags", "seq")
+
+    def __init__(self, name: str, url: str, tags: Sequence[str], seq: int):
+        self.name = name
+        self.url = url
+        self.tags = sorted(set(tags))
+        self.seq = seq
+
+    def to_dict(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"name": self.name, "url": self.url}
+        if self.tags:
+            info["tags"] = list(self.tags)
+        return info
 
 
 class MemoryServerRegistry(ServerRegistry):
     """
     基于内存的MCP服务器注册与管理实现。
+
+    按主机名与标签维护二级索引，过滤时只访问命中的服务器。
     """
 
     def __init__(self):
-        self._servers: Dict[str, str] = {}
+        self._servers: Dict[str, _Entry] = {}
+        self._by_host: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._seq = itertools.count()
+        self._notifier = ChangeNotifier()
+
+    def list_servers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        host: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取已注册的服务器信息，可过滤与分页。
+        """
+        stop = None if limit is None else offset + limit
+        if host is None and tag is None:
+            entries = itertools.islice(self._servers.values(), offset, stop)
+        else:
+            names = self._filter(host, tag)
+            entries = sorted(
+                (self._servers[name] for name in names), key=lambda e: e.seq
+            )[offset:stop]
+        return [entry.to_dict() for entry in entries]
 
-    def list_servers(self) -> List[Dict[str, str]]:
+    def count_servers(
+        self, host: Optional[str] = None, tag: Optional[str] = None
+    ) -> int:
         """
-        获取所有已注册的服务器信息。
+        统计满足过滤条件的服务器数量。
         """
-        return [{"name": name, "url": url} for name, url in self._servers.items()]
+        if host is None and tag is None:
+            return len(self._servers)
+        return len(self._filter(host, tag))
 
-    def add_server(self, name: str, url: str) -> bool:
+    def add_server(self, name: str, url: str, tags: Sequence[str] = ()) -> bool:
         """
         添加新服务器。
         """
-        if name in self._servers:
+        if not self._insert(name, url, tags):
             return False
-        self._servers[name] = url
+        self._notifier.notify(SERVER_ADDED, name)
         return True
 
+    def add_servers(self, servers: Sequence[Dict[str, Any]]) -> int:
+        """
+        批量添加服务器。
+        """
+        added = [
+            server["name"]
+            for server in servers
+            if self._insert(server["name"], server["url"], server.get("tags", ()))
+        ]
+        for name in added:
+            self._notifier.notify(SERVER_ADDED, name)
+        return len(added)
+
     def remove_server(self, name: str) -> bool:
         """
         删除指定名称的服务器。
         """
-        if name not in self._servers:
+        if not self._delete(name):
             return False
-        del self._servers[name]
+        self._notifier.notify(SERVER_REMOVED, name)
         return True
 
-    def get_server(self, name: str) -> Optional[Dict[str, str]]:
+    def remove_servers(self, names: Sequence[str]) -> int:
+        """
+        批量删除服务器。
+        """
+        removed = [name for name in names if self._delete(name)]
+        for name in removed:
+            self._notifier.notify(SERVER_REMOVED, name)
+        return len(removed)
+
+    def get_server(self, name: str) -> Optional[Dict[str, Any]]:
         """
         获取指定名称服务器的详细信息。
         """
-        if name not in self._servers:
-            return None
-        return {"name": name, "url": self._servers[name]}
+        entry = self._servers.get(name)
+        return None if entry is None else entry.to_dict()
 
     def edit_server(self, name: str, url: str) -> bool:
         """
         修改指定服务器的地址。
         """
-        if name not in self._servers:
+        entry = self._servers.get(name)
+        if entry is None:
             return False
-        self._servers[name] = url
+        self._unindex(self._by_host, url_host(entry.url), name)
+        entry.url = url
+        self._by_host.setdefault(url_host(url), set()).add(name)
+        self._notifier.notify(SERVER_EDITED, name)
         return True
+
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        """
+        订阅服务器变更事件。
+        """
+        self._notifier.subscribe(listener)
+
+    def _filter(self, host: Optional[str], tag: Optional[str]) -> Set[str]:
+        names: Optional[Set[str]] = None
+        if host is not None:
+            names = self._by_host.get(host.lower(), set())
+        if tag is not None:
+            tagged = self._by_tag.get(tag, set())
+            names = tagged if names is None else names & tagged
+        return names
+
+    def _insert(self, name: str, url: str, tags: Sequence[str]) -> bool:
+        if name in self._servers:
+            return False
+        entry = _Entry(name, url, tags, next(self._seq))
+        self._servers[name] = entry
+        self._by_host.setdefault(url_host(url), set()).add(name)
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, set()).add(name)
+        return True
+
+    def _delete(self, name: str) -> bool:
+        entry = self._servers.pop(name, None)
+        if entry is None:
+            return False
+        self._unindex(self._by_host, url_host(entry.url), name)
+        for tag in entry.tags:
+            self._unindex(self._by_tag, tag, name)
+        return True
+
+    @staticmethod
+    def _unindex(index: Dict[str, Set[str]], key: str, name: str) -> None:
+        names = index.get(key)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del index[key]
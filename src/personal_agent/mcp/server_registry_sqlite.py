@@ -0,0 +1,219 @@
+# pylint: disable=duplicate-code
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from .api.server_registry import (
+    SERVER_ADDED,
+    SERVER_EDITED,
+    SERVER_REMOVED,
+    ServerRegistry,
+    url_host,
+)
+from .registry_events import ChangeNotifier
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS servers_by_host ON servers (host, id);
+CREATE TABLE IF NOT EXISTS server_tags (
+    tag TEXT NOT NULL,
+    server_id INTEGER NOT NULL REFERENCES servers (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, server_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS server_tags_by_server ON server_tags (server_id);
+"""
+
+# SQLite 单条语句的参数个数上限较保守的取值
+_MAX_PARAMS = 500
+
+
+class SqliteServerRegistry(ServerRegistry):
+    """
+    基于 SQLite（WAL 模式）的持久化服务器注册表，进程重启后服务器列表仍然有效。
+
+    每次增删改（包括批量操作）都在一个事务内完成，中途失败不会留下半写的数据；
+    主机名与标签各有索引，过滤与分页在数据库中完成，不构造完整列表。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._notifier = ChangeNotifier()
+
+    def list_servers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        host: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取已注册的服务器信息，可过滤与分页。
+        """
+        where, params = self._where(host, tag)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, name, url FROM servers {where} "
+                "ORDER BY id LIMIT ? OFFSET ?",
+                (*params, -1 if limit is None else limit, offset),
+            ).fetchall()
+            tags = self._tags_of([row[0] for row in rows])
+        return [self._to_dict(name, url, tags.get(id_)) for id_, name, url in rows]
+
+    def count_servers(
+        self, host: Optional[str] = None, tag: Optional[str] = None
+    ) -> int:
+        """
+        统计满足过滤条件的服务器数量。
+        """
+        where, params = self._where(host, tag)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) FROM servers {where}", params
+            ).fetchone()
+        return row[0]
+
+    def add_server(self, name: str, url: str, tags: Sequence[str] = ()) -> bool:
+        """
+        添加新服务器。
+        """
+        with self._lock, self._conn:
+            added = self._insert(name, url, tags)
+        if added:
+            self._notifier.notify(SERVER_ADDED, name)
+        return added
+
+    def add_servers(self, servers: Sequence[Dict[str, Any]]) -> int:
+        """
+        批量添加服务器，在同一事务中完成。
+        """
+        with self._lock, self._conn:
+            added = [
+                server["name"]
+                for server in servers
+                if self._insert(server["name"], server["url"], server.get("tags", ()))
+            ]
+        for name in added:
+            self._notifier.notify(SERVER_ADDED, name)
+        return len(added)
+
+    def remove_server(self, name: str) -> bool:
+        """
+        删除指定名称的服务器。
+        """
+        return self.remove_servers([name]) == 1
+
+    def remove_servers(self, names: Sequence[str]) -> int:
+        """
+        批量删除服务器，在同一事务中完成。
+        """
+        removed: List[str] = []
+        with self._lock, self._conn:
+            for start in range(0, len(names), _MAX_PARAMS):
+                chunk = list(names[start : start + _MAX_PARAMS])
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"DELETE FROM servers WHERE name IN ({marks}) RETURNING name",
+                    chunk,
+                ).fetchall()
+                removed.extend(row[0] for row in rows)
+        for name in removed:
+            self._notifier.notify(SERVER_REMOVED, name)
+        return len(removed)
+
+    def get_server(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定名称服务器的详细信息。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, url FROM servers WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            tags = self._tags_of([row[0]])
+        return self._to_dict(name, row[1], tags.get(row[0]))
+
+    def edit_server(self, name: str, url: str) -> bool:
+        """
+        修改指定服务器的地址。
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE servers SET url = ?, host = ? WHERE name = ?",
+                (url, url_host(url), name),
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._notifier.notify(SERVER_EDITED, name)
+        return True
+
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        """
+        订阅服务器变更事件。
+        """
+        self._notifier.subscribe(listener)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _where(host: Optional[str], tag: Optional[str]) -> Tuple[str, Tuple[Any, ...]]:
+        clauses, params = [], []
+        if host is not None:
+            clauses.append("host = ?")
+            params.append(host.lower())
+        if tag is not None:
+            clauses.append("id IN (SELECT server_id FROM server_tags WHERE tag = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, tuple(params)
+
+    def _insert(self, name: str, url: str, tags: Sequence[str]) -> bool:
+        """在调用方的事务中插入一个服务器，名称已存在时返回 False"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO servers (name, url, host) VALUES (?, ?, ?)",
+            (name, url, url_host(url)),
+        )
+        if cursor.rowcount == 0:
+            return False
+        if tags:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO server_tags (tag, server_id) VALUES (?, ?)",
+                [(tag, cursor.lastrowid) for tag in tags],
+            )
+        return True
+
+    def _tags_of(self, ids: List[int]) -> Dict[int, List[str]]:
+        tags: Dict[int, List[str]] = {}
+        for start in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[start : start + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            for server_id, tag in self._conn.execute(
+                f"SELECT server_id, tag FROM server_tags "
+                f"WHERE server_id IN ({marks}) ORDER BY tag",
+                chunk,
+            ):
+                tags.setdefault(server_id, []).append(tag)
+        return tags
+
+    @staticmethod
+    def _to_dict(name: str, url: str, tags: Optional[List[str]]) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"name": name, "url": url}
+        if tags:
+            info["tags"] = tags
+        return info
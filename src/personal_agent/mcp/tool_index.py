@@ -0,0 +1,109 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Collection, Dict, List, Sequence, Tuple
+from .types import ToolDescription
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CJK = re.compile(r"[一-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按单词（含 snake_case / camelCase 拆分），中文按单字与相邻双字切分"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower().replace("_", " ")
+    tokens = _WORD.findall(text)
+    for run in _CJK.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _tool_text(tool: ToolDescription) -> str:
+    """参与检索的文本：工具名、描述、参数名及参数描述"""
+    parts = [tool.name, tool.description]
+    for name, prop in (tool.input_schema.get("properties") or {}).items():
+        parts.append(name)
+        if isinstance(prop, dict):
+            parts.append(str(prop.get("description", "")))
+    return " ".join(parts)
+
+
+class ToolIndex:
+    """
+    本地工具检索索引（BM25），用于每轮只向模型附带最相关的 top-k 个工具。
+
+    倒排表按服务器增量维护：服务器的工具更新或移除时只改动该服务器的文档，
+    查询只遍历查询词命中的倒排项，不依赖网络或额外的向量模型。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Tuple[ToolDescription, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._by_server: Dict[str, List[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def update_server(self, server: str, tools: Sequence[ToolDescription]) -> None:
+        """用服务器最新的工具列表替换其在索引中的文档"""
+        self.remove_server(server)
+        doc_ids = []
+        for tool in tools:
+            doc_id = tool.qualified_name
+            terms = Counter(tokenize(_tool_text(tool)))
+            length = sum(terms.values())
+            self._docs[doc_id] = (tool, length)
+            self._total_length += length
+            for term, freq in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = freq
+            doc_ids.append(doc_id)
+        self._by_server[server] = doc_ids
+
+    def remove_server(self, server: str) -> None:
+        """移除服务器的全部工具"""
+        for doc_id in self._by_server.pop(server, []):
+            tool, length = self._docs.pop(doc_id)
+            self._total_length -= length
+            for term in set(tokenize(_tool_text(tool))):
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self._postings[term]
+
+    def search(
+        self, query: str, top_k: int, exclude_servers: Collection[str] = ()
+    ) -> List[ToolDescription]:
+        """
+        返回与查询最相关的至多 top_k 个工具，无任何词命中时返回空列表。
+        exclude_servers 中服务器的工具不参与排序。
+        """
+        if not self._docs or top_k <= 0:
+            return []
+        doc_count = len(self._docs)
+        avg_length = self._total_length / doc_count
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, freq in posting.items():
+                length = self._docs[doc_id][1]
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (
+                    self.k1 + 1
+                ) / (freq + norm)
+        if exclude_servers:
+            scores = {
+                doc_id: score
+                for doc_id, score in scores.items()
+                if self._docs[doc_id][0].server not in exclude_servers
+            }
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [self._docs[doc_id][0] for doc_id, _ in best]
@@ -0,0 +1,258 @@
+# pylint: disable=duplicate-code
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Optional, Tuple, Union
+from personal_agent.util.disk_store import SqliteDiskStore
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from .types import ToolDescription
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_results (
+    key TEXT PRIMARY KEY,
+    server TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tool_results_by_server ON tool_results (server);
+CREATE INDEX IF NOT EXISTS tool_results_by_expires ON tool_results (expires);
+CREATE INDEX IF NOT EXISTS tool_results_by_accessed ON tool_results (accessed);
+"""
+
+
+def canonical_arguments(arguments: Optional[Dict[str, Any]]) -> str:
+    """工具参数的规范 JSON：键排序、无多余空白，键顺序不同的相同参数得到相同文本"""
+    return json.dumps(
+        arguments or {},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+
+
+def tool_cache_key(server: str, tool: str, arguments: str) -> str:
+    """服务器、工具名与规范化参数的 SHA-256 哈希"""
+    payload = "\0".join((server, tool, arguments))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskToolResultStore(SqliteDiskStore):
+    """
+    工具结果缓存的磁盘层（SQLite），过期条目在读取时删除，
+    总大小超过 max_bytes 时先删过期条目，仍然超出再按最久未访问淘汰。
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(path, "tool_results", _SCHEMA, max_bytes)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """返回未过期的 (结果, 过期时间)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM tool_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            with self._conn:
+                if expires <= now:
+                    self._delete("key = ?", (key,))
+                    return None
+                self._touch(key, now)
+            return value, expires
+
+    def put(self, key: str, server: str, value: str, expires: float) -> None:
+        self._put(key, value, server=server, expires=expires)
+
+    def invalidate_server(self, server: str) -> None:
+        with self._lock, self._conn:
+            self._delete("server = ?", (server,))
+
+    def _evict(self) -> None:
+        self._delete("expires <= ?", (time.time(),))
+        if self._total_bytes > self.max_bytes:
+            super()._evict()
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires", "server")
+
+    def __init__(self, value: str, size: int, expires: float, server: str):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.server = server
+
+
+class _ToolStats:
+    __slots__ = ("hits", "misses", "bytes_saved")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+
+class ToolResultCache:  # pylint: disable=too-many-instance-attributes
+    """
+    MCP 工具调用结果缓存，键为（服务器、工具、规范化参数）。
+
+    - 有效期按工具配置：tool_ttls 以工具名或带服务器前缀的工具名为键，未配置的工具使用 default_ttl；
+      non_cacheable 中的工具（以及有效期不大于 0 的工具）不缓存；
+    - 内存层为 LRU，结果总字节数超过 max_bytes 时淘汰最久未使用的条目；
+    - 可选的磁盘层在进程重启后仍然有效，读写在专用的单线程执行器中完成，不阻塞事件循环；
+    - 按工具统计命中率与节省的字节数（命中时未从服务器传输的结果大小）。
+    """
+
+    def __init__(
+        self,
+        *,
+        default_ttl: float = 300.0,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        non_cacheable: Collection[str] = (),
+        max_bytes: int = 16 * 1024 * 1024,
+        disk_store: Optional[DiskToolResultStore] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self.default_ttl = default_ttl
+        self.tool_ttls = dict(tool_ttls or {})
+        self.non_cacheable = set(non_cacheable)
+        self.max_bytes = max_bytes
+        self.disk_store = disk_store
+        self.metrics = metrics or default_registry
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats: Dict[str, _ToolStats] = {}
+        self._executor = executor
+        if disk_store is not None and executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="tool-result-cache"
+            )
+
+    @classmethod
+    def from_config(cls, cache_config) -> "ToolResultCache":
+        disk_store = (
+            DiskToolResultStore(cache_config.path, cache_config.max_disk_bytes)
+            if cache_config.path
+            else None
+        )
+        return cls(
+            default_ttl=cache_config.default_ttl,
+            tool_ttls=cache_config.tool_ttls,
+            non_cacheable=cache_config.non_cacheable,
+            max_bytes=cache_config.max_bytes,
+            disk_store=disk_store,
+        )
+
+    @property
+    def total_bytes(self) -> int:
+        """内存层中结果的总字节数"""
+        return self._total_bytes
+
+    def ttl_for(self, tool: ToolDescription) -> float:
+        """工具结果的有效期（秒），不缓存的工具返回 0"""
+        names = (tool.qualified_name, tool.name)
+        if any(name in self.non_cacheable for name in names):
+            return 0.0
+        ttl = self.tool_ttls.get(tool.qualified_name)
+        if ttl is None:
+            ttl = self.tool_ttls.get(tool.name, self.default_ttl)
+        return max(0.0, ttl)
+
+    async def get(self, tool: ToolDescription, key: str) -> Optional[str]:
+        now = time.time()
+        stats = self._tool_stats(tool)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > now:
+                self._entries.move_to_end(key)
+            else:
+                self._drop(key)
+                entry = None
+        if entry is None and self.disk_store is not None:
+            found = await self._on_disk(self.disk_store.get, key)
+            if found is not None:
+                value, expires = found
+                entry = self._remember(key, value, expires, tool.server)
+                self.metrics.counter("mcp.tool_cache.disk_hits").inc()
+        if entry is None:
+            stats.misses += 1
+            self.metrics.counter(f"mcp.tool_cache.misses.{tool.qualified_name}").inc()
+            return None
+        stats.hits += 1
+        stats.bytes_saved += entry.size
+        name = tool.qualified_name
+        self.metrics.counter(f"mcp.tool_cache.hits.{name}").inc()
+        self.metrics.counter(f"mcp.tool_cache.bytes_saved.{name}").inc(entry.size)
+        return entry.value
+
+    async def put(self, tool: ToolDescription, key: str, value: str) -> None:
+        ttl = self.ttl_for(tool)
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        self._remember(key, value, expires, tool.server)
+        if self.disk_store is not None:
+            await self._on_disk(self.disk_store.put, key, tool.server, value, expires)
+
+    def invalidate_server(self, server: str) -> None:
+        """
+        服务器被删除或修改后，其工具结果全部失效。
+
+        由能力缓存的同步回调调用：磁盘上的删除提交到执行器后即返回，
+        执行器只有一个线程，之后的读取一定排在删除之后。
+        """
+        for key in [k for k, e in self._entries.items() if e.server == server]:
+            self._drop(key)
+        if self.disk_store is not None:
+            self._executor.submit(self.disk_store.invalidate_server, server)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """按工具（带服务器前缀）统计的命中次数、未命中次数、命中率与节省的字节数"""
+        return {
+            name: {
+                "hits": s.hits,
+                "misses": s.misses,
+                "hit_rate": s.hits / max(1, s.hits + s.misses),
+                "bytes_saved": s.bytes_saved,
+            }
+            for name, s in self._stats.items()
+        }
+
+    async def _on_disk(self, method: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
+
+    def _tool_stats(self, tool: ToolDescription) -> _ToolStats:
+        stats = self._stats.get(tool.qualified_name)
+        if stats is None:
+            stats = self._stats[tool.qualified_name] = _ToolStats()
+        return stats
+
+    def _remember(self, key: str, value: str, expires: float, server: str) -> _Entry:
+        self._drop(key)
+        entry = _Entry(value, len(value.encode("utf-8")), expires, server)
+        if entry.size > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+        while self._total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.size
+            self.metrics.counter("mcp.tool_cache.evictions").inc()
+        return entry
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Optional, Set
+from personal_agent.util.bounded_text import BoundedText
+from personal_agent.util.metrics import MetricsRegistry, default_registry
+from personal_agent.util.singleflight import SingleFlight
+from personal_agent.util.tracing import span
+from .api.tool_service import ToolService
+from .capability_cache import CapabilityCache
+from .connection_manager import MCPConnectionManager, is_server_error
+from .exceptions import ToolCallError, ToolNotFound
+from .health_checker import HealthChecker
+from .tool_index import ToolIndex
+from .tool_result_cache import ToolResultCache, canonical_arguments, tool_cache_key
+from .types import ToolDescription
+
+
+def _item_to_text(item) -> str:
+    """单个内容项的文本；图片、音频等二进制内容只保留类型与大小的说明"""
+    text = getattr(item, "text", None)
+    if text is not None:
+        return text
+    resource = getattr(item, "resource", None)
+    if resource is not None:
+        text = getattr(resource, "text", None)
+        if text is not None:
+            return text
+        item = resource
+    data = getattr(item, "data", None) or getattr(item, "blob", None)
+    if data is not None:
+        mime = getattr(item, "mimeType", None) or "application/octet-stream"
+        return f"[{mime} 内容，{len(data)} 字节（base64）]"
+    uri = getattr(item, "uri", None)
+    if uri is not None:
+        return f"[资源 {uri}]"
+    return str(item)
+
+
+def result_to_text(result) -> str:
+    """将 call_tool 结果中的内容项合并为文本"""
+    items = getattr(result, "content", None) or []
+    return "\n".join(_item_to_text(item) for item in items)
+
+
+class ToolServiceImpl(ToolService):  # pylint: disable=too-many-instance-attributes
+    """
+    基于能力缓存和长连接管理的 MCP 工具服务实现。
+
+    工具检索索引订阅能力缓存，随服务器工具的更新与失效增量维护。
+    相同工具、相同参数的并发调用合并为一次（可用 coalesce 关闭，或在 no_coalesce() 中调用）；
+    各会话并发的 list_tools 由能力缓存的在途拉取任务合并。
+    单个结果最多保留 max_result_bytes 字节，超大结果截断后才进入缓存与对话。
+    配置了结果缓存时，可缓存工具的结果在有效期内直接返回，不再访问服务器。
+    配置了健康检查时，被标记为 slow 或 down 的服务器的工具不会出现在工具列表与检索结果中。
+    """
+
+    def __init__(
+        self,
+        capability_cache: CapabilityCache,
+        connection_manager: MCPConnectionManager,
+        *,
+        tool_index: Optional[ToolIndex] = None,
+        coalesce: bool = True,
+        health_checker: Optional[HealthChecker] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        max_result_bytes: Optional[int] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.capability_cache = capability_cache
+        self.connection_manager = connection_manager
+        self.tool_index = tool_index or ToolIndex()
+        self.coalesce = coalesce
+        self.health_checker = health_checker
+        self.result_cache = result_cache
+        self.max_result_bytes = max_result_bytes
+        self.metrics = metrics or default_registry
+        self._flight = SingleFlight("mcp.singleflight")
+        capability_cache.subscribe(self._on_tools_changed)
+
+    async def list_tools(self) -> List[ToolDescription]:
+        tools = await self.capability_cache.get_tools()
+        skipped = self._unavailable_servers()
+        if not skipped:
+            return tools
+        return [tool for tool in tools if tool.server not in skipped]
+
+    async def search_tools(self, query: str, top_k: int) -> List[ToolDescription]:
+        # 确保缓存已加载（或在后台刷新），索引随缓存更新
+        await self.capability_cache.get_tools()
+        return self.tool_index.search(query, top_k, self._unavailable_servers())
+
+    async def call_tool(
+        self, tool_name: str, params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        with span("mcp.call_tool", tool=tool_name) as call:
+            tool = await self._resolve(tool_name)
+            params = params or {}
+            arguments = canonical_arguments(params)
+            cache = self.result_cache
+            if cache is not None and cache.ttl_for(tool) > 0:
+                cache_key = tool_cache_key(tool.server, tool.name, arguments)
+                cached = await cache.get(tool, cache_key)
+                call.set("cache_hit", cached is not None)
+                if cached is not None:
+                    call.set("result_bytes", len(cached.encode("utf-8")))
+                    return cached
+            else:
+                cache = None
+            if self.coalesce:
+                result = await self._flight.do(
+                    (tool.qualified_name, arguments), lambda: self._call(tool, params)
+                )
+            else:
+                result = await self._call(tool, params)
+            if cache is not None:
+                await cache.put(tool, cache_key, result)
+            if call.recording:
+                call.set("result_bytes", len(result.encode("utf-8")))
+            return result
+
+    async def _call(self, tool: ToolDescription, params: Dict[str, Any]) -> str:
+        try:
+            result = await self.connection_manager.call_tool(
+                tool.server, tool.name, params
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            if not is_server_error(e):
+                raise
+            raise ToolCallError(f"工具 {tool.qualified_name} 调用失败: {e}") from e
+        if getattr(result, "is_error", False):
+            raise ToolCallError(
+                f"工具 {tool.qualified_name} 返回错误: {self._result_text(result)}"
+            )
+        return self._result_text(result)
+
+    def _result_text(self, result) -> str:
+        """逐项收集结果文本，超过 max_result_bytes 的部分在追加时即被丢弃"""
+        if self.max_result_bytes is None:
+            return result_to_text(result)
+        bounded = BoundedText(self.max_result_bytes)
+        for item in getattr(result, "content", None) or []:
+            bounded.append(_item_to_text(item))
+        if bounded.truncated:
+            self.metrics.counter("mcp.tool_results_truncated").inc()
+        return bounded.getvalue()
+
+    def _unavailable_servers(self) -> Set[str]:
+        if self.health_checker is None:
+            return set()
+        return self.health_checker.unavailable_servers()
+
+    async def refresh_tools(self) -> None:
+        await self.capability_cache.refresh()
+
+    def _on_tools_changed(
+        self, server: str, tools: Optional[List[ToolDescription]]
+    ) -> None:
+        if tools is None:
+            self.tool_index.remove_server(server)
+            # 服务器被删除或修改地址，旧结果不再可信
+            if self.result_cache is not None:
+                self.result_cache.invalidate_server(server)
+        else:
+            self.tool_index.update_server(server, tools)
+
+    async def _resolve(self, tool_name: str) -> ToolDescription:
+        tools = await self.capability_cache.get_tools()
+        for tool in tools:
+            if tool.qualified_name == tool_name:
+                return tool
+        matches = [tool for tool in tools if tool.name == tool_name]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise ToolNotFound(f"工具 {tool_name} 存在于多个服务器，请加上服务器前缀")
+        raise ToolNotFound(f"没有服务器提供工具 {tool_name}")
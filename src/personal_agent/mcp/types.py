@@ -0,0 +1,34 @@
+"""
+MCP 子系统对外使用的数据类型。
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+
+@dataclass(frozen=True)
+class ToolDescription:
+    """聚合后的工具能力描述"""
+
+    name: str
+    description: str
+    server: str
+    input_schema: Dict[str, Any] = field(default_factory=dict, hash=False)
+
+    @property
+    def qualified_name(self) -> str:
+        """带服务器前缀的工具名，如 amap.maps_weather"""
+        return f"{self.server}.{self.name}"
+
+    @classmethod
+    def from_mcp_tool(cls, server: str, tool) -> "ToolDescription":
+        """由 MCP list_tools 返回的工具对象构造"""
+        schema = getattr(tool, "input_schema", None)
+        if schema is None:
+            schema = getattr(tool, "inputSchema", None)
+        return cls(
+            name=tool.name,
+            description=tool.description or "",
+            server=server,
+            input_schema=dict(schema or {}),
+        )
@@ -0,0 +1,7 @@
+"""
+server 子系统职责：以 HTTP / WebSocket 服务的形式提供对话与 MCP 服务器管理，作为 CLI 之外的另一个入口。
+"""
+
+from .container import Container
+
+__all__ = ["Container"]
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Optional
+
+
+class Overloaded(Exception):
+    """排队的请求已满或服务正在停止，请求被拒绝"""
+
+
+class Permit:
+    """一次准入许可；release 可重复调用，只生效一次"""
+
+    __slots__ = ("_controller", "_released")
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release()  # pylint: disable=protected-access
+
+
+class AdmissionController:
+    """
+    请求准入控制（背压）：最多 max_in_flight 个请求同时处理，另有至多 max_waiting 个排队等待；
+    排队也已满时立即拒绝，而不是无限堆积协程与内存，让客户端按 Retry-After 稍后重试。
+
+    停止时先调用 start_draining() 拒绝新请求，再用 wait_idle() 等待进行中的请求完成。
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_waiting: int = 256):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.in_flight = 0
+        self.waiting = 0
+        self.draining = False
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def acquire(self) -> Permit:
+        if self.draining:
+            raise Overloaded("服务正在停止")
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                raise Overloaded("请求过多，请稍后重试")
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self._idle.clear()
+        return Permit(self)
+
+    def start_draining(self) -> None:
+        self.draining = True
+
+    async def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待进行中的请求全部完成；超时返回 False"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+        if self.in_flight == 0:
+            self._idle.set()
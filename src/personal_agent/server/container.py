@@ -0,0 +1,35 @@
+from dependency_injector import containers, providers
+
+
+def create_app(session_chat_service, server_registry, server_config, health_checker):
+    """starlette 只在启动 HTTP 服务时才导入，不增加 CLI 的启动时间"""
+    # pylint: disable=import-outside-toplevel
+    from .http_app import create_app as create_starlette_app
+
+    return create_starlette_app(
+        session_chat_service,
+        server_registry,
+        server_config,
+        health_checker=health_checker,
+    )
+
+
+class Container(containers.DeclarativeContainer):
+    configer = providers.Dependency()
+    session_chat_service = providers.Dependency()
+    # AsyncServerRegistry：磁盘注册表的读写不阻塞处理请求的事件循环
+    server_registry = providers.Dependency()
+    # 可选：提供时随服务启动后台健康检查，服务器详情中附带健康数据
+    health_checker = providers.Dependency(default=providers.Object(None))
+
+    server_config = providers.Callable(
+        lambda configer: configer().get_server_config(), configer
+    )
+
+    app = providers.Singleton(
+        create_app,
+        session_chat_service=session_chat_service,
+        server_registry=server_registry,
+        server_config=server_config,
+        health_checker=health_checker,
+    )
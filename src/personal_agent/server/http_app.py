@@ -0,0 +1,339 @@
+"""
+HTTP / WebSocket 接口，所有请求在同一个事件循环上异步处理：
+
+    POST   /v1/sessions/{session_id}/messages         {"message": ...} -> {"response": ...}
+    POST   /v1/sessions/{session_id}/messages/stream  同上，以 SSE 逐段返回
+    WS     /v1/sessions/{session_id}/ws               发送 {"message": ...}，
+                                                      逐段收到 {"delta": ...}，最后 {"done": true}
+    GET    /v1/sessions/{session_id}/context          会话上下文
+    DELETE /v1/sessions/{session_id}/context          清空会话
+    GET    /v1/servers?offset=&limit=&host=&tag=      分页列出 MCP 服务器
+    POST   /v1/servers                                {"name", "url", "tags"} 添加服务器
+    GET    /v1/servers/{name}                         服务器详情（含健康数据）
+    PUT    /v1/servers/{name}                         {"url"} 修改地址
+    DELETE /v1/servers/{name}                         删除服务器
+    GET    /healthz                                   存活检查，停止过程中返回 503
+    GET    /metrics                                   Prometheus 文本格式的指标
+
+对话请求经 AdmissionController 准入，超出排队上限时返回 503 与 Retry-After；
+流式响应按客户端的读取速度写出（传输层写缓冲满时暂停生成），慢客户端不会让回复堆积在内存中。
+"""
+
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+import icontract
+from pydantic import BaseModel, ValidationError
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from personal_agent.chat import SessionChatService
+from personal_agent.mcp import AsyncServerRegistry
+from personal_agent.mcp.health_checker import HealthChecker
+from personal_agent.util import tracing
+from personal_agent.util.metrics import (
+    MetricsRegistry,
+    default_registry,
+    render_prometheus,
+)
+from .admission import AdmissionController, Overloaded
+
+# GET /v1/servers 每页的默认与最大条数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ChatRequest(BaseModel):
+    message: str
+
+
+class ServerCreate(BaseModel):
+    name: str
+    url: str
+    tags: List[str] = []
+
+
+class ServerUpdate(BaseModel):
+    url: str
+
+
+class _BadRequest(Exception):
+    pass
+
+
+def _error(status: int, message: str, **headers: str) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def _overloaded(e: Overloaded) -> JSONResponse:
+    return _error(503, str(e), **{"Retry-After": "1"})
+
+
+def _sse(payload: Dict[str, Any], event: Optional[str] = None) -> str:
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n" if event else f"data: {data}\n\n"
+
+
+async def _body(request: Request, model: type) -> Any:
+    try:
+        return model.model_validate(await request.json())
+    except (ValueError, ValidationError) as e:
+        raise _BadRequest(str(e)) from e
+
+
+def _message_of(body: ChatRequest) -> str:
+    if not body.message.strip():
+        raise _BadRequest("message 不能为空")
+    return body.message
+
+
+class HTTPFrontend:
+    """把多会话聊天服务与服务器注册表暴露为 HTTP / WebSocket 接口"""
+
+    def __init__(
+        self,
+        session_chat_service: SessionChatService,
+        server_registry: AsyncServerRegistry,
+        admission: AdmissionController,
+        *,
+        health_checker: Optional[HealthChecker] = None,
+        shutdown_timeout: float = 30.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.chat = session_chat_service
+        self.registry = server_registry
+        self.admission = admission
+        self.health_checker = health_checker
+        self.shutdown_timeout = shutdown_timeout
+        self.metrics = metrics or default_registry
+
+    def routes(self) -> list:
+        return [
+            Route("/healthz", self.healthz),
+            Route("/metrics", self.prometheus_metrics),
+            Route(
+                "/v1/sessions/{session_id}/messages",
+                self.send_message,
+                methods=["POST"],
+            ),
+            Route(
+                "/v1/sessions/{session_id}/messages/stream",
+                self.stream_message,
+                methods=["POST"],
+            ),
+            WebSocketRoute("/v1/sessions/{session_id}/ws", self.chat_socket),
+            Route(
+                "/v1/sessions/{session_id}/context",
+                self.session_context,
+                methods=["GET", "DELETE"],
+            ),
+            Route("/v1/servers", self.servers, methods=["GET", "POST"]),
+            Route("/v1/servers/{name}", self.server, methods=["GET", "PUT", "DELETE"]),
+        ]
+
+    @asynccontextmanager
+    async def lifespan(self, _app: Starlette) -> AsyncIterator[None]:
+        if self.health_checker is not None:
+            self.health_checker.start()
+        try:
+            yield
+        finally:
+            # 拒绝新请求，等待进行中的对话（包括流式响应）完成后再释放资源
+            self.admission.start_draining()
+            await self.admission.wait_idle(self.shutdown_timeout)
+            if self.health_checker is not None:
+                await self.health_checker.stop()
+            # 写出缓冲中的 span 与最后一次指标文件
+            tracing.shutdown()
+
+    async def healthz(self, _request: Request) -> Response:
+        status = "draining" if self.admission.draining else "ok"
+        return JSONResponse(
+            {
+                "status": status,
+                "in_flight": self.admission.in_flight,
+                "waiting": self.admission.waiting,
+            },
+            status_code=503 if self.admission.draining else 200,
+        )
+
+    async def prometheus_metrics(self, _request: Request) -> Response:
+        return PlainTextResponse(
+            render_prometheus(self.metrics),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    async def send_message(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        try:
+            message = _message_of(await _body(request, ChatRequest))
+            permit = await self.admission.acquire()
+        except _BadRequest as e:
+            return _error(400, str(e))
+        except Overloaded as e:
+            return _overloaded(e)
+        try:
+            reply = await self.chat.get_response(session_id, message)
+        except ConnectionError as e:
+            return _error(502, str(e))
+        finally:
+            permit.release()
+        return JSONResponse({"response": reply})
+
+    async def stream_message(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        try:
+            message = _message_of(await _body(request, ChatRequest))
+            permit = await self.admission.acquire()
+        except _BadRequest as e:
+            return _error(400, str(e))
+        except Overloaded as e:
+            return _overloaded(e)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                async for chunk in self.chat.stream_response(session_id, message):
+                    yield _sse({"delta": chunk})
+                yield _sse({}, "done")
+            except Exception as e:  # pylint: disable=broad-except
+                # 响应头已经发出，错误只能作为事件告知客户端
+                yield _sse({"error": str(e)}, "error")
+            finally:
+                permit.release()
+
+        # 客户端在流开始前断开时生成器不会运行，由后台任务兜底释放许可
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+            background=BackgroundTask(permit.release),
+        )
+
+    async def chat_socket(self, websocket: WebSocket) -> None:
+        session_id = websocket.path_params["session_id"]
+        await websocket.accept()
+        try:
+            while True:
+                try:
+                    data = await websocket.receive_json()
+                    message = _message_of(ChatRequest.model_validate(data))
+                except (ValueError, ValidationError, _BadRequest) as e:
+                    await websocket.send_json({"error": str(e)})
+                    continue
+                try:
+                    permit = await self.admission.acquire()
+                except Overloaded as e:
+                    await websocket.send_json({"error": str(e), "retry": True})
+                    continue
+                try:
+                    async for chunk in self.chat.stream_response(session_id, message):
+                        await websocket.send_json({"delta": chunk})
+                    await websocket.send_json({"done": True})
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:  # pylint: disable=broad-except
+                    await websocket.send_json({"error": str(e)})
+                finally:
+                    permit.release()
+        except WebSocketDisconnect:
+            pass
+
+    async def session_context(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        if request.method == "DELETE":
+            self.chat.clear_context(session_id)
+            return Response(status_code=204)
+        context = self.chat.get_context(session_id)
+        return JSONResponse({"context": [dict(m) for m in context]})
+
+    async def servers(self, request: Request) -> Response:
+        try:
+            if request.method == "POST":
+                return await self._add_server(request)
+            return await self._list_servers(request)
+        except _BadRequest as e:
+            return _error(400, str(e))
+        except icontract.ViolationError as e:
+            return _error(400, str(e))
+
+    async def server(self, request: Request) -> Response:
+        name = request.path_params["name"]
+        try:
+            if request.method == "PUT":
+                return await self._edit_server(request, name)
+            if request.method == "DELETE":
+                return await self._remove_server(name)
+            return await self._get_server(name)
+        except _BadRequest as e:
+            return _error(400, str(e))
+        except icontract.ViolationError as e:
+            return _error(400, str(e))
+
+    async def _get_server(self, name: str) -> Response:
+        info = await self.registry.get_server(name)
+        if info is None:
+            return _error(404, f"没有这样的服务器: {name}")
+        if self.health_checker is not None:
+            info["health"] = self.health_checker.get(name)
+        return JSONResponse(info)
+
+    async def _edit_server(self, request: Request, name: str) -> Response:
+        body = await _body(request, ServerUpdate)
+        if not await self.registry.edit_server(name, body.url):
+            return _error(404, f"没有这样的服务器: {name}")
+        return JSONResponse(await self.registry.get_server(name))
+
+    async def _remove_server(self, name: str) -> Response:
+        if not await self.registry.remove_server(name):
+            return _error(404, f"没有这样的服务器: {name}")
+        return Response(status_code=204)
+
+    async def _list_servers(self, request: Request) -> Response:
+        params = request.query_params
+        try:
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError as e:
+            raise _BadRequest("offset 与 limit 必须为整数") from e
+        if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+            raise _BadRequest(
+                f"offset 不能为负，limit 必须在 1 到 {MAX_PAGE_SIZE} 之间"
+            )
+        host, tag = params.get("host"), params.get("tag")
+        total = await self.registry.count_servers(host=host, tag=tag)
+        servers = await self.registry.list_servers(
+            offset=offset, limit=limit, host=host, tag=tag
+        )
+        return JSONResponse({"servers": servers, "total": total})
+
+    async def _add_server(self, request: Request) -> Response:
+        body = await _body(request, ServerCreate)
+        if not await self.registry.add_server(body.name, body.url, tags=body.tags):
+            return _error(409, f"名称重复: {body.name}")
+        return JSONResponse(await self.registry.get_server(body.name), status_code=201)
+
+
+def create_app(
+    session_chat_service: SessionChatService,
+    server_registry: AsyncServerRegistry,
+    server_config,
+    health_checker: Optional[HealthChecker] = None,
+) -> Starlette:
+    frontend = HTTPFrontend(
+        session_chat_service,
+        server_registry,
+        AdmissionController(server_config.max_in_flight, server_config.max_waiting),
+        health_checker=health_checker,
+        shutdown_timeout=server_config.shutdown_timeout,
+    )
+    app = Starlette(routes=frontend.routes(), lifespan=frontend.lifespan)
+    app.state.frontend = frontend
+    return app
@@ -0,0 +1,63 @@
+"""
+启动 HTTP 服务：单进程时在当前进程的事件循环上运行；workers 大于 1 时由 uvicorn 预派生多个工作进程，
+每个进程通过 create_app_from_config 各自组装一份 AppContainer。
+
+多个工作进程共用同一个会话历史数据库时，消息序号在写事务内分配，
+每轮对话开始前按会话修订号发现其他进程的写入并重新加载，同一会话的请求可以落在任意进程上。
+服务器注册表的变更事件只在发起变更的进程内传递，其他进程缓存的工具列表与连接在有效期过后才更新。
+"""
+
+import logging
+from typing import Optional
+import uvicorn
+from personal_agent.app import Container
+from personal_agent.util import contracts, tracing
+
+logger = logging.getLogger(__name__)
+
+
+def _build(container: Container):
+    app_config = container.config_container().configer().get_app_config()
+    contracts.configure(app_config.contracts, app_config.contract_sample_rate)
+    tracing.configure_from(app_config.tracing)
+    return container.server_container().app()
+
+
+def create_app_from_config():
+    """uvicorn 工作进程的应用工厂"""
+    return _build(Container())
+
+
+def serve(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> None:
+    """按配置启动服务，参数覆盖配置中的同名项；收到 SIGINT/SIGTERM 后等待进行中的请求完成再退出"""
+    container = Container()
+    configer = container.config_container().configer()
+    server_config = configer.get_server_config()
+    host = host or server_config.host
+    port = server_config.port if port is None else port
+    workers = workers or server_config.workers
+    options = {
+        "host": host,
+        "port": port,
+        "timeout_graceful_shutdown": server_config.shutdown_timeout,
+    }
+    if workers == 1:
+        uvicorn.run(_build(container), **options)
+        return
+    # 各工作进程的内存状态互不共享：会话与服务器列表需持久化到同一个 SQLite 文件才能在进程间一致
+    if not configer.get_chat_config().history_path:
+        logger.warning("多进程模式下未配置 chat.history_path，各进程的会话历史互不可见")
+    if not configer.get_mcp_config().registry_path:
+        logger.warning(
+            "多进程模式下未配置 mcp.registry_path，各进程的服务器列表互不同步"
+        )
+    uvicorn.run(
+        "personal_agent.server.runner:create_app_from_config",
+        factory=True,
+        workers=workers,
+        **options,
+    )
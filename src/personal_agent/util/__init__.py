@@ -1,3 +1,16 @@
 """
-subsystem responsibility to be added
+util 子系统职责：提供各子系统共用的基础设施，如性能指标的记录与导出、每轮对话的追踪、并发请求合并、接口契约的检查模式、有上限的文本收集、缓存的 SQLite 磁盘层。
 """
+
+from .metrics import MetricsRegistry, default_registry
+from .singleflight import SingleFlight, no_coalesce
+from .tracing import Tracer, default_tracer
+
+__all__ = [
+    "MetricsRegistry",
+    "default_registry",
+    "SingleFlight",
+    "no_coalesce",
+    "Tracer",
+    "default_tracer",
+]
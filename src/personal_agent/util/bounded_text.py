@@ -0,0 +1,124 @@
+"""
+有上限的文本收集：按片段增量追加，只保留开头与结尾，保留的 UTF-8 字节数不超过上限。
+
+用于把大小不可控的外部输出（如 MCP 工具结果）放进提示之前截断，
+超出部分在追加时即被丢弃，不会先拼出完整字符串再截取。
+"""
+
+from collections import deque
+from typing import Deque, List, Tuple
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def clip_head(text: str, max_bytes: int) -> str:
+    """保留 text 开头不超过 max_bytes 字节的部分，不截断多字节字符"""
+    if max_bytes <= 0:
+        return ""
+    # 每个字符至少一个字节，先按字符数截取，避免对超长文本整体编码
+    prefix = text[:max_bytes]
+    encoded = prefix.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return prefix
+    return encoded[:max_bytes].decode("utf-8", "ignore")
+
+
+def clip_tail(text: str, max_bytes: int) -> str:
+    """保留 text 结尾不超过 max_bytes 字节的部分，不截断多字节字符"""
+    if max_bytes <= 0:
+        return ""
+    suffix = text[-max_bytes:]
+    encoded = suffix.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return suffix
+    return encoded[-max_bytes:].decode("utf-8", "ignore")
+
+
+class BoundedText:  # pylint: disable=too-many-instance-attributes
+    """
+    增量收集文本片段，最多保留 max_bytes 字节：开头占 (1 - tail_ratio)，结尾占 tail_ratio。
+
+    片段先填满开头的额度，之后的片段进入结尾的滑动窗口，窗口溢出时裁掉最早的内容；
+    中间被丢弃的内容在 getvalue() 中以一行省略说明代替。
+    """
+
+    def __init__(self, max_bytes: int, tail_ratio: float = 0.25, separator: str = "\n"):
+        self.max_bytes = max_bytes
+        self.separator = separator
+        self._tail_budget = int(max_bytes * tail_ratio)
+        self._head_budget = max_bytes - self._tail_budget
+        self._head: List[str] = []
+        self._head_bytes = 0
+        self._head_full = False
+        self._tail: Deque[Tuple[str, int]] = deque()
+        self._tail_bytes = 0
+        self._parts = 0
+        self.total_chars = 0
+        self.omitted_chars = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted_chars > 0
+
+    def append(self, text: str) -> None:
+        if self._parts:
+            self._add(self.separator)
+        self._parts += 1
+        self._add(text)
+
+    def getvalue(self) -> str:
+        tail = "".join(text for text, _ in self._tail)
+        if not self.truncated:
+            return "".join(self._head) + tail
+        marker = (
+            f"\n…[已省略 {self.omitted_chars} 个字符，"
+            f"原始结果共 {self.total_chars} 个字符]…\n"
+        )
+        return "".join(self._head) + marker + tail
+
+    def _add(self, text: str) -> None:
+        if not text:
+            return
+        self.total_chars += len(text)
+        start = 0
+        if not self._head_full:
+            kept = clip_head(text, self._head_budget - self._head_bytes)
+            self._head.append(kept)
+            self._head_bytes += _utf8_len(kept)
+            if len(kept) == len(text):
+                return
+            self._head_full = True
+            start = len(kept)
+        rest = len(text) - start
+        # 直接从原文本末尾截取，不复制开头之后的整段剩余内容
+        kept = clip_tail(text, self._tail_budget)
+        if len(kept) > rest:
+            kept = text[start:]
+        self.omitted_chars += rest - len(kept)
+        if not kept:
+            return
+        size = _utf8_len(kept)
+        self._tail.append((kept, size))
+        self._tail_bytes += size
+        while self._tail_bytes > self._tail_budget:
+            # 窗口溢出：从最早的片段开头裁掉多出的部分
+            oldest, oldest_size = self._tail.popleft()
+            remaining = clip_tail(
+                oldest, oldest_size - (self._tail_bytes - self._tail_budget)
+            )
+            remaining_size = _utf8_len(remaining)
+            self._tail_bytes += remaining_size - oldest_size
+            self.omitted_chars += len(oldest) - len(remaining)
+            if remaining:
+                self._tail.appendleft((remaining, remaining_size))
+
+
+def truncate_text(text: str, max_bytes: int, tail_ratio: float = 0.25) -> str:
+    """把 text 截断到不超过 max_bytes 字节（另加一行省略说明），保留开头与结尾"""
+    if len(text) * 4 <= max_bytes:
+        return text
+    bounded = BoundedText(max_bytes, tail_ratio)
+    bounded.append(text)
+    return bounded.getvalue()
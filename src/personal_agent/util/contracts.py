@@ -0,0 +1,111 @@
+"""
+接口契约（icontract）的检查模式：full 全部检查、sampled 抽样检查、off 不检查。
+
+各子系统 api/ 中的接口用本模块的 require/ensure 声明契约，接口类继承 icontract.DBC，
+实现类自动继承契约。模式可在运行时通过 configure() 切换（通常取自配置），
+环境变量 PERSONAL_AGENT_CONTRACTS 优先于配置；若进程启动时环境变量即为 off，
+契约在导入时就不会安装，调用没有任何额外开销。
+"""
+
+import functools
+import inspect
+import itertools
+import os
+from typing import Any, Callable, Optional
+import icontract
+
+MODE_FULL = "full"
+MODE_SAMPLED = "sampled"
+MODE_OFF = "off"
+MODES = (MODE_FULL, MODE_SAMPLED, MODE_OFF)
+
+ENV_VAR = "PERSONAL_AGENT_CONTRACTS"
+
+
+class _State:
+    __slots__ = ("mode", "every")
+
+    def __init__(self, mode: str, every: int):
+        self.mode = mode
+        self.every = every
+
+
+def _env_mode() -> Optional[str]:
+    mode = os.environ.get(ENV_VAR, "").strip().lower()
+    return mode if mode in MODES else None
+
+
+_state = _State(_env_mode() or MODE_FULL, 1)
+# 导入时即关闭的契约不安装到函数上
+_INSTALLED = _state.mode != MODE_OFF
+
+
+def configure(mode: str, sample_rate: float = 0.01) -> str:
+    """设置检查模式与抽样比例，环境变量已指定模式时以环境变量为准；返回生效的模式"""
+    mode = _env_mode() or mode
+    if mode not in MODES:
+        raise ValueError(f"未知的契约检查模式: {mode}")
+    _state.mode = mode
+    _state.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 1
+    return mode
+
+
+def current_mode() -> str:
+    return _state.mode
+
+
+def _gate(condition: Callable[..., Any]) -> Callable[..., Any]:
+    """按当前模式决定是否真正求值条件；签名与原条件一致，icontract 按名称传参"""
+    counter = itertools.count()
+
+    @functools.wraps(condition)
+    def gated(*args: Any, **kwargs: Any) -> Any:
+        mode = _state.mode
+        if mode == MODE_OFF:
+            return True
+        if mode == MODE_SAMPLED and next(counter) % _state.every:
+            return True
+        return condition(*args, **kwargs)
+
+    return gated
+
+
+def _error(
+    condition: Callable[..., Any], description: Optional[str]
+) -> Callable[..., Exception]:
+    """违反契约时构造异常；只在违反时才读取条件源码作为说明"""
+
+    @functools.wraps(condition)
+    def make_error(*_args: Any, **kwargs: Any) -> Exception:
+        text = description
+        if text is None:
+            try:
+                text = inspect.getsource(condition).strip()
+            except (OSError, TypeError):
+                text = getattr(condition, "__name__", repr(condition))
+        values = ", ".join(f"{name}={value!r}" for name, value in kwargs.items())
+        return icontract.ViolationError(f"{text}: {values}")
+
+    return make_error
+
+
+def require(
+    condition: Callable[..., Any], description: Optional[str] = None
+) -> Callable:
+    """前置条件，参数与 icontract.require 相同"""
+    return icontract.require(
+        _gate(condition),
+        error=_error(condition, description),
+        enabled=_INSTALLED,
+    )
+
+
+def ensure(
+    condition: Callable[..., Any], description: Optional[str] = None
+) -> Callable:
+    """后置条件，参数与 icontract.ensure 相同"""
+    return icontract.ensure(
+        _gate(condition),
+        error=_error(condition, description),
+        enabled=_INSTALLED,
+    )
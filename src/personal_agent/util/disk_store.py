@@ -0,0 +1,91 @@
+"""
+缓存的磁盘层（SQLite）：回复缓存与工具结果缓存共用的连接管理、大小统计与淘汰逻辑。
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Union
+
+
+class SqliteDiskStore:
+    """
+    SQLite 上的键值存储，总大小超过 max_bytes 时按最久未访问淘汰。
+
+    表须包含 key（主键）、value、size 与 accessed 列，并为 accessed 建索引；
+    淘汰沿该索引从最旧的条目数起，只读到腾出足够空间为止，再一次性删除。
+    子类提供建表语句，按需增加列并实现读写接口。
+    """
+
+    def __init__(self, path: Union[str, Path], table: str, schema: str, max_bytes: int):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(schema)
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {table}"
+        ).fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _put(self, key: str, value: str, **columns: Any) -> None:
+        """写入（或替换）一个条目，超出大小上限时淘汰旧条目"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        values = {"key": key, "value": value, "size": size, "accessed": time.time()}
+        values.update(columns)
+        names = ", ".join(values)
+        marks = ", ".join("?" for _ in values)
+        with self._lock, self._conn:
+            old = self._conn.execute(
+                f"SELECT size FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} ({names}) VALUES ({marks})",
+                tuple(values.values()),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _touch(self, key: str, now: float) -> None:
+        self._conn.execute(
+            f"UPDATE {self._table} SET accessed = ? WHERE key = ?", (now, key)
+        )
+
+    def _delete(self, where: str, params: tuple) -> None:
+        rows = self._conn.execute(
+            f"DELETE FROM {self._table} WHERE {where} RETURNING size", params
+        ).fetchall()
+        self._total_bytes -= sum(row[0] for row in rows)
+
+    def _evict(self) -> None:
+        excess = self._total_bytes - self.max_bytes
+        count = 0
+        cursor = self._conn.execute(f"SELECT size FROM {self._table} ORDER BY accessed")
+        try:
+            for (size,) in cursor:
+                if excess <= 0:
+                    break
+                excess -= size
+                count += 1
+        finally:
+            cursor.close()
+        self._delete(
+            f"key IN (SELECT key FROM {self._table} ORDER BY accessed LIMIT ?)",
+            (count,),
+        )
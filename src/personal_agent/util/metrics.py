@@ -0,0 +1,126 @@
+"""
+进程内轻量级指标：计数器与直方图，供各子系统记录延迟、命中率等性能数据。
+render_prometheus / write_prometheus 以 Prometheus 文本格式导出注册表中的全部指标。
+"""
+
+import math
+import os
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+class Counter:
+    """单调递增计数器"""
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """保留最近 max_samples 个样本的直方图，用于计算 p50/p95/p99 等分位数"""
+
+    __slots__ = ("name", "count", "total", "_samples")
+
+    def __init__(self, name: str, max_samples: int = 1024):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self._samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回最近样本的 q 分位数（0 < q <= 100），无样本时返回 None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    """按名称管理计数器与直方图，同名指标只创建一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def counter(self, name: str) -> Counter:
+        metric = self._counters.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.setdefault(name, Counter(name))
+        return metric
+
+    def histogram(self, name: str) -> Histogram:
+        metric = self._histograms.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.setdefault(name, Histogram(name))
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """导出所有指标的当前值"""
+        return {
+            "counters": {name: c.value for name, c in self._counters.items()},
+            "histograms": {name: h.snapshot() for name, h in self._histograms.items()},
+        }
+
+
+def _prometheus_name(name: str) -> str:
+    """指标名中的点号等字符替换为下划线，符合 Prometheus 的命名规则"""
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """导出为 Prometheus 文本格式：计数器加 _total 后缀，直方图导出为带分位数的 summary"""
+    snapshot = registry.snapshot()
+    lines: List[str] = []
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = _prometheus_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value:g}")
+    for name, values in sorted(snapshot["histograms"].items()):
+        metric = _prometheus_name(name)
+        lines.append(f"# TYPE {metric} summary")
+        for quantile in ("p50", "p95", "p99"):
+            if values[quantile] is not None:
+                q = int(quantile[1:]) / 100
+                lines.append(f'{metric}{{quantile="{q}"}} {values[quantile]:g}')
+        lines.append(f"{metric}_sum {values['sum']:g}")
+        lines.append(f"{metric}_count {values['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(registry: MetricsRegistry, path: str) -> None:
+    """写入供 node_exporter textfile 采集器读取的文件；先写临时文件再替换，不会读到半个文件"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(registry))
+    os.replace(tmp, path)
+
+
+# 进程级默认注册表，未显式注入时各组件共用
+default_registry = MetricsRegistry()
@@ -0,0 +1,78 @@
+"""
+请求合并（single-flight）：相同键的并发请求共享同一个上游调用。
+
+与缓存不同，合并只作用于同时在途的请求，调用结束后立即失效，不会返回过期数据。
+在 no_coalesce() 上下文中发起的请求不参与合并。
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, TypeVar
+from .metrics import MetricsRegistry, default_registry
+
+T = TypeVar("T")
+
+_bypass: ContextVar[bool] = ContextVar("singleflight_bypass", default=False)
+
+
+@contextmanager
+def no_coalesce() -> Iterator[None]:
+    """在此上下文中发起的请求各自独立调用上游"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并并发请求。
+
+    每个等待者通过 shield 等待共享任务，单个等待者被取消不会影响其他等待者；
+    所有等待者都取消后，共享任务随之取消并立即移出在途表，之后的请求发起新的调用，
+    而不是加入一个正在取消的任务。
+    """
+
+    def __init__(self, name: str, metrics: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.metrics = metrics or default_registry
+        self._calls: Dict[Hashable, _Call] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if _bypass.get():
+            return await fn()
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.metrics.counter(f"{self.name}.coalesced").inc()
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: Any) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
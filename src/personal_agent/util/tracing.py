@@ -0,0 +1,326 @@
+"""
+每轮对话的追踪：用 span 记录一轮中各阶段（组装提示、模型调用、工具发现与调用、输出渲染）的耗时，
+以及 token 数、字节数、缓存命中等属性。
+
+组件通过 span(name, **attributes) 记录，父子关系由 contextvars 在同一任务内自动传递。
+追踪默认关闭，此时 span() 只返回一个共享的空 span，几乎没有开销；计算代价较高的属性应先检查
+span.recording。开启后每个结束的 span：
+
+- 耗时记入指标注册表的 span.<name>_seconds 直方图，供 /stats 与 Prometheus 导出；
+- 交给各导出器：OTelJSONExporter 按 OTLP JSON 格式逐行写入文件，
+  PrometheusFileExporter 在一轮结束时按间隔把全部指标写成 Prometheus 文本文件。
+
+追踪状态是进程级的，与契约检查模式一样在启动时由 configure() 按配置设置。
+"""
+
+import contextvars
+import json
+import random
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Protocol
+from .metrics import MetricsRegistry, default_registry, write_prometheus
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "personal_agent_span", default=None
+)
+_ids = random.Random()
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """一次计时的操作；作为上下文管理器使用，退出时结束并导出"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "duration",
+        "attributes",
+        "error",
+        "_tracer",
+        "_t0",
+        "_token",
+    )
+
+    recording = True
+
+    def __init__(
+        self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes
+    ):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{_ids.getrandbits(128):032x}"
+        self.span_id = f"{_ids.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = attributes
+        self.error: Optional[str] = None
+        self.duration = 0.0
+        self._tracer = tracer
+        self._token: Optional[contextvars.Token] = None
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter()
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1) -> None:
+        """累加数值属性，如流式回复的片段数与字节数"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_error(self, error: BaseException) -> None:
+        """记录已被处理、不会从 with 块中抛出的异常"""
+        self.error = f"{type(error).__name__}: {error}"
+
+    def detach(self) -> None:
+        """把当前 span 还原为父 span；异步生成器在每次 yield 前调用，恢复执行后再 attach()
+
+        否则 span 在 yield 期间仍是消费方的当前 span，消费方新建的 span 会错挂在它下面，
+        生成器在另一个上下文中结束时也无法还原。
+        """
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+    def attach(self) -> None:
+        """重新设为当前 span"""
+        self._token = _current.set(self)
+
+    def __enter__(self) -> "Span":
+        self.attach()
+        return self
+
+    def __exit__(self, exc_type, exc, _tb) -> None:
+        self.duration = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.detach()
+        self._tracer.finish(self)
+
+
+class _NoopSpan:
+    """追踪关闭时共享的空 span，所有操作均不做任何事；只读字段与 Span 同名，取值为空"""
+
+    __slots__ = ()
+
+    recording = False
+    name = ""
+    trace_id: Optional[str] = None
+    span_id: Optional[str] = None
+    parent_id: Optional[str] = None
+    duration = 0.0
+    attributes: Mapping[str, Any] = MappingProxyType({})
+    error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        """不记录属性"""
+
+    def add(self, key: str, amount: float = 1) -> None:
+        """不累加数值"""
+
+    def record_error(self, error: BaseException) -> None:
+        """不记录异常"""
+
+    def detach(self) -> None:
+        """从未成为当前 span，无需恢复"""
+
+    def attach(self) -> None:
+        """不成为当前 span"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class Tracer:
+    """创建 span，并在其结束时记录耗时指标、交给导出器"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        exporters: Optional[List[SpanExporter]] = None,
+    ):
+        self.enabled = enabled
+        self.metrics = metrics or default_registry
+        self.exporters: List[SpanExporter] = exporters or []
+
+    def span(self, name: str, **attributes: Any):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _current.get(), attributes)
+
+    def finish(self, span: Span) -> None:
+        self.metrics.histogram(f"span.{span.name}_seconds").observe(span.duration)
+        if span.error is not None:
+            self.metrics.counter(f"span.{span.name}.errors").inc()
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def close(self) -> None:
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+
+
+def _otel_value(value: Any) -> Dict[str, Any]:
+    # OTLP JSON 中 int64 以字符串表示
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTelJSONExporter:
+    """
+    每个 span 写一行 OTLP JSON（与 OpenTelemetry Collector 文件导出器的格式相同），
+    可由 Collector 的 otlpjsonfile 接收器读取后转发到 Jaeger、Tempo 等后端。
+    """
+
+    def __init__(self, path: str, service_name: str = "personal-agent"):
+        self.path = path
+        self._resource = {
+            "attributes": [
+                {"key": "service.name", "value": {"stringValue": service_name}}
+            ]
+        }
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=R1732
+
+    def to_otlp(self, span: Span) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.start_ns + int(span.duration * 1e9)),
+            "attributes": [
+                {"key": key, "value": _otel_value(value)}
+                for key, value in span.attributes.items()
+            ],
+            # 1 为 OK，2 为 ERROR
+            "status": (
+                {"code": 2, "message": span.error} if span.error else {"code": 1}
+            ),
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        return {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [
+                        {"scope": {"name": "personal_agent"}, "spans": [record]}
+                    ],
+                }
+            ]
+        }
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(self.to_otlp(span), ensure_ascii=False)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                if span.parent_id is None:
+                    # 一轮结束时落盘，轮内的子 span 留在缓冲区中
+                    self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusFileExporter:
+    """一轮（根 span）结束时，距上次写入超过 interval 秒则把全部指标写成 Prometheus 文本文件"""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 15.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or default_registry
+        self._written_at = float("-inf")
+
+    def export(self, span: Span) -> None:
+        if span.parent_id is not None:
+            return
+        now = time.monotonic()
+        if now - self._written_at >= self.interval:
+            self._written_at = now
+            write_prometheus(self.metrics, self.path)
+
+    def close(self) -> None:
+        write_prometheus(self.metrics, self.path)
+
+
+# 进程级默认追踪器，由 configure() 按配置开启
+default_tracer = Tracer()
+
+
+def span(name: str, **attributes: Any):
+    """在默认追踪器上开始一个 span，用作 with 语句的上下文管理器"""
+    tracer = default_tracer
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return Span(tracer, name, _current.get(), attributes)
+
+
+def current_span():
+    """当前任务中进行中的 span，没有时返回空 span；用于给外层 span 补充属性（如缓存命中）"""
+    return _current.get() or NOOP_SPAN
+
+
+def configure(
+    enabled: bool,
+    otel_path: Optional[str] = None,
+    prometheus_path: Optional[str] = None,
+    prometheus_interval: float = 15.0,
+) -> Tracer:
+    """按配置开启或关闭默认追踪器，并替换其导出器"""
+    default_tracer.close()
+    exporters: List[SpanExporter] = []
+    if enabled and otel_path:
+        exporters.append(OTelJSONExporter(otel_path))
+    if enabled and prometheus_path:
+        exporters.append(
+            PrometheusFileExporter(
+                prometheus_path, prometheus_interval, default_tracer.metrics
+            )
+        )
+    default_tracer.exporters = exporters
+    default_tracer.enabled = enabled
+    return default_tracer
+
+
+def configure_from(tracing_config) -> Tracer:
+    """按 SystemConfig.tracing 配置默认追踪器"""
+    return configure(
+        tracing_config.enabled,
+        otel_path=tracing_config.otel_path,
+        prometheus_path=tracing_config.prometheus_path,
+        prometheus_interval=tracing_config.prometheus_interval,
+    )
+
+
+def shutdown() -> None:
+    """进程退出前关闭导出器，写出缓冲中的 span 与最后一次指标"""
+    default_tracer.close()
@@ -49,7 +49,7 @@ async def test_handle_network_error(cli):
     ) as mock_prompt:
         mock_prompt.side_effect = ["Hello", "/exit"]
         with patch(
-            "langchain_openai.ChatOpenAI.ainvoke",
+            "langchain_openai.ChatOpenAI.astream",
             side_effect=ConnectionError("Network error"),
         ):
             with StringIO() as stdout:
@@ -0,0 +1,78 @@
+"""
+性能基准的结果记录：测试通过 bench_results.record(name, **metrics) 记录指标，
+会话结束时写入 JSON（默认 benchmark-results/latest.json，可用环境变量 PERSONAL_AGENT_BENCH_OUTPUT 指定），
+并在同目录的 history.jsonl 中追加一行，便于跟踪指标随提交的变化。
+
+只有专门运行基准（pytest -m benchmark 或 pytest tests/benchmark）或设置了上述环境变量时才写入，
+普通的全量测试不会留下结果文件。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+OUTPUT_ENV = "PERSONAL_AGENT_BENCH_OUTPUT"
+DEFAULT_OUTPUT = Path("benchmark-results") / "latest.json"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+class BenchResults:
+    def __init__(self):
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, **metrics: Any) -> None:
+        self.results[name] = metrics
+        print(f"\n{name}: {json.dumps(metrics, ensure_ascii=False)}")
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": self.results,
+        }
+        path.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        with open(path.with_name("history.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+
+def _benchmarks_selected(config) -> bool:
+    markexpr = config.getoption("markexpr") or ""
+    if "benchmark" in markexpr and "not benchmark" not in markexpr:
+        return True
+    here = Path(__file__).parent.resolve()
+    paths = [Path(arg.split("::")[0]).resolve() for arg in config.args]
+    return bool(paths) and all(path.is_relative_to(here) for path in paths)
+
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    results = BenchResults()
+    yield results
+    if results.results and (
+        os.environ.get(OUTPUT_ENV) or _benchmarks_selected(request.config)
+    ):
+        results.write(Path(os.environ.get(OUTPUT_ENV, DEFAULT_OUTPUT)))
@@ -0,0 +1,45 @@
+"""
+性能基准：逐项收集 50MB 的工具输出，保留的内存只与上限有关，与输出总量无关。
+"""
+
+import time
+import tracemalloc
+
+import pytest
+from personal_agent.util.bounded_text import BoundedText
+
+pytestmark = pytest.mark.benchmark
+
+
+def _items(count, size):
+    line = "搜索结果：" + "x" * (size - 15)
+    for i in range(count):
+        yield f"{i} {line}"
+
+
+def _collect(max_bytes, count):
+    bounded = BoundedText(max_bytes)
+    for item in _items(count, 1024):
+        bounded.append(item)
+    return bounded, bounded.getvalue()
+
+
+def test_collecting_huge_output_should_keep_memory_bounded():
+    max_bytes = 32 * 1024
+    start = time.perf_counter()
+    collected, _ = _collect(max_bytes, 50_000)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    # tracemalloc 本身开销较大，内存只用较少的数据量测量
+    bounded, value = _collect(max_bytes, 10_000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"collected {collected.total_chars / 1e6:.1f}M chars in {seconds * 1e3:.1f} ms, "
+        f"kept {len(value.encode('utf-8'))} bytes, peak {peak / 1024:.0f} KiB"
+    )
+    assert bounded.truncated
+    assert len(value.encode("utf-8")) < max_bytes + 200
+    assert peak < 8 * max_bytes
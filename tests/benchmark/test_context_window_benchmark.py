@@ -0,0 +1,43 @@
+"""
+性能基准：上下文窗口的单轮组装开销不应随会话长度增长。
+"""
+
+import asyncio
+import time
+
+import pytest
+from personal_agent.chat.context_window import ContextWindow, TokenCounter
+
+pytestmark = pytest.mark.benchmark
+
+
+class CheapTokenCounter(TokenCounter):
+    """固定的近似分词，避免基准受词表加载影响"""
+
+    def count_text(self, text: str) -> int:
+        return len(text) // 4 + 1
+
+
+def per_turn_seconds(turns: int, rounds: int = 200) -> float:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question number {i} " * 5})
+        history.append({"role": "assistant", "content": f"answer number {i} " * 20})
+    window = ContextWindow(4000, counter=CheapTokenCounter())
+
+    async def run() -> float:
+        await window.build(history, "warm up")
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await window.build(history, "next question")
+        return (time.perf_counter() - start) / rounds
+
+    return asyncio.run(run())
+
+
+def test_per_turn_cost_should_stay_flat_as_conversation_grows():
+    timings = {turns: per_turn_seconds(turns) for turns in (100, 1_000, 10_000)}
+    for turns, seconds in timings.items():
+        print(f"history={turns:>6} turns  build={seconds * 1e6:8.1f} us/turn")
+    # 历史增长 100 倍，单轮耗时应基本不变（留出计时噪声余量）
+    assert timings[10_000] < timings[100] * 3
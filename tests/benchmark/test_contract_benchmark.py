@@ -0,0 +1,85 @@
+"""
+性能基准：接口契约在 full / sampled / off 三种模式下的单次调用开销。
+
+get_context 的后置条件逐项检查历史，长会话下 full 模式的开销随历史长度线性增长；
+sampled 与 off 模式应接近裸调用。
+"""
+
+import time
+
+import pytest
+from personal_agent.chat.chat_service_impl import ChatServiceImpl
+from personal_agent.chat.context_window import ContextWindow
+from personal_agent.chat.conversation_store_memory import MemoryConversationStore
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.util import contracts
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(autouse=True)
+def restore_mode(monkeypatch):
+    monkeypatch.delenv(contracts.ENV_VAR, raising=False)
+    yield
+    contracts.configure(contracts.MODE_FULL)
+
+
+def _per_call_seconds(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def _measure(fn, calls):
+    results = {}
+    for mode in (contracts.MODE_FULL, contracts.MODE_SAMPLED, contracts.MODE_OFF):
+        contracts.configure(mode, sample_rate=0.01)
+        results[mode] = _per_call_seconds(fn, calls)
+    return results
+
+
+def _report(name, results):
+    print(
+        name
+        + " "
+        + ", ".join(
+            f"{mode}={seconds * 1e6:.1f} us" for mode, seconds in results.items()
+        )
+    )
+
+
+def test_get_context_on_long_history_should_be_cheaper_when_sampled():
+    store = MemoryConversationStore()
+    for i in range(5_000):
+        store.append(
+            "default",
+            [
+                {"role": "user", "content": f"question {i}"},
+                {"role": "assistant", "content": f"answer {i}"},
+            ],
+        )
+    service = ChatServiceImpl(
+        None, context_window=ContextWindow(budget_tokens=10**9), store=store
+    )
+    assert len(service.get_context()) == 10_000
+
+    results = _measure(service.get_context, 200)
+    _report("get_context(10k)", results)
+    assert results[contracts.MODE_SAMPLED] < results[contracts.MODE_FULL] / 3
+    assert results[contracts.MODE_OFF] < results[contracts.MODE_FULL] / 3
+
+
+def test_server_registry_gating_should_not_add_overhead():
+    registry = MemoryServerRegistry()
+    for i in range(100):
+        registry.add_server(f"server-{i}", f"http://localhost:{8000 + i}/sse")
+
+    def calls():
+        registry.edit_server("server-1", "http://localhost:9000/sse")
+
+    results = _measure(calls, 20_000)
+    _report("edit_server", results)
+    # 这些条件本身很轻，只确认模式开关不会让调用变慢
+    assert results[contracts.MODE_SAMPLED] < results[contracts.MODE_FULL] * 1.5
+    assert results[contracts.MODE_OFF] < results[contracts.MODE_FULL] * 1.5
@@ -0,0 +1,42 @@
+"""
+性能基准：恢复 10k 轮的会话只读取预算内的尾部，耗时应在毫秒级。
+"""
+
+import time
+
+import pytest
+from personal_agent.chat.chat_service_impl import ChatServiceImpl
+from personal_agent.chat.context_window import ContextWindow
+from personal_agent.chat.conversation_store_sqlite import SqliteConversationStore
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_resume_10k_turn_session_should_take_milliseconds(tmp_path):
+    path = tmp_path / "history.db"
+    store = SqliteConversationStore(path)
+    start = time.perf_counter()
+    for i in range(10_000):
+        store.append(
+            "long",
+            [
+                {"role": "user", "content": f"question number {i} " * 5},
+                {"role": "assistant", "content": f"answer number {i} " * 20},
+            ],
+        )
+    append_seconds = (time.perf_counter() - start) / 10_000
+    store.close()
+
+    start = time.perf_counter()
+    service = ChatServiceImpl(
+        None,
+        context_window=ContextWindow(budget_tokens=6000),
+        store=SqliteConversationStore(path),
+        session_id="long",
+    )
+    resume_seconds = time.perf_counter() - start
+
+    print(f"append={append_seconds * 1e6:.1f} us/turn")
+    print(f"resume={resume_seconds * 1e3:.2f} ms, loaded {len(service.get_context())}")
+    assert 0 < len(service.get_context()) < 20_000
+    assert resume_seconds < 0.05
@@ -0,0 +1,192 @@
+"""
+性能基准：对本地假 LLM 与假 MCP 服务器测量对话、工具调用与 CLI 三条路径的端到端延迟、吞吐量与内存，
+结果经 bench_results 写入 JSON（见 conftest.py）。假服务器的延迟、生成速度与结果大小固定，数值可复现。
+"""
+
+import asyncio
+import contextlib
+import io
+import time
+import tracemalloc
+
+import pytest
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.cli.cli import CommandLineInterface
+from personal_agent.config.config import ChatConfig, LLMConfig, MCPConfig
+from personal_agent.devtools.fake_llm import FakeLLMServer
+from personal_agent.devtools.fake_mcp import FakeMCPServer
+from personal_agent.mcp import Container as MCPContainer
+from personal_agent.util import contracts
+from personal_agent.util.metrics import Histogram
+
+pytestmark = pytest.mark.benchmark
+
+# 假 LLM：首 token 前 20ms，之后每秒 2000 token（每 token 4 个字符），回复 400 个字符
+LLM_LATENCY = 0.02
+LLM_TOKEN_RATE = 2000
+REPLY_SIZE = 400
+# 假 MCP：每次调用 10ms，结果 4KB
+TOOL_LATENCY = 0.01
+TOOL_PAYLOAD = 4096
+
+
+class StubConfiger:
+    def __init__(self, llm_url: str):
+        self.llm_url = llm_url
+
+    def get_llm_config(self):
+        return LLMConfig(
+            provider="fake",
+            model="fake-model",
+            api_key="fake-key",
+            api_base=self.llm_url,
+            retry_attempts=0,
+        )
+
+    def get_chat_config(self):
+        return ChatConfig()
+
+    def get_mcp_config(self):
+        return MCPConfig()
+
+
+@pytest.fixture(autouse=True)
+def app_contract_mode(monkeypatch):
+    # 按应用默认的抽样模式测量，而不是测试环境的完整检查
+    monkeypatch.delenv(contracts.ENV_VAR, raising=False)
+    contracts.configure(contracts.MODE_SAMPLED)
+    yield
+    contracts.configure(contracts.MODE_FULL)
+
+
+def fake_llm(**kwargs) -> FakeLLMServer:
+    kwargs.setdefault("latency", LLM_LATENCY)
+    kwargs.setdefault("token_rate", LLM_TOKEN_RATE)
+    kwargs.setdefault("reply_size", REPLY_SIZE)
+    return FakeLLMServer(record_requests=False, **kwargs)
+
+
+def summary(histogram: Histogram) -> dict:
+    return {
+        key: round(value * 1000, 2) if key != "count" else value
+        for key, value in histogram.snapshot().items()
+        if key != "sum"
+    }
+
+
+async def timed_turns(turn, count: int) -> Histogram:
+    latency = Histogram("turn", max_samples=count)
+    await turn(-1)  # 预热：导入 LLM 客户端并建立连接
+    for i in range(count):
+        start = time.perf_counter()
+        await turn(i)
+        latency.observe(time.perf_counter() - start)
+    return latency
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_latency(bench_results):
+    async with fake_llm() as llm:
+        service = ChatContainer(configer=lambda: StubConfiger(llm.url)).chat_service()
+        first_chunk = Histogram("first_chunk")
+
+        async def turn(i):
+            service.clear_context()
+            start = time.perf_counter()
+            async for _ in service.stream_response(f"第 {i} 轮"):
+                if start is not None:
+                    first_chunk.observe(time.perf_counter() - start)
+                    start = None
+
+        latency = await timed_turns(turn, 30)
+    bench_results.record(
+        "chat.stream_turn_ms",
+        **summary(latency),
+        first_chunk_p50=round(first_chunk.percentile(50) * 1000, 2),
+    )
+    assert latency.percentile(50) >= LLM_LATENCY
+
+
+@pytest.mark.asyncio
+async def test_chat_throughput_and_memory(bench_results):
+    turns, concurrency = 400, 50
+    async with fake_llm(latency=0.05) as llm:
+        service = ChatContainer(
+            configer=lambda: StubConfiger(llm.url)
+        ).session_chat_service()
+        await service.get_response("warmup", "预热")
+        pending = iter(range(turns))
+
+        async def worker():
+            for i in pending:
+                await service.get_response(f"s{i}", f"第 {i} 个会话")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+
+        # tracemalloc 开销较大，内存用较少的对话测量：并发 50 个会话各一轮的峰值与残留
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        await asyncio.gather(
+            *(service.get_response(f"m{i}", "测量内存") for i in range(concurrency))
+        )
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    bench_results.record(
+        "chat.throughput",
+        turns=turns,
+        concurrency=concurrency,
+        turns_per_second=round(turns / seconds, 1),
+        peak_kib_per_turn=round((peak - before) / concurrency / 1024, 1),
+        retained_kib_per_turn=round((after - before) / concurrency / 1024, 1),
+    )
+    assert service.active_sessions <= ChatConfig().max_active_sessions
+
+
+@pytest.mark.asyncio
+async def test_tool_turn_latency(bench_results):
+    async with FakeMCPServer(
+        latency=TOOL_LATENCY, payload_size=TOOL_PAYLOAD
+    ) as mcp_server, fake_llm(
+        tool_call="search", tool_arguments={"query": "天气"}
+    ) as llm:
+
+        def configer():
+            return StubConfiger(llm.url)
+
+        mcp = MCPContainer(configer=configer)
+        mcp.server_registry().add_server("bench", mcp_server.url)
+        service = ChatContainer(
+            configer=configer, tool_service=mcp.tool_service()
+        ).chat_service()
+
+        async def turn(i):
+            service.clear_context()
+            await service.get_response(f"search 天气 {i}")
+
+        try:
+            latency = await timed_turns(turn, 20)
+        finally:
+            await mcp.connection_manager().close_all()
+    bench_results.record("tool.turn_ms", **summary(latency), payload=TOOL_PAYLOAD)
+    # 每轮：一次工具调用，两次模型请求
+    assert mcp_server.calls == 21
+    assert latency.percentile(50) >= TOOL_LATENCY + 2 * LLM_LATENCY
+
+
+@pytest.mark.asyncio
+async def test_cli_turn_latency(bench_results):
+    async with fake_llm() as llm:
+        chat = ChatContainer(configer=lambda: StubConfiger(llm.url)).chat_service()
+        cli = CommandLineInterface(lambda: None, chat_service=lambda: chat)
+        output = io.StringIO()
+
+        async def turn(i):
+            chat.clear_context()
+            with contextlib.redirect_stdout(output):
+                await cli._process_input(f"第 {i} 轮")  # pylint: disable=W0212
+
+        latency = await timed_turns(turn, 30)
+    bench_results.record("cli.turn_ms", **summary(latency))
+    assert "Assistant: " in output.getvalue()
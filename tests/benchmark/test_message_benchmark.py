@@ -0,0 +1,84 @@
+"""
+性能基准：1k 与 10k 条历史下每轮组装提示的耗时与内存分配，对比字典消息与 ChatMessage。
+
+上下文预算足够容纳全部历史，每轮都要把整个历史转换为 langchain 消息：
+字典消息每轮为每条历史新建一个 HumanMessage/AIMessage；ChatMessage 只在首次转换，
+之后每轮只复制对象引用。另测量历史本身的常驻内存。
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+import pytest
+from personal_agent.chat.context_window import ContextWindow, SlidingWindowPolicy
+from personal_agent.chat.llm_adapter import OpenAICompatibleLLMAdapter
+from personal_agent.chat.message import ChatMessage
+from personal_agent.config.config import LLMConfig
+
+pytestmark = pytest.mark.benchmark
+
+TURNS = 5
+
+
+def _dict_message(role, content):
+    return {"role": role, "content": content}
+
+
+def _history(length, factory):
+    return [
+        factory("user" if i % 2 == 0 else "assistant", f"message number {i}")
+        for i in range(length)
+    ]
+
+
+def _retained_bytes(length, factory):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    history = _history(length, factory)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del history
+    return after - before
+
+
+def _measure_turns(history):
+    adapter = OpenAICompatibleLLMAdapter(
+        LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+    )
+    window = ContextWindow(budget_tokens=10**9, policy=SlidingWindowPolicy())
+
+    def turn():
+        messages = asyncio.run(window.build(history, "next question"))
+        return adapter._to_lc_messages(messages)  # pylint: disable=W0212
+
+    turn()  # 预热：token 计数缓存与首次转换不计入
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        turn()
+    seconds = (time.perf_counter() - start) / TURNS
+    tracemalloc.start()
+    turn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+@pytest.mark.parametrize("length", [1_000, 10_000])
+def test_prompt_building_with_long_history(bench_results, length):
+    dict_seconds, dict_peak = _measure_turns(_history(length, _dict_message))
+    slot_seconds, slot_peak = _measure_turns(_history(length, ChatMessage))
+    dict_bytes = _retained_bytes(length, _dict_message)
+    slot_bytes = _retained_bytes(length, ChatMessage)
+    bench_results.record(
+        f"history.{length}",
+        dict_turn_ms=round(dict_seconds * 1000, 2),
+        message_turn_ms=round(slot_seconds * 1000, 2),
+        dict_turn_alloc_kib=round(dict_peak / 1024, 1),
+        message_turn_alloc_kib=round(slot_peak / 1024, 1),
+        dict_history_kib=round(dict_bytes / 1024, 1),
+        message_history_kib=round(slot_bytes / 1024, 1),
+    )
+    assert slot_seconds < dict_seconds / 2
+    assert slot_peak < dict_peak / 2
+    assert slot_bytes < dict_bytes
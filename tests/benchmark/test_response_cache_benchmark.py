@@ -0,0 +1,46 @@
+"""
+性能基准：回复缓存命中时不访问模型，单次命中在微秒量级。
+"""
+
+import asyncio
+import time
+
+import pytest
+from personal_agent.chat.llm_adapter import LLMAdapter
+from personal_agent.chat.response_cache import CachingLLMAdapter
+from personal_agent.util.metrics import MetricsRegistry
+
+pytestmark = pytest.mark.benchmark
+
+
+class SlowLLMAdapter(LLMAdapter):
+    async def chat(self, messages):
+        await asyncio.sleep(0.05)
+        return "answer " * 50
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        raise NotImplementedError
+
+
+def test_cache_hit_should_take_microseconds():
+    messages = [{"role": "system", "content": "你是一个助手"}] + [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 20}
+        for i in range(20)
+    ]
+    adapter = CachingLLMAdapter(SlowLLMAdapter(), "m", 0.0, metrics=MetricsRegistry())
+    rounds = 2_000
+
+    async def run() -> float:
+        await adapter.chat(messages)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await adapter.chat(messages)
+        return (time.perf_counter() - start) / rounds
+
+    per_hit = asyncio.run(run())
+    print(f"\ncache hit: {per_hit * 1e6:.1f} us")
+    assert adapter.metrics.counter("llm.cache.hits").value == rounds
+    assert per_hit < 0.001
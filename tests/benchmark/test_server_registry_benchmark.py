@@ -0,0 +1,86 @@
+"""
+性能基准：数千个服务器的持久化注册表，批量写入在一个事务内完成，
+按主机名、标签过滤的分页查询走索引，耗时与注册表总大小基本无关。
+"""
+
+import time
+
+import pytest
+from personal_agent.mcp.server_registry_sqlite import SqliteServerRegistry
+
+pytestmark = pytest.mark.benchmark
+
+SERVERS = 5_000
+
+
+def _servers():
+    return [
+        {
+            "name": f"server-{i}",
+            "url": f"http://host-{i % 50}.internal:{8000 + i}/sse",
+            "tags": [f"team-{i % 20}", "prod" if i % 2 else "dev"],
+        }
+        for i in range(SERVERS)
+    ]
+
+
+def _per_call_seconds(fn, calls=200):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def test_bulk_operations_and_filtered_pages_at_thousands_of_servers(tmp_path):
+    path = tmp_path / "servers.db"
+    registry = SqliteServerRegistry(path)
+
+    start = time.perf_counter()
+    assert registry.add_servers(_servers()) == SERVERS
+    bulk_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(200):
+        registry.add_server(f"single-{i}", f"http://single:{i + 1}/sse")
+    single_seconds = (time.perf_counter() - start) / 200
+
+    first_page = _per_call_seconds(lambda: registry.list_servers(limit=20))
+    by_host = _per_call_seconds(
+        lambda: registry.list_servers(limit=20, host="host-7.internal")
+    )
+    by_tag = _per_call_seconds(
+        lambda: registry.list_servers(limit=20, tag="team-3", host="host-3.internal")
+    )
+    lookup = _per_call_seconds(lambda: registry.get_server("server-4321"), 2_000)
+    full_list = _per_call_seconds(registry.list_servers, 5)
+
+    start = time.perf_counter()
+    removed = registry.remove_servers([f"server-{i}" for i in range(0, SERVERS, 2)])
+    remove_seconds = time.perf_counter() - start
+    registry.close()
+
+    start = time.perf_counter()
+    reopened = SqliteServerRegistry(path)
+    count = reopened.count_servers()
+    reopen_seconds = time.perf_counter() - start
+    reopened.close()
+
+    print(
+        f"bulk add {SERVERS}: {bulk_seconds * 1e3:.1f} ms, "
+        f"single add: {single_seconds * 1e3:.2f} ms/server"
+    )
+    print(
+        f"page(20)={first_page * 1e6:.0f} us, host page={by_host * 1e6:.0f} us, "
+        f"host+tag page={by_tag * 1e6:.0f} us, get={lookup * 1e6:.0f} us, "
+        f"full list={full_list * 1e3:.1f} ms"
+    )
+    print(
+        f"bulk remove {removed}: {remove_seconds * 1e3:.1f} ms, "
+        f"reopen+count: {reopen_seconds * 1e3:.1f} ms"
+    )
+    assert removed == SERVERS // 2
+    assert count == SERVERS // 2 + 200
+    assert bulk_seconds < 1.0
+    assert first_page < full_list / 10
+    assert by_host < full_list / 10
+    assert by_tag < full_list / 10
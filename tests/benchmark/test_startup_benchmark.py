@@ -0,0 +1,51 @@
+"""
+性能基准：CLI 启动时不应导入 langchain、OpenAI SDK、fastmcp 等重量级依赖，导入耗时有回归阈值。
+"""
+
+import re
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+# 导入 personal_agent.app.main 的累计耗时上限（秒），懒加载前约 3.5 秒
+IMPORT_TIME_LIMIT = 1.5
+
+HEAVY_MODULES = ("langchain_openai", "langchain_core", "openai", "fastmcp", "httpx")
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        check=True,
+        timeout=60,
+    )
+
+
+def test_import_time_should_stay_under_threshold():
+    result = run_python("-X", "importtime", "-c", "import personal_agent.app.main")
+    match = re.search(
+        r"^import time:\s+\d+ \|\s+(\d+) \| personal_agent\.app\.main$",
+        result.stderr,
+        re.MULTILINE,
+    )
+    assert match, result.stderr[-2000:]
+    seconds = int(match.group(1)) / 1_000_000
+    print(f"\nimport personal_agent.app.main: {seconds * 1000:.0f} ms")
+    assert seconds < IMPORT_TIME_LIMIT
+
+
+def test_building_cli_should_not_load_heavy_modules():
+    script = (
+        "import sys\n"
+        "from personal_agent.app import Container\n"
+        "Container().cli_container().cli()\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = run_python("-c", script)
+    assert result.stdout.strip().splitlines()[-1:] in ([], [""])
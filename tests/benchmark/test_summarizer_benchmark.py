@@ -0,0 +1,85 @@
+"""
+性能基准：长会话中内联摘要与后台摘要对每轮组装提示延迟的影响，以及摘要的开销。
+
+摘要模型每次调用耗时 SUMMARY_SECONDS：内联摘要让触发摘要的那一轮多等一次调用，
+后台摘要在下一轮之前完成并换入，用户的一轮从不等待。
+后台摘要一次压缩较多轮次，摘要调用次数也更少，次数与 token 开销一并记录。
+"""
+
+import asyncio
+import time
+
+import pytest
+from personal_agent.chat.context_window import (
+    BackgroundSummarizePolicy,
+    ContextWindow,
+    SummarizePolicy,
+    TokenCounter,
+)
+from personal_agent.chat.message import ChatMessage
+from personal_agent.util.metrics import MetricsRegistry
+
+pytestmark = pytest.mark.benchmark
+
+TURNS = 30
+SUMMARY_SECONDS = 0.05
+# 用户两轮之间的间隔（阅读与输入），后台摘要在此期间完成
+THINK_SECONDS = 0.06
+
+
+async def _summarizer(_previous, messages):
+    await asyncio.sleep(SUMMARY_SECONDS)
+    return f"summary of {len(messages)} messages"
+
+
+def _percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def _turns(policy):
+    window = ContextWindow(600, policy, TokenCounter())
+    history = [ChatMessage("system", "you are helpful")]
+    durations = []
+    summaries = 0
+    for i in range(TURNS):
+        start = time.perf_counter()
+        messages = await window.build(history, f"question number {i} " * 5)
+        durations.append(time.perf_counter() - start)
+        summaries += any(m["content"].startswith("之前对话的摘要") for m in messages)
+        history.append(ChatMessage("user", f"question number {i} " * 5))
+        history.append(ChatMessage("assistant", f"answer number {i} " * 10))
+        await asyncio.sleep(THINK_SECONDS)
+    return durations, summaries
+
+
+def test_background_summary_should_keep_turn_latency_flat(bench_results):
+    inline, inline_summaries = asyncio.run(_turns(SummarizePolicy(_summarizer)))
+    metrics = MetricsRegistry()
+    background, background_summaries = asyncio.run(
+        _turns(BackgroundSummarizePolicy(_summarizer, metrics=metrics))
+    )
+    counters = metrics.snapshot()["counters"]
+    bench_results.record(
+        "summary.turn_ms",
+        inline_p50=round(_percentile(inline, 0.5) * 1000, 2),
+        inline_p95=round(_percentile(inline, 0.95) * 1000, 2),
+        inline_max=round(max(inline) * 1000, 2),
+        background_p50=round(_percentile(background, 0.5) * 1000, 2),
+        background_p95=round(_percentile(background, 0.95) * 1000, 2),
+        background_max=round(max(background) * 1000, 2),
+    )
+    bench_results.record(
+        "summary.cost",
+        inline_turns_with_summary=inline_summaries,
+        runs=counters.get("chat.summary.runs", 0),
+        swaps=counters.get("chat.summary.swaps", 0),
+        input_tokens=counters.get("chat.summary.input_tokens", 0),
+        output_tokens=counters.get("chat.summary.output_tokens", 0),
+        window_overflows=counters.get("chat.summary.window_overflows", 0),
+        turns_with_summary=background_summaries,
+    )
+    assert inline_summaries and background_summaries
+    assert counters["chat.summary.runs"] >= 1
+    assert max(inline) >= SUMMARY_SECONDS
+    assert max(background) < SUMMARY_SECONDS / 5
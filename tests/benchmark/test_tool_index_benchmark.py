@@ -0,0 +1,105 @@
+"""
+性能基准：按用户消息检索 top-k 工具后，提示中的工具 schema 大幅减少，检索本身开销很小。
+"""
+
+import json
+import time
+
+import pytest
+from personal_agent.chat.context_window import TokenCounter
+from personal_agent.mcp.tool_index import ToolIndex
+from personal_agent.mcp.types import ToolDescription
+
+pytestmark = pytest.mark.benchmark
+
+TOP_K = 5
+
+DOMAINS = {
+    "weather": ("查询城市的天气预报和气温", ["city", "date"]),
+    "route": ("规划驾车或步行路线", ["origin", "destination", "mode"]),
+    "calendar": ("管理日历中的会议和日程安排", ["title", "start", "end"]),
+    "mail": ("收发电子邮件并管理邮箱", ["to", "subject", "body"]),
+    "stock": ("查询股票行情和价格走势", ["symbol", "period"]),
+    "music": ("搜索并播放歌曲和歌单", ["keyword", "playlist"]),
+    "translate": ("在多种语言之间翻译文本", ["text", "target_language"]),
+    "notes": ("创建和搜索个人笔记", ["content", "tags"]),
+    "files": ("读取和写入本地文件", ["path", "content"]),
+    "news": ("获取最新的新闻头条", ["category", "region"]),
+}
+ACTIONS = ["get", "list", "create", "update", "delete", "search"]
+
+QUERIES = {
+    "明天杭州的天气预报怎么样": "weather",
+    "帮我规划从公司到机场的驾车路线": "route",
+    "下周二下午安排一个会议到日历": "calendar",
+    "给张三发一封电子邮件说明进度": "mail",
+    "查一下苹果公司的股票行情": "stock",
+    "把这段话翻译成英文": "translate",
+}
+
+
+def make_tools():
+    tools = []
+    for domain, (description, params) in DOMAINS.items():
+        for action in ACTIONS:
+            tools.append(
+                ToolDescription(
+                    f"{action}_{domain}",
+                    f"{description}（{action}）",
+                    f"{domain}_server",
+                    {
+                        "type": "object",
+                        "properties": {
+                            p: {"type": "string", "description": f"{p} 参数"}
+                            for p in params
+                        },
+                        "required": params[:1],
+                    },
+                )
+            )
+    return tools
+
+
+def schema_tokens(tools, counter):
+    return sum(
+        counter.count_text(
+            json.dumps(
+                {
+                    "name": tool.qualified_name,
+                    "description": tool.description,
+                    "parameters": tool.input_schema,
+                },
+                ensure_ascii=False,
+            )
+        )
+        for tool in tools
+    )
+
+
+def test_top_k_should_cut_tool_prompt_tokens():
+    tools = make_tools()
+    index = ToolIndex()
+    for domain in DOMAINS:
+        index.update_server(
+            f"{domain}_server", [t for t in tools if t.server == f"{domain}_server"]
+        )
+    counter = TokenCounter()
+    full = schema_tokens(tools, counter)
+
+    selected_tokens = []
+    start = time.perf_counter()
+    for query, domain in QUERIES.items():
+        selected = index.search(query, TOP_K)
+        # 相关领域的工具必须被选中
+        assert selected and selected[0].server == f"{domain}_server", query
+        selected_tokens.append(schema_tokens(selected, counter))
+    per_query = (time.perf_counter() - start) / len(QUERIES)
+
+    average = sum(selected_tokens) / len(selected_tokens)
+    print(
+        f"\n{len(tools)} tools: {full} schema tokens in full, "
+        f"{average:.0f} with top-{TOP_K} ({1 - average / full:.0%} saved), "
+        f"{per_query * 1000:.2f} ms per query"
+    )
+    assert average <= full * 0.2
+    assert per_query < 0.01
@@ -0,0 +1,94 @@
+"""
+性能基准：追踪关闭与开启时单个 span 的开销，以及追踪对一轮对话延迟的影响。
+
+关闭时 span() 只返回共享的空 span，开销应与一次普通函数调用相当。
+"""
+
+import asyncio
+import time
+
+import pytest
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.chat.llm_adapter import LLMAdapter
+from personal_agent.config.config import ChatConfig, LLMConfig
+from personal_agent.util import tracing
+from personal_agent.util.metrics import MetricsRegistry
+
+pytestmark = pytest.mark.benchmark
+
+
+class InstantLLMAdapter(LLMAdapter):
+    async def chat(self, messages):
+        return "ok"
+
+    async def stream(self, messages):
+        yield "ok"
+
+    async def chat_with_tools(self, messages, tools):
+        raise NotImplementedError
+
+
+class StubConfiger:
+    def get_llm_config(self):
+        return LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+
+    def get_chat_config(self):
+        return ChatConfig()
+
+
+@pytest.fixture(autouse=True)
+def restore_tracer():
+    metrics = tracing.default_tracer.metrics
+    tracing.default_tracer.metrics = MetricsRegistry()
+    yield
+    tracing.configure(False)
+    tracing.default_tracer.metrics = metrics
+
+
+def _per_call_seconds(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def _one_span():
+    with tracing.span("bench", size=1) as span:
+        span.add("bytes", 10)
+
+
+def test_disabled_span_should_cost_close_to_nothing(bench_results):
+    calls = 100_000
+    disabled = _per_call_seconds(_one_span, calls)
+    tracing.configure(True)
+    enabled = _per_call_seconds(_one_span, calls)
+    bench_results.record(
+        "tracing.span_us",
+        disabled=round(disabled * 1e6, 3),
+        enabled=round(enabled * 1e6, 3),
+    )
+    assert disabled < enabled / 3
+
+
+def test_tracing_overhead_per_turn(bench_results):
+    service = ChatContainer(
+        configer=StubConfiger, llm_adapter=InstantLLMAdapter()
+    ).chat_service()
+
+    async def turns(count):
+        start = time.perf_counter()
+        for _ in range(count):
+            service.clear_context()
+            await service.get_response("hi")
+        return (time.perf_counter() - start) / count
+
+    asyncio.run(turns(200))  # 预热
+    disabled = asyncio.run(turns(2_000))
+    tracing.configure(True)
+    enabled = asyncio.run(turns(2_000))
+    bench_results.record(
+        "tracing.turn_us",
+        disabled=round(disabled * 1e6, 1),
+        enabled=round(enabled * 1e6, 1),
+    )
+    assert enabled < disabled * 3
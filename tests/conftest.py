@@ -1,5 +1,10 @@
 """测试配置。"""
 
+import os
+
+# 测试中完整检查接口契约，须在导入被测模块之前设置
+os.environ.setdefault("PERSONAL_AGENT_CONTRACTS", "full")
+
 
 def pytest_configure(config):
     """注册自定义标记"""
@@ -7,3 +12,4 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "tbd: 标记待实现的测试用例")
     config.addinivalue_line("markers", "dev_ongoing: 标记正在实现中的测试")
     config.addinivalue_line("markers", "smoke: 标记需要加入 smoke test 的测试")
+    config.addinivalue_line("markers", "benchmark: 标记性能基准测试")
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import icontract
+import pytest
+from personal_agent.config.config import MCPConfig
+from personal_agent.mcp import AsyncServerRegistry
+from personal_agent.mcp import Container as MCPContainer
+from personal_agent.mcp.server_registry_async import ThreadedServerRegistry
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.mcp.server_registry_sqlite import SqliteServerRegistry
+
+
+class StubConfiger:
+    """只提供 MCP 配置的测试配置源，可指定注册表文件"""
+
+    def __init__(self, registry_path=None):
+        self.registry_path = registry_path
+
+    def get_mcp_config(self):
+        return MCPConfig(registry_path=self.registry_path)
+
+
+class SlowSqliteServerRegistry(SqliteServerRegistry):
+    """每次写操作前阻塞一段时间，模拟慢速磁盘"""
+
+    delay = 0.3
+
+    def add_server(self, name, url, tags=()):
+        time.sleep(self.delay)
+        return super().add_server(name, url, tags)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def registry(request, tmp_path):
+    if request.param == "memory":
+        yield ThreadedServerRegistry(MemoryServerRegistry(), offload=False)
+        return
+    inner = SqliteServerRegistry(tmp_path / "registry.db")
+    registry = ThreadedServerRegistry(inner)
+    yield registry
+    registry.close()
+    inner.close()
+
+
+class TestAsyncServerRegistry:
+
+    @pytest.mark.asyncio
+    async def test_crud_roundtrip(self, registry: AsyncServerRegistry):
+        assert await registry.add_server("a", "http://a:1", tags=["x"]) is True
+        assert await registry.add_server("a", "http://a:2") is False
+        added = await registry.add_servers(
+            [{"name": "b", "url": "http://b:1"}, {"name": "c", "url": "http://b:2"}]
+        )
+        assert added == 2
+        assert await registry.count_servers(host="b") == 2
+        page = await registry.list_servers(offset=1, limit=1)
+        assert [s["name"] for s in page] == ["b"]
+        assert await registry.get_server("a") == {
+            "name": "a",
+            "url": "http://a:1",
+            "tags": ["x"],
+        }
+        assert await registry.edit_server("a", "http://a:3") is True
+        assert (await registry.get_server("a"))["url"] == "http://a:3"
+        assert await registry.remove_server("a") is True
+        assert await registry.remove_servers(["b", "c", "missing"]) == 2
+        assert await registry.count_servers() == 0
+
+    @pytest.mark.asyncio
+    async def test_events_are_delivered_on_loop_thread(
+        self, registry: AsyncServerRegistry
+    ):
+        events = []
+        registry.subscribe(
+            lambda event, name: events.append((event, name, threading.get_ident()))
+        )
+        await registry.add_server("a", "http://a:1")
+        await registry.edit_server("a", "http://a:2")
+        await registry.remove_server("a")
+        # 线程池中触发的事件经 call_soon_threadsafe 排队，让出一次事件循环后执行
+        await asyncio.sleep(0)
+        loop_thread = threading.get_ident()
+        assert events == [
+            ("added", "a", loop_thread),
+            ("edited", "a", loop_thread),
+            ("removed", "a", loop_thread),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_contracts_apply_to_async_calls(self, registry):
+        with pytest.raises(icontract.ViolationError):
+            await registry.add_server("a", "not-a-url")
+
+
+@pytest.mark.asyncio
+async def test_slow_write_does_not_stall_concurrent_stream(tmp_path):
+    """慢速写入在工作线程中进行时，同时进行的流式输出不出现明显停顿"""
+    inner = SlowSqliteServerRegistry(tmp_path / "registry.db")
+    registry = ThreadedServerRegistry(inner)
+    gaps = []
+
+    async def stream():
+        last = time.perf_counter()
+        for _ in range(30):
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    try:
+        added, _ = await asyncio.gather(
+            registry.add_server("slow", "http://localhost:1"), stream()
+        )
+    finally:
+        registry.close()
+        inner.close()
+    assert added is True
+    assert max(gaps) < SlowSqliteServerRegistry.delay / 2
+
+
+def test_container_offloads_only_blocking_registries(tmp_path):
+    memory = MCPContainer(configer=StubConfiger).async_server_registry()
+    assert memory.offload is False
+    sqlite = MCPContainer(
+        configer=lambda: StubConfiger(registry_path=str(tmp_path / "r.db"))
+    ).async_server_registry()
+    assert sqlite.offload is True
+    sqlite.close()
+    sqlite.inner.close()
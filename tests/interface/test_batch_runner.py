@@ -0,0 +1,171 @@
+import asyncio
+import json
+import pytest
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.cli.batch import BatchRunner, default_output_path
+from personal_agent.config.config import ChatConfig, LLMConfig
+
+
+class CountingLLMAdapter(LLMAdapter):
+    """回显最后一条用户消息，记录同时进行的请求数的峰值；内容含 fail 时抛出异常"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def chat(self, messages):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            content = messages[-1]["content"]
+            if "fail" in content:
+                raise ConnectionError("upstream unavailable")
+            return f"echo {content} ({len(messages)})"
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+class StubConfiger:
+    def get_llm_config(self):
+        return LLMConfig(
+            provider="fake", model="fake-model", api_key="fake-key", retry_attempts=0
+        )
+
+    def get_chat_config(self):
+        return ChatConfig(batch_concurrency=4)
+
+
+def write_jsonl(path, rows):
+    path.write_text(
+        "".join(
+            (row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows
+        ),
+        encoding="utf-8",
+    )
+
+
+def read_results(path):
+    return {
+        record["id"]: record
+        for record in map(json.loads, path.read_text(encoding="utf-8").splitlines())
+    }
+
+
+class TestBatchRunner:
+    adapter: CountingLLMAdapter
+    runner: BatchRunner
+
+    @pytest.fixture(autouse=True)
+    def setup_runner(self):
+        self.adapter = CountingLLMAdapter()
+        container = ChatContainer(configer=StubConfiger, llm_adapter=self.adapter)
+        self.runner = BatchRunner.from_config(
+            StubConfiger().get_chat_config(), container.session_chat_service()
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_run_prompts_with_bounded_concurrency(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(source, [{"id": f"q{i}", "prompt": f"hi {i}"} for i in range(20)])
+        summary = await self.runner.run(source)
+        assert summary == {"completed": 20, "failed": 0, "skipped": 0}
+        assert self.adapter.peak == 4
+        results = read_results(default_output_path(source))
+        assert results["q7"]["response"] == "echo hi 7 (1)"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_argument_overrides_config(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(source, [{"prompt": f"hi {i}"} for i in range(10)])
+        await self.runner.run(source, tmp_path / "out.jsonl", concurrency=2)
+        assert self.adapter.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_multi_turn_conversation_keeps_session_context(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(source, [{"id": "c", "messages": ["one", "two"]}])
+        output = tmp_path / "out.jsonl"
+        await self.runner.run(source, output)
+        assert read_results(output)["c"]["responses"] == [
+            "echo one (1)",
+            "echo two (3)",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_recorded_per_line(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(
+            source,
+            [
+                {"id": "ok", "prompt": "fine"},
+                {"id": "bad", "prompt": "please fail"},
+                "not json",
+                {"id": "empty"},
+            ],
+        )
+        output = tmp_path / "out.jsonl"
+        summary = await self.runner.run(source, output)
+        assert summary == {"completed": 1, "failed": 3, "skipped": 0}
+        results = read_results(output)
+        assert "ConnectionError" in results["bad"]["error"]
+        # 无法解析的行以行号作为 id
+        assert "error" in results["3"]
+        assert "prompt" in results["empty"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_should_resume_from_checkpoint(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(source, [{"id": f"q{i}", "prompt": f"hi {i}"} for i in range(6)])
+        output = tmp_path / "out.jsonl"
+        # 模拟崩溃：两条结果已写入，第三条只写了一半
+        done = [
+            json.dumps({"id": "q0", "response": "earlier"}),
+            json.dumps({"id": "q1", "response": "earlier"}),
+        ]
+        output.write_text("\n".join(done) + '\n{"id": "q2", "resp', encoding="utf-8")
+        summary = await self.runner.run(source, output)
+        assert summary == {"completed": 4, "failed": 0, "skipped": 2}
+        assert self.adapter.calls == 4
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 6
+        results = {record["id"]: record for record in map(json.loads, lines)}
+        assert results["q0"]["response"] == "earlier"
+        assert results["q2"]["response"] == "echo hi 2 (1)"
+
+        again = await self.runner.run(source, output)
+        assert again == {"completed": 0, "failed": 0, "skipped": 6}
+
+    @pytest.mark.asyncio
+    async def test_failed_items_should_be_retried_on_resume(self, tmp_path):
+        source = tmp_path / "prompts.jsonl"
+        write_jsonl(
+            source,
+            [{"id": "ok", "prompt": "fine"}, {"id": "flaky", "prompt": "hello"}],
+        )
+        output = tmp_path / "out.jsonl"
+        write_jsonl(
+            output,
+            [
+                {"id": "ok", "response": "earlier"},
+                {"id": "flaky", "error": "ConnectionError: upstream unavailable"},
+            ],
+        )
+        summary = await self.runner.run(source, output)
+        assert summary == {"completed": 1, "failed": 0, "skipped": 1}
+        assert self.adapter.calls == 1
+        # 重试结果追加在旧的 error 记录之后，读取时以最后一条为准
+        assert read_results(output)["flaky"]["response"] == "echo hello (1)"
+
+        again = await self.runner.run(source, output)
+        assert again == {"completed": 0, "failed": 0, "skipped": 2}
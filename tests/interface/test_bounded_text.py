@@ -0,0 +1,52 @@
+from personal_agent.util.bounded_text import (
+    BoundedText,
+    clip_head,
+    clip_tail,
+    truncate_text,
+)
+
+
+def utf8_len(text):
+    return len(text.encode("utf-8"))
+
+
+class TestBoundedText:
+
+    def test_clip_should_not_split_multibyte_characters(self):
+        assert clip_head("天气晴朗", 7) == "天气"
+        assert clip_tail("天气晴朗", 7) == "晴朗"
+        assert clip_head("abc", 0) == ""
+
+    def test_small_input_should_be_kept_verbatim(self):
+        bounded = BoundedText(1024)
+        for part in ["第一项", "第二项", "第三项"]:
+            bounded.append(part)
+        assert bounded.getvalue() == "第一项\n第二项\n第三项"
+        assert not bounded.truncated
+
+    def test_large_input_should_keep_head_and_tail_within_budget(self):
+        bounded = BoundedText(400, tail_ratio=0.25)
+        for i in range(10_000):
+            bounded.append(f"结果 {i}")
+        value = bounded.getvalue()
+        head, rest = value.split("\n…[", 1)
+        tail = rest.split("]…\n", 1)[1]
+        assert value.startswith("结果 0\n结果 1\n")
+        assert value.endswith("结果 9999")
+        assert utf8_len(head) <= 300
+        assert utf8_len(tail) <= 100
+        assert bounded.truncated
+        full = "\n".join(f"结果 {i}" for i in range(10_000))
+        assert bounded.total_chars == len(full)
+        kept = len(head) + len(tail)
+        assert bounded.omitted_chars == bounded.total_chars - kept
+
+    def test_single_oversized_item_should_be_clipped(self):
+        value = truncate_text("A" * 100_000 + "Z" * 10, 100)
+        assert value.startswith("A" * 75)
+        assert value.endswith("Z" * 10)
+        assert "已省略" in value
+
+    def test_truncate_text_should_return_short_text_unchanged(self):
+        text = "北京: 晴"
+        assert truncate_text(text, 1024) is text
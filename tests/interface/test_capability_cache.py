@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import pytest
+from fastmcp import Client, FastMCP
+from personal_agent.mcp.capability_cache import CapabilityCache
+from personal_agent.mcp.connection_manager import MCPConnectionManager
+from personal_agent.mcp.server_registry_async import ThreadedServerRegistry
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.util.metrics import MetricsRegistry
+
+
+def make_server(name: str, *tool_names: str) -> FastMCP:
+    server = FastMCP(name)
+    for tool_name in tool_names:
+
+        def tool(query: str) -> str:
+            return query
+
+        server.tool(tool, name=tool_name, description=f"{name} {tool_name}")
+    return server
+
+
+class SlowListToolsManager(MCPConnectionManager):
+    """list_tools 带可调延迟，并记录调用次数"""
+
+    def __init__(self, *args, delays=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays = delays or {}
+        self.calls = []
+
+    async def list_tools(self, name):
+        self.calls.append(name)
+        await asyncio.sleep(self.delays.get(name, 0))
+        return await super().list_tools(name)
+
+
+class TestCapabilityCache:
+    registry: MemoryServerRegistry
+    manager: SlowListToolsManager
+    metrics: MetricsRegistry
+
+    @pytest.fixture(autouse=True)
+    def setup_cache(self):
+        servers = {
+            "http://amap.local/sse": make_server("amap", "maps_weather", "maps_route"),
+            "http://search.local/sse": make_server("search", "web_search"),
+            "http://slow.local/sse": make_server("slow", "slow_tool"),
+        }
+        self.registry = MemoryServerRegistry()
+        self.manager = SlowListToolsManager(
+            self.registry, client_factory=lambda url: Client(servers[url])
+        )
+        self.metrics = MetricsRegistry()
+        self.registry.add_server("amap", "http://amap.local/sse")
+        self.registry.add_server("search", "http://search.local/sse")
+
+    def make_cache(self, **kwargs) -> CapabilityCache:
+        return CapabilityCache(
+            self.registry, self.manager, metrics=self.metrics, **kwargs
+        )
+
+    @pytest.mark.asyncio
+    async def test_tools_should_be_aggregated_across_servers(self):
+        cache = self.make_cache()
+        tools = await cache.get_tools()
+        assert [t.qualified_name for t in tools] == [
+            "amap.maps_weather",
+            "amap.maps_route",
+            "search.web_search",
+        ]
+        assert tools[0].input_schema["properties"] == {"query": {"type": "string"}}
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_server_list_should_be_read_off_the_loop(self):
+        offloaded = ThreadedServerRegistry(self.registry)
+        cache = self.make_cache(async_server_registry=offloaded)
+        threads = []
+        original = self.registry.list_servers
+
+        def list_servers(*args):
+            threads.append(threading.get_ident())
+            return original(*args)
+
+        self.registry.list_servers = list_servers
+        tools = await cache.get_tools()
+        assert len(tools) == 3
+        assert threads and threading.get_ident() not in threads
+        offloaded.close()
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_second_query_should_hit_cache(self):
+        cache = self.make_cache()
+        await cache.get_tools()
+        await cache.get_tools()
+        assert sorted(self.manager.calls) == ["amap", "search"]
+        assert cache.stats()["misses"] == 2
+        assert cache.stats()["hits"] == 2
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_servers_should_be_fetched_in_parallel(self):
+        self.manager.delays = {"amap": 0.2, "search": 0.2}
+        cache = self.make_cache()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await cache.get_tools()
+        assert loop.time() - start < 0.35
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_slow_server_should_not_block_query(self):
+        self.registry.add_server("slow", "http://slow.local/sse")
+        self.manager.delays = {"slow": 0.3}
+        cache = self.make_cache(fetch_wait=0.05)
+        tools = await cache.get_tools()
+        assert "slow.slow_tool" not in [t.qualified_name for t in tools]
+        # 慢服务器在后台完成后，下一轮即可使用
+        await asyncio.sleep(0.4)
+        tools = await cache.get_tools()
+        assert "slow.slow_tool" in [t.qualified_name for t in tools]
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_should_refresh_in_background(self):
+        cache = self.make_cache(server_ttls={"amap": 0.01})
+        await cache.get_tools()
+        await asyncio.sleep(0.02)
+        self.manager.delays = {"amap": 0.2}
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tools = await cache.get_tools()
+        # 过期数据立即返回，不等待刷新
+        assert loop.time() - start < 0.1
+        assert len(tools) == 3
+        assert cache.stats()["refreshes"] == 1
+        await asyncio.sleep(0.3)
+        assert self.manager.calls.count("amap") == 2
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_registry_change_should_invalidate(self):
+        cache = self.make_cache()
+        await cache.get_tools()
+        self.registry.remove_server("search")
+        assert [t.server for t in await cache.get_tools()] == ["amap", "amap"]
+        self.registry.edit_server("amap", "http://slow.local/sse")
+        tools = await cache.get_tools()
+        assert [t.qualified_name for t in tools] == ["amap.slow_tool"]
+        await self.manager.close_all()
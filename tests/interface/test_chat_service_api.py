@@ -2,6 +2,17 @@ from unittest.mock import AsyncMock
 import pytest
 from personal_agent.chat import Container as ChatContainer
 from personal_agent.chat import ChatService
+from personal_agent.config.config import ChatConfig, LLMConfig
+
+
+class StubConfiger:
+    """只提供 LLM 与聊天配置的测试配置源"""
+
+    def get_llm_config(self):
+        return LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+
+    def get_chat_config(self):
+        return ChatConfig()
 
 
 class TestChatServiceApi:
@@ -19,7 +30,7 @@ class TestChatServiceApi:
         self.mock_llm_adapter.chat.side_effect = mock_chat
 
         container = ChatContainer(
-            configer=lambda: None, llm_adapter=self.mock_llm_adapter
+            configer=StubConfiger, llm_adapter=self.mock_llm_adapter
         )
         self.service = container.chat_service()
 
@@ -43,3 +54,59 @@ class TestChatServiceApi:
         # 清除上下文
         self.service.clear_context()
         assert self.service.get_context() == []
+
+
+class TestChatServiceStreamApi:
+    mock_llm_adapter: AsyncMock
+    service: ChatService
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self):
+        self.mock_llm_adapter = AsyncMock()
+
+        async def mock_stream(messages):
+            for token in ["mocked ", "stream ", messages[-1]["content"]]:
+                yield token
+
+        self.mock_llm_adapter.stream = mock_stream
+
+        container = ChatContainer(
+            configer=StubConfiger, llm_adapter=self.mock_llm_adapter
+        )
+        self.service = container.chat_service()
+
+    @pytest.mark.asyncio
+    async def test_stream_response_should_yield_chunks_in_order(self):
+        chunks = [chunk async for chunk in self.service.stream_response("hello")]
+        assert chunks == ["mocked ", "stream ", "hello"]
+
+    @pytest.mark.asyncio
+    async def test_stream_response_should_commit_full_reply_to_context(self):
+        async for _ in self.service.stream_response("hi"):
+            # 流结束前不应写入上下文
+            assert self.service.get_context() == []
+
+        assert self.service.get_context() == [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "mocked stream hi"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_response_should_record_time_to_first_token(self):
+        histogram = self.service.metrics.histogram("chat.time_to_first_token_seconds")
+        before = histogram.count
+        async for _ in self.service.stream_response("hi"):
+            pass
+        assert histogram.count == before + 1
+
+    @pytest.mark.asyncio
+    async def test_stream_response_failure_should_raise_connection_error(self):
+        async def broken_stream(_messages):
+            raise RuntimeError("boom")
+            yield  # pylint: disable=unreachable
+
+        self.mock_llm_adapter.stream = broken_stream
+        with pytest.raises(ConnectionError):
+            async for _ in self.service.stream_response("hi"):
+                pass
+        assert self.service.get_context() == []
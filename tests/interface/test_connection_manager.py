@@ -0,0 +1,196 @@
+import asyncio
+import anyio
+import pytest
+from fastmcp import Client, FastMCP
+from personal_agent.mcp.connection_manager import MCPConnectionManager
+from personal_agent.mcp.exceptions import MCPConnectionError, ServerNotFound
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+
+
+def make_weather_server() -> FastMCP:
+    server = FastMCP("weather")
+
+    @server.tool
+    def maps_weather(city: str) -> str:
+        """查询城市天气"""
+        return f"{city}: 晴"
+
+    return server
+
+
+class CountingClientFactory:
+    """把 URL 映射到进程内的 FastMCP 服务器，并记录创建的客户端"""
+
+    def __init__(self, servers):
+        self.servers = servers
+        self.clients = []
+
+    def __call__(self, url):
+        client = Client(self.servers[url])
+        self.clients.append(client)
+        return client
+
+
+class TestMCPConnectionManager:
+    registry: MemoryServerRegistry
+    factory: CountingClientFactory
+    manager: MCPConnectionManager
+
+    @pytest.fixture(autouse=True)
+    def setup_manager(self):
+        self.registry = MemoryServerRegistry()
+        self.factory = CountingClientFactory(
+            {
+                "http://weather.local/sse": make_weather_server(),
+                "http://weather2.local/sse": make_weather_server(),
+            }
+        )
+        self.manager = MCPConnectionManager(
+            self.registry, client_factory=self.factory, base_backoff=0.01
+        )
+        self.registry.add_server("weather", "http://weather.local/sse")
+
+    @pytest.mark.asyncio
+    async def test_client_should_be_created_lazily_and_reused(self):
+        assert not self.factory.clients
+        for city in ["北京", "上海", "广州"]:
+            result = await self.manager.call_tool(
+                "weather", "maps_weather", {"city": city}
+            )
+            assert result.data == f"{city}: 晴"
+        assert len(self.factory.clients) == 1
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_calls_should_share_one_connection(self):
+        await asyncio.gather(
+            *(
+                self.manager.call_tool("weather", "maps_weather", {"city": str(i)})
+                for i in range(10)
+            )
+        )
+        assert len(self.factory.clients) == 1
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_dropped_connection_should_reconnect(self):
+        await self.manager.list_tools("weather")
+        await self.factory.clients[0].close()
+        assert not self.manager.is_connected("weather")
+        tools = await self.manager.list_tools("weather")
+        assert [t.name for t in tools] == ["maps_weather"]
+        assert len(self.factory.clients) == 2
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_tool_call_dropped_after_sending_should_not_be_retried(self):
+        await self.manager.list_tools("weather")
+        client = self.factory.clients[0]
+        call_tool = client.call_tool
+        sent = []
+
+        async def reset_after_sending(tool, arguments):
+            sent.append(await call_tool(tool, arguments))
+            raise ConnectionResetError("connection reset")
+
+        client.call_tool = reset_after_sending
+        with pytest.raises(MCPConnectionError):
+            await self.manager.call_tool("weather", "maps_weather", {"city": "北京"})
+        assert len(sent) == 1
+        assert len(self.factory.clients) == 1
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_tool_call_failing_before_sending_should_be_retried(self):
+        await self.manager.list_tools("weather")
+
+        async def closed(tool, arguments):
+            raise anyio.ClosedResourceError()
+
+        self.factory.clients[0].call_tool = closed
+        result = await self.manager.call_tool(
+            "weather", "maps_weather", {"city": "北京"}
+        )
+        assert result.data == "北京: 晴"
+        assert len(self.factory.clients) == 2
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_handshake_should_close_client(self):
+        closed = []
+
+        class SlowClient:
+            async def __aenter__(self):
+                await asyncio.sleep(1)
+
+            async def close(self):
+                closed.append(self)
+
+        manager = MCPConnectionManager(
+            self.registry, client_factory=lambda url: SlowClient()
+        )
+        connecting = asyncio.ensure_future(manager.get_client("weather"))
+        await asyncio.sleep(0.01)
+        connecting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await connecting
+        assert len(closed) == 1
+
+    @pytest.mark.asyncio
+    async def test_remove_server_should_close_client(self):
+        await self.manager.list_tools("weather")
+        client = self.factory.clients[0]
+        self.registry.remove_server("weather")
+        await asyncio.sleep(0.05)
+        assert not client.is_connected()
+        with pytest.raises(ServerNotFound):
+            await self.manager.list_tools("weather")
+
+    @pytest.mark.asyncio
+    async def test_edit_server_should_reconnect_to_new_url(self):
+        await self.manager.list_tools("weather")
+        self.registry.edit_server("weather", "http://weather2.local/sse")
+        await self.manager.list_tools("weather")
+        assert len(self.factory.clients) == 2
+        assert not self.factory.clients[0].is_connected()
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_server_should_back_off(self):
+        attempts = []
+
+        def broken_factory(url):
+            attempts.append(url)
+            return Client("http://127.0.0.1:9/sse", timeout=0.5)
+
+        manager = MCPConnectionManager(
+            self.registry,
+            client_factory=broken_factory,
+            connect_attempts=2,
+            base_backoff=0.2,
+            max_backoff=0.2,
+        )
+        with pytest.raises(MCPConnectionError):
+            await manager.list_tools("weather")
+        assert len(attempts) == 2
+        # 退避期内直接失败，不再发起连接
+        with pytest.raises(MCPConnectionError):
+            await manager.list_tools("weather")
+        assert len(attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_health_check_should_report_connection_state(self):
+        assert await self.manager.check_health("weather") is True
+        assert await self.manager.check_health("missing") is False
+        await self.manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_health_check_should_not_keep_probe_connection(self):
+        assert await self.manager.check_health("weather") is True
+        assert not self.manager.is_connected("weather")
+        assert not self.factory.clients[0].is_connected()
+        # 已有长连接时在该连接上探测，不再新建客户端
+        await self.manager.list_tools("weather")
+        assert await self.manager.check_health("weather") is True
+        assert len(self.factory.clients) == 2
+        await self.manager.close_all()
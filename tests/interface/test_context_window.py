@@ -0,0 +1,242 @@
+import asyncio
+import pytest
+from personal_agent.chat.context_window import (
+    BackgroundSummarizePolicy,
+    ContextWindow,
+    LastTurnsPolicy,
+    SlidingWindowPolicy,
+    SummarizePolicy,
+    TokenCounter,
+)
+from personal_agent.chat.request_scope import (
+    PRIORITY_INTERACTIVE,
+    current_scope,
+    scheduling,
+)
+from personal_agent.config.config import ContextWindowConfig, LLMConfig
+from personal_agent.util.metrics import MetricsRegistry
+
+
+class FixedTokenCounter(TokenCounter):
+    """每条消息按固定 10 个 token 计数，便于断言窗口边界"""
+
+    MESSAGE_OVERHEAD = 0
+
+    def count_text(self, text: str) -> int:
+        return 10
+
+
+def make_history(turns: int, with_system: bool = False):
+    history = [{"role": "system", "content": "you are helpful"}] if with_system else []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+class TestContextWindow:
+
+    @pytest.mark.asyncio
+    async def test_short_history_should_be_sent_in_full(self):
+        window = ContextWindow(1000, SlidingWindowPolicy(), FixedTokenCounter())
+        history = make_history(3)
+        messages = await window.build(history, "new")
+        assert messages == history + [{"role": "user", "content": "new"}]
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_should_keep_newest_within_budget(self):
+        # 预算 50：新消息占 10，历史最多保留 4 条
+        window = ContextWindow(50, SlidingWindowPolicy(), FixedTokenCounter())
+        history = make_history(10)
+        messages = await window.build(history, "new")
+        assert messages[:-1] == history[-4:]
+        assert messages[0]["role"] == "user"
+
+    @pytest.mark.asyncio
+    async def test_system_prompt_should_always_be_kept(self):
+        window = ContextWindow(50, SlidingWindowPolicy(), FixedTokenCounter())
+        history = make_history(10, with_system=True)
+        messages = await window.build(history, "new")
+        assert messages[0] == history[0]
+        assert len(messages) == 4
+        assert messages[1]["role"] == "user"
+
+    @pytest.mark.asyncio
+    async def test_last_turns_should_keep_only_n_turns(self):
+        window = ContextWindow(1000, LastTurnsPolicy(2), FixedTokenCounter())
+        history = make_history(10, with_system=True)
+        messages = await window.build(history, "new")
+        assert messages[:-1] == [history[0]] + history[-4:]
+
+    @pytest.mark.asyncio
+    async def test_summarize_should_compress_dropped_messages_incrementally(self):
+        calls = []
+
+        async def summarizer(previous, messages):
+            calls.append((previous, [m["content"] for m in messages]))
+            return f"summary of {len(messages)}"
+
+        window = ContextWindow(90, SummarizePolicy(summarizer), FixedTokenCounter())
+        history = make_history(10)
+        messages = await window.build(history, "new")
+        assert messages[0]["role"] == "system"
+        assert "summary of" in messages[0]["content"]
+        assert messages[-1] == {"role": "user", "content": "new"}
+        # 预算 80 中预留 20 给摘要，保留最近 6 条，其余 14 条被压缩
+        assert len(calls) == 1 and len(calls[0][1]) == 14
+        assert messages[1:-1] == history[-6:]
+
+        # 再来一轮，仅新滑出窗口的消息参与摘要
+        history += [
+            {"role": "user", "content": "question 10"},
+            {"role": "assistant", "content": "answer 10"},
+        ]
+        await window.build(history, "again")
+        assert len(calls) == 2
+        assert calls[1][0].startswith("summary")
+        assert calls[1][1] == ["question 7", "answer 7"]
+
+    @pytest.mark.asyncio
+    async def test_reloaded_history_should_not_reuse_summary(self):
+        calls = []
+
+        async def summarizer(previous, messages):
+            calls.append(previous)
+            return f"summary of {len(messages)}"
+
+        window = ContextWindow(90, SummarizePolicy(summarizer), FixedTokenCounter())
+        await window.build(make_history(10), "new")
+        # 重新加载会话得到的是新的列表，长度相同但内容不同
+        reloaded = make_history(10)[2:] + make_history(1)
+        messages = await window.build(reloaded, "again")
+        assert calls == [None, None]
+        assert messages[0]["content"].endswith("summary of 14")
+        assert messages[1:-1] == reloaded[-6:]
+
+    @pytest.mark.asyncio
+    async def test_inline_summary_should_keep_caller_priority(self):
+        scopes = []
+
+        class RecordingAdapter:
+            async def chat(self, messages):
+                scopes.append(current_scope())
+                return f"summary of {len(messages)}"
+
+        llm_config = LLMConfig(
+            provider="fake",
+            model="fake-model",
+            api_key="fake-key",
+            context=ContextWindowConfig(policy="summarize", budget_tokens=90),
+        )
+        window = ContextWindow.from_config(llm_config, RecordingAdapter())
+        window.counter = FixedTokenCounter()
+        with scheduling(PRIORITY_INTERACTIVE, "s1"):
+            await window.build(make_history(10), "new")
+        assert scopes == [(PRIORITY_INTERACTIVE, "s1")]
+
+
+class TestBackgroundSummarize:
+
+    @staticmethod
+    def make_window(summarizer, metrics):
+        # 预算 80（新消息占 10）：预留 20 给摘要，未摘要部分超过 48 即开始摘要
+        policy = BackgroundSummarizePolicy(summarizer, 0.8, metrics)
+        return ContextWindow(90, policy, FixedTokenCounter()), policy
+
+    @pytest.mark.asyncio
+    async def test_turn_should_not_wait_for_summary(self):
+        release = asyncio.Event()
+        calls = []
+
+        async def summarizer(previous, messages):
+            calls.append((previous, [m["content"] for m in messages]))
+            await release.wait()
+            return f"summary of {len(messages)}"
+
+        metrics = MetricsRegistry()
+        window, policy = self.make_window(summarizer, metrics)
+        history = make_history(10)
+        # 摘要尚未完成：直接按预算裁剪，本轮与下一轮都不等待摘要
+        messages = await window.build(history, "new")
+        assert messages[:-1] == history[-8:]
+        await asyncio.sleep(0)
+        messages = await window.build(history, "again")
+        assert messages[:-1] == history[-8:]
+        assert len(calls) == 1 and calls[0][0] is None
+        # 保留最近 30 个 token 的原文，其余 18 条交给摘要
+        assert len(calls[0][1]) == 18
+
+        release.set()
+        await policy.wait_idle()
+        messages = await window.build(history, "next")
+        assert messages[0]["role"] == "system"
+        assert messages[0]["content"].endswith("summary of 18")
+        assert messages[1:-1] == history[18:]
+        snapshot = metrics.snapshot()["counters"]
+        assert snapshot["chat.summary.runs"] == 1
+        assert snapshot["chat.summary.swaps"] == 1
+        assert snapshot["chat.summary.input_tokens"] == 180
+        assert snapshot["chat.summary.output_tokens"] == 10
+        assert snapshot["chat.summary.window_overflows"] == 2
+
+    @pytest.mark.asyncio
+    async def test_new_history_should_discard_pending_summary(self):
+        started = asyncio.Event()
+
+        async def summarizer(_previous, _messages):
+            started.set()
+            await asyncio.Event().wait()
+
+        window, policy = self.make_window(summarizer, MetricsRegistry())
+        await window.build(make_history(10), "new")
+        await started.wait()
+        task = policy._task  # pylint: disable=W0212
+        # 清空会话后换成新的历史列表，进行中的摘要被取消
+        history = make_history(1)
+        assert await window.build(history, "new") == history + [
+            {"role": "user", "content": "new"}
+        ]
+        await asyncio.wait({task})
+        assert task.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_failed_summary_should_be_counted_and_retried(self):
+        calls = []
+
+        async def summarizer(_previous, messages):
+            calls.append(len(messages))
+            raise RuntimeError("model unavailable")
+
+        metrics = MetricsRegistry()
+        window, policy = self.make_window(summarizer, metrics)
+        history = make_history(10)
+        await window.build(history, "new")
+        await policy.wait_idle()
+        messages = await window.build(history, "again")
+        await policy.wait_idle()
+        assert messages[:-1] == history[-8:]
+        assert calls == [18, 18]
+        assert metrics.snapshot()["counters"]["chat.summary.failures"] == 2
+
+
+class TestTokenCounter:
+
+    def test_count_should_be_cached_per_message_content(self):
+        counted = []
+
+        class RecordingCounter(TokenCounter):
+            def count_text(self, text: str) -> int:
+                counted.append(text)
+                return 1
+
+        counter = RecordingCounter()
+        message = {"role": "user", "content": "hello"}
+        counter.count(message)
+        counter.count(dict(message))
+        assert counted == ["hello"]
+
+    def test_count_should_grow_with_content(self):
+        counter = TokenCounter()
+        short = counter.count({"role": "user", "content": "hi"})
+        long = counter.count({"role": "user", "content": "hi " * 200})
+        assert long > short
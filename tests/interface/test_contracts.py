@@ -0,0 +1,44 @@
+import icontract
+import pytest
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.util import contracts
+
+
+@pytest.fixture(autouse=True)
+def restore_mode(monkeypatch):
+    # 测试中切换模式时不受 conftest 设置的环境变量影响
+    monkeypatch.delenv(contracts.ENV_VAR, raising=False)
+    yield
+    contracts.configure(contracts.MODE_FULL)
+
+
+class TestContractModes:
+
+    def test_implementation_should_inherit_interface_contracts(self):
+        contracts.configure(contracts.MODE_FULL)
+        with pytest.raises(icontract.ViolationError, match="合法的 URL"):
+            MemoryServerRegistry().add_server("demo", "not a url")
+
+    def test_off_mode_should_skip_checks(self):
+        contracts.configure(contracts.MODE_OFF)
+        assert MemoryServerRegistry().add_server("demo", "not a url")
+
+    def test_sampled_mode_should_check_a_fraction_of_calls(self):
+        contracts.configure(contracts.MODE_SAMPLED, sample_rate=0.25)
+        registry = MemoryServerRegistry()
+        violations = 0
+        for i in range(100):
+            try:
+                registry.add_server(f"s{i}", "not a url")
+            except icontract.ViolationError:
+                violations += 1
+        assert violations == 25
+
+    def test_env_var_should_take_precedence(self, monkeypatch):
+        monkeypatch.setenv(contracts.ENV_VAR, "off")
+        assert contracts.configure(contracts.MODE_FULL) == contracts.MODE_OFF
+        assert contracts.current_mode() == contracts.MODE_OFF
+
+    def test_unknown_mode_should_be_rejected(self):
+        with pytest.raises(ValueError):
+            contracts.configure("sometimes")
@@ -0,0 +1,138 @@
+import threading
+from unittest.mock import AsyncMock
+import pytest
+from personal_agent.chat.api.conversation_store import ConversationStore
+from personal_agent.chat.chat_service_impl import ChatServiceImpl
+from personal_agent.chat.context_window import ContextWindow
+from personal_agent.chat.conversation_store_memory import MemoryConversationStore
+from personal_agent.chat.conversation_store_sqlite import SqliteConversationStore
+
+
+def turn(i):
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+class TestConversationStore:
+
+    store: ConversationStore
+
+    @pytest.fixture(autouse=True, params=["memory", "sqlite"])
+    def setup_store(self, request, tmp_path):
+        if request.param == "memory":
+            self.store = MemoryConversationStore()
+        else:
+            self.store = SqliteConversationStore(tmp_path / "history.db")
+
+    def test_append_should_keep_order_across_batches(self):
+        for i in range(5):
+            self.store.append("s1", turn(i))
+        batches = list(self.store.iter_reverse("s1", batch_size=3))
+        assert [len(b) for b in batches] == [3, 3, 3, 1]
+        history = [m for batch in reversed(batches) for m in batch]
+        assert history == [m for i in range(5) for m in turn(i)]
+        assert self.store.count("s1") == 10
+
+    def test_sessions_should_be_isolated(self):
+        self.store.append("s1", turn(1))
+        self.store.append("s2", turn(2))
+        assert list(self.store.iter_reverse("s2")) == [turn(2)]
+
+    def test_clear_should_remove_history(self):
+        self.store.append("s1", turn(1))
+        self.store.clear("s1")
+        assert not list(self.store.iter_reverse("s1"))
+        self.store.append("s1", turn(2))
+        assert self.store.count("s1") == 2
+
+    def test_revision_should_advance_on_every_write(self):
+        assert self.store.revision("s1") == 0
+        self.store.append("s1", turn(1))
+        self.store.append("s1", turn(2))
+        self.store.clear("s1")
+        assert self.store.revision("s1") == 3
+        assert self.store.revision("s2") == 0
+
+
+class TestSharedSqliteStore:
+
+    def test_writers_on_same_file_should_not_collide(self, tmp_path):
+        path = tmp_path / "history.db"
+        first, second = SqliteConversationStore(path), SqliteConversationStore(path)
+        for i in range(3):
+            first.append("s1", turn(2 * i))
+            second.append("s1", turn(2 * i + 1))
+        history = [
+            m for batch in reversed(list(first.iter_reverse("s1"))) for m in batch
+        ]
+        assert history == [m for i in range(6) for m in turn(i)]
+        assert second.revision("s1") == 6
+
+    @pytest.mark.asyncio
+    async def test_services_should_see_each_others_turns(self, tmp_path):
+        path = tmp_path / "history.db"
+        adapter = AsyncMock()
+        adapter.chat.return_value = "ok"
+        first = ChatServiceImpl(adapter, store=SqliteConversationStore(path))
+        second = ChatServiceImpl(adapter, store=SqliteConversationStore(path))
+        await first.get_response("from first")
+        await second.get_response("from second")
+        await first.get_response("again")
+        assert [m["content"] for m in first.get_context() if m["role"] == "user"] == [
+            "from first",
+            "from second",
+            "again",
+        ]
+
+
+class TestConversationResume:
+
+    @pytest.mark.asyncio
+    async def test_history_should_survive_restart(self, tmp_path):
+        path = tmp_path / "history.db"
+        adapter = AsyncMock()
+        adapter.chat.return_value = "hi Alice"
+        service = ChatServiceImpl(adapter, store=SqliteConversationStore(path))
+        await service.get_response("my name is Alice")
+
+        restarted = ChatServiceImpl(adapter, store=SqliteConversationStore(path))
+        assert restarted.get_context() == [
+            {"role": "user", "content": "my name is Alice"},
+            {"role": "assistant", "content": "hi Alice"},
+        ]
+
+    def test_resume_should_load_only_tail_within_budget(self):
+        store = MemoryConversationStore()
+        for i in range(1000):
+            store.append("default", turn(i))
+        window = ContextWindow(budget_tokens=100)
+        service = ChatServiceImpl(AsyncMock(), context_window=window, store=store)
+        context = service.get_context()
+        assert 0 < len(context) < 20
+        assert context[-1] == {"role": "assistant", "content": "answer 999"}
+        assert context[0]["role"] == "user"
+
+    @pytest.mark.asyncio
+    async def test_store_io_should_run_off_the_event_loop(self, tmp_path):
+        threads = []
+
+        class RecordingStore(SqliteConversationStore):
+            def append(self, session_id, messages):
+                threads.append(threading.get_ident())
+                super().append(session_id, messages)
+
+            def revision(self, session_id):
+                threads.append(threading.get_ident())
+                return super().revision(session_id)
+
+        adapter = AsyncMock()
+        adapter.chat.return_value = "ok"
+        service = ChatServiceImpl(adapter, store=RecordingStore(tmp_path / "h.db"))
+        await service.get_response("first")
+        await service.get_response("second")
+        # 首轮加载读一次修订号，之后每轮各一次比对与一次追加
+        assert len(threads) == 4
+        assert threading.get_ident() not in threads
+        assert len(service.get_context()) == 4
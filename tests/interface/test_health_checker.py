@@ -0,0 +1,173 @@
+import asyncio
+import pytest
+from personal_agent.mcp.health_checker import (
+    STATUS_DOWN,
+    STATUS_HEALTHY,
+    STATUS_SLOW,
+    HealthChecker,
+)
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.mcp.tool_index import ToolIndex
+from personal_agent.mcp.tool_service_impl import ToolServiceImpl
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry
+
+
+class FakeConnectionManager:
+    """按服务器设定探测耗时与结果，并记录同时进行的探测数"""
+
+    def __init__(self, delays=None, down=()):
+        self.delays = delays or {}
+        self.down = set(down)
+        self.running = 0
+        self.max_running = 0
+        self.probes = 0
+
+    async def check_health(self, name):
+        self.probes += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0.01))
+        finally:
+            self.running -= 1
+        return name not in self.down
+
+
+class FakeCapabilityCache:
+    def __init__(self, tools):
+        self.tools = tools
+
+    async def get_tools(self):
+        return self.tools
+
+    def subscribe(self, listener):
+        for server in {tool.server for tool in self.tools}:
+            listener(server, [t for t in self.tools if t.server == server])
+
+
+def make_checker(registry, manager, **kwargs):
+    return HealthChecker(registry, manager, metrics=MetricsRegistry(), **kwargs)
+
+
+@pytest.fixture
+def registry():
+    registry = MemoryServerRegistry()
+    for name in ["fast", "slow", "dead"]:
+        registry.add_server(name, f"http://{name}.local/sse")
+    return registry
+
+
+class TestHealthChecker:
+
+    @pytest.mark.asyncio
+    async def test_check_all_should_classify_servers(self, registry):
+        manager = FakeConnectionManager(delays={"slow": 0.1}, down={"dead"})
+        checker = make_checker(registry, manager, slow_threshold=0.05, down_after=2)
+        await checker.check_all()
+        await checker.check_all()
+
+        assert checker.get("fast")["status"] == STATUS_HEALTHY
+        assert checker.get("fast")["availability"] == 1.0
+        assert checker.get("slow")["status"] == STATUS_SLOW
+        assert checker.get("slow")["p95"] >= 0.1
+        assert checker.get("dead")["status"] == STATUS_DOWN
+        assert checker.get("dead")["availability"] == 0.0
+        assert checker.get("dead")["last_error"]
+        assert checker.unavailable_servers() == {"slow", "dead"}
+        assert checker.is_available("fast")
+
+    @pytest.mark.asyncio
+    async def test_probes_should_respect_concurrency_limit(self):
+        registry = MemoryServerRegistry()
+        for i in range(20):
+            registry.add_server(f"s{i}", f"http://s{i}.local/sse")
+        manager = FakeConnectionManager()
+        checker = make_checker(registry, manager, concurrency=4)
+        await checker.check_all()
+        assert manager.probes == 20
+        assert manager.max_running == 4
+
+    @pytest.mark.asyncio
+    async def test_check_all_should_page_through_registry(self):
+        pages = []
+
+        class PagingRegistry(MemoryServerRegistry):
+            def list_servers(self, offset=0, limit=None, host=None, tag=None):
+                pages.append(limit)
+                return super().list_servers(offset, limit, host, tag)
+
+        registry = PagingRegistry()
+        registry.add_servers(
+            [{"name": f"s{i}", "url": f"http://s{i}.local/sse"} for i in range(300)]
+        )
+        manager = FakeConnectionManager()
+        checker = make_checker(registry, manager, concurrency=300)
+        await checker.check_all()
+        assert manager.probes == 300
+        assert pages == [256, 256]
+
+    @pytest.mark.asyncio
+    async def test_probe_timeout_should_count_as_failure(self, registry):
+        manager = FakeConnectionManager(delays={"slow": 1.0})
+        checker = make_checker(registry, manager, timeout=0.05, down_after=1)
+        health = await checker.check("slow")
+        assert health["status"] == STATUS_DOWN
+        assert "超时" in health["last_error"]
+
+    @pytest.mark.asyncio
+    async def test_recovered_server_should_become_available(self, registry):
+        manager = FakeConnectionManager(down={"dead"})
+        checker = make_checker(registry, manager, down_after=1)
+        await checker.check("dead")
+        assert not checker.is_available("dead")
+        manager.down.clear()
+        await checker.check("dead")
+        assert checker.is_available("dead")
+        assert checker.get("dead")["availability"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_edit_should_reset_and_discard_in_flight_probe(self, registry):
+        manager = FakeConnectionManager(delays={"dead": 0.05}, down={"dead"})
+        checker = make_checker(registry, manager, down_after=1)
+        await checker.check("dead")
+        probe = asyncio.create_task(checker.check("dead"))
+        await asyncio.sleep(0.01)
+        registry.edit_server("dead", "http://dead2.local/sse")
+        assert await probe is None
+        assert checker.get("dead") is None
+        assert checker.is_available("dead")
+
+    @pytest.mark.asyncio
+    async def test_background_task_should_probe_on_interval(self, registry):
+        manager = FakeConnectionManager()
+        checker = make_checker(registry, manager, interval=0.05)
+        checker.start()
+        await asyncio.sleep(0.18)
+        await checker.stop()
+        assert not checker.running
+        rounds = manager.probes // 3
+        assert 2 <= rounds <= 5
+        probes = manager.probes
+        await asyncio.sleep(0.1)
+        assert manager.probes == probes
+
+    @pytest.mark.asyncio
+    async def test_tool_service_should_skip_unavailable_servers(self, registry):
+        manager = FakeConnectionManager(down={"dead"})
+        checker = make_checker(registry, manager, down_after=1)
+        tools = [
+            ToolDescription("weather", "查询 weather 天气", "fast"),
+            ToolDescription("weather_backup", "查询 weather 天气 备用", "dead"),
+        ]
+        service = ToolServiceImpl(
+            FakeCapabilityCache(tools),
+            manager,
+            tool_index=ToolIndex(),
+            health_checker=checker,
+        )
+        assert len(await service.search_tools("weather", 5)) == 2
+
+        await checker.check_all()
+        assert [t.server for t in await service.list_tools()] == ["fast"]
+        assert [t.server for t in await service.search_tools("weather", 5)] == ["fast"]
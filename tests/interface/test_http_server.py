@@ -0,0 +1,193 @@
+import asyncio
+import json
+import httpx
+import pytest
+from starlette.testclient import TestClient
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.config.config import ChatConfig, LLMConfig, ServerConfig
+from personal_agent.mcp.server_registry_async import ThreadedServerRegistry
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.server.admission import AdmissionController, Overloaded
+from personal_agent.server.http_app import create_app
+
+
+class ChunkedEchoLLMAdapter(LLMAdapter):
+    """回显最后一条用户消息，流式时逐字产出"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def chat(self, messages):
+        await asyncio.sleep(self.delay)
+        return f"echo {messages[-1]['content']}"
+
+    async def stream(self, messages):
+        for char in await self.chat(messages):
+            yield char
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+class StubConfiger:
+    def get_llm_config(self):
+        return LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+
+    def get_chat_config(self):
+        return ChatConfig()
+
+
+def make_app(delay: float = 0.0, **server_config):
+    container = ChatContainer(
+        configer=StubConfiger, llm_adapter=ChunkedEchoLLMAdapter(delay)
+    )
+    return create_app(
+        container.session_chat_service(),
+        ThreadedServerRegistry(MemoryServerRegistry(), offload=False),
+        ServerConfig(**server_config),
+    )
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+class TestChatEndpoints:
+    client: TestClient
+
+    @pytest.fixture(autouse=True)
+    def setup_client(self):
+        with TestClient(make_app()) as client:
+            self.client = client
+            yield
+
+    def test_send_message_should_reply_and_keep_context(self):
+        response = self.client.post("/v1/sessions/s1/messages", json={"message": "hi"})
+        assert response.status_code == 200
+        assert response.json() == {"response": "echo hi"}
+        context = self.client.get("/v1/sessions/s1/context").json()["context"]
+        assert [m["role"] for m in context] == ["user", "assistant"]
+        assert self.client.delete("/v1/sessions/s1/context").status_code == 204
+        assert self.client.get("/v1/sessions/s1/context").json()["context"] == []
+
+    def test_invalid_message_should_be_rejected(self):
+        assert (
+            self.client.post("/v1/sessions/s1/messages", json={"message": " "})
+        ).status_code == 400
+        assert (
+            self.client.post("/v1/sessions/s1/messages", content=b"not json")
+        ).status_code == 400
+
+    def test_stream_should_send_sse_deltas(self):
+        response = self.client.post(
+            "/v1/sessions/s1/messages/stream", json={"message": "hi"}
+        )
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = sse_events(response.text)
+        assert events[-1] == ("done", {})
+        assert "".join(data["delta"] for _, data in events[:-1]) == "echo hi"
+
+    def test_websocket_should_stream_each_turn(self):
+        with self.client.websocket_connect("/v1/sessions/s1/ws") as ws:
+            for message in ("one", "two"):
+                ws.send_json({"message": message})
+                reply = ""
+                while True:
+                    frame = ws.receive_json()
+                    if frame.get("done"):
+                        break
+                    reply += frame["delta"]
+                assert reply == f"echo {message}"
+            ws.send_json({"nope": 1})
+            assert "error" in ws.receive_json()
+
+
+class TestServerEndpoints:
+    client: TestClient
+
+    @pytest.fixture(autouse=True)
+    def setup_client(self):
+        with TestClient(make_app()) as client:
+            self.client = client
+            yield
+
+    def test_server_crud(self):
+        created = self.client.post(
+            "/v1/servers",
+            json={"name": "amap", "url": "http://localhost:8000/sse", "tags": ["map"]},
+        )
+        assert created.status_code == 201
+        assert created.json()["tags"] == ["map"]
+        duplicate = self.client.post(
+            "/v1/servers", json={"name": "amap", "url": "http://localhost:9000"}
+        )
+        assert duplicate.status_code == 409
+        edited = self.client.put("/v1/servers/amap", json={"url": "http://other:1"})
+        assert edited.json()["url"] == "http://other:1"
+        assert self.client.get("/v1/servers/amap").json()["name"] == "amap"
+        assert self.client.delete("/v1/servers/amap").status_code == 204
+        assert self.client.get("/v1/servers/amap").status_code == 404
+        assert self.client.delete("/v1/servers/amap").status_code == 404
+
+    def test_invalid_server_should_be_rejected(self):
+        response = self.client.post(
+            "/v1/servers", json={"name": "bad", "url": "not a url"}
+        )
+        assert response.status_code == 400
+
+    def test_list_should_filter_and_paginate(self):
+        for i in range(5):
+            host = "a" if i % 2 == 0 else "b"
+            self.client.post(
+                "/v1/servers", json={"name": f"s{i}", "url": f"http://{host}:{i}"}
+            )
+        page = self.client.get("/v1/servers", params={"host": "a", "limit": 2}).json()
+        assert page["total"] == 3
+        assert [s["name"] for s in page["servers"]] == ["s0", "s2"]
+        assert self.client.get("/v1/servers", params={"limit": 0}).status_code == 400
+
+
+class TestBackpressure:
+
+    @pytest.mark.asyncio
+    async def test_controller_should_queue_then_reject(self):
+        controller = AdmissionController(max_in_flight=1, max_waiting=1)
+        first = await controller.acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        first.release()
+        first.release()  # 重复释放不应多放行
+        second = await queued
+        assert controller.in_flight == 1
+        controller.start_draining()
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        assert await controller.wait_idle(0.05) is False
+        second.release()
+        assert await controller.wait_idle(0.05) is True
+
+    @pytest.mark.asyncio
+    async def test_overloaded_server_should_answer_503(self):
+        app = make_app(delay=0.2, max_in_flight=1, max_waiting=0)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post(f"/v1/sessions/s{i}/messages", json={"message": "hi"})
+                    for i in range(3)
+                )
+            )
+        statuses = sorted(r.status_code for r in responses)
+        assert statuses == [200, 503, 503]
+        rejected = next(r for r in responses if r.status_code == 503)
+        assert rejected.headers["retry-after"] == "1"
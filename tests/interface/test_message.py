@@ -0,0 +1,80 @@
+import pytest
+from personal_agent.chat.context_window import (
+    ContextWindow,
+    SlidingWindowPolicy,
+    TokenCounter,
+)
+from personal_agent.chat.llm_adapter import OpenAICompatibleLLMAdapter
+from personal_agent.chat.message import ChatMessage
+from personal_agent.config.config import LLMConfig
+
+
+class FixedTokenCounter(TokenCounter):
+    MESSAGE_OVERHEAD = 0
+
+    def count_text(self, text: str) -> int:
+        return 10
+
+
+def make_history(turns: int):
+    history = [ChatMessage("system", "you are helpful")]
+    for i in range(turns):
+        history.append(ChatMessage("user", f"question {i}"))
+        history.append(ChatMessage("assistant", f"answer {i}"))
+    return history
+
+
+class TestChatMessage:
+
+    def test_message_should_behave_like_a_read_only_dict(self):
+        message = ChatMessage("user", "hi")
+        assert message == {"role": "user", "content": "hi"}
+        assert dict(message) == {"role": "user", "content": "hi"}
+        assert message["role"] == "user" and message.get("tool_calls") is None
+        assert "content" in message and "tool_call_id" not in message
+        assert not hasattr(message, "__dict__")
+
+    def test_roles_should_be_interned(self):
+        role = "".join(["assis", "tant"])
+        assert ChatMessage(role, "a").role is ChatMessage("assistant", "b").role
+
+    def test_of_should_reuse_existing_messages(self):
+        message = ChatMessage("user", "hi")
+        assert ChatMessage.of(message) is message
+        assert ChatMessage.of({"role": "user", "content": "hi"}) == message
+
+
+class TestConvertedCache:
+
+    def test_history_messages_should_be_converted_once(self):
+        adapter = OpenAICompatibleLLMAdapter(
+            LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+        )
+        history = make_history(2)
+        transient = {"role": "user", "content": "new"}
+        first = adapter._to_lc_messages(history + [transient])  # pylint: disable=W0212
+        second = adapter._to_lc_messages(history + [transient])  # pylint: disable=W0212
+        assert all(a is b for a, b in zip(first[:-1], second[:-1]))
+        assert first[-1] is not second[-1]
+        assert [m.content for m in first] == [m["content"] for m in history] + ["new"]
+
+    @pytest.mark.asyncio
+    async def test_messages_leaving_the_window_should_release_conversions(self):
+        # 预算 50：系统提示与新消息各占 10，历史保留最近 3 条后再去掉开头的助手回复
+        window = ContextWindow(50, SlidingWindowPolicy(), FixedTokenCounter())
+        history = make_history(4)
+        for message in history:
+            message.converted = object()
+        messages = await window.build(history, "new")
+        kept = {id(m) for m in messages}
+        for message in history:
+            if id(message) in kept:
+                assert message.converted is not None
+            else:
+                assert message.converted is None
+        assert history[0].converted is not None  # 系统提示固定在窗口中
+        # 下一轮窗口后移，上一轮窗口中滑出的消息随之释放
+        history.extend([ChatMessage("user", "q"), ChatMessage("assistant", "a")])
+        following = {id(m) for m in await window.build(history, "next")}
+        dropped = [m for m in messages[1:-1] if id(m) not in following]
+        assert dropped and all(m.converted is None for m in dropped)
@@ -0,0 +1,216 @@
+import asyncio
+import pytest
+from personal_agent.chat.exceptions import (
+    CircuitOpenError,
+    LLMRequestError,
+    LLMTimeoutError,
+)
+from personal_agent.chat.llm_adapter import LLMAdapter, OpenAICompatibleLLMAdapter
+from personal_agent.chat.resilience import CircuitBreaker, ResilientLLMAdapter
+from personal_agent.config.config import LLMConfig
+from personal_agent.devtools.fake_llm import FakeLLMServer, FakeStep
+from personal_agent.util.metrics import MetricsRegistry
+
+QUESTION = [{"role": "user", "content": "你好"}]
+
+
+class SlowStreamAdapter(LLMAdapter):
+    """首个片段立即返回，之后每个片段间隔 gap 秒，可在第 fail_after 个片段后断开"""
+
+    def __init__(self, gap=0.0, chunks=3, fail_after=None, first_delay=0.0):
+        self.gap = gap
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.first_delay = first_delay
+
+    async def chat(self, messages):
+        await asyncio.sleep(self.first_delay)
+        return "ok"
+
+    async def stream(self, messages):
+        await asyncio.sleep(self.first_delay)
+        for i in range(self.chunks):
+            if i == self.fail_after:
+                raise ConnectionError("connection reset")
+            if i:
+                await asyncio.sleep(self.gap)
+            yield str(i)
+
+    async def chat_with_tools(self, messages, tools):
+        raise NotImplementedError
+
+
+def make_adapter(server: FakeLLMServer, **kwargs) -> ResilientLLMAdapter:
+    config = LLMConfig(
+        provider="fake", model="fake-model", api_key="fake-key", api_base=server.url
+    )
+    kwargs.setdefault("base_backoff", 0.01)
+    kwargs.setdefault("metrics", MetricsRegistry())
+    return ResilientLLMAdapter(OpenAICompatibleLLMAdapter(config), **kwargs)
+
+
+class TestResilientLLMAdapter:
+
+    @pytest.mark.asyncio
+    async def test_server_error_should_be_retried(self):
+        plan = [FakeStep(status=500), FakeStep(status=503)]
+        async with FakeLLMServer(reply="ok", plan=plan) as server:
+            adapter = make_adapter(server)
+            assert await adapter.chat(QUESTION) == "ok"
+            assert len(server.requests) == 3
+            assert adapter.metrics.counter("llm.retries").value == 2
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_should_honor_retry_after(self):
+        plan = [FakeStep(status=429, retry_after=0.3)]
+        async with FakeLLMServer(reply="ok", plan=plan) as server:
+            adapter = make_adapter(server)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            assert await adapter.chat(QUESTION) == "ok"
+            assert loop.time() - start >= 0.3
+
+    @pytest.mark.asyncio
+    async def test_slow_attempt_should_time_out_and_retry(self):
+        async with FakeLLMServer(reply="ok", plan=[FakeStep(delay=2.0)]) as server:
+            adapter = make_adapter(server, attempt_timeout=0.3)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            assert await adapter.chat(QUESTION) == "ok"
+            assert loop.time() - start < 1.0
+
+    @pytest.mark.asyncio
+    async def test_total_deadline_should_bound_the_call(self):
+        async with FakeLLMServer(latency=2.0) as server:
+            adapter = make_adapter(server, attempt_timeout=0.2, total_timeout=0.5)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            with pytest.raises(LLMTimeoutError):
+                await adapter.chat(QUESTION)
+            assert loop.time() - start < 0.8
+
+    @pytest.mark.asyncio
+    async def test_client_error_should_not_be_retried(self):
+        async with FakeLLMServer(plan=[FakeStep(status=400)]) as server:
+            adapter = make_adapter(server)
+            with pytest.raises(LLMRequestError) as exc_info:
+                await adapter.chat(QUESTION)
+            assert isinstance(exc_info.value, ConnectionError)
+            assert len(server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_breaker_should_reject_until_reset(self):
+        plan = [FakeStep(status=500)] * 2
+        async with FakeLLMServer(reply="ok", plan=plan) as server:
+            adapter = make_adapter(
+                server, max_attempts=1, breaker=CircuitBreaker(2, reset_timeout=0.3)
+            )
+            for _ in range(2):
+                with pytest.raises(ConnectionError):
+                    await adapter.chat(QUESTION)
+            with pytest.raises(CircuitOpenError):
+                await adapter.chat(QUESTION)
+            assert len(server.requests) == 2
+            await asyncio.sleep(0.3)
+            assert await adapter.chat(QUESTION) == "ok"
+            assert adapter.breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_should_cut_tail_latency(self):
+        async with FakeLLMServer(reply="ok", plan=[FakeStep(delay=2.0)]) as server:
+            adapter = make_adapter(server, hedge=True, hedge_min_samples=5)
+            for _ in range(5):
+                adapter.latency.observe(0.05)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            assert await adapter.chat(QUESTION) == "ok"
+            assert loop.time() - start < 0.5
+            assert len(server.requests) == 2
+            assert adapter.metrics.counter("llm.hedged_requests").value == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_should_retry_before_first_chunk(self):
+        reply = "这是一段流式回复"
+        async with FakeLLMServer(reply=reply, plan=[FakeStep(status=502)]) as server:
+            adapter = make_adapter(server)
+            chunks = [chunk async for chunk in adapter.stream(QUESTION)]
+            assert "".join(chunks) == reply
+            assert len(chunks) > 1
+            assert len(server.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_total_deadline_should_cover_the_whole_stream(self):
+        adapter = ResilientLLMAdapter(
+            SlowStreamAdapter(gap=0.2, chunks=10),
+            total_timeout=0.5,
+            breaker=CircuitBreaker(1),
+            metrics=MetricsRegistry(),
+        )
+        chunks = []
+        with pytest.raises(LLMTimeoutError):
+            async for chunk in adapter.stream(QUESTION):
+                chunks.append(chunk)
+        assert 1 <= len(chunks) < 10
+        assert adapter.breaker.state == CircuitBreaker.OPEN
+
+    @pytest.mark.asyncio
+    async def test_mid_stream_error_should_count_against_breaker(self):
+        adapter = ResilientLLMAdapter(
+            SlowStreamAdapter(fail_after=2),
+            breaker=CircuitBreaker(1),
+            metrics=MetricsRegistry(),
+        )
+        with pytest.raises(ConnectionError):
+            async for _ in adapter.stream(QUESTION):
+                pass
+        assert adapter.breaker.state == CircuitBreaker.OPEN
+        assert adapter.metrics.counter("llm.failed_attempts").value == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_should_release_half_open_breaker(self):
+        breaker = CircuitBreaker(1, reset_timeout=0.01)
+        breaker.record_failure()
+        await asyncio.sleep(0.02)
+        adapter = ResilientLLMAdapter(
+            SlowStreamAdapter(first_delay=1.0),
+            breaker=breaker,
+            metrics=MetricsRegistry(),
+        )
+        probe = asyncio.create_task(adapter.chat(QUESTION))
+        await asyncio.sleep(0.05)
+        assert not breaker.available
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        adapter.inner.first_delay = 0.0
+        assert await adapter.chat(QUESTION) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_exhausted_deadline_should_not_take_half_open_probe(self):
+        breaker = CircuitBreaker(1, reset_timeout=0.01)
+        breaker.record_failure()
+        await asyncio.sleep(0.02)
+        adapter = ResilientLLMAdapter(
+            SlowStreamAdapter(),
+            total_timeout=0,
+            breaker=breaker,
+            metrics=MetricsRegistry(),
+        )
+        with pytest.raises(LLMTimeoutError):
+            await adapter.chat(QUESTION)
+        with pytest.raises(LLMTimeoutError):
+            async for _ in adapter.stream(QUESTION):
+                pass
+        adapter.total_timeout = 90.0
+        assert await adapter.chat(QUESTION) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_first_chunk_latency_should_not_feed_hedging(self):
+        adapter = ResilientLLMAdapter(SlowStreamAdapter(), metrics=MetricsRegistry())
+        async for _ in adapter.stream(QUESTION):
+            pass
+        await adapter.chat(QUESTION)
+        assert adapter.ttft.count == 1
+        assert adapter.latency.count == 1
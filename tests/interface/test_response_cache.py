@@ -0,0 +1,153 @@
+import pytest
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.chat.response_cache import (
+    CachingLLMAdapter,
+    DiskResponseStore,
+    cache_key,
+)
+from personal_agent.config.config import LLMBackendConfig, LLMConfig
+from personal_agent.util.metrics import MetricsRegistry
+
+
+class CountingLLMAdapter(LLMAdapter):
+    """记录实际发往模型的请求数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, messages):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+    async def stream(self, messages):
+        self.calls += 1
+        for chunk in ("流", "式"):
+            yield chunk
+
+    async def chat_with_tools(self, messages, tools):
+        self.calls += 1
+        return LLMReply(content="tools")
+
+
+def question(text):
+    return [{"role": "user", "content": text}]
+
+
+class TestCachingLLMAdapter:
+
+    def test_key_should_ignore_whitespace_but_not_model_or_temperature(self):
+        key = cache_key("m", 0.0, question("你好"))
+        assert key == cache_key("m", 0.0, question("  你好\n"))
+        assert key != cache_key("m2", 0.0, question("你好"))
+        assert key != cache_key("m", 0.5, question("你好"))
+        assert key != cache_key("m", 0.0, question("你好"), max_tokens=100)
+
+    @pytest.mark.asyncio
+    async def test_routed_backends_and_max_tokens_should_split_cache(self, tmp_path):
+        def config(max_tokens=1000, backend_model="b-model"):
+            return LLMConfig(
+                provider="p",
+                model="unused",
+                api_key="k",
+                temperature=0.0,
+                max_tokens=max_tokens,
+                cache={"enabled": True, "path": str(tmp_path / "cache.db")},
+                backends=[LLMBackendConfig(name="b", model=backend_model, api_key="k")],
+            )
+
+        inner = CountingLLMAdapter()
+        configs = (
+            config(),
+            config(max_tokens=10),
+            config(backend_model="m2"),
+            config(),
+        )
+        for llm_config in configs:
+            adapter = CachingLLMAdapter.from_config(inner, llm_config)
+            adapter.metrics = MetricsRegistry()
+            await adapter.chat(question("你好"))
+            adapter.disk_store.close()
+        assert inner.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_repeated_chat_should_hit_cache(self):
+        inner = CountingLLMAdapter()
+        metrics = MetricsRegistry()
+        adapter = CachingLLMAdapter(inner, "m", 0.0, metrics=metrics)
+        assert await adapter.chat(question("你好")) == "reply 1"
+        assert await adapter.chat(question("你好 ")) == "reply 1"
+        assert await adapter.chat(question("再见")) == "reply 2"
+        assert inner.calls == 2
+        assert metrics.counter("llm.cache.hits").value == 1
+        assert metrics.counter("llm.cache.misses").value == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_should_be_cached_after_completion(self):
+        inner = CountingLLMAdapter()
+        adapter = CachingLLMAdapter(inner, "m", 0.0, metrics=MetricsRegistry())
+        assert [c async for c in adapter.stream(question("你好"))] == ["流", "式"]
+        assert [c async for c in adapter.stream(question("你好"))] == ["流式"]
+        assert await adapter.chat(question("你好")) == "流式"
+        assert inner.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_nonzero_temperature_should_bypass_unless_configured(self):
+        inner = CountingLLMAdapter()
+        adapter = CachingLLMAdapter(inner, "m", 0.7, metrics=MetricsRegistry())
+        await adapter.chat(question("你好"))
+        await adapter.chat(question("你好"))
+        assert inner.calls == 2
+
+        adapter = CachingLLMAdapter(
+            inner, "m", 0.7, cache_nonzero_temperature=True, metrics=MetricsRegistry()
+        )
+        await adapter.chat(question("你好"))
+        await adapter.chat(question("你好"))
+        assert inner.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_memory_lru_should_be_bounded(self):
+        inner = CountingLLMAdapter()
+        adapter = CachingLLMAdapter(inner, "m", 0.0, max_entries=2)
+        for text in ("a", "b", "c", "a"):
+            await adapter.chat(question(text))
+        assert inner.calls == 4
+
+    @pytest.mark.asyncio
+    async def test_tool_requests_should_not_be_cached(self):
+        inner = CountingLLMAdapter()
+        adapter = CachingLLMAdapter(inner, "m", 0.0)
+        await adapter.chat_with_tools(question("天气"), [])
+        await adapter.chat_with_tools(question("天气"), [])
+        assert inner.calls == 2
+
+
+class TestDiskResponseStore:
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_should_survive_restart(self, tmp_path):
+        path = tmp_path / "cache.db"
+        inner = CountingLLMAdapter()
+        adapter = CachingLLMAdapter(inner, "m", 0.0, disk_store=DiskResponseStore(path))
+        await adapter.chat(question("你好"))
+        adapter.disk_store.close()
+
+        metrics = MetricsRegistry()
+        adapter = CachingLLMAdapter(
+            inner, "m", 0.0, disk_store=DiskResponseStore(path), metrics=metrics
+        )
+        assert await adapter.chat(question("你好")) == "reply 1"
+        assert inner.calls == 1
+        assert metrics.counter("llm.cache.disk_hits").value == 1
+        adapter.disk_store.close()
+
+    def test_size_limit_should_evict_least_recently_used(self, tmp_path):
+        store = DiskResponseStore(tmp_path / "cache.db", max_bytes=250)
+        store.put("a", "x" * 100)
+        store.put("b", "x" * 100)
+        assert store.get("a") is not None
+        store.put("c", "x" * 100)
+        assert store.get("b") is None
+        assert store.get("a") is not None and store.get("c") is not None
+        assert store.total_bytes == 200
+        store.close()
@@ -0,0 +1,212 @@
+import asyncio
+import pytest
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.chat.resilience import ResilientLLMAdapter
+from personal_agent.chat.request_scope import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    scheduling,
+)
+from personal_agent.chat.scheduler import (
+    RequestScheduler,
+    SchedulingLLMAdapter,
+    TokenBucket,
+)
+from personal_agent.util.metrics import MetricsRegistry
+
+
+class RecordingLLMAdapter(LLMAdapter):
+    """按到达上游的顺序记录请求内容；gate 打开前请求一直挂起"""
+
+    def __init__(self):
+        self.order = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def chat(self, messages):
+        self.order.append(messages[-1]["content"])
+        await self.gate.wait()
+        return "ok"
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+class FlakyLLMAdapter(LLMAdapter):
+    """前 failures 次请求抛出连接错误，每次请求耗时 delay 秒"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    async def chat(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ConnectionError("connection reset")
+        return "ok"
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+def ask(adapter, text, priority=PRIORITY_INTERACTIVE, session_id=""):
+    async def run():
+        with scheduling(priority, session_id):
+            return await adapter.chat([{"role": "user", "content": text}])
+
+    return asyncio.ensure_future(run())
+
+
+async def run_blocked(adapter, inner, requests):
+    """先占满唯一的并发名额，排好队后再放行，返回上游收到请求的顺序"""
+    inner.gate.clear()
+    blocker = ask(adapter, "blocker")
+    await asyncio.sleep(0)
+    tasks = []
+    for args in requests:
+        tasks.append(ask(adapter, *args))
+        await asyncio.sleep(0)
+    inner.gate.set()
+    await asyncio.gather(blocker, *tasks)
+    return inner.order[1:]
+
+
+class TestSchedulingLLMAdapter:
+
+    @pytest.mark.asyncio
+    async def test_interactive_requests_should_go_first(self):
+        inner = RecordingLLMAdapter()
+        adapter = SchedulingLLMAdapter(
+            inner, max_concurrency=1, metrics=MetricsRegistry()
+        )
+        order = await run_blocked(
+            adapter,
+            inner,
+            [
+                ("summary", PRIORITY_BACKGROUND),
+                ("question 1", PRIORITY_INTERACTIVE),
+                ("question 2", PRIORITY_INTERACTIVE),
+            ],
+        )
+        assert order == ["question 1", "question 2", "summary"]
+
+    @pytest.mark.asyncio
+    async def test_sessions_should_be_served_round_robin(self):
+        inner = RecordingLLMAdapter()
+        adapter = SchedulingLLMAdapter(
+            inner, max_concurrency=1, metrics=MetricsRegistry()
+        )
+        burst = [(f"a{i}", PRIORITY_INTERACTIVE, "a") for i in range(3)]
+        order = await run_blocked(
+            adapter, inner, burst + [("b0", PRIORITY_INTERACTIVE, "b")]
+        )
+        assert order.index("b0") < order.index("a2")
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_should_delay_requests(self):
+        inner = RecordingLLMAdapter()
+        metrics = MetricsRegistry()
+        # 每秒补充 10 个请求令牌，先清空令牌桶
+        adapter = SchedulingLLMAdapter(inner, rpm=600, metrics=metrics)
+        adapter.scheduler.request_bucket.tokens = 0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(ask(adapter, str(i)) for i in range(3)))
+        assert loop.time() - start >= 0.25
+        assert metrics.counter("llm.scheduler.throttled").value > 0
+        assert metrics.histogram("llm.scheduler.wait_seconds").count == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_should_leave_queue(self):
+        inner = RecordingLLMAdapter()
+        adapter = SchedulingLLMAdapter(
+            inner, max_concurrency=1, metrics=MetricsRegistry()
+        )
+        inner.gate.clear()
+        blocker = ask(adapter, "blocker")
+        queued = ask(adapter, "queued")
+        await asyncio.sleep(0.01)
+        assert adapter.queue_depth == 1
+        queued.cancel()
+        await asyncio.sleep(0)
+        assert adapter.queue_depth == 0
+        inner.gate.set()
+        await blocker
+        assert await ask(adapter, "next") == "ok"
+        assert inner.order == ["blocker", "next"]
+
+    @pytest.mark.asyncio
+    async def test_stream_should_hold_slot_until_finished(self):
+        inner = RecordingLLMAdapter()
+        adapter = SchedulingLLMAdapter(
+            inner, max_concurrency=1, metrics=MetricsRegistry()
+        )
+        chunks = [c async for c in adapter.stream([{"role": "user", "content": "s"}])]
+        assert chunks == ["ok"]
+        assert await ask(adapter, "after") == "ok"
+
+    @pytest.mark.asyncio
+    async def test_adapters_sharing_scheduler_should_share_slots(self):
+        chat_inner, summary_inner = RecordingLLMAdapter(), RecordingLLMAdapter()
+        scheduler = RequestScheduler(max_concurrency=1, metrics=MetricsRegistry())
+        chat = SchedulingLLMAdapter(chat_inner, scheduler=scheduler)
+        summary = SchedulingLLMAdapter(summary_inner, scheduler=scheduler)
+        chat_inner.gate.clear()
+        blocker = ask(chat, "question")
+        queued = ask(summary, "summary", PRIORITY_BACKGROUND)
+        await asyncio.sleep(0.01)
+        # 对话请求占着唯一的并发名额，摘要请求在同一队列中等待
+        assert summary.queue_depth == chat.queue_depth == 1
+        assert not summary_inner.order
+        chat_inner.gate.set()
+        assert await asyncio.gather(blocker, queued) == ["ok", "ok"]
+        assert summary_inner.order == ["summary"]
+
+    @pytest.mark.asyncio
+    async def test_retries_should_take_rate_limit_tokens(self):
+        inner = FlakyLLMAdapter(failures=1)
+        metrics = MetricsRegistry()
+        resilient = ResilientLLMAdapter(
+            inner, base_backoff=0, metrics=MetricsRegistry()
+        )
+        adapter = SchedulingLLMAdapter(resilient, rpm=600, metrics=metrics)
+        # 令牌桶只剩一个令牌：首次发送用掉它，重试需等待补充（每秒 10 个）
+        adapter.scheduler.request_bucket.tokens = 1
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await ask(adapter, "q") == "ok"
+        assert inner.calls == 2
+        assert loop.time() - start >= 0.08
+        assert metrics.counter("llm.scheduler.resends").value == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("tokens, hedged", [(1, 0), (2, 1)])
+    async def test_hedge_should_only_be_sent_when_tokens_allow(self, tokens, hedged):
+        inner = FlakyLLMAdapter(delay=0.05)
+        resilient_metrics = MetricsRegistry()
+        resilient = ResilientLLMAdapter(
+            inner, hedge=True, hedge_min_samples=1, metrics=resilient_metrics
+        )
+        resilient.latency.observe(0.01)
+        adapter = SchedulingLLMAdapter(resilient, rpm=60, metrics=MetricsRegistry())
+        adapter.scheduler.request_bucket.tokens = tokens
+        assert await ask(adapter, "q") == "ok"
+        assert inner.calls == 1 + hedged
+        assert resilient_metrics.counter("llm.hedged_requests").value == hedged
+
+
+class TestTokenBucket:
+
+    def test_wait_time_should_follow_refill_rate(self):
+        bucket = TokenBucket(60)
+        assert bucket.wait_time(60) == 0
+        bucket.consume(61)
+        assert bucket.wait_time(1) == pytest.approx(2.0, abs=0.05)
@@ -1,6 +1,20 @@
+import inspect
 import pytest
+from personal_agent.config.config import MCPConfig
 from personal_agent.mcp import Container as MCPContainer
 from personal_agent.mcp import ServerRegistry
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.mcp.server_registry_sqlite import SqliteServerRegistry
+
+
+class StubConfiger:
+    """只提供 MCP 配置的测试配置源"""
+
+    def __init__(self, **overrides):
+        self.mcp_config = MCPConfig(**overrides)
+
+    def get_mcp_config(self):
+        return self.mcp_config
 
 
 class TestServerRegistry:
@@ -9,7 +23,7 @@ class TestServerRegistry:
 
     @pytest.fixture(autouse=True)
     def setup_registry(self):
-        container = MCPContainer()
+        container = MCPContainer(configer=StubConfiger)
         self.registry = container.server_registry()
 
     def test_add_server_should_succeed(self):
@@ -57,3 +71,124 @@ class TestServerRegistry:
     def test_edit_server_nonexistent_should_fail(self):
         result = self.registry.edit_server("not_exist", "http://localhost:9000")
         assert result is False
+
+    def test_subscribe_should_receive_change_events(self):
+        events = []
+        self.registry.subscribe(lambda event, name: events.append((event, name)))
+        self.registry.add_server("server1", "http://localhost:8000")
+        self.registry.edit_server("server1", "http://localhost:9000")
+        self.registry.remove_server("server1")
+        self.registry.remove_server("server1")
+        assert events == [
+            ("added", "server1"),
+            ("edited", "server1"),
+            ("removed", "server1"),
+        ]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def registry(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryServerRegistry()
+    else:
+        store = SqliteServerRegistry(tmp_path / "servers.db")
+        yield store
+        store.close()
+
+
+def _servers(count, host="localhost", tags=()):
+    return [
+        {"name": f"{host}-{i}", "url": f"http://{host}:{8000 + i}/sse", "tags": tags}
+        for i in range(count)
+    ]
+
+
+class TestServerRegistryBulkAndQuery:
+
+    def test_add_servers_should_skip_duplicates(self, registry):
+        registry.add_server("localhost-0", "http://localhost:9999")
+        batch = _servers(3) + [{"name": "localhost-1", "url": "http://other:1"}]
+        assert registry.add_servers(batch) == 2
+        assert registry.count_servers() == 3
+        assert registry.get_server("localhost-0")["url"] == "http://localhost:9999"
+
+    def test_remove_servers_should_ignore_missing(self, registry):
+        registry.add_servers(_servers(5))
+        events = []
+        registry.subscribe(lambda event, name: events.append((event, name)))
+        assert registry.remove_servers(["localhost-1", "localhost-3", "nope"]) == 2
+        assert sorted(events) == [
+            ("removed", "localhost-1"),
+            ("removed", "localhost-3"),
+        ]
+        assert [s["name"] for s in registry.list_servers()] == [
+            "localhost-0",
+            "localhost-2",
+            "localhost-4",
+        ]
+
+    def test_list_servers_should_paginate_in_insertion_order(self, registry):
+        registry.add_servers(_servers(10))
+        page = registry.list_servers(offset=4, limit=3)
+        assert [s["name"] for s in page] == [
+            "localhost-4",
+            "localhost-5",
+            "localhost-6",
+        ]
+        assert registry.list_servers(offset=10, limit=3) == []
+
+    def test_list_servers_should_filter_by_host_and_tag(self, registry):
+        registry.add_servers(_servers(3, host="alpha", tags=["search"]))
+        registry.add_servers(_servers(2, host="beta", tags=["search", "files"]))
+        registry.add_server("plain", "http://Alpha:1/sse")
+
+        assert registry.count_servers(host="ALPHA") == 4
+        assert registry.count_servers(tag="files") == 2
+        assert registry.count_servers(host="alpha", tag="search") == 3
+        assert registry.list_servers(host="beta", tag="files", limit=1) == [
+            {
+                "name": "beta-0",
+                "url": "http://beta:8000/sse",
+                "tags": ["files", "search"],
+            }
+        ]
+        assert registry.list_servers(tag="missing") == []
+
+    def test_edit_server_should_move_host_index_and_keep_tags(self, registry):
+        registry.add_server("s", "http://alpha:1", tags=["t"])
+        registry.edit_server("s", "http://beta:1")
+        assert registry.count_servers(host="alpha") == 0
+        assert registry.list_servers(host="beta") == [
+            {"name": "s", "url": "http://beta:1", "tags": ["t"]}
+        ]
+
+
+class TestSqliteServerRegistry:
+
+    def test_servers_should_survive_reopen(self, tmp_path):
+        path = tmp_path / "servers.db"
+        store = SqliteServerRegistry(path)
+        store.add_servers(_servers(3, tags=["x"]))
+        store.remove_server("localhost-1")
+        store.close()
+
+        reopened = SqliteServerRegistry(path)
+        assert [s["name"] for s in reopened.list_servers(tag="x")] == [
+            "localhost-0",
+            "localhost-2",
+        ]
+        reopened.close()
+
+    def test_failed_bulk_add_should_not_leave_partial_writes(self, tmp_path):
+        store = SqliteServerRegistry(tmp_path / "servers.db")
+        batch = _servers(3) + [{"name": "bad"}]
+        # 绕过接口契约，模拟写入中途失败
+        with pytest.raises(KeyError):
+            inspect.unwrap(SqliteServerRegistry.add_servers)(store, batch)
+        assert store.count_servers() == 0
+        store.close()
+
+    def test_container_should_use_sqlite_when_path_configured(self, tmp_path):
+        path = str(tmp_path / "servers.db")
+        container = MCPContainer(configer=lambda: StubConfiger(registry_path=path))
+        assert isinstance(container.server_registry(), SqliteServerRegistry)
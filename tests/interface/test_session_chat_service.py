@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.chat import SessionChatService
+from personal_agent.chat.chat_service_impl import ChatServiceImpl
+from personal_agent.chat.conversation_store_memory import MemoryConversationStore
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.chat.session_chat_service_impl import SessionChatServiceImpl
+from personal_agent.config.config import ChatConfig, LLMConfig
+
+
+class EchoLLMAdapter(LLMAdapter):
+    """回显最后一条用户消息，并记录每次请求携带的消息"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+
+    async def chat(self, messages):
+        self.requests.append(messages)
+        await asyncio.sleep(self.delay)
+        return f"echo {messages[-1]['content']}"
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+class StubConfiger:
+    def get_llm_config(self):
+        return LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+
+    def get_chat_config(self):
+        return ChatConfig(max_active_sessions=2)
+
+
+class TestSessionChatService:
+    adapter: EchoLLMAdapter
+    service: SessionChatService
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self):
+        self.adapter = EchoLLMAdapter()
+        container = ChatContainer(configer=StubConfiger, llm_adapter=self.adapter)
+        self.service = container.session_chat_service()
+
+    @pytest.mark.asyncio
+    async def test_sessions_should_have_isolated_context(self):
+        await self.service.get_response("alice", "I am Alice")
+        await self.service.get_response("bob", "I am Bob")
+        assert self.service.get_context("alice") == [
+            {"role": "user", "content": "I am Alice"},
+            {"role": "assistant", "content": "echo I am Alice"},
+        ]
+        assert len(self.service.get_context("bob")) == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_response_should_use_session_context(self):
+        await self.service.get_response("alice", "first")
+        chunks = [c async for c in self.service.stream_response("alice", "second")]
+        assert chunks == ["echo second"]
+        assert [m["content"] for m in self.adapter.requests[-1]] == [
+            "first",
+            "echo first",
+            "second",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_evicted_session_should_resume_from_store(self):
+        await self.service.get_response("s1", "hello 1")
+        await self.service.get_response("s2", "hello 2")
+        await self.service.get_response("s3", "hello 3")
+        assert self.service.active_sessions == 2
+        assert self.service.get_context("s1") == [
+            {"role": "user", "content": "hello 1"},
+            {"role": "assistant", "content": "echo hello 1"},
+        ]
+
+
+class TestSessionConcurrency:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_turns_in_one_session_should_not_interleave(self):
+        service = SessionChatServiceImpl(
+            EchoLLMAdapter(delay=0.01), MemoryConversationStore()
+        )
+        await asyncio.gather(
+            *(service.get_response("s1", f"message {i}") for i in range(5))
+        )
+        context = service.get_context("s1")
+        assert len(context) == 10
+        for user, assistant in zip(context[::2], context[1::2]):
+            assert user["role"] == "user"
+            assert assistant["content"] == f"echo {user['content']}"
+
+    @pytest.mark.asyncio
+    async def test_different_sessions_should_run_concurrently(self):
+        service = SessionChatServiceImpl(
+            EchoLLMAdapter(delay=0.05), MemoryConversationStore()
+        )
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(
+            *(service.get_response(f"user{i}", "hi") for i in range(20))
+        )
+        assert loop.time() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_busy_session_should_not_be_evicted(self):
+        service = SessionChatServiceImpl(
+            EchoLLMAdapter(delay=0.05), MemoryConversationStore(), max_active_sessions=1
+        )
+        slow = asyncio.ensure_future(service.get_response("busy", "slow"))
+        await asyncio.sleep(0)
+        await service.get_response("other", "hi")
+        await slow
+        assert service.get_context("busy")[-1]["content"] == "echo slow"
+
+    def test_shared_adapter_should_be_reused_across_sessions(self):
+        adapter = EchoLLMAdapter()
+        service = SessionChatServiceImpl(adapter, MemoryConversationStore())
+        # pylint: disable=W0212
+        with service._acquire("a") as first, service._acquire("b") as second:
+            assert isinstance(first, ChatServiceImpl)
+            assert first.llm_adapter is second.llm_adapter is adapter
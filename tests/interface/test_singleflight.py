@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from personal_agent.chat.coalescing import CoalescingLLMAdapter
+from personal_agent.chat.llm_adapter import LLMAdapter, LLMReply
+from personal_agent.util.metrics import MetricsRegistry
+from personal_agent.util.singleflight import SingleFlight, no_coalesce
+
+
+class SlowUpstream:
+    """记录上游调用次数的慢请求"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self, value):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return value
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_calls_should_share_upstream(self):
+        upstream = SlowUpstream()
+        flight = SingleFlight("test", MetricsRegistry())
+        results = await asyncio.gather(
+            *(flight.do("k", lambda: upstream.fetch("v")) for _ in range(10))
+        )
+        assert results == ["v"] * 10
+        assert upstream.calls == 1
+        assert flight.metrics.counter("test.coalesced").value == 9
+        assert flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_should_not_be_coalesced(self):
+        upstream = SlowUpstream(delay=0)
+        flight = SingleFlight("test", MetricsRegistry())
+        for _ in range(3):
+            await flight.do("k", lambda: upstream.fetch("v"))
+        assert upstream.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_errors_should_reach_every_waiter(self):
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        flight = SingleFlight("test", MetricsRegistry())
+        results = await asyncio.gather(
+            *(flight.do("k", broken) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_should_not_cancel_others(self):
+        upstream = SlowUpstream(delay=0.1)
+        flight = SingleFlight("test", MetricsRegistry())
+        first = asyncio.ensure_future(flight.do("k", lambda: upstream.fetch("v")))
+        second = asyncio.ensure_future(flight.do("k", lambda: upstream.fetch("v")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "v"
+        assert upstream.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_call_after_all_waiters_cancel_should_start_fresh(self):
+        upstream = SlowUpstream()
+        flight = SingleFlight("test", MetricsRegistry())
+        first = asyncio.ensure_future(flight.do("k", lambda: upstream.fetch("v")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # 取消尚未在共享任务中生效时发起的新请求不应得到 CancelledError
+        second = asyncio.ensure_future(flight.do("k", lambda: upstream.fetch("v")))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "v"
+        assert upstream.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_no_coalesce_should_opt_out(self):
+        upstream = SlowUpstream()
+        flight = SingleFlight("test", MetricsRegistry())
+
+        async def independent():
+            with no_coalesce():
+                return await flight.do("k", lambda: upstream.fetch("v"))
+
+        await asyncio.gather(independent(), independent())
+        assert upstream.calls == 2
+
+
+class CountingLLMAdapter(LLMAdapter):
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, messages):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return messages[-1]["content"]
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+    async def chat_with_tools(self, messages, tools):
+        return LLMReply(content=await self.chat(messages))
+
+
+class TestCoalescingLLMAdapter:
+
+    @pytest.mark.asyncio
+    async def test_identical_chats_should_coalesce(self):
+        inner = CountingLLMAdapter()
+        adapter = CoalescingLLMAdapter(inner, MetricsRegistry())
+        same = [{"role": "user", "content": "你好"}]
+        other = [{"role": "user", "content": "再见"}]
+        results = await asyncio.gather(
+            adapter.chat(same), adapter.chat(same), adapter.chat(other)
+        )
+        assert results == ["你好", "你好", "再见"]
+        assert inner.calls == 2
@@ -0,0 +1,318 @@
+import asyncio
+import pytest
+from fastmcp import Client, FastMCP
+from personal_agent.chat.chat_service_impl import ChatServiceImpl
+from personal_agent.chat.llm_adapter import (
+    LLMAdapter,
+    LLMReply,
+    OpenAICompatibleLLMAdapter,
+    ToolCall,
+)
+from personal_agent.chat.tool_executor import ToolExecutor
+from personal_agent.config.config import LLMConfig
+from personal_agent.devtools.fake_llm import FakeLLMServer
+from personal_agent.mcp.api.tool_service import ToolService
+from personal_agent.mcp.capability_cache import CapabilityCache
+from personal_agent.mcp.connection_manager import MCPConnectionManager
+from personal_agent.mcp.exceptions import ToolCallError, ToolNotFound
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.mcp.tool_service_impl import ToolServiceImpl
+from personal_agent.mcp.types import ToolDescription
+
+
+class FakeToolService(ToolService):
+    """每次调用耗时 delay 秒，并记录同时进行的调用数"""
+
+    def __init__(self, delay: float = 0.1, server: str = "amap"):
+        self.delay = delay
+        self.server = server
+        self.running = 0
+        self.max_running = 0
+
+    async def list_tools(self):
+        return [ToolDescription("maps_weather", "查询天气", self.server)]
+
+    async def search_tools(self, query, top_k):
+        return (await self.list_tools())[:top_k]
+
+    async def call_tool(self, tool_name, params=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        return f"{params['city']}: 晴"
+
+    async def refresh_tools(self):
+        pass
+
+
+def weather_calls(*cities):
+    return [
+        ToolCall(id=f"call_{i}", name="amap.maps_weather", arguments={"city": city})
+        for i, city in enumerate(cities)
+    ]
+
+
+class TestToolExecutor:
+
+    @pytest.mark.asyncio
+    async def test_calls_should_run_concurrently(self):
+        executor = ToolExecutor(FakeToolService(delay=0.2))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await executor.execute(weather_calls("北京", "上海", "广州"))
+        # 总耗时约等于最慢的单个调用
+        assert loop.time() - start < 0.35
+        assert results == [
+            {"role": "tool", "tool_call_id": "call_0", "content": "北京: 晴"},
+            {"role": "tool", "tool_call_id": "call_1", "content": "上海: 晴"},
+            {"role": "tool", "tool_call_id": "call_2", "content": "广州: 晴"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_large_results_should_share_turn_budget(self):
+        class VerboseToolService(FakeToolService):
+            async def call_tool(self, tool_name, params=None):
+                return params["city"] * 100_000
+
+        executor = ToolExecutor(VerboseToolService(), max_result_bytes=4000)
+        results = await executor.execute(weather_calls(*"abcd"))
+        for result, city in zip(results, "abcd"):
+            content = result["content"]
+            assert content.startswith(city * 750)
+            assert content.endswith(city * 250)
+            # 每个结果分到 1000 字节，另加一行省略说明
+            assert len(content.encode("utf-8")) < 1000 + 100
+
+    @pytest.mark.asyncio
+    async def test_concurrency_should_be_capped_per_server(self):
+        service = FakeToolService(delay=0.05)
+        executor = ToolExecutor(service, per_server_concurrency=2)
+        await executor.execute(weather_calls(*"abcdef"))
+        assert service.max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_call_should_time_out_without_failing_others(self):
+        class MixedToolService(FakeToolService):
+            async def call_tool(self, tool_name, params=None):
+                if params["city"] == "slow":
+                    await asyncio.sleep(10)
+                return await super().call_tool(tool_name, params)
+
+        executor = ToolExecutor(MixedToolService(delay=0.01), call_timeout=0.1)
+        results = await executor.execute(weather_calls("北京", "slow"))
+        assert results[0]["content"] == "北京: 晴"
+        assert "超时" in results[1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_servers_with_dots_should_have_separate_limits(self):
+        service = FakeToolService(delay=0.05)
+        executor = ToolExecutor(service, per_server_concurrency=1)
+        calls = [
+            ToolCall(
+                id=f"call_{server}",
+                name=f"{server}.maps_weather",
+                arguments={"city": server},
+                tool=ToolDescription("maps_weather", "查询天气", server),
+            )
+            for server in ("cn.amap", "cn.baidu")
+        ]
+        await executor.execute(calls)
+        assert service.max_running == 2
+
+
+class ScriptedLLMAdapter(LLMAdapter):
+    """第一次请求要求调用三个天气工具，随后根据工具结果作答"""
+
+    def __init__(self):
+        self.chat_requests = []
+
+    async def chat_with_tools(self, messages, tools):
+        if messages[-1]["role"] == "tool":
+            return LLMReply(content=await self.chat(messages))
+        return LLMReply(content="", tool_calls=weather_calls("北京", "上海", "广州"))
+
+    async def chat(self, messages):
+        self.chat_requests.append(messages)
+        results = [m["content"] for m in messages if m["role"] == "tool"]
+        return "；".join(results)
+
+    async def stream(self, messages):
+        yield await self.chat(messages)
+
+
+class TestChatWithTools:
+
+    @pytest.mark.asyncio
+    async def test_tool_results_should_be_sent_in_single_follow_up(self):
+        adapter = ScriptedLLMAdapter()
+        service = ChatServiceImpl(
+            adapter, tool_executor=ToolExecutor(FakeToolService(delay=0.01))
+        )
+        reply = await service.get_response("北京、上海、广州天气如何？")
+        assert reply == "北京: 晴；上海: 晴；广州: 晴"
+        assert len(adapter.chat_requests) == 1
+        roles = [m["role"] for m in adapter.chat_requests[0]]
+        assert roles == ["user", "assistant", "tool", "tool", "tool"]
+        assert service.get_context()[-1] == {"role": "assistant", "content": reply}
+
+    @pytest.mark.asyncio
+    async def test_stream_response_should_stream_follow_up(self):
+        adapter = ScriptedLLMAdapter()
+        service = ChatServiceImpl(
+            adapter, tool_executor=ToolExecutor(FakeToolService(delay=0.01))
+        )
+        chunks = [c async for c in service.stream_response("天气如何？")]
+        assert "".join(chunks) == "北京: 晴；上海: 晴；广州: 晴"
+
+    @pytest.mark.asyncio
+    async def test_tool_rounds_should_stop_at_limit(self):
+        class ToolHungryLLMAdapter(ScriptedLLMAdapter):
+            async def chat_with_tools(self, messages, tools):
+                return LLMReply(content="", tool_calls=weather_calls("北京"))
+
+        adapter = ToolHungryLLMAdapter()
+        executor = ToolExecutor(FakeToolService(delay=0), max_rounds=2)
+        service = ChatServiceImpl(adapter, tool_executor=executor)
+        assert await service.get_response("天气如何？") == "北京: 晴；北京: 晴"
+        roles = [m["role"] for m in adapter.chat_requests[0]]
+        assert roles == ["user"] + ["assistant", "tool"] * 2
+
+
+class TestStreamingWithTools:
+
+    @staticmethod
+    def make_service(server: FakeLLMServer) -> ChatServiceImpl:
+        config = LLMConfig(
+            provider="fake",
+            model="fake-model",
+            api_key="fake-key",
+            api_base=server.url,
+        )
+        return ChatServiceImpl(
+            OpenAICompatibleLLMAdapter(config),
+            tool_executor=ToolExecutor(FakeToolService(delay=0, server="cn.amap")),
+        )
+
+    @pytest.mark.asyncio
+    async def test_direct_answer_should_stream_with_tools_bound(self):
+        async with FakeLLMServer(reply="今天适合出门散步。", chunk_size=2) as server:
+            service = self.make_service(server)
+            chunks = [c async for c in service.stream_response("出门吗？")]
+        assert len(chunks) > 1 and "".join(chunks) == "今天适合出门散步。"
+        assert len(server.requests) == 1
+        assert server.requests[0]["stream"] and server.requests[0]["tools"]
+
+    @pytest.mark.asyncio
+    async def test_tool_call_deltas_should_switch_to_tool_execution(self):
+        async with FakeLLMServer(
+            reply="北京晴", tool_call="maps_weather", tool_arguments={"city": "北京"}
+        ) as server:
+            service = self.make_service(server)
+            chunks = [c async for c in service.stream_response("北京天气？")]
+        assert "".join(chunks) == "北京晴"
+        first, second = server.requests
+        offered = first["tools"][0]["function"]["name"]
+        assert offered == "cn_amap__maps_weather"
+        # 回放的工具调用与提供给模型的函数名一致
+        replayed = second["messages"][-2]["tool_calls"][0]["function"]["name"]
+        assert replayed == offered
+        assert second["messages"][-1]["content"] == "北京: 晴"
+
+
+def make_amap_server() -> FastMCP:
+    server = FastMCP("amap")
+
+    @server.tool
+    def maps_weather(city: str) -> str:
+        """查询城市天气"""
+        if city == "火星":
+            raise ValueError("不支持的城市")
+        return f"{city}: 晴"
+
+    @server.tool
+    def route_plan(steps: int) -> str:
+        """规划路线"""
+        return "\n".join(f"第 {i} 步：直行 100 米" for i in range(steps))
+
+    return server
+
+
+class TestToolServiceImpl:
+    service: ToolServiceImpl
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self):
+        servers = {"http://amap.local/sse": make_amap_server()}
+        registry = MemoryServerRegistry()
+        manager = MCPConnectionManager(
+            registry, client_factory=lambda url: Client(servers[url])
+        )
+        self.service = ToolServiceImpl(CapabilityCache(registry, manager), manager)
+        registry.add_server("amap", "http://amap.local/sse")
+
+    @pytest.mark.asyncio
+    async def test_call_tool_should_route_to_server(self):
+        assert await self.service.call_tool("amap.maps_weather", {"city": "北京"}) == (
+            "北京: 晴"
+        )
+        assert await self.service.call_tool("maps_weather", {"city": "上海"}) == (
+            "上海: 晴"
+        )
+        await self.service.connection_manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_oversized_result_should_be_capped(self):
+        self.service.max_result_bytes = 2048
+        result = await self.service.call_tool("amap.route_plan", {"steps": 50_000})
+        assert result.startswith("第 0 步")
+        assert result.endswith("第 49999 步：直行 100 米")
+        assert "已省略" in result
+        assert len(result.encode("utf-8")) < 2048 + 200
+        await self.service.connection_manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_should_raise(self):
+        with pytest.raises(ToolNotFound):
+            await self.service.call_tool("amap.no_such_tool", {})
+        await self.service.connection_manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_calls_should_coalesce(self):
+        manager = self.service.connection_manager
+        calls = []
+        original = manager.call_tool
+
+        async def counting_call_tool(name, tool, args):
+            calls.append(args)
+            await asyncio.sleep(0.05)
+            return await original(name, tool, args)
+
+        manager.call_tool = counting_call_tool
+        results = await asyncio.gather(
+            *(
+                self.service.call_tool("amap.maps_weather", {"city": "北京"})
+                for _ in range(5)
+            ),
+            self.service.call_tool("amap.maps_weather", {"city": "上海"}),
+        )
+        assert results == ["北京: 晴"] * 5 + ["上海: 晴"]
+        assert len(calls) == 2
+        await manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_search_tools_should_follow_registry(self):
+        tools = await self.service.search_tools("北京今天天气怎么样", 3)
+        assert [tool.qualified_name for tool in tools] == ["amap.maps_weather"]
+        assert await self.service.search_tools("讲个笑话", 3) == []
+        self.service.capability_cache.server_registry.remove_server("amap")
+        assert len(self.service.tool_index) == 0
+        await self.service.connection_manager.close_all()
+
+    @pytest.mark.asyncio
+    async def test_tool_error_should_raise_tool_call_error(self):
+        with pytest.raises(ToolCallError):
+            await self.service.call_tool("amap.maps_weather", {"city": "火星"})
+        await self.service.connection_manager.close_all()
@@ -0,0 +1,67 @@
+from personal_agent.mcp.tool_index import ToolIndex, tokenize
+from personal_agent.mcp.types import ToolDescription
+
+
+def make_tools(server, specs):
+    return [
+        ToolDescription(
+            name,
+            description,
+            server,
+            {"type": "object", "properties": {p: {"type": "string"} for p in params}},
+        )
+        for name, description, params in specs
+    ]
+
+
+AMAP = make_tools(
+    "amap",
+    [
+        ("maps_weather", "查询指定城市的天气预报", ["city"]),
+        ("maps_direction_driving", "规划驾车路线", ["origin", "destination"]),
+        ("maps_geo", "将地址转换为经纬度坐标", ["address"]),
+    ],
+)
+FILES = make_tools(
+    "files",
+    [
+        ("read_file", "Read the contents of a file", ["path"]),
+        ("list_directory", "List entries in a directory", ["path"]),
+    ],
+)
+
+
+class TestToolIndex:
+
+    def test_tokenize_should_split_identifiers_and_cjk(self):
+        tokens = tokenize("readFile maps_weather 天气")
+        assert {"read", "file", "maps", "weather", "天", "气", "天气"} <= set(tokens)
+
+    def test_search_should_rank_relevant_tools_first(self):
+        index = ToolIndex()
+        index.update_server("amap", AMAP)
+        index.update_server("files", FILES)
+        assert index.search("明天上海天气怎么样", 1)[0].name == "maps_weather"
+        assert index.search("从北京开车到天津的路线", 1)[0].name == (
+            "maps_direction_driving"
+        )
+        assert index.search("please read the file notes.txt", 1)[0].name == (
+            "read_file"
+        )
+
+    def test_unrelated_query_should_return_nothing(self):
+        index = ToolIndex()
+        index.update_server("files", FILES)
+        assert index.search("你好", 3) == []
+
+    def test_updates_should_be_incremental(self):
+        index = ToolIndex()
+        index.update_server("amap", AMAP)
+        index.update_server("files", FILES)
+        assert len(index) == 5
+        index.update_server("amap", AMAP[:1])
+        assert len(index) == 3
+        assert index.search("驾车路线", 3) == []
+        index.remove_server("files")
+        assert len(index) == 1
+        assert [t.name for t in index.search("天气", 3)] == ["maps_weather"]
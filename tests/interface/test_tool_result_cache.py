@@ -0,0 +1,199 @@
+import threading
+import time
+from typing import List
+import pytest
+from fastmcp import Client, FastMCP
+from personal_agent.mcp.capability_cache import CapabilityCache
+from personal_agent.mcp.connection_manager import MCPConnectionManager
+from personal_agent.mcp.exceptions import ToolCallError
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.mcp.tool_result_cache import (
+    DiskToolResultStore,
+    ToolResultCache,
+    canonical_arguments,
+    tool_cache_key,
+)
+from personal_agent.mcp.tool_service_impl import ToolServiceImpl
+from personal_agent.mcp.types import ToolDescription
+from personal_agent.util.metrics import MetricsRegistry
+
+WEATHER = ToolDescription("maps_weather", "查询天气", "amap")
+NOW = ToolDescription("current_time", "当前时间", "clock")
+
+
+def key_of(tool, arguments):
+    return tool_cache_key(tool.server, tool.name, canonical_arguments(arguments))
+
+
+class TestToolResultCache:
+
+    def test_key_should_ignore_argument_order(self):
+        assert key_of(WEATHER, {"city": "北京", "days": 1}) == key_of(
+            WEATHER, {"days": 1, "city": "北京"}
+        )
+        assert key_of(WEATHER, {"city": "北京"}) != key_of(WEATHER, {"city": "上海"})
+        other = ToolDescription("maps_weather", "查询天气", "other")
+        assert key_of(WEATHER, {}) != key_of(other, {})
+
+    def test_ttl_should_follow_per_tool_config_and_exclusions(self):
+        cache = ToolResultCache(
+            default_ttl=60,
+            tool_ttls={"maps_weather": 600, "clock.current_time": 5},
+            non_cacheable=["amap.send_message"],
+            metrics=MetricsRegistry(),
+        )
+        assert cache.ttl_for(WEATHER) == 600
+        assert cache.ttl_for(NOW) == 5
+        assert cache.ttl_for(ToolDescription("send_message", "", "amap")) == 0
+        assert cache.ttl_for(ToolDescription("other", "", "amap")) == 60
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_should_miss(self, monkeypatch):
+        cache = ToolResultCache(default_ttl=10, metrics=MetricsRegistry())
+        key = key_of(WEATHER, {"city": "北京"})
+        await cache.put(WEATHER, key, "晴")
+        assert await cache.get(WEATHER, key) == "晴"
+        now = time.time()
+        monkeypatch.setattr("time.time", lambda: now + 11)
+        assert await cache.get(WEATHER, key) is None
+        assert cache.total_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_should_evict_least_recently_used_by_bytes(self):
+        cache = ToolResultCache(max_bytes=250, metrics=MetricsRegistry())
+        keys = [key_of(WEATHER, {"city": str(i)}) for i in range(3)]
+        for key in keys:
+            await cache.put(WEATHER, key, "x" * 100)
+        assert await cache.get(WEATHER, keys[0]) is None
+        assert await cache.get(WEATHER, keys[1]) is not None
+        assert cache.total_bytes == 200
+
+    @pytest.mark.asyncio
+    async def test_stats_should_report_hit_rate_and_bytes_saved(self):
+        cache = ToolResultCache(metrics=MetricsRegistry())
+        key = key_of(WEATHER, {"city": "北京"})
+        assert await cache.get(WEATHER, key) is None
+        await cache.put(WEATHER, key, "北京: 晴")
+        for _ in range(3):
+            await cache.get(WEATHER, key)
+        stats = cache.stats()["amap.maps_weather"]
+        assert stats["hits"] == 3
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.75
+        assert stats["bytes_saved"] == 3 * len("北京: 晴".encode("utf-8"))
+
+    @pytest.mark.asyncio
+    async def test_disk_store_should_survive_restart_and_invalidation(self, tmp_path):
+        path = tmp_path / "tools.db"
+        key = key_of(WEATHER, {"city": "北京"})
+        cache = ToolResultCache(
+            disk_store=DiskToolResultStore(path), metrics=MetricsRegistry()
+        )
+        await cache.put(WEATHER, key, "北京: 晴")
+        cache.disk_store.close()
+
+        restarted = ToolResultCache(
+            disk_store=DiskToolResultStore(path), metrics=MetricsRegistry()
+        )
+        assert await restarted.get(WEATHER, key) == "北京: 晴"
+        restarted.invalidate_server("amap")
+        assert await restarted.get(WEATHER, key) is None
+        assert restarted.disk_store.total_bytes == 0
+        restarted.disk_store.close()
+
+    @pytest.mark.asyncio
+    async def test_disk_store_should_run_off_the_event_loop(self):
+        threads = []
+
+        class RecordingStore(DiskToolResultStore):
+            def get(self, key):
+                threads.append(threading.get_ident())
+                return super().get(key)
+
+            def put(self, key, server, value, expires):
+                threads.append(threading.get_ident())
+                super().put(key, server, value, expires)
+
+        cache = ToolResultCache(
+            disk_store=RecordingStore(":memory:"), metrics=MetricsRegistry()
+        )
+        key = key_of(WEATHER, {"city": "北京"})
+        await cache.put(WEATHER, key, "北京: 晴")
+        cache.invalidate_server("other")
+        restarted = ToolResultCache(
+            disk_store=cache.disk_store, metrics=MetricsRegistry()
+        )
+        assert await restarted.get(WEATHER, key) == "北京: 晴"
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+        cache.disk_store.close()
+
+
+def make_counting_server(calls):
+    server = FastMCP("amap")
+
+    @server.tool
+    def maps_weather(city: str) -> str:
+        """查询城市天气"""
+        calls.append(city)
+        if city == "火星":
+            raise ValueError("不支持的城市")
+        return f"{city}: 晴"
+
+    @server.tool
+    def current_time() -> str:
+        """当前时间"""
+        calls.append("time")
+        return str(len(calls))
+
+    return server
+
+
+class TestToolServiceWithResultCache:
+    calls: List[str]
+    registry: MemoryServerRegistry
+    cache: ToolResultCache
+    service: ToolServiceImpl
+
+    @pytest.fixture(autouse=True)
+    def setup_service(self):
+        self.calls = []
+        servers = {"http://amap.local/sse": make_counting_server(self.calls)}
+        self.registry = MemoryServerRegistry()
+        manager = MCPConnectionManager(
+            self.registry, client_factory=lambda url: Client(servers[url])
+        )
+        self.cache = ToolResultCache(
+            non_cacheable=["current_time"], metrics=MetricsRegistry()
+        )
+        self.service = ToolServiceImpl(
+            CapabilityCache(self.registry, manager), manager, result_cache=self.cache
+        )
+        self.registry.add_server("amap", "http://amap.local/sse")
+
+    @pytest.mark.asyncio
+    async def test_repeated_call_should_be_served_from_cache(self):
+        for _ in range(3):
+            assert await self.service.call_tool("maps_weather", {"city": "北京"}) == (
+                "北京: 晴"
+            )
+        assert self.calls == ["北京"]
+        assert self.cache.stats()["amap.maps_weather"]["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_non_cacheable_tool_and_errors_should_not_be_cached(self):
+        first = await self.service.call_tool("current_time")
+        second = await self.service.call_tool("current_time")
+        assert first != second
+        for _ in range(2):
+            with pytest.raises(ToolCallError):
+                await self.service.call_tool("maps_weather", {"city": "火星"})
+        assert self.calls.count("火星") == 2
+
+    @pytest.mark.asyncio
+    async def test_editing_server_should_invalidate_its_results(self):
+        await self.service.call_tool("maps_weather", {"city": "北京"})
+        await self.service.list_tools()
+        self.registry.edit_server("amap", "http://amap.local/sse")
+        await self.service.call_tool("maps_weather", {"city": "北京"})
+        assert self.calls == ["北京", "北京"]
@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import io
+import json
+import pytest
+from starlette.testclient import TestClient
+from personal_agent.chat import Container as ChatContainer
+from personal_agent.chat.llm_adapter import LLMAdapter, OpenAICompatibleLLMAdapter
+from personal_agent.cli.cli import CommandLineInterface
+from personal_agent.config.config import ChatConfig, LLMConfig, ServerConfig
+from personal_agent.devtools.fake_llm import FakeLLMServer
+from personal_agent.mcp.server_registry_async import ThreadedServerRegistry
+from personal_agent.mcp.server_registry_memory import MemoryServerRegistry
+from personal_agent.server.http_app import create_app
+from personal_agent.util import tracing
+from personal_agent.util.metrics import MetricsRegistry, render_prometheus
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        pass
+
+    def named(self, name):
+        return [s for s in self.spans if s.name == name]
+
+
+class EchoLLMAdapter(LLMAdapter):
+    async def chat(self, messages):
+        return f"echo {messages[-1]['content']}"
+
+    async def stream(self, messages):
+        for char in await self.chat(messages):
+            yield char
+
+    async def chat_with_tools(self, messages, tools):
+        raise NotImplementedError
+
+
+class StubConfiger:
+    def get_llm_config(self):
+        return LLMConfig(provider="fake", model="fake-model", api_key="fake-key")
+
+    def get_chat_config(self):
+        return ChatConfig()
+
+
+@pytest.fixture
+def traced():
+    """开启默认追踪器，span 收集到内存，指标写入独立的注册表"""
+    tracer = tracing.default_tracer
+    metrics = tracer.metrics
+    exporter = CollectingExporter()
+    tracer.metrics = MetricsRegistry()
+    tracer.exporters = [exporter]
+    tracer.enabled = True
+    yield exporter
+    tracing.configure(False)
+    tracer.metrics = metrics
+
+
+class TestTracer:
+
+    def test_disabled_tracer_should_return_shared_noop_span(self):
+        tracer = tracing.Tracer(metrics=MetricsRegistry())
+        with tracer.span("x", a=1) as span:
+            span.set("b", 2)
+            span.add("c")
+        assert span is tracing.NOOP_SPAN
+        assert not span.recording
+        assert tracer.metrics.snapshot()["histograms"] == {}
+
+    def test_nested_spans_should_share_trace_and_record_metrics(self):
+        exporter = CollectingExporter()
+        tracer = tracing.Tracer(True, MetricsRegistry(), [exporter])
+        with tracer.span("outer", kind="turn") as outer:
+            with tracer.span("inner") as inner:
+                inner.add("bytes", 10)
+                inner.add("bytes", 5)
+        assert [s.name for s in exporter.spans] == ["inner", "outer"]
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id and outer.parent_id is None
+        assert inner.attributes == {"bytes": 15}
+        assert outer.duration >= inner.duration
+        assert tracer.metrics.histogram("span.outer_seconds").count == 1
+
+    def test_error_should_be_recorded_and_propagated(self):
+        exporter = CollectingExporter()
+        tracer = tracing.Tracer(True, MetricsRegistry(), [exporter])
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("boom")
+        assert exporter.spans[0].error == "ValueError: boom"
+        assert tracer.metrics.counter("span.failing.errors").value == 1
+
+    @pytest.mark.asyncio
+    async def test_tasks_should_inherit_parent_span(self, traced):
+        async def child(i):
+            with tracing.span("child", index=i):
+                await asyncio.sleep(0)
+
+        with tracing.span("parent") as parent:
+            await asyncio.gather(*(child(i) for i in range(3)))
+        children = traced.named("child")
+        assert len(children) == 3
+        assert {c.parent_id for c in children} == {parent.span_id}
+
+    def test_otel_exporter_should_write_otlp_json_lines(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        exporter = tracing.OTelJSONExporter(str(path))
+        tracer = tracing.Tracer(True, MetricsRegistry(), [exporter])
+        with tracer.span("turn", tokens=3, cached=True, model="m"):
+            with tracer.span("step"):
+                pass
+        tracer.close()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        step, turn = (
+            line["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for line in lines
+        )
+        assert step["parentSpanId"] == turn["spanId"]
+        assert "parentSpanId" not in turn
+        assert int(turn["endTimeUnixNano"]) >= int(turn["startTimeUnixNano"])
+        assert {a["key"]: a["value"] for a in turn["attributes"]} == {
+            "tokens": {"intValue": "3"},
+            "cached": {"boolValue": True},
+            "model": {"stringValue": "m"},
+        }
+        assert turn["status"] == {"code": 1}
+
+    def test_prometheus_exporter_should_write_on_root_spans(self, tmp_path):
+        path = tmp_path / "metrics.prom"
+        metrics = MetricsRegistry()
+        exporter = tracing.PrometheusFileExporter(str(path), 3600, metrics)
+        tracer = tracing.Tracer(True, metrics, [exporter])
+        with tracer.span("turn"):
+            with tracer.span("step"):
+                pass
+            assert not path.exists()
+        assert "span_turn_seconds_count 1" in path.read_text()
+
+
+class TestPrometheusFormat:
+
+    def test_render_should_export_counters_and_summaries(self):
+        metrics = MetricsRegistry()
+        metrics.counter("mcp.tool_cache.hits.search").inc(3)
+        for value in (0.1, 0.2, 0.3):
+            metrics.histogram("span.llm.chat_seconds").observe(value)
+        text = render_prometheus(metrics)
+        assert "# TYPE mcp_tool_cache_hits_search_total counter" in text
+        assert "mcp_tool_cache_hits_search_total 3" in text
+        assert "# TYPE span_llm_chat_seconds summary" in text
+        assert 'span_llm_chat_seconds{quantile="0.5"} 0.2' in text
+        assert "span_llm_chat_seconds_count 3" in text
+
+
+class TestInstrumentation:
+
+    @pytest.mark.asyncio
+    async def test_chat_turn_should_record_prompt_and_llm_spans(self, traced):
+        async with FakeLLMServer(reply="你好") as server:
+            config = (
+                StubConfiger()
+                .get_llm_config()
+                .model_copy(update={"api_base": server.url})
+            )
+            service = ChatContainer(
+                configer=StubConfiger,
+                llm_adapter=OpenAICompatibleLLMAdapter(config),
+            ).chat_service()
+            assert await service.get_response("hi") == "你好"
+        turn = traced.named("chat.turn")[0]
+        build = traced.named("chat.build_prompt")[0]
+        llm = traced.named("llm.chat")[0]
+        assert build.parent_id == turn.span_id == llm.parent_id
+        assert build.attributes["prompt_tokens"] > 0
+        assert llm.attributes["model"] == "fake-model"
+        assert llm.attributes["output_tokens"] > 0
+        assert turn.attributes["reply_chars"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cli_turn_should_wrap_streamed_turn(self, traced):
+        chat = ChatContainer(
+            configer=StubConfiger, llm_adapter=EchoLLMAdapter()
+        ).chat_service()
+        cli = CommandLineInterface(lambda: None, chat_service=lambda: chat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await cli._process_input("hi")  # pylint: disable=W0212
+        cli_turn = traced.named("cli.turn")[0]
+        chat_turn = traced.named("chat.turn")[0]
+        assert chat_turn.parent_id == cli_turn.span_id
+        assert chat_turn.attributes["chunks"] == len("echo hi")
+        assert cli_turn.attributes["output_chars"] == len("echo hi")
+        assert cli_turn.attributes["render_seconds"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_streamed_turn_should_not_leak_span_into_consumer(self, traced):
+        chat = ChatContainer(
+            configer=StubConfiger, llm_adapter=EchoLLMAdapter()
+        ).chat_service()
+        with tracing.span("consumer") as consumer:
+            async for _ in chat.stream_response("hi"):
+                assert tracing.current_span() is consumer
+                with tracing.span("render"):
+                    pass
+        assert tracing.current_span() is tracing.NOOP_SPAN
+        turn = traced.named("chat.turn")[0]
+        assert turn.parent_id == consumer.span_id
+        assert {s.parent_id for s in traced.named("render")} == {consumer.span_id}
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("traced")
+    async def test_stats_should_show_percentiles(self):
+        chat = ChatContainer(
+            configer=StubConfiger, llm_adapter=EchoLLMAdapter()
+        ).chat_service()
+        cli = CommandLineInterface(
+            lambda: None,
+            chat_service=lambda: chat,
+            metrics=tracing.default_tracer.metrics,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            await cli._process_input("hi")  # pylint: disable=W0212
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            await cli._process_input("/stats span.")  # pylint: disable=W0212
+        lines = output.getvalue().splitlines()
+        assert lines[0].split()[:2] == ["timing", "count"]
+        names = [line.split()[0] for line in lines[1:] if line]
+        assert "span.cli.turn_seconds" in names
+        assert "span.chat.build_prompt_seconds" in names
+
+
+def test_http_metrics_endpoint_should_serve_prometheus_text():
+    metrics = MetricsRegistry()
+    metrics.counter("chat.session_loads").inc()
+    app = create_app(
+        ChatContainer(
+            configer=StubConfiger, llm_adapter=EchoLLMAdapter()
+        ).session_chat_service(),
+        ThreadedServerRegistry(MemoryServerRegistry(), offload=False),
+        ServerConfig(),
+    )
+    app.state.frontend.metrics = metrics
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "chat_session_loads_total 1" in response.text